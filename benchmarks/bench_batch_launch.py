@@ -0,0 +1,94 @@
+"""
+批量启动基准测试：比较每个任务单独启动task与合并为一次task调用的总耗时
+
+用法:
+    python benchmarks/bench_batch_launch.py [-n 任务数] [-r 重复次数]
+
+生成一个包含n个短任务的临时Taskfile，分别测量：
+    separate-seq   每个任务一个task进程，依次运行
+    separate-par   每个任务一个task进程，同时启动
+    batch-seq      一次调用 task t0 t1 ...
+    batch-par      一次调用 task --parallel t0 t1 ...
+每种方式统计从开始启动到所有任务结束的总耗时，并检查批量输出是否被正确拆分到各任务。
+需要安装task。
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.run_engine import start_run, wait_run, build_task_argv, get_run_output
+from src.services.batch_runner import start_batch
+
+def _write_taskfile(path, count):
+    lines = ["version: '3'", "tasks:"]
+    for index in range(count):
+        lines += [f"  t{index}:", "    cmds:", f"      - echo task-{index}"]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+def _run_separate(task_names, taskfile, workdir, parallel):
+    if parallel:
+        run_ids = [start_run(name, taskfile, argv=build_task_argv(name, taskfile), cwd=workdir) for name in task_names]
+        records = [wait_run(run_id, timeout=300, poll_interval=0.005) for run_id in run_ids]
+    else:
+        records = [wait_run(start_run(name, taskfile, argv=build_task_argv(name, taskfile), cwd=workdir),
+                            timeout=300, poll_interval=0.005) for name in task_names]
+    return all(record["status"] == "success" for record in records)
+
+def _run_batch(task_names, taskfile, parallel):
+    done = []
+    start_batch(task_names, taskfile, parallel=parallel, on_complete=done.append)
+    while not done:
+        time.sleep(0.005)
+    children = done[0]["batch_runs"]
+    # 每个任务的输出应只包含自己的echo结果
+    split_ok = all(f"task-{child['task'][1:]}\n" in get_run_output(child["run_id"]) for child in children)
+    return done[0]["status"] == "success" and split_ok and all(child["status"] == "success" for child in children)
+
+def _report(label, durations, count):
+    print(f"{label:<14} total {statistics.median(durations) * 1000:9.1f} ms"
+          f"   per task {statistics.median(durations) * 1000 / count:7.2f} ms"
+          f"   (min {min(durations) * 1000:.1f} ms)")
+
+def main():
+    parser = argparse.ArgumentParser(description="比较单独启动与合并调用的总耗时")
+    parser.add_argument("-n", "--count", type=int, default=50, help="任务数")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="每种方式的重复次数")
+    args = parser.parse_args()
+
+    if not shutil.which("task"):
+        print("未找到task命令，无法运行该基准测试")
+        return
+
+    workdir = tempfile.mkdtemp(prefix="taskgui-bench-")
+    taskfile = os.path.join(workdir, "Taskfile.yml")
+    _write_taskfile(taskfile, args.count)
+    task_names = [f"t{index}" for index in range(args.count)]
+
+    modes = [
+        ("separate-seq", lambda: _run_separate(task_names, taskfile, workdir, False)),
+        ("separate-par", lambda: _run_separate(task_names, taskfile, workdir, True)),
+        ("batch-seq", lambda: _run_batch(task_names, taskfile, False)),
+        ("batch-par", lambda: _run_batch(task_names, taskfile, True)),
+    ]
+    try:
+        print(f"{args.count} 个任务，每种方式 {args.repeat} 次（取中位数）:")
+        for label, run in modes:
+            durations = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                if not run():
+                    raise RuntimeError(f"{label} 运行失败或输出拆分不正确")
+                durations.append(time.perf_counter() - start)
+            _report(label, durations, args.count)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
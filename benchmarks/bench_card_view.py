@@ -0,0 +1,72 @@
+"""
+卡片视图渲染基准测试：比较一次渲染全部卡片与按页渲染的单次重新运行耗时
+
+用法:
+    python benchmarks/bench_card_view.py [-n 任务数] [-r 重复次数] [--sizes 12,24,48,96]
+
+用 streamlit.testing 的 AppTest 在进程内运行只包含卡片视图的脚本，任务为合成数据。
+每种每页数量先渲染一次预热，再重复触发重新运行并统计耗时（中位数与p95）和渲染的按钮数。
+"all" 表示每页数量不小于任务数，等价于分页之前一次渲染全部卡片。
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.testing.v1 import AppTest
+
+_SCRIPT = """
+import sys
+sys.path.insert(0, {root!r})
+import pandas as pd
+import streamlit as st
+import src.views.card.card_view as card_view
+from src.views.card.card_view import render_card_view
+
+card_view.CARD_PAGE_SIZES = sorted(set(card_view.CARD_PAGE_SIZES + [{page_size}]))
+card_view.DEFAULT_CARD_PAGE_SIZE = {page_size}
+tasks = pd.DataFrame([
+    {{"name": f"task{{i}}", "emoji": "🔧", "description": f"任务 {{i}} 的描述",
+      "tags": [f"tag{{i % 7}}", "bench"], "directory": "/tmp", "file_id": ""}}
+    for i in range({tasks})
+])
+render_card_view(tasks, None, key_prefix="bench")
+"""
+
+def _measure(tasks, page_size, repeat):
+    app = AppTest.from_string(_SCRIPT.format(root=ROOT, tasks=tasks, page_size=page_size), default_timeout=120)
+    app.run()
+    if app.exception:
+        raise RuntimeError(app.exception[0].value)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        app.run()
+        times.append(time.perf_counter() - start)
+    return times, len(app.button)
+
+def main():
+    parser = argparse.ArgumentParser(description="比较卡片视图按页渲染与一次渲染全部卡片的耗时")
+    parser.add_argument("-n", "--tasks", type=int, default=300, help="任务数")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="每种每页数量的重复次数")
+    parser.add_argument("--sizes", default="12,24,48,96", help="要测量的每页数量，逗号分隔")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    print(f"{args.tasks} 个任务，每种每页数量重复 {args.repeat} 次（单次重新运行耗时，秒）:")
+    results = {}
+    for label, page_size in [(str(size), size) for size in sizes] + [("all", args.tasks)]:
+        times, buttons = _measure(args.tasks, page_size, args.repeat)
+        times.sort()
+        p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+        results[label] = statistics.median(times)
+        print(f"  page size {label:<6} median {results[label]:7.3f}   p95 {p95:7.3f}   buttons {buttons}")
+    for label in [str(size) for size in sizes]:
+        print(f"  每页 {label} 个比全部渲染快 {results['all'] / results[label]:.1f} 倍")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+启动开销基准测试：比较通过task启动与直接执行展开命令的单次启动耗时
+
+用法:
+    python benchmarks/bench_launch_overhead.py [-n 次数]
+
+生成一个临时Taskfile（任务只执行一条很短的命令），依次启动并等待每次运行结束，
+统计从启动到结束的耗时。未安装task时只测试直接执行模式。
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.run_engine import start_run, wait_run, build_task_argv
+from src.services.direct_runner import expand_task, get_cache_stats
+
+TASKFILE = """version: '3'
+vars:
+  GREETING: hello
+tasks:
+  noop:
+    cmds:
+      - '"{python}" -c "pass"'
+  echo:
+    cmds:
+      - echo {{{{.GREETING}}}}
+"""
+
+def _measure(launch, count):
+    durations = []
+    for _ in range(count):
+        start = time.perf_counter()
+        record = wait_run(launch(), timeout=60, poll_interval=0.001)
+        durations.append(time.perf_counter() - start)
+        if record["status"] != "success":
+            raise RuntimeError(f"运行失败: {record}")
+    return durations
+
+def _report(label, durations):
+    durations = sorted(durations)
+    p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+    print(f"{label:<18} mean {statistics.mean(durations) * 1000:8.1f} ms"
+          f"   p50 {statistics.median(durations) * 1000:8.1f} ms"
+          f"   p95 {p95 * 1000:8.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="比较task启动与直接执行的启动开销")
+    parser.add_argument("-n", "--count", type=int, default=30, help="每种方式的启动次数")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="taskgui-bench-")
+    taskfile = os.path.join(workdir, "Taskfile.yml")
+    with open(taskfile, "w", encoding="utf-8") as f:
+        f.write(TASKFILE.format(python=sys.executable.replace("\\", "/")))
+
+    try:
+        for task_name in ("noop", "echo"):
+            print(f"任务 {task_name} ({args.count} 次):")
+
+            def launch_direct():
+                expansion = expand_task(taskfile, task_name)
+                return start_run(task_name, taskfile, argv=expansion["argv"],
+                                 cwd=expansion["cwd"], env=expansion["env"])
+
+            if expand_task(taskfile, task_name) is None:
+                print("  直接执行不支持该任务，跳过")
+            else:
+                _report("  direct", _measure(launch_direct, args.count))
+
+            if shutil.which("task"):
+                def launch_task():
+                    return start_run(task_name, taskfile, argv=build_task_argv(task_name, taskfile), cwd=workdir)
+                _report("  task", _measure(launch_task, args.count))
+            else:
+                print("  未找到task命令，跳过task模式")
+
+        # 展开缓存命中情况
+        expand_start = time.perf_counter()
+        for _ in range(1000):
+            expand_task(taskfile, "noop")
+        print(f"缓存展开: {(time.perf_counter() - expand_start) * 1000:.3f} ms / 1000 次, 统计 {get_cache_stats()}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
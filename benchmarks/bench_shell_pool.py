@@ -0,0 +1,98 @@
+"""
+常驻shell基准测试：比较每个任务启动新shell与复用预热的常驻shell的单次耗时
+
+用法:
+    python benchmarks/bench_shell_pool.py [-n 次数]
+
+生成一个临时Taskfile（任务包含几条很短的shell命令，直接执行时需要shell解释），
+依次顺序运行并等待每次运行结束，统计从启动到结束的耗时。仅支持Linux/macOS。
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.run_engine import start_run, wait_run
+from src.services.direct_runner import expand_task
+from src.services import shell_pool
+
+TASKFILE = """version: '3'
+vars:
+  GREETING: hello
+tasks:
+  short:
+    cmds:
+      - echo {{.GREETING}}
+      - test -d .
+  env:
+    env:
+      STAGE: bench
+    cmds:
+      - echo "$STAGE" > /dev/null
+      - 'true'
+"""
+
+def _measure(launch, count):
+    durations = []
+    for _ in range(count):
+        start = time.perf_counter()
+        record = wait_run(launch(), timeout=60, poll_interval=0.001)
+        durations.append(time.perf_counter() - start)
+        if record["status"] != "success":
+            raise RuntimeError(f"运行失败: {record}")
+    return durations
+
+def _report(label, durations):
+    durations = sorted(durations)
+    p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+    print(f"{label:<18} mean {statistics.mean(durations) * 1000:8.1f} ms"
+          f"   p50 {statistics.median(durations) * 1000:8.1f} ms"
+          f"   p95 {p95 * 1000:8.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="比较新shell与常驻shell的单任务开销")
+    parser.add_argument("-n", "--count", type=int, default=50, help="每种方式的运行次数")
+    args = parser.parse_args()
+
+    if not shell_pool.is_supported():
+        print("常驻shell仅支持Linux/macOS")
+        return
+
+    workdir = tempfile.mkdtemp(prefix="taskgui-bench-")
+    taskfile = os.path.join(workdir, "Taskfile.yml")
+    with open(taskfile, "w", encoding="utf-8") as f:
+        f.write(TASKFILE)
+
+    shell_pool.configure_shell_pool(enabled=True, size=1, max_commands=args.count * 2 + 10)
+    try:
+        for task_name in ("short", "env"):
+            expansion = expand_task(taskfile, task_name)
+            if expansion is None or not expansion["script"]:
+                print(f"任务 {task_name} 不需要shell解释，跳过")
+                continue
+            print(f"任务 {task_name} ({args.count} 次):")
+
+            def launch_fresh():
+                return start_run(task_name, taskfile, argv=expansion["argv"], cwd=expansion["cwd"], env=expansion["env"])
+
+            def launch_pooled():
+                return shell_pool.run_in_shell(task_name, taskfile, expansion["script"], expansion["cwd"],
+                                               env=expansion["env"])
+
+            fresh = _measure(launch_fresh, args.count)
+            pooled = _measure(launch_pooled, args.count)
+            _report("  fresh shell", fresh)
+            _report("  pooled shell", pooled)
+            print(f"  每个任务节省 {(statistics.mean(fresh) - statistics.mean(pooled)) * 1000:.1f} ms")
+        print(f"常驻shell统计: {shell_pool.get_shell_pool_stats()}")
+    finally:
+        shell_pool.configure_shell_pool(enabled=False)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,34 @@ import sys
 import run
 import exit
 
+def daemon_command(action):
+    """管理本地执行守护进程"""
+    from src.services import daemon_client
+    
+    if action == 'start':
+        try:
+            status = daemon_client.start_daemon()
+            print(f"守护进程运行中: pid={status['pid']} port={status['port']}")
+        except daemon_client.DaemonError as e:
+            print(f"启动失败: {e}")
+            sys.exit(1)
+    elif action == 'stop':
+        if daemon_client.stop_daemon():
+            print("已停止守护进程")
+        else:
+            print("守护进程未运行")
+    elif action == 'run':
+        # 在前台运行（用于调试或由进程管理器托管）
+        from src.services.run_daemon import serve
+        serve()
+    else:
+        status = daemon_client.get_status()
+        if status:
+            print(f"守护进程运行中: pid={status['pid']} port={status['port']} "
+                  f"启动于 {status['started_at']} 运行中任务 {status['active_runs']}")
+        else:
+            print("守护进程未运行")
+
 def main():
     """处理命令行参数并调用相应函数"""
     # 检查是否提供了子命令
@@ -9,6 +37,9 @@ def main():
         # 删除子命令，这样exit.stop_streamlit()就不会将其视为参数
         sys.argv.pop(1)
         exit.stop_streamlit()
+    elif len(sys.argv) > 1 and sys.argv[1] == 'daemon':
+        # 守护进程管理：daemon [start|stop|status|run]
+        daemon_command(sys.argv[2] if len(sys.argv) > 2 else 'status')
     else:
         # 默认行为是启动应用
         run.main()
@@ -1,26 +1,103 @@
 import os
+import sys
 import subprocess
 
-def stop_streamlit():
+# 任务管理器使用的端口
+PORT = 2042
+
+def _stop_windows():
+    import psutil
+    
+    # 查找占用2042端口的进程
+    result = subprocess.check_output(
+        f'netstat -ano | findstr :{PORT} | findstr LISTENING', 
+        shell=True, 
+        text=True
+    )
+    
+    # 解析PID
+    for line in result.splitlines():
+        parts = line.strip().split()
+        if len(parts) >= 5:
+            pid = parts[4]
+            print(f"找到进程ID: {pid}，正在终止...")
+            # 不使用 taskkill /T：它会连同守护进程及其拥有的运行一起结束，
+            # 先记录进程树并排除守护进程，再逐个结束
+            try:
+                children = _exclude_daemon(psutil.Process(int(pid)).children(recursive=True))
+            except psutil.Error:
+                children = []
+            
+            subprocess.run(f'taskkill /F /PID {pid}', shell=True)
+            for child in children:
+                try:
+                    child.kill()
+                except psutil.NoSuchProcess:
+                    pass
+            psutil.wait_procs(children, timeout=3)
+            print(f"已成功终止进程 {pid}")
+
+def _find_listening_pids():
+    """查找监听端口的进程ID"""
+    import psutil
+    try:
+        return {conn.pid for conn in psutil.net_connections(kind="inet")
+                if conn.status == psutil.CONN_LISTEN and conn.laddr and conn.laddr.port == PORT and conn.pid}
+    except psutil.AccessDenied:
+        # macOS等系统上需要lsof
+        output = subprocess.check_output(["lsof", "-ti", f"tcp:{PORT}", "-sTCP:LISTEN"], text=True)
+        return {int(pid) for pid in output.split()}
+
+def _exclude_daemon(processes):
+    """从进程列表中排除执行守护进程及其子进程"""
+    import json
+    import psutil
+    
+    state_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "daemon.json")
     try:
-        # 查找占用2042端口的进程
-        result = subprocess.check_output(
-            'netstat -ano | findstr :2042 | findstr LISTENING', 
-            shell=True, 
-            text=True
-        )
+        with open(state_file, "r", encoding="utf-8") as f:
+            daemon = psutil.Process(json.load(f)["pid"])
+        keep = {daemon.pid} | {child.pid for child in daemon.children(recursive=True)}
+    except (OSError, ValueError, KeyError, psutil.Error):
+        return processes
+    return [proc for proc in processes if proc.pid not in keep]
+
+def _stop_posix():
+    import psutil
+    
+    pids = _find_listening_pids()
+    if not pids:
+        raise subprocess.CalledProcessError(1, "lsof")
+    
+    for pid in pids:
+        print(f"找到进程ID: {pid}，正在终止...")
+        server = psutil.Process(pid)
+        # 任务运行在独立进程组中，先记录整个进程树（守护进程及其任务不随界面退出）
+        children = _exclude_daemon(server.children(recursive=True))
+        
+        # 先发送SIGTERM，让服务自行清理运行中的任务
+        server.terminate()
+        _, alive = psutil.wait_procs([server], timeout=5)
+        for proc in alive:
+            proc.kill()
         
-        # 解析PID
-        for line in result.splitlines():
-            parts = line.strip().split()
-            if len(parts) >= 5:
-                pid = parts[4]
-                print(f"找到进程ID: {pid}，正在终止...")
-                
-                # 终止进程
-                subprocess.run(f'taskkill /F /PID {pid}', shell=True)
-                print(f"已成功终止进程 {pid}")
-                
+        # 清理服务退出后遗留的子进程
+        for child in children:
+            try:
+                child.terminate()
+            except psutil.NoSuchProcess:
+                pass
+        _, alive = psutil.wait_procs(children, timeout=3)
+        for proc in alive:
+            proc.kill()
+        print(f"已成功终止进程 {pid}")
+
+def stop_streamlit():
+    try:
+        if sys.platform == "win32":
+            _stop_windows()
+        else:
+            _stop_posix()
         return True
     except subprocess.CalledProcessError:
         print("没有找到正在运行的任务管理器进程")
@@ -30,4 +107,4 @@ def stop_streamlit():
         return False
 
 if __name__ == "__main__":
-    stop_streamlit()
\ No newline at end of file
+    stop_streamlit()
@@ -10,8 +10,8 @@ from code_editor import code_editor
 
 # 导入自定义模块
 from src.utils.session_utils import init_session_state, setup_css
-from src.services.taskfile import load_taskfile, read_taskfile
-from src.services.dataframe import prepare_dataframe, filter_tasks
+from src.services.taskfile import load_taskfile, read_taskfile, load_task_catalog, is_workspace_mode
+from src.services.dataframe import prepare_dataframe, filter_tasks, sort_tasks
 from src.components.tag_filters import get_all_tags, render_tag_filters
 from src.views.table.table_view import render_table_view
 from src.views.card.card_view import render_card_view
@@ -21,6 +21,7 @@ from src.services.task_runner import run_task_via_cmd, run_multiple_tasks
 from src.components.preview_card import render_action_buttons
 from src.manage.state_manager import render_state_manager
 from src.tabs.dashboard import render_dashboard
+from src.tabs.runs_tab import render_runs_tab
 from src.utils.selection_utils import (
     get_global_state, update_global_state, 
     export_yaml_state as export_global_state_yaml, 
@@ -29,7 +30,8 @@ from src.utils.selection_utils import (
     update_task_runtime, record_task_run, init_global_state,
     display_yaml_in_ui, validate_yaml, get_selected_tasks,
     load_background_settings, save_background_settings,
-    get_memory_usage, run_gc, clear_memory_cache
+    get_memory_usage, run_gc, clear_memory_cache, apply_run_outcomes, pop_new_regressions,
+    refresh_task_freshness
 )
 
 # 导入新的模块化组件
@@ -37,6 +39,8 @@ from src.ui.config import setup_page_config
 from src.ui.styles import apply_custom_css, add_clipboard_js
 from src.tabs.settings import render_settings_tab, load_basic_settings
 from src.tabs.preview_tab import render_preview_tab
+from src.components.watch_panel import ensure_watches_started
+from src.components.schedule_panel import ensure_schedules_started
 
 # 导入Pillow增强插件
 try:
@@ -119,7 +123,18 @@ def main():
         register_task_file(default_taskfile)
         
         # 加载任务文件
-        tasks_df = load_taskfile(default_taskfile)
+        if 'basic_settings' not in st.session_state:
+            st.session_state.basic_settings = load_basic_settings()
+        
+        if is_workspace_mode():
+            # 工作区模式：并行加载所有发现的Taskfile并合并
+            load_taskfile(default_taskfile)
+            for taskfile in taskfiles:
+                register_task_file(taskfile)
+            tasks_df = load_task_catalog(default_taskfile)
+        else:
+            tasks_df = load_taskfile(default_taskfile)
+        
         if tasks_df is None or tasks_df.empty:
             st.error("无法加载任务文件或任务文件为空。")
             return
@@ -127,6 +142,18 @@ def main():
         # 注册所有任务
         register_tasks_from_df(tasks_df, default_taskfile)
         
+        # 写入后台运行的完成结果（状态、退出码、耗时、资源占用）
+        apply_run_outcomes()
+        # 耗时相对基线显著变长的运行（详情见仪表盘）
+        for regression in pop_new_regressions():
+            st.toast(f"⚠️ {regression['task']} 耗时 {regression['duration']:.1f}s，"
+                     f"是基线的 {regression['ratio']:.1f} 倍")
+        
+        # 启动已保存的文件监视触发（每个会话一次）
+        ensure_watches_started()
+        # 启动已保存的定时计划，处理停机期间错过的运行（每个会话一次）
+        ensure_schedules_started()
+        
         # 准备数据框
         tasks_df = prepare_dataframe(tasks_df)
         
@@ -165,7 +192,10 @@ def main():
         render_tag_filters(all_tags)
         
         # 过滤任务
-        filtered_df = filter_tasks(tasks_df)
+        filtered_df = sort_tasks(filter_tasks(tasks_df))
+        
+        # 检查声明了sources/generates的任务是否已是最新（结果短时间内复用）
+        refresh_task_freshness(filtered_df, default_taskfile)
         
         # 显示顶部横幅图片
         if 'background_settings' not in st.session_state:
@@ -195,8 +225,8 @@ def main():
             st.session_state.basic_settings = load_basic_settings()
         
         # 使用字典存储页签标题和索引的映射，便于动态管理
-        all_tab_names = ["🗂️ 卡片", "📊 表格", "🔍 预览", "📈 仪表盘", "⚙️ 设置", "🔧 状态"]
-        all_tab_features = ["show_card_tab", "show_table_tab", "show_preview_tab", "show_dashboard_tab", "show_settings_tab", "show_state_tab"]
+        all_tab_names = ["🗂️ 卡片", "📊 表格", "🔍 预览", "📜 运行", "📈 仪表盘", "⚙️ 设置", "🔧 状态"]
+        all_tab_features = ["show_card_tab", "show_table_tab", "show_preview_tab", "show_runs_tab", "show_dashboard_tab", "show_settings_tab", "show_state_tab"]
         
         # 根据设置决定要显示哪些标签页
         tab_names = []
@@ -230,6 +260,11 @@ def main():
             with tabs[tab_indices["🔍 预览"]]:
                 render_preview_tab(filtered_df, default_taskfile)
         
+        # 运行输出页签
+        if "📜 运行" in tab_indices:
+            with tabs[tab_indices["📜 运行"]]:
+                render_runs_tab()
+        
         # 仪表盘页签
         if "📈 仪表盘" in tab_indices:
             with tabs[tab_indices["📈 仪表盘"]]:
@@ -0,0 +1,127 @@
+import os
+import re
+import streamlit as st
+import pandas as pd
+from src.services.task_runner import build_matrix_cells, run_matrix, get_execution_mode, EXECUTION_MODE_HEADLESS
+from src.services.direct_runner import get_task_definition
+from src.services.run_pool import get_pool_settings
+from src.services.scheduler import NODE_FINISHED
+from src.services.run_backend import get_matrix_run, cancel_matrix_run
+from src.services.daemon_client import DaemonError
+from src.utils.selection_utils import group_tasks_by_taskfile
+
+# 一次矩阵运行最多的变量数
+MAX_MATRIX_VARS = 3
+# 显示最近的矩阵运行数量
+MAX_SHOWN_MATRIX_RUNS = 3
+
+_TEMPLATE_VAR_RE = re.compile(r"\{\{[^}]*?\.([A-Za-z_][A-Za-z0-9_]*)")
+
+_STATUS_ICONS = {"pending": "⏳", "running": "🔄", "success": "✅", "failed": "❌", "skipped": "⏭️"}
+
+def _cell_label(cell):
+    """矩阵单元的显示文本：状态图标 + 耗时"""
+    label = _STATUS_ICONS.get(cell["status"], "")
+    if cell["duration"] is not None:
+        label += f" {cell['duration']:.1f}s"
+    elif cell["reason"]:
+        label += f" {cell['reason']}"
+    return label
+
+def render_matrix_panel(selected_tasks, current_taskfile):
+    """渲染矩阵运行：为选中任务的变量指定多个取值，按组合扇出运行
+
+    参数:
+        selected_tasks: 选中的任务列表
+        current_taskfile: 当前任务文件路径
+    """
+    with st.expander("🧮 矩阵运行", expanded=False):
+        options = [(taskfile, name) for taskfile, names in group_tasks_by_taskfile(selected_tasks, current_taskfile).items()
+                   for name in names]
+        if not options:
+            st.info("请先选择任务")
+            return
+        taskfile, task_name = st.selectbox(
+            "任务", options, key="matrix_task",
+            format_func=lambda option: f"{option[1]} ({os.path.basename(option[0] or '')})"
+        )
+
+        # 任务中定义的vars优先于命令行变量，只有命令引用但任务未定义的变量才能通过矩阵取值
+        task = get_task_definition(taskfile, task_name) if taskfile else {}
+        task_vars = set((task.get("vars") or {}).keys())
+        referenced = list(dict.fromkeys(_TEMPLATE_VAR_RE.findall(str(task.get("cmds", "")))))
+        declared = [name for name in referenced if name not in task_vars]
+        if declared:
+            st.caption(f"命令中可由外部传入的变量: {', '.join(declared)}")
+        var_count = st.number_input("变量数", min_value=1, max_value=MAX_MATRIX_VARS, value=1, key="matrix_var_count")
+
+        var_specs = {}
+        for index in range(int(var_count)):
+            cols = st.columns([1, 3])
+            with cols[0]:
+                name = st.text_input("变量名", value=declared[index] if index < len(declared) else "",
+                                     key=f"matrix_var_name_{index}")
+            with cols[1]:
+                spec = st.text_area("取值（每行一个，支持glob，如 input/*）", key=f"matrix_var_values_{index}", height=80)
+            if name.strip() in task_vars:
+                st.warning(f"变量 {name.strip()} 在任务的vars中已定义，任务内定义优先，矩阵取值不会生效")
+            if name.strip():
+                var_specs[name] = spec
+
+        max_concurrency = st.number_input("矩阵并发上限", min_value=1, max_value=64,
+                                          value=min(2, get_pool_settings()["max_workers"]), key="matrix_concurrency",
+                                          help="矩阵内同时运行的组合数，同时受执行池最大并发数限制")
+
+        cells = None
+        if var_specs:
+            try:
+                cells = build_matrix_cells(taskfile, var_specs)
+                st.caption(f"共 {len(cells)} 个组合")
+            except ValueError as e:
+                st.warning(str(e))
+
+        if st.button("运行矩阵", key="matrix_run", disabled=not cells, use_container_width=True):
+            if get_execution_mode() != EXECUTION_MODE_HEADLESS:
+                st.warning("矩阵运行需要后台执行模式")
+            else:
+                try:
+                    matrix_id = run_matrix(task_name, taskfile, cells, max_concurrency=int(max_concurrency))
+                    st.session_state.setdefault("matrix_run_ids", []).append(matrix_id)
+                except DaemonError as e:
+                    st.error(f"无法提交到守护进程: {str(e)}")
+
+        render_matrix_status()
+
+def render_matrix_status():
+    """显示最近的矩阵运行：两个变量时以二维表展示，否则每个组合一行"""
+    for matrix_id in reversed(st.session_state.get("matrix_run_ids", [])[-MAX_SHOWN_MATRIX_RUNS:]):
+        matrix = get_matrix_run(matrix_id)
+        if matrix is None:
+            continue
+        cells = matrix["cells"]
+        done = sum(1 for cell in cells if cell["status"] in NODE_FINISHED)
+        failed = sum(1 for cell in cells if cell["status"] == "failed")
+        durations = [cell["duration"] for cell in cells if cell["duration"] is not None]
+
+        st.markdown(f"**{matrix['task']}** · {_STATUS_ICONS.get(matrix['status'], '')} {done}/{len(cells)}"
+                    + (f" · 失败 {failed}" if failed else "")
+                    + (f" · 累计耗时 {sum(durations):.1f}s" if durations else ""))
+        st.progress(done / len(cells) if cells else 1.0)
+
+        var_names = matrix["vars"]
+        if len(var_names) == 2:
+            rows, columns = var_names
+            grid = pd.DataFrame(
+                [{rows: cell["vars"][rows], columns: cell["vars"][columns], "cell": _cell_label(cell)} for cell in cells]
+            ).pivot(index=rows, columns=columns, values="cell")
+            st.dataframe(grid, use_container_width=True)
+        else:
+            st.dataframe(pd.DataFrame([
+                dict(cell["vars"], 状态=_cell_label(cell), 退出码=cell["exit_code"], run_id=cell["run_id"])
+                for cell in cells
+            ]), use_container_width=True, hide_index=True)
+
+        if matrix["status"] == "running":
+            if st.button("停止未开始的组合", key=f"matrix_cancel_{matrix_id}"):
+                cancel_matrix_run(matrix_id)
+                st.rerun()
@@ -2,10 +2,19 @@ import streamlit as st
 import pandas as pd
 import os
 from src.utils.file_utils import get_task_command, copy_to_clipboard
-from src.services.task_runner import run_task_via_cmd, run_multiple_tasks as run_tasks_via_cmd
-from src.utils.selection_utils import get_selected_tasks, clear_all_selections, get_global_state, record_task_run, get_task_runtime
+from src.services.task_runner import run_task_via_cmd, run_multiple_tasks as run_tasks_via_cmd, get_execution_mode, EXECUTION_MODE_HEADLESS, plan_dependency_run, run_dependency_plan
+from src.services.scheduler import NODE_FINISHED
+from src.services.run_backend import get_dag_run, list_parallel_batches, list_runs
+from src.components.run_progress import render_dag_progress, render_batch_progress
+from src.services.daemon_client import DaemonError
+from src.utils.selection_utils import get_selected_tasks, clear_all_selections, get_global_state, record_task_run, group_tasks_by_taskfile, find_task_key, estimate_task_duration
 from src.views.card.task_card import render_task_card
 
+# 运行进度的刷新间隔（秒）
+PROGRESS_REFRESH_INTERVAL = 1.0
+# st.fragment 在1.37之前名为 experimental_fragment，更早的版本不支持定时刷新
+_FRAGMENT = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+
 try:
     from streamlit_pills import pills
     PILLS_AVAILABLE = True
@@ -38,7 +47,7 @@ def render_action_buttons(selected_tasks, current_taskfile, key_prefix="preview"
             
             with st.container():
                 # 使用响应式布局，在宽屏幕上单行显示，在窄屏上自适应折行
-                cols = st.columns([1, 1, 1, 1])
+                cols = st.columns([1, 1, 1, 1, 1])
                 
                 with cols[0]:
                     # 清除选择按钮，使用emoji代替文本
@@ -50,9 +59,9 @@ def render_action_buttons(selected_tasks, current_taskfile, key_prefix="preview"
                     # 复制所有命令，使用emoji代替文本
                     if st.button("📋", key=f"{key_prefix}_copy_all", use_container_width=True, help="复制所有命令"):
                         commands = []
-                        for task_name in selected_tasks:
-                            cmd = get_task_command(task_name, current_taskfile)
-                            commands.append(cmd)
+                        for taskfile, task_names in group_tasks_by_taskfile(selected_tasks, current_taskfile).items():
+                            for task_name in task_names:
+                                commands.append(get_task_command(task_name, taskfile))
                         
                         all_commands = "\n".join(commands)
                         copy_to_clipboard(all_commands)
@@ -67,16 +76,169 @@ def render_action_buttons(selected_tasks, current_taskfile, key_prefix="preview"
                         st.rerun()
                 
                 with cols[3]:
+                    # 依赖感知模式：按deps构建DAG，共享依赖只运行一次
+                    btn_type = "primary" if st.session_state.get('run_with_deps', False) else "secondary"
+                    if st.button("🔗", key=f"{key_prefix}_run_with_deps", type=btn_type, use_container_width=True, help="切换依赖感知运行"):
+                        st.session_state.run_with_deps = not st.session_state.get('run_with_deps', False)
+                        st.rerun()
+                
+                with cols[4]:
                     # 运行所有选中任务，使用emoji代替文本
                     if st.button("▶️", key=f"{key_prefix}_run_all", use_container_width=True, help="运行所有任务"):
+                        if st.session_state.get('run_with_deps', False):
+                            # 先生成执行计划，确认后再执行
+                            st.session_state[f"{key_prefix}_dag_plans"] = build_dependency_plans(selected_tasks, current_taskfile)
+                            st.rerun()
                         with st.spinner("正在启动所有选中的任务..."):
-                            results = run_tasks_via_cmd(selected_tasks, current_taskfile, parallel=st.session_state.get('run_parallel', False))
-                            # 记录所有任务的运行状态
-                            for task_name in selected_tasks:
-                                record_task_run(task_name, status="started")
+                            # 工作区模式下选中任务可能来自多个Taskfile，按文件分别启动
+                            skipped = 0
+                            for taskfile, task_names in group_tasks_by_taskfile(selected_tasks, current_taskfile).items():
+                                messages = run_tasks_via_cmd(task_names, taskfile, parallel=st.session_state.get('run_parallel', False))
+                                skipped += sum(1 for msg in messages if msg.endswith("已是最新，已跳过"))
+                            if skipped:
+                                st.info(f"{skipped} 个任务已是最新，已跳过（勾选“强制运行”可重新运行）")
+                            # 分离模式无法获知运行结果，只记录启动；后台模式在运行结束时记录真实结果
+                            if get_execution_mode() != EXECUTION_MODE_HEADLESS:
+                                for task_name in selected_tasks:
+                                    record_task_run(task_name, status="started")
                         
+                # 声明了sources/generates且未变化的任务默认跳过
+                st.checkbox("强制运行已是最新的任务", key="force_run")
+                
+                render_dependency_plans(key_prefix)
+                render_run_status()
                 st.success(f"已选中{len(selected_tasks)}个任务")
 
+def _estimate_from_history(taskfile):
+    """返回按历史耗时估计任务耗时的函数"""
+    def estimate(task_name):
+        return estimate_task_duration(find_task_key(task_name, taskfile))
+    
+    return estimate
+
+def build_dependency_plans(selected_tasks, current_taskfile):
+    """为每个Taskfile中的选中任务生成DAG执行计划
+    
+    参数:
+        selected_tasks: 选中的任务列表
+        current_taskfile: 当前任务文件路径
+        
+    返回:
+        计划列表，每项为 {taskfile, plan} 或 {taskfile, error}
+    """
+    plans = []
+    for taskfile, task_names in group_tasks_by_taskfile(selected_tasks, current_taskfile).items():
+        try:
+            plan = plan_dependency_run(task_names, taskfile, _estimate_from_history(taskfile))
+            plans.append({"taskfile": taskfile, "plan": plan})
+        except Exception as e:
+            plans.append({"taskfile": taskfile, "error": str(e)})
+    return plans
+
+def render_dependency_plans(key_prefix):
+    """显示待确认的DAG执行计划：关键路径与预计总耗时"""
+    plans = st.session_state.get(f"{key_prefix}_dag_plans")
+    if not plans:
+        return
+    
+    for entry in plans:
+        st.markdown(f"**{os.path.basename(entry['taskfile'])}**")
+        if "error" in entry:
+            st.error(entry["error"])
+            continue
+        plan = entry["plan"]
+        st.caption(
+            f"{len(plan['graph']['nodes'])} 个节点 · 并发上限 {plan['max_workers']} · "
+            f"预计总耗时 {plan['makespan']:.1f}s"
+        )
+        st.caption(f"关键路径 ({plan['critical_path_length']:.1f}s): {' → '.join(plan['critical_path'])}")
+        if plan["graph"]["external"]:
+            st.caption(f"外部依赖（由task处理）: {', '.join(plan['graph']['external'])}")
+        if plan.get("rerun_deps"):
+            st.warning(
+                "以下任务无法直接执行，将通过task运行并再次运行自己的依赖：\n"
+                + "\n".join(f"- {name}: {reason}" for name, reason in plan["rerun_deps"].items())
+            )
+    
+    runnable = [entry for entry in plans if "plan" in entry]
+    cols = st.columns(2)
+    with cols[0]:
+        if st.button("确认执行", key=f"{key_prefix}_dag_confirm", use_container_width=True, disabled=not runnable):
+            if get_execution_mode() != EXECUTION_MODE_HEADLESS:
+                st.warning("依赖感知运行需要后台执行模式")
+            else:
+                dag_ids = st.session_state.setdefault("dag_run_ids", [])
+                try:
+                    for entry in runnable:
+                        dag_ids.append(run_dependency_plan(entry["plan"], entry["taskfile"]))
+                except DaemonError as e:
+                    st.error(f"无法提交到守护进程: {str(e)}")
+                else:
+                    st.session_state[f"{key_prefix}_dag_plans"] = None
+                    st.rerun()
+    with cols[1]:
+        if st.button("取消", key=f"{key_prefix}_dag_cancel", use_container_width=True):
+            st.session_state[f"{key_prefix}_dag_plans"] = None
+            st.rerun()
+
+def render_dag_status(active_runs):
+    """显示最近的DAG运行中各节点的状态，运行中的DAG显示进度和预计剩余时间"""
+    status_icons = {"pending": "⏳", "running": "🔄", "success": "✅", "failed": "❌", "skipped": "⏭️"}
+    for dag_id in st.session_state.get("dag_run_ids", [])[-3:]:
+        dag = get_dag_run(dag_id)
+        if dag is None:
+            continue
+        done = sum(1 for node in dag["nodes"].values() if node["status"] in NODE_FINISHED)
+        st.caption(f"DAG {dag_id}: {status_icons.get(dag['status'], '')} {done}/{len(dag['nodes'])}")
+        st.caption(" ".join(f"{status_icons.get(node['status'], '')}{name}" for name, node in dag["nodes"].items()))
+        if dag["status"] == "running":
+            render_dag_progress(dag, active_runs)
+
+def render_batch_status(active_runs):
+    """显示最近的并行批次：按最长耗时优先提交的预计完成时间与实际完成时间，运行中的批次显示进度"""
+    batches = list_parallel_batches()[-3:]
+    for batch in batches:
+        actual = f"实际 {batch['actual_makespan']:.1f}s" if batch["actual_makespan"] is not None else "运行中"
+        st.caption(
+            f"并行批次 {batch['batch_id']}: {len(batch['tasks'])} 个任务 · 并发上限 {batch['max_workers']} · "
+            f"预计 {batch['makespan']:.1f}s（按选择顺序预计 {batch['baseline_makespan']:.1f}s） · {actual}"
+            + ("" if batch["estimated"] == len(batch["tasks"]) else
+               f" · {len(batch['tasks']) - batch['estimated']} 个任务无历史耗时")
+        )
+        if batch["status"] == "running":
+            render_batch_progress(batch, active_runs)
+    if batches:
+        latest = batches[-1]
+        rows = [
+            {
+                "任务": name,
+                "顺序": task["position"] + 1,
+                "预计耗时(秒)": task["estimate"],
+                "预计完成(秒)": task["predicted_end"],
+                "实际完成(秒)": task["actual_end"],
+                "状态": task["status"],
+            }
+            for name, task in sorted(latest["tasks"].items(), key=lambda item: item[1]["position"])
+        ]
+        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+
+def _render_run_status():
+    active_runs = list_runs(active_only=True)
+    render_dag_status(active_runs)
+    render_batch_status(active_runs)
+
+if _FRAGMENT is not None:
+    _render_run_status_live = _FRAGMENT(run_every=PROGRESS_REFRESH_INTERVAL)(_render_run_status)
+else:
+    _render_run_status_live = _render_run_status
+
+def render_run_status():
+    """显示DAG运行和并行批次的状态与进度（有运行中的任务且支持片段时定时刷新，不重跑整个页面）"""
+    if list_runs(active_only=True):
+        _render_run_status_live()
+    else:
+        _render_run_status()
+
 def render_preview_tab_content(filtered_df, current_taskfile):
     """渲染预览页签的内容
     
@@ -93,7 +255,9 @@ def render_preview_tab_content(filtered_df, current_taskfile):
         return
     
     # 获取选中任务的详细信息
-    selected_df = filtered_df[filtered_df['name'].isin(selected_tasks)].copy()
+    # 工作区模式下选中状态按 task_key 保存
+    key_column = 'task_key' if 'task_key' in filtered_df.columns else 'name'
+    selected_df = filtered_df[filtered_df[key_column].isin(selected_tasks)].copy()
     
     # 添加每行卡片数量的滑动条
     cards_per_row = st.slider(
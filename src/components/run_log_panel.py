@@ -0,0 +1,151 @@
+import codecs
+import streamlit as st
+from src.services.run_engine import OUTPUT_ENCODING, STATUS_RUNNING, FINISHED_STATUSES
+from src.services.run_backend import get_run, tail_run_output, cancel_run, get_log_size, get_run_resources
+from src.utils.ansi_utils import ansi_to_html
+from src.components.run_progress import render_run_progress
+
+# 日志面板刷新间隔（秒），所有面板共用一个定时片段，更新合并到固定帧率
+LOG_FRAME_INTERVAL = 0.5
+# 每个面板显示的最大字符数
+MAX_PANEL_CHARS = 20000
+# 落后太多时直接跳到末尾附近，只读取面板能显示的部分
+MAX_CATCHUP_BYTES = MAX_PANEL_CHARS * 4
+# 同时显示的最大面板数
+MAX_LIVE_PANELS = 10
+
+# st.fragment 在1.37之前名为 experimental_fragment，更早的版本不支持定时刷新
+_FRAGMENT = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+
+_STATUS_ICONS = {"running": "🔄", "success": "✅", "failed": "❌", "error": "⚠️", "cancelled": "⏹️", "timeout": "⏱️"}
+
+def _get_view_state(run_id):
+    """获取面板在会话中的读取状态（offset、增量解码器、已显示文本）"""
+    views = st.session_state.setdefault("run_log_views", {})
+    if run_id not in views:
+        views[run_id] = {
+            "offset": 0,
+            "decoder": codecs.getincrementaldecoder(OUTPUT_ENCODING)(errors="replace"),
+            "text": "",
+            "html": "",
+            "skipped": False,
+            # 首次打开时可能落后很多，需要按日志大小决定是否跳到末尾
+            "behind": True,
+            # 运行已结束且输出已读完，不再轮询
+            "done": False,
+        }
+    return views[run_id]
+
+def _poll_run(run_id, view, record=None):
+    """读取自上次offset之后的新输出，返回是否有新内容"""
+    if view["done"]:
+        return False
+    if view["behind"]:
+        # 只在首次读取或上次读满一整块时查询大小，平时直接使用 tail 返回的offset
+        total = get_log_size(run_id)
+        if total - view["offset"] > MAX_CATCHUP_BYTES:
+            # 输出太快或首次打开大日志：跳过面板显示不了的部分
+            view["offset"] = total - MAX_CATCHUP_BYTES
+            view["decoder"].reset()
+            view["text"] = ""
+            view["skipped"] = True
+
+    data, view["offset"] = tail_run_output(run_id, view["offset"], MAX_CATCHUP_BYTES)
+    view["behind"] = len(data) >= MAX_CATCHUP_BYTES
+    if not data:
+        # 日志在状态变为结束之前关闭，结束后读不到新内容即已到达最终大小
+        if record and record["status"] in FINISHED_STATUSES:
+            view["done"] = True
+        return False
+
+    text = view["text"] + view["decoder"].decode(data)
+    if len(text) > MAX_PANEL_CHARS:
+        # 从换行处截断，避免截断半行
+        text = text[-MAX_PANEL_CHARS:]
+        newline = text.find("\n")
+        if 0 <= newline < 200:
+            text = text[newline + 1:]
+        view["skipped"] = True
+    view["text"] = text
+    view["html"] = ansi_to_html(text)
+    return True
+
+def _render_resource_caption(run_id):
+    """显示运行中任务最近一次资源采样（整个进程树）"""
+    series = get_run_resources(run_id)
+    if not series or not series["points"]:
+        return
+    point = dict(zip(series["fields"], series["points"][-1]))
+    mb = 1024 * 1024
+    st.caption(f"CPU {point['cpu_percent']:.0f}% · 内存 {point['rss'] / mb:.0f}MB · "
+               f"读 {point['read_bytes'] / mb:.1f}MB / 写 {point['write_bytes'] / mb:.1f}MB · 线程 {point['threads']}")
+
+def _render_panel(run_id):
+    """渲染单个运行的输出面板"""
+    record = get_run(run_id)
+    view = _get_view_state(run_id)
+    _poll_run(run_id, view, record)
+
+    if record:
+        duration = f" · {record['duration']:.1f}s" if record.get("duration") is not None else ""
+        header = f"{_STATUS_ICONS.get(record['status'], '')} **{record['task']}** `{run_id}`{duration}"
+    else:
+        header = f"`{run_id}`"
+    
+    if record and record["status"] == STATUS_RUNNING:
+        header_cols = st.columns([5, 1])
+        with header_cols[0]:
+            st.markdown(header)
+        with header_cols[1]:
+            if st.button("⏹️ 停止", key=f"run_log_cancel_{run_id}", help="发送SIGTERM，超时后强制结束整个进程树"):
+                cancel_run(run_id)
+        render_run_progress(record)
+        _render_resource_caption(run_id)
+    else:
+        st.markdown(header)
+    if view["skipped"]:
+        st.caption("仅显示最近的输出")
+
+    # column-reverse 让滚动条停留在底部，新输出始终可见
+    st.markdown(
+        "<div style='display:flex;flex-direction:column-reverse;max-height:320px;overflow-y:auto;"
+        "background:#1e1e1e;color:#d4d4d4;border-radius:4px;padding:6px 8px;'>"
+        "<pre style='margin:0;white-space:pre-wrap;word-break:break-all;font-size:12px;background:none;color:inherit;'>"
+        f"{view['html'] or '(暂无输出)'}</pre></div>",
+        unsafe_allow_html=True
+    )
+
+def _render_panels(run_ids):
+    for run_id in run_ids:
+        _render_panel(run_id)
+
+if _FRAGMENT is not None:
+    _render_panels_live = _FRAGMENT(run_every=LOG_FRAME_INTERVAL)(_render_panels)
+else:
+    _render_panels_live = _render_panels
+
+def render_live_log_panels(run_ids):
+    """
+    渲染多个运行的实时输出面板
+
+    所有面板在同一个定时片段中刷新，只重跑片段而不是整个脚本；
+    每帧只读取各运行自上次offset以来的新字节。
+
+    参数:
+        run_ids: 要显示的运行ID列表（最多显示 MAX_LIVE_PANELS 个）
+    """
+    run_ids = list(run_ids)[:MAX_LIVE_PANELS]
+    if not run_ids:
+        st.info("没有要显示的运行")
+        return
+
+    if _FRAGMENT is None:
+        # 旧版本Streamlit不支持片段定时刷新，提供手动刷新
+        if st.button("🔄 刷新输出", key="run_log_refresh"):
+            st.rerun()
+    _render_panels_live(run_ids)
+
+    # 清理已不再显示的面板状态
+    views = st.session_state.get("run_log_views", {})
+    for run_id in [rid for rid in views if rid not in run_ids]:
+        views.pop(run_id, None)
@@ -0,0 +1,96 @@
+from datetime import datetime
+import streamlit as st
+from src.services.duration_model import estimate_progress, estimate_batch_progress, format_seconds
+from src.services.scheduler import estimate_dag_remaining, NODE_FINISHED, NODE_RUNNING, DEFAULT_DURATION_ESTIMATE
+from src.utils.selection_utils import get_task_duration_summary, find_task_key
+
+def _elapsed_since(started_at):
+    """从ISO时间到现在经过的秒数"""
+    try:
+        return max(0.0, (datetime.now() - datetime.fromisoformat(started_at)).total_seconds())
+    except (TypeError, ValueError):
+        return 0.0
+
+def _summary(task_name, taskfile):
+    return get_task_duration_summary(find_task_key(task_name, taskfile))
+
+def _active_runs_by_task(active_runs):
+    """(Taskfile路径, 任务名) -> 运行中的记录，用于把批次和DAG中的任务对应到实际运行"""
+    return {(run.get("taskfile"), run["task"]): run for run in active_runs}
+
+def render_run_progress(record):
+    """显示运行中任务的进度条和预计剩余时间（没有历史耗时时不显示）"""
+    summary = _summary(record["task"], record.get("taskfile"))
+    elapsed = _elapsed_since(record.get("started_at"))
+    estimate = estimate_progress(elapsed, summary)
+    if estimate is None:
+        st.caption(f"已运行 {format_seconds(elapsed)}（没有历史耗时，无法估计剩余时间）")
+        return
+    if estimate["overdue"]:
+        text = f"已运行 {format_seconds(elapsed)}，超过近期p90（{format_seconds(summary['p90'])}）"
+    else:
+        text = f"已运行 {format_seconds(elapsed)} · 预计还需 {format_seconds(estimate['remaining'])}"
+    st.progress(estimate["progress"], text=text)
+
+def render_batch_progress(batch, active_runs):
+    """
+    显示运行中的并行批次的整体进度：按运行中任务的剩余时间和排队任务的中位耗时模拟剩余完成时间
+
+    参数:
+        batch: list_parallel_batches 中的一项
+        active_runs: 运行中的运行记录列表
+    """
+    runs = _active_runs_by_task(active_runs)
+    running, queued, finished = [], [], []
+    for name, task in sorted(batch["tasks"].items(), key=lambda item: item[1]["position"]):
+        if task["actual_end"] is not None:
+            finished.append(task["duration"] or 0.0)
+        elif (batch.get("taskfile"), name) in runs:
+            run = runs[(batch.get("taskfile"), name)]
+            running.append((_elapsed_since(run.get("started_at")), _summary(name, batch.get("taskfile"))))
+        else:
+            queued.append(_summary(name, batch.get("taskfile")))
+    estimate = estimate_batch_progress(running, queued, finished, batch["max_workers"], DEFAULT_DURATION_ESTIMATE)
+    st.progress(
+        estimate["progress"],
+        text=f"批次 {batch['batch_id']}: {len(finished)}/{len(batch['tasks'])} 完成 · "
+             f"预计还需 {format_seconds(estimate['remaining'])}"
+    )
+
+def render_dag_progress(dag, active_runs):
+    """
+    显示运行中的DAG的整体进度：剩余节点按依赖和并发上限估计完成时间，并给出剩余关键路径
+
+    参数:
+        dag: get_dag_run 返回的快照
+        active_runs: 运行中的运行记录列表
+    """
+    runs = _active_runs_by_task(active_runs)
+    taskfile = dag.get("taskfile")
+    remaining = {}
+    done_work = 0.0
+    for name, node in dag["nodes"].items():
+        if node["status"] in NODE_FINISHED:
+            done_work += node.get("duration") or 0.0
+            continue
+        summary = _summary(name, taskfile)
+        expected = summary["median"] if summary else DEFAULT_DURATION_ESTIMATE
+        run = runs.get((taskfile, name)) if node["status"] == NODE_RUNNING else None
+        if run is not None:
+            elapsed = _elapsed_since(run.get("started_at"))
+            estimate = estimate_progress(elapsed, summary)
+            expected = estimate["expected"] if estimate else max(expected, elapsed)
+            done_work += elapsed
+            remaining[name] = max(0.0, expected - elapsed)
+        else:
+            remaining[name] = expected
+    estimate = estimate_dag_remaining(dag, remaining)
+    total_work = done_work + sum(remaining.values())
+    st.progress(
+        min(1.0, done_work / total_work) if total_work else 1.0,
+        text=f"预计还需 {format_seconds(estimate['remaining'])}"
+    )
+    if estimate["critical_path"]:
+        st.caption(
+            f"剩余关键路径 ({format_seconds(estimate['critical_remaining'])}): {' → '.join(estimate['critical_path'])}"
+        )
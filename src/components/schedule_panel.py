@@ -0,0 +1,149 @@
+import os
+import uuid
+from datetime import datetime
+import streamlit as st
+import pandas as pd
+from src.services.task_runner import sync_cron_schedules, get_execution_mode, EXECUTION_MODE_HEADLESS
+from src.services.cron_scheduler import (
+    parse_cron, next_fire_time, CATCH_UP_SKIP, CATCH_UP_ONCE, CATCH_UP_ALL, MAX_PENDING_RUNS
+)
+from src.services.run_backend import list_schedules
+from src.services.daemon_client import DaemonError
+from src.utils.selection_utils import load_local_config, save_local_config, group_tasks_by_taskfile
+
+# config.yaml 中保存定时计划的键
+CRON_CONFIG_KEY = "cron_schedules"
+
+_CATCH_UP_LABELS = {
+    CATCH_UP_ONCE: "补跑一次",
+    CATCH_UP_ALL: f"逐次补跑（最多{MAX_PENDING_RUNS}次）",
+    CATCH_UP_SKIP: "不补跑",
+}
+
+def load_cron_bindings():
+    """从config.yaml读取定时计划"""
+    return list(load_local_config().get(CRON_CONFIG_KEY) or [])
+
+def save_cron_bindings(bindings):
+    """保存定时计划到config.yaml（保留其他配置）"""
+    config = load_local_config()
+    config[CRON_CONFIG_KEY] = bindings
+    return save_local_config(config)
+
+def apply_cron_bindings(bindings):
+    """把定时计划应用到执行层，返回是否成功"""
+    try:
+        sync_cron_schedules(bindings)
+        return True
+    except DaemonError as e:
+        st.error(f"无法把定时计划同步到守护进程: {str(e)}")
+        return False
+
+def ensure_schedules_started():
+    """每个会话启动时应用一次已保存的定时计划（后台执行模式下），错过的触发按补跑策略处理"""
+    if st.session_state.get("cron_schedules_applied") or get_execution_mode() != EXECUTION_MODE_HEADLESS:
+        return
+    bindings = load_cron_bindings()
+    if not bindings or apply_cron_bindings(bindings):
+        st.session_state.cron_schedules_applied = True
+
+def render_schedule_panel(selected_tasks, current_taskfile):
+    """渲染定时运行：为任务设置cron表达式，按时在后台运行
+
+    参数:
+        selected_tasks: 选中的任务列表
+        current_taskfile: 当前任务文件路径
+    """
+    with st.expander("⏰ 定时运行", expanded=False):
+        bindings = load_cron_bindings()
+
+        options = [(taskfile, name) for taskfile, names in group_tasks_by_taskfile(selected_tasks, current_taskfile).items()
+                   for name in names]
+        if options:
+            taskfile, task_name = st.selectbox(
+                "任务", options, key="cron_task",
+                format_func=lambda option: f"{option[1]} ({os.path.basename(option[0] or '')})"
+            )
+            cols = st.columns([2, 1])
+            with cols[0]:
+                expression = st.text_input("cron表达式（分 时 日 月 周）", key="cron_expression",
+                                           placeholder="0 3 * * *",
+                                           help="支持 * , - / 、月份和星期名称（如 mon-fri），以及 @hourly、@daily、@weekly 等简写")
+            with cols[1]:
+                catch_up = st.selectbox("错过的运行", list(_CATCH_UP_LABELS), format_func=_CATCH_UP_LABELS.get,
+                                        key="cron_catch_up",
+                                        help="应用未运行（关闭或停用守护进程）期间错过的触发时间如何处理")
+
+            valid = False
+            if expression.strip():
+                try:
+                    next_at = next_fire_time(parse_cron(expression), datetime.now())
+                    valid = next_at is not None
+                    st.caption(f"下次运行: {next_at:%Y-%m-%d %H:%M}" if valid else "该表达式永远不会触发")
+                except ValueError as e:
+                    st.warning(str(e))
+
+            if st.button("添加定时", key="cron_add", disabled=not valid, use_container_width=True):
+                if get_execution_mode() != EXECUTION_MODE_HEADLESS:
+                    st.warning("定时运行需要后台执行模式")
+                else:
+                    bindings.append({
+                        "id": uuid.uuid4().hex[:12],
+                        "task": task_name,
+                        "taskfile": taskfile,
+                        "cron": expression.strip(),
+                        "catch_up": catch_up,
+                        "enabled": True,
+                    })
+                    save_cron_bindings(bindings)
+                    apply_cron_bindings(bindings)
+                    st.rerun()
+        else:
+            st.info("选择任务后可以添加定时")
+
+        render_schedule_status(bindings)
+
+def render_schedule_status(bindings):
+    """显示已保存的定时计划及下次运行时间、补跑统计，并提供启用/停用和删除操作"""
+    if not bindings:
+        return
+    stats = {schedule["schedule_id"]: schedule for schedule in list_schedules()}
+    rows = []
+    for binding in bindings:
+        schedule = stats.get(binding["id"], {})
+        rows.append({
+            "任务": binding["task"],
+            "cron": binding["cron"],
+            "错过的运行": _CATCH_UP_LABELS.get(binding.get("catch_up"), ""),
+            "启用": binding.get("enabled", True),
+            "下次运行": (schedule.get("next_at") or "").replace("T", " "),
+            "状态": "运行中" if schedule.get("running") else (schedule.get("last_status") or ""),
+            "最近运行": (schedule.get("last_run_at") or "").replace("T", " "),
+            "运行次数": schedule.get("runs", 0),
+            "错过": schedule.get("missed", 0),
+            "已补跑": schedule.get("caught_up", 0),
+            "等待": schedule.get("pending", 0),
+        })
+    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+    for binding in bindings:
+        error = stats.get(binding["id"], {}).get("error")
+        if error:
+            st.warning(f"{binding['task']}: {error}")
+
+    labels = {binding["id"]: f"{binding['task']} · {binding['cron']}" for binding in bindings}
+    cols = st.columns([3, 1, 1])
+    with cols[0]:
+        schedule_id = st.selectbox("定时计划", list(labels), format_func=labels.get, key="cron_select")
+    binding = next((binding for binding in bindings if binding["id"] == schedule_id), None)
+    with cols[1]:
+        if binding and st.button("停用" if binding.get("enabled", True) else "启用", key="cron_toggle"):
+            binding["enabled"] = not binding.get("enabled", True)
+            save_cron_bindings(bindings)
+            apply_cron_bindings(bindings)
+            st.rerun()
+    with cols[2]:
+        if binding and st.button("删除", key="cron_delete"):
+            bindings = [other for other in bindings if other["id"] != schedule_id]
+            save_cron_bindings(bindings)
+            apply_cron_bindings(bindings)
+            st.rerun()
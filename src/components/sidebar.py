@@ -1,5 +1,5 @@
 import streamlit as st
-from src.services.taskfile import read_taskfile, load_taskfile
+from src.services.taskfile import read_taskfile, load_taskfile, load_task_catalog
 from src.utils.selection_utils import save_favorite_tags, save_background_settings, load_background_settings, get_selected_tasks, get_card_view_settings, load_local_config, update_global_state, get_global_state, get_task_selection_state, update_task_selection, record_task_run
 import os
 import sys
@@ -11,6 +11,8 @@ from src.utils.file_utils import get_directory_files, get_task_command
 from src.services.task_runner import run_task_via_cmd
 from src.views.card.card_view import group_tasks_by_first_tag, sort_grouped_tasks
 from src.utils.file_utils import copy_to_clipboard
+from src.services.workspace import get_task_taskfile
+from src.services.dataframe import SORT_OPTIONS
 import hashlib
 
 def get_tag_color(tag):
@@ -119,7 +121,7 @@ def set_sidebar_background(image_path):
 def get_all_tags(taskfile_path):
     """获取所有可用的标签"""
     try:
-        tasks_df = read_taskfile(taskfile_path)
+        tasks_df = load_task_catalog(taskfile_path)
         all_tags = []
         for tags in tasks_df["tags"]:
             if isinstance(tags, list):
@@ -161,7 +163,7 @@ def render_outline_expander(current_taskfile):
     
     with st.expander("📑 分组大纲", expanded=True):
         # 加载任务数据以获取所有分组
-        tasks_df = read_taskfile(current_taskfile)
+        tasks_df = load_task_catalog(current_taskfile)
         if tasks_df is not None and not tasks_df.empty:
             # 分组任务
             grouped_tasks = group_tasks_by_first_tag(tasks_df)
@@ -235,8 +237,8 @@ def render_filter_tasks_expander(current_taskfile):
     with st.expander("🔍 过滤任务", expanded=True):
         # 获取任务列表用于过滤
         try:
-            tasks_df = read_taskfile(current_taskfile)
-            task_names = tasks_df["name"].tolist()
+            tasks_df = load_task_catalog(current_taskfile)
+            task_names = list(dict.fromkeys(tasks_df["name"].tolist()))
             
             # 使用多选组件进行任务筛选
             filtered_tasks = st.multiselect(
@@ -254,6 +256,13 @@ def render_filter_tasks_expander(current_taskfile):
             # 只有当选择发生变化时才更新
             if set(filtered_tasks) != set(st.session_state.filtered_tasks):
                 st.session_state.filtered_tasks = filtered_tasks
+            
+            # 排序方式（耗时、最近运行取自实际运行记录）
+            sort_cols = st.columns([2, 1])
+            with sort_cols[0]:
+                st.selectbox("排序:", options=list(SORT_OPTIONS.keys()), key="sort_by")
+            with sort_cols[1]:
+                st.selectbox("顺序:", options=["升序", "降序"], key="sort_order")
         except Exception as e:
             st.error(f"加载任务失败: {str(e)}")
             st.session_state.filtered_tasks = []
@@ -309,8 +318,9 @@ def render_edit_task_expander(current_taskfile):
                                 if st.button(f"✏️ {task_name}", key=f"edit_btn_{task_name}", help=f"编辑任务 {task_name}"):
                                     # 查找任务数据
                                     try:
-                                        tasks_df = read_taskfile(current_taskfile)
-                                        task_row = tasks_df[tasks_df["name"] == task_name].iloc[0]
+                                        tasks_df = load_task_catalog(current_taskfile)
+                                        key_column = "task_key" if "task_key" in tasks_df.columns else "name"
+                                        task_row = tasks_df[tasks_df[key_column] == task_name].iloc[0]
                                         st.session_state.edit_task_in_sidebar = task_row.to_dict()
                                         st.rerun()
                                     except Exception as e:
@@ -320,8 +330,9 @@ def render_edit_task_expander(current_taskfile):
             
             # 从当前taskfile获取所有任务
             try:
-                tasks_df = read_taskfile(current_taskfile)
-                task_names = tasks_df["name"].tolist()
+                tasks_df = load_task_catalog(current_taskfile)
+                key_column = "task_key" if "task_key" in tasks_df.columns else "name"
+                task_names = tasks_df[key_column].tolist()
                 
                 # 合并搜索和选择为一个多选组件
                 selected_tasks_to_edit = st.multiselect(
@@ -342,7 +353,7 @@ def render_edit_task_expander(current_taskfile):
                         st.info(f"将编辑第一个选择的任务: {selected_task}")
                     
                     # 设置要编辑的任务
-                    task_row = tasks_df[tasks_df["name"] == selected_task].iloc[0]
+                    task_row = tasks_df[tasks_df[key_column] == selected_task].iloc[0]
                     st.session_state.edit_task_in_sidebar = task_row.to_dict()
                     st.rerun()
             except Exception as e:
@@ -370,7 +381,7 @@ def render_edit_task_expander(current_taskfile):
             # 渲染编辑表单
             render_task_edit_form(
                 task=st.session_state.edit_task_in_sidebar,
-                taskfile_path=current_taskfile,
+                taskfile_path=get_task_taskfile(st.session_state.edit_task_in_sidebar, current_taskfile),
                 on_save_callback=on_save_callback,
                 with_back_button=True,
                 back_button_callback=back_button_callback
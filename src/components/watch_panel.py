@@ -0,0 +1,141 @@
+import os
+import uuid
+import streamlit as st
+import pandas as pd
+from src.services.task_runner import sync_watch_triggers, get_execution_mode, EXECUTION_MODE_HEADLESS
+from src.services.file_watch import DEFAULT_DEBOUNCE_SECONDS
+from src.services.run_backend import list_watches
+from src.services.daemon_client import DaemonError
+from src.utils.selection_utils import load_local_config, save_local_config, group_tasks_by_taskfile
+
+# config.yaml 中保存绑定的键
+WATCH_CONFIG_KEY = "watch_triggers"
+
+def load_watch_bindings():
+    """从config.yaml读取文件监视绑定"""
+    return list(load_local_config().get(WATCH_CONFIG_KEY) or [])
+
+def save_watch_bindings(bindings):
+    """保存文件监视绑定到config.yaml（保留其他配置）"""
+    config = load_local_config()
+    config[WATCH_CONFIG_KEY] = bindings
+    return save_local_config(config)
+
+def apply_watch_bindings(bindings):
+    """把绑定应用到执行层，返回是否成功"""
+    try:
+        sync_watch_triggers(bindings)
+        return True
+    except DaemonError as e:
+        st.error(f"无法把文件监视同步到守护进程: {str(e)}")
+        return False
+
+def ensure_watches_started():
+    """每个会话启动时应用一次已保存的绑定（后台执行模式下）"""
+    if st.session_state.get("watch_triggers_applied") or get_execution_mode() != EXECUTION_MODE_HEADLESS:
+        return
+    bindings = load_watch_bindings()
+    if not bindings or apply_watch_bindings(bindings):
+        st.session_state.watch_triggers_applied = True
+
+def _split_lines(text):
+    return [line.strip() for line in str(text or "").replace("，", ",").replace(",", "\n").splitlines() if line.strip()]
+
+def render_watch_panel(selected_tasks, current_taskfile):
+    """渲染文件监视触发：把任务绑定到目录和文件模式，文件变化时自动运行
+
+    参数:
+        selected_tasks: 选中的任务列表
+        current_taskfile: 当前任务文件路径
+    """
+    with st.expander("👀 文件监视触发", expanded=False):
+        bindings = load_watch_bindings()
+
+        options = [(taskfile, name) for taskfile, names in group_tasks_by_taskfile(selected_tasks, current_taskfile).items()
+                   for name in names]
+        if options:
+            taskfile, task_name = st.selectbox(
+                "任务", options, key="watch_task",
+                format_func=lambda option: f"{option[1]} ({os.path.basename(option[0] or '')})"
+            )
+            cols = st.columns([2, 2, 1])
+            with cols[0]:
+                paths = st.text_area("监视目录（每行一个，相对Taskfile所在目录）", key="watch_paths", height=80)
+            with cols[1]:
+                patterns = st.text_area("文件模式（每行一个，留空表示所有文件）", key="watch_patterns", height=80,
+                                        placeholder="*.csv\nincoming/**/*.json")
+            with cols[2]:
+                debounce = st.number_input("防抖（秒）", min_value=0.1, max_value=3600.0, step=0.5,
+                                           value=DEFAULT_DEBOUNCE_SECONDS, key="watch_debounce",
+                                           help="最后一次文件变化后这么久没有新变化才运行；持续变化时最多等待10倍时长")
+                recursive = st.checkbox("包含子目录", value=True, key="watch_recursive")
+            st.caption("任务运行期间再次触发时最多排队一次后续运行；任务的输出不要写入被监视的匹配文件，否则会反复触发")
+
+            if st.button("添加监视", key="watch_add", disabled=not _split_lines(paths), use_container_width=True):
+                if get_execution_mode() != EXECUTION_MODE_HEADLESS:
+                    st.warning("文件监视触发需要后台执行模式")
+                else:
+                    bindings.append({
+                        "id": uuid.uuid4().hex[:12],
+                        "task": task_name,
+                        "taskfile": taskfile,
+                        "paths": _split_lines(paths),
+                        "patterns": _split_lines(patterns),
+                        "debounce": float(debounce),
+                        "recursive": bool(recursive),
+                        "enabled": True,
+                    })
+                    save_watch_bindings(bindings)
+                    apply_watch_bindings(bindings)
+                    st.rerun()
+        else:
+            st.info("选择任务后可以添加监视")
+
+        render_watch_status(bindings)
+
+def render_watch_status(bindings):
+    """显示已保存的绑定及其触发次数、延迟，并提供启用/停用和删除操作"""
+    if not bindings:
+        return
+    stats = {watch["watch_id"]: watch for watch in list_watches()}
+    rows = []
+    for binding in bindings:
+        watch = stats.get(binding["id"], {})
+        rows.append({
+            "任务": binding["task"],
+            "目录": ", ".join(binding.get("paths") or []),
+            "模式": ", ".join(binding.get("patterns") or []) or "*",
+            "启用": binding.get("enabled", True),
+            "文件事件": watch.get("events", 0),
+            "触发": watch.get("triggers", 0),
+            "运行": watch.get("runs", 0),
+            "合并": watch.get("coalesced", 0),
+            "状态": "运行中" + ("（已排队1次）" if watch.get("followup") else "") if watch.get("running")
+                    else ("等待防抖" if watch.get("pending") else (watch.get("last_status") or "")),
+            "最近延迟(秒)": watch.get("last_lag"),
+            "平均延迟(秒)": watch.get("avg_lag"),
+            "最近事件": (watch.get("last_event_at") or "")[11:19],
+        })
+    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+    for binding in bindings:
+        error = stats.get(binding["id"], {}).get("error")
+        if error:
+            st.warning(f"{binding['task']}: {error}")
+
+    labels = {binding["id"]: f"{binding['task']} ← {', '.join(binding.get('paths') or [])}" for binding in bindings}
+    cols = st.columns([3, 1, 1])
+    with cols[0]:
+        watch_id = st.selectbox("监视", list(labels), format_func=labels.get, key="watch_select")
+    binding = next((binding for binding in bindings if binding["id"] == watch_id), None)
+    with cols[1]:
+        if binding and st.button("停用" if binding.get("enabled", True) else "启用", key="watch_toggle"):
+            binding["enabled"] = not binding.get("enabled", True)
+            save_watch_bindings(bindings)
+            apply_watch_bindings(bindings)
+            st.rerun()
+    with cols[2]:
+        if binding and st.button("删除", key="watch_delete"):
+            bindings = [other for other in bindings if other["id"] != watch_id]
+            save_watch_bindings(bindings)
+            apply_watch_bindings(bindings)
+            st.rerun()
@@ -11,6 +11,14 @@ from src.utils.selection_utils import (
     validate_yaml, update_task_runtime, record_task_run,
     get_memory_usage, run_gc, clear_memory_cache, optimize_memory_cache
 )
+from src.services.run_engine import STATUS_RUNNING
+from src.services.run_backend import (
+    list_runs, get_run_output, clear_finished_runs, cancel_run,
+    get_pool_snapshot, cancel_queued, move_queued, set_queued_priority, get_daemon_status,
+    get_flakiness_snapshot, get_shell_pool_stats
+)
+from src.services.task_runner import is_daemon_mode
+from src.services.daemon_client import start_daemon, stop_daemon, DaemonError
 
 def render_state_manager():
     """渲染状态管理器页面"""
@@ -28,7 +36,7 @@ def render_state_manager():
     st.write(f"选中任务数: {len([t for t, info in global_state.get('select', {}).items() if info])}")
     
     # 创建标签页名称和对应索引的映射
-    tab_names = ["YAML编辑器", "任务文件", "选中任务", "任务运行时", "用户偏好", "内存管理"]
+    tab_names = ["YAML编辑器", "任务文件", "选中任务", "任务运行时", "运行记录", "执行队列", "用户偏好", "内存管理"]
     tab_indices = {name: idx for idx, name in enumerate(tab_names)}
     
     # 创建标签页
@@ -296,6 +304,14 @@ def render_state_manager():
         else:
             st.info("没有任务运行时数据")
     
+    # ===== 运行记录标签页 =====
+    with tabs[tab_indices["运行记录"]]:
+        render_run_records()
+    
+    # ===== 执行队列标签页 =====
+    with tabs[tab_indices["执行队列"]]:
+        render_run_queue()
+    
     # ===== 用户偏好标签页 =====
     with tabs[tab_indices["用户偏好"]]:
         st.subheader("用户偏好设置")
@@ -353,6 +369,170 @@ def render_state_manager():
     with tabs[tab_indices["内存管理"]]:
         render_memory_manager()
 
+def render_run_records():
+    """渲染后台运行记录"""
+    st.subheader("后台运行记录")
+    
+    runs = list_runs()
+    if not runs:
+        st.info("还没有后台运行记录")
+        return
+    
+    # 最新的运行排在最前
+    runs = list(reversed(runs))
+    runs_df = pd.DataFrame([{
+        "运行ID": run["run_id"],
+        "任务": run["task"],
+        "PID": run["pid"],
+        "状态": run["status"],
+        "退出码": run["exit_code"],
+        "开始时间": run["started_at"],
+        "结束时间": run["ended_at"] or "",
+        "耗时(秒)": run["duration"],
+        "CPU时间(秒)": run["cpu_time"],
+        "峰值内存(MB)": round(run["peak_rss"] / (1024 * 1024), 1) if run["peak_rss"] else None,
+    } for run in runs])
+    st.dataframe(runs_df, use_container_width=True, hide_index=True)
+    
+    cols = st.columns([3, 1])
+    with cols[0]:
+        run_options = {f"{run['task']} · {run['started_at']} · {run['run_id']}": run["run_id"] for run in runs}
+        selected_label = st.selectbox("查看输出", list(run_options.keys()), key="run_records_select")
+    with cols[1]:
+        if st.button("清除已结束", key="clear_finished_runs"):
+            clear_finished_runs()
+            st.rerun()
+    
+    if selected_label:
+        run_id = run_options[selected_label]
+        record = next(run for run in runs if run["run_id"] == run_id)
+        if record.get("error"):
+            st.error(f"启动失败: {record['error']}")
+        if record["status"] == STATUS_RUNNING:
+            if st.button("⏹️ 停止运行", key="run_records_cancel", help="发送SIGTERM，超时后强制结束整个进程树"):
+                cancel_run(run_id)
+                st.rerun()
+        st.code(get_run_output(run_id, max_chars=20000) or "(无输出)", language="text")
+
+def render_run_queue():
+    """渲染执行池的并发、排队和吞吐量信息"""
+    st.subheader("执行队列")
+    
+    if is_daemon_mode():
+        render_daemon_status()
+    
+    snapshot = get_pool_snapshot()
+    settings = snapshot["settings"]
+    stats = snapshot["stats"]
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("运行中", f"{len(snapshot['active'])} / {settings['max_workers']}")
+    with col2:
+        st.metric("排队中", f"{len(snapshot['queued'])} / {settings['max_queue_size']}")
+    with col3:
+        st.metric("吞吐量 (次/分钟)", f"{snapshot['throughput_per_min']:.2f}")
+    with col4:
+        st.metric("平均排队延迟", f"{snapshot['avg_queue_wait']:.2f} 秒",
+                  help=f"最大排队延迟: {snapshot['max_queue_wait']:.2f} 秒")
+    
+    st.caption(f"队列策略: {settings['queue_policy']} · 老化间隔 {settings['aging_seconds']:g} 秒 · "
+               f"已提交 {stats['submitted']} · 已启动 {stats['started']} · "
+               f"已完成 {stats['completed']} · 被拒绝 {stats['rejected']}")
+    if settings["tag_limits"]:
+        st.caption("标签并发上限: " + ", ".join(f"{tag}={limit}" for tag, limit in settings["tag_limits"].items()))
+    
+    if snapshot["active"]:
+        st.markdown("#### 运行中")
+        st.dataframe(pd.DataFrame(snapshot["active"]), use_container_width=True, hide_index=True)
+    
+    if snapshot["queued"]:
+        st.markdown("#### 排队中")
+        st.dataframe(pd.DataFrame(snapshot["queued"]), use_container_width=True, hide_index=True)
+        
+        # 调整排队顺序：前移/后移、修改优先级或取消
+        queued_items = {item["item_id"]: item for item in snapshot["queued"]}
+        cols = st.columns([3, 1, 1, 2, 1])
+        with cols[0]:
+            item_id = st.selectbox("排队项", list(queued_items.keys()), key="queued_item_select",
+                                   format_func=lambda qid: f"{queued_items[qid]['task']} ({qid})")
+        with cols[1]:
+            if st.button("⬆️", key="queued_item_up", help="前移一位") and item_id:
+                move_queued(item_id, -1)
+                st.rerun()
+        with cols[2]:
+            if st.button("⬇️", key="queued_item_down", help="后移一位") and item_id:
+                move_queued(item_id, 1)
+                st.rerun()
+        with cols[3]:
+            new_priority = st.number_input("优先级", value=float(queued_items[item_id]["priority"]) if item_id else 5.0,
+                                           step=1.0, key=f"queued_item_priority_{item_id}", label_visibility="collapsed")
+            if item_id and new_priority != queued_items[item_id]["priority"]:
+                set_queued_priority(item_id, new_priority)
+                st.rerun()
+        with cols[4]:
+            if st.button("取消", key="cancel_queued_item") and item_id:
+                cancel_queued(item_id)
+                st.rerun()
+    elif not snapshot["active"]:
+        st.info("执行队列为空")
+    
+    if snapshot["task_waits"]:
+        with st.expander("各任务排队等待时间"):
+            st.dataframe(pd.DataFrame(snapshot["task_waits"]).rename(columns={
+                "task": "任务", "count": "次数", "avg_wait": "平均等待(秒)", "max_wait": "最长等待(秒)"
+            }), use_container_width=True, hide_index=True)
+    
+    if snapshot.get("resources"):
+        waiting = sum(row["waiting"] for row in snapshot["resources"])
+        with st.expander(f"资源锁（{waiting} 个运行在等待资源）"):
+            st.caption("任务通过 resources 字段或 lock:名称[:shared] 标签声明资源；"
+                       "争用时间为因资源被其他运行持有而等待的时间")
+            st.dataframe(pd.DataFrame(snapshot["resources"]).rename(columns={
+                "resource": "资源", "holders": "持有者", "waiting": "等待数", "runs": "运行次数",
+                "contended": "发生争用", "total_wait": "累计争用(秒)", "avg_wait": "平均争用(秒)",
+                "max_wait": "最长争用(秒)"
+            }), use_container_width=True, hide_index=True)
+    
+    flakiness = get_flakiness_snapshot()
+    if flakiness:
+        isolated = sum(1 for row in flakiness if row["isolated"])
+        with st.expander(f"任务不稳定度（{isolated} 个任务在隔离槽位中运行）"):
+            st.caption(f"隔离槽位: {settings.get('isolated_slots', 0)} · "
+                       "不稳定度 = (重试后才成功的次数 + 结果翻转次数) / 最近的运行次数")
+            st.dataframe(pd.DataFrame(flakiness).rename(columns={
+                "task": "任务", "runs": "运行次数", "retried": "重试过", "failed": "最终失败",
+                "flakiness": "不稳定度", "isolated": "隔离"
+            }), use_container_width=True, hide_index=True)
+    
+    shell_stats = get_shell_pool_stats()
+    if shell_stats.get("enabled"):
+        st.caption(f"常驻shell: 空闲 {shell_stats['idle']}/{shell_stats['size']} · 已执行 {shell_stats['commands']} 条命令 · "
+                   f"启动 {shell_stats['created']} · 复用 {shell_stats['reused']} · "
+                   f"到期回收 {shell_stats['recycled']} · 异常丢弃 {shell_stats['broken']}")
+
+def render_daemon_status():
+    """显示守护进程状态，并提供启动/停止操作"""
+    status = get_daemon_status()
+    cols = st.columns([4, 1])
+    with cols[0]:
+        if status:
+            st.success(f"守护进程运行中 · PID {status['pid']} · 端口 {status['port']} · "
+                       f"启动于 {status['started_at'][:19]} · 运行中任务 {status['active_runs']}")
+        else:
+            st.warning("守护进程未运行，运行任务时会自动启动")
+    with cols[1]:
+        if status:
+            if st.button("停止守护进程", key="stop_daemon", help="停止守护进程并终止其中运行的任务"):
+                stop_daemon()
+                st.rerun()
+        elif st.button("启动守护进程", key="start_daemon"):
+            try:
+                start_daemon()
+            except DaemonError as e:
+                st.error(str(e))
+            st.rerun()
+
 def render_memory_manager():
     """渲染内存管理器页面"""
     st.subheader("内存监控与管理")
@@ -0,0 +1,179 @@
+import os
+import re
+import threading
+from src.services import run_engine
+from src.services.direct_runner import get_task_definition
+
+# task --output prefixed 的输出格式：
+#   [前缀] 命令输出
+#   task: [任务名] 执行的命令
+# --verbose 额外输出任务的开始与结束：
+#   task: "任务名" started / task: "任务名" finished
+_OUTPUT_RE = re.compile(r"^\[(?P<prefix>[^\]]+)\] ?(?P<text>.*)$")
+_COMMAND_RE = re.compile(r"^task: \[(?P<name>[^\]]+)\] ")
+_STARTED_RE = re.compile(r'^task: "(?P<name>[^"]+)" started')
+_FINISHED_RE = re.compile(r'^task: "(?P<name>[^"]+)" finished')
+_UP_TO_DATE_RE = re.compile(r'^task: Task "(?P<name>[^"]+)" is up to date')
+_FAILED_RE = re.compile(r'^task: Failed to run task "(?P<name>[^"]+)": (?P<message>.*)$')
+_EXIT_STATUS_RE = re.compile(r"exit status (\d+)")
+
+def build_batch_argv(task_names, taskfile_path=None, parallel=False):
+    """
+    构建一次调用运行多个任务的task命令
+
+    参数:
+        task_names: 任务名称列表
+        taskfile_path: Taskfile路径
+        parallel: 是否使用 --parallel 并行运行
+
+    返回:
+        参数列表
+    """
+    argv = ["task"]
+    if taskfile_path and os.path.exists(taskfile_path):
+        argv += ["--taskfile", taskfile_path]
+    argv += ["--output", "prefixed", "--verbose"]
+    if parallel:
+        argv.append("--parallel")
+    return argv + list(task_names)
+
+def _task_prefixes(task_names, taskfile_path):
+    """输出前缀 -> 任务名（任务可以用prefix字段自定义前缀）"""
+    prefixes = {}
+    for task_name in task_names:
+        prefixes[task_name] = task_name
+        prefix = get_task_definition(taskfile_path, task_name).get("prefix") if taskfile_path else None
+        if isinstance(prefix, str) and prefix and "{{" not in prefix:
+            prefixes[prefix] = task_name
+    return prefixes
+
+def _finish_child(batch, task_name, status, exit_code=None, error=None):
+    child_id = batch["children"].get(task_name)
+    if child_id is not None:
+        run_engine.finish_child_run(child_id, status, exit_code=exit_code, error=error)
+
+def _handle_line(batch, raw):
+    """按前缀把一行输出归到对应任务，并根据 --verbose 的开始/结束/失败行更新任务状态"""
+    line = raw.decode(run_engine.OUTPUT_ENCODING, errors="replace").rstrip("\r\n")
+    match = _OUTPUT_RE.match(line)
+    if match and match.group("prefix") in batch["prefixes"]:
+        run_engine.append_run_output(batch["children"][batch["prefixes"][match.group("prefix")]],
+                                       match.group("text").encode(run_engine.OUTPUT_ENCODING) + b"\n")
+        return
+    match = _COMMAND_RE.match(line)
+    if match and match.group("name") in batch["children"]:
+        run_engine.append_run_output(batch["children"][match.group("name")], raw)
+        return
+    match = _STARTED_RE.match(line)
+    if match and match.group("name") in batch["children"]:
+        run_engine.mark_child_started(batch["children"][match.group("name")])
+        return
+    match = _FINISHED_RE.match(line) or _UP_TO_DATE_RE.match(line)
+    if match:
+        _finish_child(batch, match.group("name"), run_engine.STATUS_SUCCESS)
+        return
+    match = _FAILED_RE.match(line)
+    if match and match.group("name") in batch["children"]:
+        code = _EXIT_STATUS_RE.search(match.group("message"))
+        batch["failed"].append(match.group("name"))
+        run_engine.append_run_output(batch["children"][match.group("name")], raw)
+        _finish_child(batch, match.group("name"), run_engine.STATUS_FAILED,
+                      exit_code=int(code.group(1)) if code else None, error=match.group("message"))
+
+def _feed_output(batch, stream_name, data):
+    """处理一块输出：按流拼接上次未结束的行，逐行处理完整的行"""
+    with batch["lock"]:
+        lines = (batch["partial"][stream_name] + data).split(b"\n")
+        batch["partial"][stream_name] = lines.pop()
+        for raw in lines:
+            _handle_line(batch, raw + b"\n")
+
+def _flush_output(batch):
+    """进程结束后处理各流中最后一个没有换行的行"""
+    with batch["lock"]:
+        for stream_name, rest in batch["partial"].items():
+            if rest:
+                _handle_line(batch, rest)
+            batch["partial"][stream_name] = b""
+
+def _finish_children(batch, record):
+    """批量进程结束后确定尚未结束的任务的状态，返回所有任务的运行记录"""
+    exit_code = record.get("exit_code")
+    if record.get("status") == run_engine.STATUS_SUCCESS:
+        # task正常退出：没有输出finished的任务（旧版本task或已是最新）也视为成功
+        pending_status, message = run_engine.STATUS_SUCCESS, None
+    elif record.get("status") in (run_engine.STATUS_CANCELLED, run_engine.STATUS_TIMEOUT):
+        pending_status, message = record["status"], None
+    elif record.get("status") == run_engine.STATUS_ERROR:
+        pending_status, message = run_engine.STATUS_ERROR, record.get("error")
+    elif batch["failed"]:
+        # 某个任务失败后task停止后续任务（并行时中断其他运行中的任务）
+        pending_status, message = run_engine.STATUS_CANCELLED, f"批量运行中的任务 {batch['failed'][0]} 失败"
+    else:
+        # 无法从输出判断是哪个任务失败（如任务名无效），全部按批量结果记为失败
+        pending_status, message = run_engine.STATUS_FAILED, None
+
+    records = []
+    for task_name, child_id in batch["children"].items():
+        child = run_engine.finish_child_run(
+            child_id, pending_status,
+            exit_code=exit_code if pending_status == run_engine.STATUS_FAILED else None,
+            error=message, pid=record.get("pid")
+        )
+        run_engine.close_child_run(child_id)
+        if child is not None:
+            records.append(child)
+    return records
+
+def start_batch(task_names, taskfile_path=None, parallel=False, on_complete=None, meta=None, timeout=None):
+    """
+    用一次task调用运行多个任务（task a b c 或 task --parallel a b c），
+    按输出前缀把输出拆分到每个任务各自的运行记录中
+
+    每个任务登记为批量运行的子运行（meta.batch_id），可以像普通运行一样查看输出和状态；
+    取消其中一个任务会取消整个批量调用。
+
+    参数:
+        task_names: 任务名称列表（同一个Taskfile）
+        taskfile_path: Taskfile路径
+        parallel: 是否并行运行
+        on_complete: 完成回调，参数为批量运行记录，其中 batch_runs 为各任务的运行记录
+        meta: 附加到运行记录上的元数据
+        timeout: 整个批量调用的超时时间（秒）
+
+    返回:
+        批量运行的run_id
+    """
+    task_names = list(dict.fromkeys(task_names))
+    batch_id = run_engine.new_run_id()
+    child_meta = dict(meta or {}, parallel=parallel)
+    batch = {
+        "children": {name: run_engine.open_child_run(batch_id, name, taskfile_path, child_meta) for name in task_names},
+        "prefixes": _task_prefixes(task_names, taskfile_path),
+        "failed": [],
+        # 按流缓存未结束的行
+        "partial": {"stdout": b"", "stderr": b""},
+        "lock": threading.Lock(),
+    }
+
+    def on_output(_run_id, stream_name, data):
+        _feed_output(batch, stream_name, data)
+
+    def on_batch_complete(record):
+        _flush_output(batch)
+        record = dict(record, batch_runs=_finish_children(batch, record))
+        if on_complete:
+            on_complete(record)
+
+    cwd = os.path.dirname(os.path.abspath(taskfile_path)) if taskfile_path else None
+    return run_engine.start_run(
+        f"批量({len(task_names)})",
+        taskfile_path,
+        argv=build_batch_argv(task_names, taskfile_path, parallel),
+        cwd=cwd,
+        on_output=on_output,
+        on_complete=on_batch_complete,
+        meta=dict(meta or {}, batch_tasks=task_names, parallel=parallel),
+        timeout=timeout,
+        run_id=batch_id
+    )
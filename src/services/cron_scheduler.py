@@ -0,0 +1,441 @@
+import os
+import json
+import heapq
+import itertools
+import threading
+from datetime import datetime, timedelta
+
+# 补跑策略：停机期间错过的触发时间如何处理
+CATCH_UP_SKIP = "skip"
+CATCH_UP_ONCE = "once"
+CATCH_UP_ALL = "all"
+CATCH_UP_POLICIES = (CATCH_UP_SKIP, CATCH_UP_ONCE, CATCH_UP_ALL)
+
+# 触发时间过去不超过这么久（秒）仍视为准时触发，不算错过
+MISFIRE_GRACE_SECONDS = 60
+# 每个计划最多补跑/排队的运行次数
+MAX_PENDING_RUNS = 5
+# 统计错过次数时最多展开的触发时间数量
+MAX_COUNTED_SLOTS = 1000
+# 定时线程最长睡眠时间（秒），用于应对系统休眠或调整时钟
+MAX_SLEEP_SECONDS = 300
+
+STATE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                          "cache", "cron_state.json")
+
+_MACROS = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+_MONTH_NAMES = {name: index + 1 for index, name in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"])}
+_DAY_NAMES = {name: index for index, name in enumerate(["sun", "mon", "tue", "wed", "thu", "fri", "sat"])}
+# 字段：名称、最小值、最大值、名称映射
+_FIELDS = (
+    ("minute", 0, 59, {}),
+    ("hour", 0, 23, {}),
+    ("day", 1, 31, {}),
+    ("month", 1, 12, _MONTH_NAMES),
+    ("weekday", 0, 7, _DAY_NAMES),
+)
+
+# 计划注册表：schedule_id -> 计划状态
+_SCHEDULES = {}
+# 定时队列：(下次触发的时间戳, 序号, schedule_id)，计划变化后旧条目在出队时丢弃
+_TIMERS = []
+_SEQ = itertools.count()
+_COND = threading.Condition()
+_TIMER_THREAD = None
+# 持久化状态：schedule_id -> {"last_slot", "last_run_at", "last_status"}
+_STATE = None
+
+def _parse_value(text, names):
+    text = text.strip().lower()
+    if text in names:
+        return names[text]
+    if not text.isdigit():
+        raise ValueError(f"无法识别的取值: {text}")
+    return int(text)
+
+def _parse_field(text, name, low, high, names):
+    """解析单个字段：支持 * , - / 和月份、星期名称"""
+    values = set()
+    for part in text.split(","):
+        base, _, step = part.partition("/")
+        step = int(step) if step else 1
+        if step <= 0:
+            raise ValueError(f"{name} 字段的步长必须大于0")
+        if base in ("*", ""):
+            start, end = low, high
+        elif "-" in base:
+            start_text, end_text = base.split("-", 1)
+            start, end = _parse_value(start_text, names), _parse_value(end_text, names)
+        else:
+            start = _parse_value(base, names)
+            end = high if "/" in part else start
+        if not low <= start <= high or not low <= end <= high or start > end:
+            raise ValueError(f"{name} 字段超出范围 {low}-{high}: {part}")
+        values.update(range(start, end + 1, step))
+    return values
+
+def parse_cron(expression):
+    """
+    解析5段cron表达式（分 时 日 月 周），支持 @daily 等简写
+
+    参数:
+        expression: cron表达式
+
+    返回:
+        {"minute", "hour", "day", "month", "weekday"（0=周日）: 取值集合, "day_any", "weekday_any"}
+
+    异常:
+        ValueError: 表达式无效
+    """
+    text = _MACROS.get(str(expression or "").strip().lower(), str(expression or "").strip())
+    parts = text.split()
+    if len(parts) != 5:
+        raise ValueError("cron表达式需要5段：分 时 日 月 周")
+    spec = {}
+    for part, (name, low, high, names) in zip(parts, _FIELDS):
+        spec[name] = _parse_field(part, name, low, high, names)
+    if 7 in spec["weekday"]:
+        spec["weekday"] = (spec["weekday"] - {7}) | {0}
+    spec["day_any"] = parts[2] == "*"
+    spec["weekday_any"] = parts[4] == "*"
+    return spec
+
+def _day_matches(spec, moment):
+    """日与周都有限定时满足其一即可（与cron一致），否则按限定的字段判断"""
+    day_ok = moment.day in spec["day"]
+    weekday_ok = (moment.weekday() + 1) % 7 in spec["weekday"]
+    if spec["day_any"] or spec["weekday_any"]:
+        return day_ok and weekday_ok
+    return day_ok or weekday_ok
+
+def next_fire_time(spec, after):
+    """
+    计算严格晚于after的下一个触发时间（本地时间，精确到分钟）
+
+    参数:
+        spec: parse_cron 的返回值
+        after: datetime
+
+    返回:
+        datetime；表达式永远不会触发（如2月30日）时返回None
+    """
+    moment = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    limit = moment + timedelta(days=366 * 5)
+    while moment <= limit:
+        if moment.month not in spec["month"]:
+            moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            continue
+        if not _day_matches(spec, moment):
+            moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            continue
+        if moment.hour not in spec["hour"]:
+            moment = moment.replace(minute=0) + timedelta(hours=1)
+            continue
+        if moment.minute not in spec["minute"]:
+            moment += timedelta(minutes=1)
+            continue
+        return moment
+    return None
+
+def previous_fire_time(spec, before):
+    """
+    计算不晚于before的最近一个触发时间（本地时间，精确到分钟）
+
+    参数:
+        spec: parse_cron 的返回值
+        before: datetime
+
+    返回:
+        datetime；过去5年内没有触发时间时返回None
+    """
+    moment = before.replace(second=0, microsecond=0)
+    limit = moment - timedelta(days=366 * 5)
+    while moment >= limit:
+        if moment.month not in spec["month"]:
+            # 跳到上个月的最后一分钟
+            moment = moment.replace(day=1, hour=23, minute=59) - timedelta(days=1)
+            continue
+        if not _day_matches(spec, moment):
+            moment = moment.replace(hour=23, minute=59) - timedelta(days=1)
+            continue
+        if moment.hour not in spec["hour"]:
+            moment = moment.replace(minute=59) - timedelta(hours=1)
+            continue
+        if moment.minute not in spec["minute"]:
+            moment -= timedelta(minutes=1)
+            continue
+        return moment
+    return None
+
+def _load_state():
+    """首次使用时读取持久化状态，调用方需持有锁"""
+    global _STATE
+    if _STATE is not None:
+        return
+    _STATE = {}
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            _STATE.update(json.load(f))
+    except (OSError, ValueError):
+        pass
+
+def _save_state():
+    """写入持久化状态，调用方需持有锁"""
+    try:
+        os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+        tmp_path = f"{STATE_FILE}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(_STATE, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, STATE_FILE)
+    except OSError as e:
+        print(f"保存定时计划状态时出错: {str(e)}")
+
+def _definition(binding):
+    return (binding.get("task"), binding.get("taskfile"), str(binding.get("cron", "")).strip(),
+            binding.get("catch_up", CATCH_UP_ONCE), bool(binding.get("enabled", True)))
+
+def _new_schedule(binding, submit, now):
+    """创建计划；上次处理到的触发时间取自持久化状态，没有记录时从现在开始（不补跑）"""
+    state = _STATE.setdefault(binding["id"], {})
+    schedule = {
+        "schedule_id": binding["id"],
+        "task": binding["task"],
+        "taskfile": binding.get("taskfile"),
+        "cron": str(binding.get("cron", "")).strip(),
+        "catch_up": binding.get("catch_up") if binding.get("catch_up") in CATCH_UP_POLICIES else CATCH_UP_ONCE,
+        "enabled": bool(binding.get("enabled", True)),
+        "definition": _definition(binding),
+        "submit": submit,
+        "spec": None,
+        "error": None,
+        "next_at": None,
+        "running": False,
+        # 等待运行的次数（补跑或上次运行尚未结束时到期的触发）
+        "pending": 0,
+        "runs": 0,
+        # 错过的触发时间数、按策略补跑的次数、因排队已满而放弃的次数
+        "missed": 0,
+        "caught_up": 0,
+        "dropped": 0,
+        "last_slot": state.get("last_slot") or now.isoformat(timespec="seconds"),
+        "last_run_at": state.get("last_run_at"),
+        "last_status": state.get("last_status"),
+    }
+    try:
+        schedule["spec"] = parse_cron(schedule["cron"])
+    except ValueError as e:
+        schedule["error"] = str(e)
+    return schedule
+
+def _arm(schedule, now):
+    """计算下次触发时间并加入定时队列，调用方需持有锁"""
+    schedule["next_at"] = None
+    if not schedule["enabled"] or schedule["spec"] is None:
+        return
+    next_at = next_fire_time(schedule["spec"], max(now, datetime.fromisoformat(schedule["last_slot"])))
+    if next_at is None:
+        schedule["error"] = "表达式永远不会触发"
+        return
+    schedule["next_at"] = next_at
+    heapq.heappush(_TIMERS, (next_at.timestamp(), next(_SEQ), schedule["schedule_id"]))
+
+def _process_due(schedule, now):
+    """
+    处理上次之后到期的触发时间：准时的触发运行一次，错过的按补跑策略处理，调用方需持有锁
+
+    返回:
+        需要新增的运行次数
+    """
+    if not schedule["enabled"] or schedule["spec"] is None:
+        return 0
+    # 只展开有限个触发时间用于统计错过次数，最近的触发时间直接向前查找，
+    # 停机很久时也能一次把last_slot推进到现在，之后不会重复统计同一批错过的触发
+    slots = []
+    moment = datetime.fromisoformat(schedule["last_slot"])
+    capped = False
+    while True:
+        moment = next_fire_time(schedule["spec"], moment)
+        if moment is None or moment > now:
+            break
+        if len(slots) >= MAX_COUNTED_SLOTS:
+            capped = True
+            break
+        slots.append(moment)
+    if not slots:
+        return 0
+
+    latest = previous_fire_time(schedule["spec"], now) if capped else slots[-1]
+    schedule["last_slot"] = latest.isoformat(timespec="seconds")
+    _STATE.setdefault(schedule["schedule_id"], {})["last_slot"] = schedule["last_slot"]
+    on_time = (now - latest).total_seconds() <= MISFIRE_GRACE_SECONDS
+    # 展开的触发时间达到上限时，准时的那次不在slots中，slots全部算作错过（错过次数为下限）
+    missed = len(slots) - (1 if on_time and not capped else 0)
+    schedule["missed"] += missed
+
+    runs = 1 if on_time else 0
+    if missed and schedule["catch_up"] == CATCH_UP_ONCE and not on_time:
+        runs = 1
+    elif missed and schedule["catch_up"] == CATCH_UP_ALL:
+        runs += missed
+    runs = min(runs, MAX_PENDING_RUNS)
+    if missed:
+        schedule["caught_up"] += max(0, runs - (1 if on_time else 0))
+        print(f"定时任务 {schedule['task']} 错过 {missed} 次触发（补跑策略: {schedule['catch_up']}）")
+    return runs
+
+def _queue_runs(schedule, count):
+    """增加等待运行的次数（超出上限的丢弃），空闲时立即开始，调用方需持有锁"""
+    if count <= 0:
+        return False
+    accepted = min(count, MAX_PENDING_RUNS - schedule["pending"])
+    schedule["dropped"] += count - max(0, accepted)
+    schedule["pending"] += max(0, accepted)
+    if schedule["running"] or schedule["pending"] <= 0:
+        return False
+    schedule["pending"] -= 1
+    schedule["running"] = True
+    return True
+
+def _start_run(schedule):
+    """提交一次运行（在锁外调用，提交可能等待队列空位）"""
+    try:
+        future = schedule["submit"]()
+    except Exception as e:
+        future = None
+        print(f"提交定时任务 {schedule['task']} 时出错: {str(e)}")
+    if future is None:
+        _on_run_done(schedule, None)
+        return
+    with _COND:
+        schedule["runs"] += 1
+        schedule["last_run_at"] = datetime.now().isoformat(timespec="seconds")
+    future.add_done_callback(lambda f: _on_run_done(schedule, f))
+
+def _on_run_done(schedule, future):
+    """运行结束：记录状态，有等待的运行时继续提交"""
+    if future is None:
+        status = "rejected"
+    elif future.cancelled() or future.exception() is not None:
+        status = "error"
+    else:
+        status = future.result().get("status")
+    with _COND:
+        schedule["last_status"] = status
+        state = _STATE.setdefault(schedule["schedule_id"], {})
+        state.update(last_run_at=schedule["last_run_at"], last_status=status)
+        _save_state()
+        if schedule["pending"] <= 0 or _SCHEDULES.get(schedule["schedule_id"]) is not schedule:
+            schedule["running"] = False
+            return
+        schedule["pending"] -= 1
+    _start_run(schedule)
+
+def _timer_loop():
+    """定时线程：睡眠到最近的触发时间，到期后提交运行并安排下一次"""
+    while True:
+        due = []
+        with _COND:
+            while not due:
+                now = datetime.now()
+                while _TIMERS and _TIMERS[0][0] <= now.timestamp():
+                    timestamp, _, schedule_id = heapq.heappop(_TIMERS)
+                    schedule = _SCHEDULES.get(schedule_id)
+                    # 计划已删除或已重新安排时丢弃旧条目
+                    if schedule is None or schedule["next_at"] is None or schedule["next_at"].timestamp() != timestamp:
+                        continue
+                    runs = _process_due(schedule, now)
+                    _arm(schedule, now)
+                    if _queue_runs(schedule, runs):
+                        due.append(schedule)
+                if due:
+                    _save_state()
+                    break
+                timeout = MAX_SLEEP_SECONDS
+                if _TIMERS:
+                    timeout = min(timeout, max(0.0, _TIMERS[0][0] - now.timestamp()))
+                _COND.wait(timeout)
+        for schedule in due:
+            _start_run(schedule)
+
+def _ensure_timer_thread():
+    """按需启动定时线程，调用方需持有锁"""
+    global _TIMER_THREAD
+    if _TIMER_THREAD is None or not _TIMER_THREAD.is_alive():
+        _TIMER_THREAD = threading.Thread(target=_timer_loop, name="cron-scheduler", daemon=True)
+        _TIMER_THREAD.start()
+
+def sync_schedules(bindings, submit_factory):
+    """
+    按绑定列表更新定时计划：新增的计划会先按补跑策略处理停机期间错过的触发，
+    删除的计划停止，定义变化的重新安排（未变化的保留统计）
+
+    参数:
+        bindings: 绑定列表，每项为 {id, task, taskfile, cron, catch_up, enabled}
+        submit_factory: submit_factory(绑定) -> 提交函数，提交函数无参数，返回Future（结果为运行记录）或None
+    """
+    wanted = {binding["id"]: binding for binding in bindings if binding.get("id") and binding.get("task")}
+    to_start = []
+    with _COND:
+        if not wanted and not _SCHEDULES:
+            # 本进程没有计划（如计划由守护进程执行）时不读写状态文件
+            return
+        _load_state()
+        now = datetime.now()
+        for schedule_id in list(_SCHEDULES):
+            if schedule_id not in wanted or _SCHEDULES[schedule_id]["definition"] != _definition(wanted[schedule_id]):
+                _SCHEDULES[schedule_id]["next_at"] = None
+                del _SCHEDULES[schedule_id]
+        for schedule_id, binding in wanted.items():
+            if schedule_id in _SCHEDULES:
+                continue
+            schedule = _new_schedule(binding, submit_factory(binding), now)
+            _SCHEDULES[schedule_id] = schedule
+            runs = _process_due(schedule, now)
+            if not schedule["enabled"]:
+                # 停用期间的触发不补跑
+                schedule["last_slot"] = now.isoformat(timespec="seconds")
+                _STATE[schedule_id]["last_slot"] = schedule["last_slot"]
+            _arm(schedule, now)
+            if _queue_runs(schedule, runs):
+                to_start.append(schedule)
+        _save_state()
+        if _SCHEDULES:
+            _ensure_timer_thread()
+        _COND.notify_all()
+    for schedule in to_start:
+        _start_run(schedule)
+
+def _public_schedule(schedule):
+    return {
+        "schedule_id": schedule["schedule_id"],
+        "task": schedule["task"],
+        "taskfile": schedule["taskfile"],
+        "cron": schedule["cron"],
+        "catch_up": schedule["catch_up"],
+        "enabled": schedule["enabled"],
+        "error": schedule["error"],
+        "next_at": schedule["next_at"].isoformat(timespec="seconds") if schedule["next_at"] else None,
+        "running": schedule["running"],
+        "pending": schedule["pending"],
+        "runs": schedule["runs"],
+        "missed": schedule["missed"],
+        "caught_up": schedule["caught_up"],
+        "dropped": schedule["dropped"],
+        "last_slot": schedule["last_slot"],
+        "last_run_at": schedule["last_run_at"],
+        "last_status": schedule["last_status"],
+    }
+
+def list_schedules():
+    """列出所有定时计划的状态快照（含下次触发时间与补跑统计）"""
+    with _COND:
+        return [_public_schedule(schedule) for schedule in _SCHEDULES.values()]
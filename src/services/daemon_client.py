@@ -0,0 +1,261 @@
+import os
+import sys
+import json
+import time
+import base64
+import subprocess
+import urllib.request
+import urllib.error
+from urllib.parse import urlencode, quote
+
+# 项目根目录与守护进程状态文件（记录pid、端口和访问令牌）
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+STATE_FILE = os.path.join(PROJECT_ROOT, "cache", "daemon.json")
+DAEMON_LOG_FILE = os.path.join(PROJECT_ROOT, "logs", "daemon.log")
+TOKEN_HEADER = "X-TaskGUI-Token"
+
+# 请求超时（秒）与启动等待时间
+REQUEST_TIMEOUT = 5
+STARTUP_TIMEOUT = 10
+
+class DaemonError(Exception):
+    """守护进程不可用或请求失败"""
+
+def read_state():
+    """
+    读取守护进程状态文件
+
+    返回:
+        {"pid", "port", "token", "started_at"}；不存在或损坏时返回None
+    """
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        return state if state.get("port") and state.get("token") else None
+    except (OSError, ValueError):
+        return None
+
+def _request(method, path, body=None, params=None, state=None, timeout=REQUEST_TIMEOUT):
+    """向守护进程发送请求，返回解析后的JSON"""
+    state = state or read_state()
+    if state is None:
+        raise DaemonError("守护进程未运行")
+    url = f"http://127.0.0.1:{state['port']}{path}"
+    if params:
+        url += "?" + urlencode(params)
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    request = urllib.request.Request(url, data=data, method=method, headers={
+        TOKEN_HEADER: state["token"],
+        "Content-Type": "application/json",
+    })
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read().decode("utf-8") or "null")
+    except urllib.error.HTTPError as e:
+        try:
+            message = json.loads(e.read().decode("utf-8")).get("error", str(e))
+        except ValueError:
+            message = str(e)
+        raise DaemonError(message) from e
+    except (urllib.error.URLError, OSError, ValueError) as e:
+        raise DaemonError(f"无法连接守护进程: {e}") from e
+
+def get_status():
+    """
+    获取守护进程状态
+
+    返回:
+        health信息字典；未运行时返回None
+    """
+    try:
+        return _request("GET", "/health", timeout=1)
+    except DaemonError:
+        return None
+
+def is_running():
+    """守护进程是否在运行并可访问"""
+    return get_status() is not None
+
+def start_daemon(port=0, wait=True):
+    """
+    在独立会话中启动守护进程（不随界面进程退出）
+
+    参数:
+        port: 监听端口，0表示自动选择
+        wait: 是否等待守护进程就绪
+
+    返回:
+        health信息字典
+
+    异常:
+        DaemonError: 启动超时
+    """
+    status = get_status()
+    if status is not None:
+        return status
+
+    os.makedirs(os.path.dirname(DAEMON_LOG_FILE), exist_ok=True)
+    kwargs = {}
+    if sys.platform == "win32":
+        kwargs["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+    with open(DAEMON_LOG_FILE, "ab") as log_file:
+        subprocess.Popen(
+            [sys.executable, "-m", "src.services.run_daemon", "--port", str(port)],
+            cwd=PROJECT_ROOT,
+            stdin=subprocess.DEVNULL,
+            stdout=log_file,
+            stderr=subprocess.STDOUT,
+            **kwargs
+        )
+    if not wait:
+        return None
+
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        status = get_status()
+        if status is not None:
+            return status
+        time.sleep(0.1)
+    raise DaemonError(f"守护进程启动超时，请查看 {DAEMON_LOG_FILE}")
+
+def ensure_daemon():
+    """守护进程未运行时启动它，返回health信息"""
+    return get_status() or start_daemon()
+
+def stop_daemon():
+    """
+    停止守护进程（运行中的任务会被终止）
+
+    返回:
+        是否成功发送停止请求
+    """
+    try:
+        _request("POST", "/shutdown", {})
+        return True
+    except DaemonError:
+        return False
+
+# 以下函数与本地执行层的接口一一对应，供 run_backend 转发
+
+def configure(settings):
+    return _request("POST", "/config", settings)
+
+def launch(task_names, taskfile_path, parallel, direct, default_timeout, batch=False, durations=None):
+    """提交一批任务（durations为界面中按历史估计的耗时），返回每个任务是否被接受"""
+    return _request("POST", "/launch", {
+        "tasks": list(task_names),
+        "taskfile": taskfile_path,
+        "parallel": parallel,
+        "direct": direct,
+        "default_timeout": default_timeout,
+        "batch": batch,
+        "durations": durations or {},
+    })["accepted"]
+
+def start_dag(plan, taskfile_path, force, direct, default_timeout):
+    # 依赖集合不能直接序列化为JSON，按列表发送（调度器只遍历依赖，不要求集合）
+    graph = dict(plan["graph"], nodes={name: sorted(deps) for name, deps in plan["graph"]["nodes"].items()})
+    return _request("POST", "/dag", {
+        "plan": dict(plan, graph=graph),
+        "taskfile": taskfile_path,
+        "force": force,
+        "direct": direct,
+        "default_timeout": default_timeout,
+    })["dag_id"]
+
+def start_matrix(task_name, taskfile_path, cells, max_concurrency, direct, default_timeout):
+    return _request("POST", "/matrix", {
+        "task": task_name,
+        "taskfile": taskfile_path,
+        "cells": cells,
+        "max_concurrency": max_concurrency,
+        "direct": direct,
+        "default_timeout": default_timeout,
+    })["matrix_id"]
+
+def sync_watches(bindings, direct, default_timeout):
+    return _request("POST", "/watches", {
+        "bindings": bindings,
+        "direct": direct,
+        "default_timeout": default_timeout,
+    })["ok"]
+
+def list_watches():
+    return _request("GET", "/watches")
+
+def sync_schedules(bindings, direct, default_timeout):
+    return _request("POST", "/schedules", {
+        "bindings": bindings,
+        "direct": direct,
+        "default_timeout": default_timeout,
+    })["ok"]
+
+def list_schedules():
+    return _request("GET", "/schedules")
+
+def list_parallel_batches():
+    return _request("GET", "/batches")
+
+def get_matrix_run(matrix_id):
+    return _request("GET", f"/matrix/{quote(matrix_id)}")
+
+def cancel_matrix_run(matrix_id):
+    return _request("POST", f"/matrix/{quote(matrix_id)}/cancel", {})["ok"]
+
+def get_dag_run(dag_id):
+    return _request("GET", f"/dag/{quote(dag_id)}")
+
+def list_runs(active_only=False):
+    return _request("GET", "/runs", params={"active_only": int(bool(active_only))})
+
+def get_run(run_id):
+    return _request("GET", f"/runs/{quote(run_id)}")
+
+def tail_run_output(run_id, offset=0, max_bytes=None):
+    params = {"offset": offset}
+    if max_bytes is not None:
+        params["max_bytes"] = max_bytes
+    result = _request("GET", f"/runs/{quote(run_id)}/tail", params=params)
+    return base64.b64decode(result["data"]), result["offset"]
+
+def get_run_resources(run_id):
+    return _request("GET", f"/runs/{quote(run_id)}/resources")
+
+def get_log_size(run_id):
+    return _request("GET", f"/runs/{quote(run_id)}/size")["size"]
+
+def get_run_output(run_id, max_chars=None):
+    params = {"max_chars": max_chars} if max_chars else None
+    return _request("GET", f"/runs/{quote(run_id)}/output", params=params)["output"]
+
+def cancel_run(run_id):
+    return _request("POST", f"/runs/{quote(run_id)}/cancel", {})["cancelled"]
+
+def clear_finished_runs():
+    return _request("POST", "/runs/clear", {})["cleared"]
+
+def get_pool_snapshot():
+    return _request("GET", "/pool")
+
+def cancel_queued(item_id):
+    return _request("POST", "/pool/cancel", {"item_id": item_id})["ok"]
+
+def move_queued(item_id, offset):
+    return _request("POST", "/pool/move", {"item_id": item_id, "offset": offset})["ok"]
+
+def set_queued_priority(item_id, priority):
+    return _request("POST", "/pool/priority", {"item_id": item_id, "priority": priority})["ok"]
+
+def get_gate_snapshot():
+    return _request("GET", "/gate")
+
+def get_flakiness_snapshot():
+    return _request("GET", "/flakiness")
+
+def get_shell_pool_stats():
+    return _request("GET", "/shell-pool")
+
+def pop_run_outcomes():
+    return _request("POST", "/outcomes/pop", {})
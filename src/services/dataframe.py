@@ -1,6 +1,20 @@
 import pandas as pd
 import streamlit as st
 from typing import List, Dict, Any, Optional
+from src.utils.selection_utils import get_task_runtime
+from src.services.run_pool import parse_priority
+
+# 排序选项：界面显示名称 -> 排序列（None表示保持Taskfile中的顺序）
+SORT_OPTIONS = {
+    '默认': None,
+    '名称': 'name',
+    '描述': 'description',
+    '目录': 'directory',
+    '组': 'group',
+    '优先级': 'priority',
+    '耗时': 'duration',
+    '最近运行': 'last_run',
+}
 
 def prepare_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -24,6 +38,10 @@ def prepare_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     # 确保标签列是列表类型
     tasks_df['tags'] = tasks_df['tags'].apply(lambda x: x if isinstance(x, list) else [])
     
+    # 工作区目录加载时已预先计算搜索列，无需重复计算
+    if 'search_text' in tasks_df.columns:
+        return tasks_df
+    
     # 添加文本搜索列，用于更好的搜索
     tasks_df['search_text'] = tasks_df.apply(
         lambda row: f"{row['name']} {row['description']} {' '.join(row['tags'])}", 
@@ -68,13 +86,52 @@ def filter_tasks(df: pd.DataFrame) -> pd.DataFrame:
             
         # 如果标签列表不为空，应用过滤
         if tags_to_filter:
-            # 过滤包含所选标签的任务
-            filtered_df = filtered_df[filtered_df['tags'].apply(
-                lambda x: any(tag in x for tag in tags_to_filter) if isinstance(x, list) else False
-            )]
+            tag_index = filtered_df.attrs.get('tag_index')
+            if tag_index is not None and 'task_key' in filtered_df.columns:
+                # 工作区模式：使用标签倒排索引，避免逐行扫描标签列表
+                matched_keys = set()
+                for tag in tags_to_filter:
+                    matched_keys |= tag_index.get(tag, set())
+                filtered_df = filtered_df[filtered_df['task_key'].isin(matched_keys)]
+            else:
+                # 过滤包含所选标签的任务
+                filtered_df = filtered_df[filtered_df['tags'].apply(
+                    lambda x: any(tag in x for tag in tags_to_filter) if isinstance(x, list) else False
+                )]
     
     return filtered_df
 
+def sort_tasks(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    根据用户选择的排序方式排序任务，耗时和最近运行取自任务运行时数据
+    
+    参数:
+        df: 要排序的数据框
+        
+    返回:
+        排序后的数据框
+    """
+    column = SORT_OPTIONS.get(st.session_state.get('sort_by', '默认'))
+    if column is None or df.empty:
+        return df
+    
+    ascending = st.session_state.get('sort_order', '升序') == '升序'
+    key_column = 'task_key' if 'task_key' in df.columns else 'name'
+    
+    if column in ('duration', 'last_run'):
+        sorted_df = df.copy()
+        sorted_df[column] = sorted_df[key_column].map(lambda key: get_task_runtime(key).get(column))
+        # 没有运行记录的任务始终排在最后
+        return sorted_df.sort_values(by=column, ascending=ascending, na_position='last', kind='stable')
+    
+    if column not in df.columns:
+        return df
+    if column == 'priority':
+        # 优先级可以是数值或 high / medium / low，按执行队列使用的数值排序
+        return df.sort_values(by=column, ascending=ascending, kind='stable',
+                              key=lambda values: values.map(parse_priority))
+    return df.sort_values(by=column, ascending=ascending, na_position='last', kind='stable')
+
 def get_all_tags(df: pd.DataFrame) -> List[str]:
     """
     从数据框获取所有唯一标签
@@ -0,0 +1,294 @@
+import os
+import re
+import sys
+import shlex
+import shutil
+import threading
+import yaml
+
+# 只支持 {{.VAR}} 形式的模板，其余模板语法（管道、函数、条件等）回退到task
+_VAR_RE = re.compile(r"\{\{\s*\.([A-Za-z_][A-Za-z0-9_]*)\s*\}\}")
+# 出现这些字符时命令需要shell解释，不能直接执行
+_SHELL_META_RE = re.compile(r"[|&;<>()$`*?\[\]{}~#\n]")
+
+# 含这些字段的任务语义依赖task本身（增量构建、前置条件、交互等），回退到task
+_UNSUPPORTED_TASK_KEYS = (
+    "status", "preconditions", "sources", "generates", "method", "prompt",
+    "requires", "platforms", "dotenv", "set", "shopt", "interactive", "for",
+)
+_UNSUPPORTED_FILE_KEYS = ("dotenv", "set", "shopt")
+
+# 展开缓存：Taskfile绝对路径 -> {"signature", "doc", "environ", "expansions"}
+# 展开结果依赖环境变量和当前目录，二者变化时（environ不同）清空该文件的展开结果
+_CACHE = {}
+_CACHE_LOCK = threading.Lock()
+_CACHE_STATS = {"hits": 0, "misses": 0, "fallbacks": 0}
+
+class UnsupportedTask(Exception):
+    """任务使用了直接执行模式不支持的特性，需要回退到task"""
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+def _load_doc(path):
+    """读取Taskfile（按文件签名缓存），返回 (签名, 文档, 展开缓存)"""
+    signature = _file_signature(path)
+    with _CACHE_LOCK:
+        entry = _CACHE.get(path)
+        if entry is not None and entry["signature"] == signature:
+            return entry
+    with open(path, "r", encoding="utf-8") as f:
+        doc = yaml.safe_load(f) or {}
+    entry = {"signature": signature, "doc": doc, "expansions": {}}
+    with _CACHE_LOCK:
+        _CACHE[path] = entry
+    return entry
+
+def _render(text, variables):
+    """替换 {{.VAR}} 模板，遇到未定义变量或其他模板语法时抛出UnsupportedTask"""
+    def replace(match):
+        name = match.group(1)
+        if name not in variables:
+            raise UnsupportedTask(f"未定义的变量: {name}")
+        return variables[name]
+
+    rendered = _VAR_RE.sub(replace, str(text))
+    if "{{" in rendered:
+        raise UnsupportedTask("使用了不支持的模板语法")
+    return rendered
+
+def _resolve_vars(var_defs, variables):
+    """按声明顺序解析静态变量，后声明的变量可以引用先声明的变量"""
+    for name, value in (var_defs or {}).items():
+        if isinstance(value, bool):
+            value = "true" if value else "false"
+        if not isinstance(value, (str, int, float)):
+            # sh: 动态变量、ref、map/list 变量
+            raise UnsupportedTask(f"不支持的变量类型: {name}")
+        variables[name] = _render(value, variables)
+
+def _split_simple_command(cmd):
+    """把简单命令（无shell元字符）拆分为参数列表，否则返回None"""
+    if _SHELL_META_RE.search(cmd):
+        return None
+    try:
+        argv = shlex.split(cmd, posix=True)
+    except ValueError:
+        return None
+    if not argv or "=" in argv[0]:
+        return None
+    return argv
+
+def _resolve_program(program, cwd, env):
+    """把可执行文件解析为绝对路径，找不到时返回None"""
+    if os.path.dirname(program):
+        path = program if os.path.isabs(program) else os.path.join(cwd, program)
+        return path if os.path.exists(path) else None
+    return shutil.which(program, path=env.get("PATH"))
+
+def _build_argv(cmds, cwd, env):
+    """
+    单个简单命令直接执行（不经过shell）；多个或复杂命令在POSIX上交给sh，
+    每条命令放在子shell中执行，与task中各命令互不影响的行为一致。
+    与task一样，一条命令（含多行命令块）以最后一行的退出码为准，失败时不再执行后续命令
+    """
+    if len(cmds) == 1:
+        argv = _split_simple_command(cmds[0])
+        if argv is not None:
+            program = _resolve_program(argv[0], cwd, env)
+            if program is None:
+                raise UnsupportedTask(f"找不到可执行文件: {argv[0]}")
+            return [program] + argv[1:]
+
+    shell = None if sys.platform == "win32" else shutil.which("sh", path=env.get("PATH"))
+    if shell is None:
+        raise UnsupportedTask("需要shell解释的命令")
+    # 不使用set -e：子shell会继承errexit，多行命令块会在第一行失败时中止，与task不一致
+    script = "\n".join(f"(\n{cmd}\n) || exit $?" for cmd in cmds)
+    return [shell, "-c", script]
+
+def _task_variables(path, doc, task_name, task, call_vars):
+    """构建任务可用的模板变量"""
+    taskfile_dir = os.path.dirname(path)
+    # 变量优先级：任务变量 > 命令行变量 > 全局变量 > 环境变量
+    variables = dict(os.environ)
+    variables.update({
+        "TASK": task_name,
+        "ROOT_DIR": taskfile_dir,
+        "TASKFILE_DIR": taskfile_dir,
+        "TASKFILE": path,
+        "ROOT_TASKFILE": path,
+        "USER_WORKING_DIR": os.getcwd(),
+        "CLI_ARGS": "",
+    })
+    _resolve_vars(doc.get("vars"), variables)
+    variables.update(call_vars)
+    _resolve_vars(task.get("vars"), variables)
+    return variables
+
+def _task_dir(path, task, variables):
+    """解析任务的工作目录（相对于Taskfile所在目录）"""
+    taskfile_dir = os.path.dirname(path)
+    cwd = _render(task.get("dir") or "", variables)
+    return os.path.normpath(os.path.join(taskfile_dir, cwd)) if cwd else taskfile_dir
+
+def _expand(path, doc, task_name, skip_deps, call_vars):
+    """把任务展开为 {argv, cwd, env}"""
+    for key in _UNSUPPORTED_FILE_KEYS:
+        if key in doc:
+            raise UnsupportedTask(f"Taskfile使用了 {key}")
+
+    tasks = doc.get("tasks") or {}
+    if task_name not in tasks:
+        # include进来的任务、别名等交给task处理
+        raise UnsupportedTask(f"找不到任务: {task_name}")
+    task = tasks[task_name]
+    if isinstance(task, (str, list)):
+        task = {"cmds": task if isinstance(task, list) else [task]}
+
+    for key in _UNSUPPORTED_TASK_KEYS:
+        if key in task:
+            raise UnsupportedTask(f"任务使用了 {key}")
+    if task.get("deps") and not skip_deps:
+        raise UnsupportedTask("任务有依赖")
+
+    variables = _task_variables(path, doc, task_name, task, call_vars)
+
+    env = dict(os.environ)
+    for env_defs in (doc.get("env"), task.get("env")):
+        scratch = dict(variables)
+        _resolve_vars(env_defs, scratch)
+        env.update({name: scratch[name] for name in (env_defs or {})})
+
+    cmds = []
+    for cmd in task.get("cmds") or []:
+        if isinstance(cmd, dict):
+            if set(cmd) - {"cmd", "silent"}:
+                # task:, defer:, for:, ignore_error 等
+                raise UnsupportedTask("命令使用了不支持的字段")
+            cmd = cmd.get("cmd", "")
+        cmds.append(_render(cmd, variables))
+    if not cmds:
+        raise UnsupportedTask("任务没有命令")
+
+    cwd = _task_dir(path, task, variables)
+    if not os.path.isdir(cwd):
+        raise UnsupportedTask(f"工作目录不存在: {cwd}")
+
+    argv = _build_argv(cmds, cwd, env)
+    # 需要shell解释时记录脚本，可以交给常驻shell执行
+    script = argv[2] if len(argv) == 3 and argv[1] == "-c" else None
+    return {"argv": argv, "cwd": cwd, "env": env, "script": script}
+
+def expand_task(taskfile_path, task_name, skip_deps=False, call_vars=None):
+    """
+    把任务展开为可直接执行的命令（按Taskfile版本缓存）
+
+    参数:
+        taskfile_path: Taskfile路径
+        task_name: 任务名称
+        skip_deps: 是否忽略deps（依赖已由调度器执行时使用）
+        call_vars: 命令行变量 {名称: 值}
+
+    返回:
+        {"argv", "cwd", "env", "script"}（script为需要shell解释的脚本，否则为None）；
+        不支持直接执行时返回None（应回退到task）
+    """
+    if not taskfile_path:
+        return None
+    path = os.path.abspath(taskfile_path)
+    cache_key = (task_name, bool(skip_deps), tuple(sorted((call_vars or {}).items())))
+    environ = (os.getcwd(), frozenset(os.environ.items()))
+    try:
+        entry = _load_doc(path)
+        with _CACHE_LOCK:
+            if entry.get("environ") != environ:
+                entry["environ"] = environ
+                entry["expansions"] = {}
+            expansions = entry["expansions"]
+            if cache_key in expansions:
+                _CACHE_STATS["hits"] += 1
+                expansion = expansions[cache_key]
+                if expansion is None:
+                    _CACHE_STATS["fallbacks"] += 1
+                return expansion
+            _CACHE_STATS["misses"] += 1
+        try:
+            expansion = _expand(path, entry["doc"], task_name, skip_deps, {k: str(v) for k, v in (call_vars or {}).items()})
+        except UnsupportedTask:
+            expansion = None
+            _CACHE_STATS["fallbacks"] += 1
+        with _CACHE_LOCK:
+            expansions[cache_key] = expansion
+        return expansion
+    except (OSError, yaml.YAMLError) as e:
+        print(f"展开任务 {task_name} 时出错: {str(e)}")
+        return None
+
+def get_task_definition(taskfile_path, task_name):
+    """
+    获取Taskfile中任务的原始定义（复用展开缓存中的解析结果）
+
+    参数:
+        taskfile_path: Taskfile路径
+        task_name: 任务名称
+
+    返回:
+        任务定义字典；找不到时返回空字典
+    """
+    try:
+        doc = _load_doc(os.path.abspath(taskfile_path))["doc"]
+    except (OSError, yaml.YAMLError, TypeError):
+        return {}
+    task = (doc.get("tasks") or {}).get(task_name)
+    return task if isinstance(task, dict) else {}
+
+def render_task_paths(taskfile_path, task_name, patterns):
+    """
+    解析任务的工作目录，并展开路径模式中的 {{.VAR}} 模板（用于sources/generates）
+
+    参数:
+        taskfile_path: Taskfile路径
+        task_name: 任务名称
+        patterns: 路径模式列表
+
+    返回:
+        (工作目录, 展开后的模式列表)；使用了不支持的模板时返回None
+    """
+    try:
+        path = os.path.abspath(taskfile_path)
+        doc = _load_doc(path)["doc"]
+        task = (doc.get("tasks") or {}).get(task_name)
+        if not isinstance(task, dict):
+            return None
+        variables = _task_variables(path, doc, task_name, task, {})
+        return _task_dir(path, task, variables), [_render(pattern, variables) for pattern in patterns]
+    except (UnsupportedTask, OSError, yaml.YAMLError):
+        return None
+
+def explain_fallback(taskfile_path, task_name, skip_deps=False):
+    """
+    说明任务为何不能直接执行
+
+    返回:
+        原因字符串；可以直接执行时返回None
+    """
+    try:
+        path = os.path.abspath(taskfile_path)
+        _expand(path, _load_doc(path)["doc"], task_name, skip_deps, {})
+        return None
+    except UnsupportedTask as e:
+        return str(e)
+    except (OSError, yaml.YAMLError) as e:
+        return str(e)
+
+def get_cache_stats():
+    """获取展开缓存的命中统计"""
+    with _CACHE_LOCK:
+        return dict(_CACHE_STATS)
+
+def clear_expansion_cache():
+    """清空展开缓存"""
+    with _CACHE_LOCK:
+        _CACHE.clear()
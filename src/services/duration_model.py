@@ -0,0 +1,162 @@
+import math
+import heapq
+
+# 耗时模型：按对数分桶的直方图，每记录一次运行，旧的权重乘以衰减系数，
+# 近期的运行对中位数和p90影响更大；记录一次运行只更新少量桶，不需要重新扫描运行历史
+
+# 最小可区分的耗时（秒），更短的运行都落在第一个桶
+MIN_DURATION = 0.01
+# 相邻桶的耗时比例（桶宽约10%）
+BIN_RATIO = 1.1
+# 每记录一次运行，已有权重乘以此系数（约7次运行后权重减半）
+DECAY = 0.9
+# 权重低于此值的桶被丢弃
+MIN_WEIGHT = 1e-3
+# 超出p90后，按已运行时间的这个比例估计剩余时间
+OVERDUE_FACTOR = 0.1
+
+_LOG_RATIO = math.log(BIN_RATIO)
+
+def new_duration_model():
+    """创建空的耗时模型（可直接保存为JSON）"""
+    return {"bins": {}, "total": 0.0, "runs": 0}
+
+def _bin_index(duration):
+    return int(math.floor(math.log(max(float(duration), MIN_DURATION) / MIN_DURATION) / _LOG_RATIO))
+
+def _bin_value(index):
+    """桶的代表耗时（对数中点）"""
+    return MIN_DURATION * BIN_RATIO ** (index + 0.5)
+
+def update_duration_model(model, duration):
+    """
+    记录一次运行的耗时（原地更新）
+
+    参数:
+        model: new_duration_model 创建的模型
+        duration: 耗时（秒），为空或负数时忽略
+
+    返回:
+        模型本身
+    """
+    if duration is None or duration < 0:
+        return model
+    bins = model["bins"]
+    for key in list(bins):
+        weight = bins[key] * DECAY
+        if weight < MIN_WEIGHT:
+            del bins[key]
+        else:
+            bins[key] = weight
+    # JSON对象的键只能是字符串
+    key = str(_bin_index(duration))
+    bins[key] = bins.get(key, 0.0) + 1.0
+    model["total"] = sum(bins.values())
+    model["runs"] = model.get("runs", 0) + 1
+    return model
+
+def duration_quantile(model, q):
+    """
+    按衰减权重计算耗时分位数
+
+    参数:
+        model: 耗时模型
+        q: 分位（0~1）
+
+    返回:
+        耗时（秒），模型为空时返回None
+    """
+    if not model or not model.get("bins"):
+        return None
+    target = q * model["total"]
+    cumulative = 0.0
+    indexes = sorted(int(key) for key in model["bins"])
+    for index in indexes:
+        cumulative += model["bins"][str(index)]
+        if cumulative >= target:
+            return _bin_value(index)
+    return _bin_value(indexes[-1])
+
+def summarize_duration_model(model):
+    """
+    模型摘要
+
+    返回:
+        {median, p90, runs}，模型为空时返回None
+    """
+    median = duration_quantile(model, 0.5)
+    if median is None:
+        return None
+    return {"median": median, "p90": max(median, duration_quantile(model, 0.9)), "runs": model.get("runs", 0)}
+
+def estimate_progress(elapsed, summary):
+    """
+    根据已运行时间估计进度：已超过中位数时改用p90，超过p90后按已运行时间的比例估计剩余时间
+
+    参数:
+        elapsed: 已运行时间（秒）
+        summary: summarize_duration_model 的返回值，没有模型时为None
+
+    返回:
+        {progress(0~1), remaining(秒), expected(预计总耗时), overdue(是否已超过p90)}，没有模型时返回None
+    """
+    if not summary:
+        return None
+    elapsed = max(0.0, float(elapsed))
+    overdue = False
+    if elapsed < summary["median"]:
+        expected = summary["median"]
+    elif elapsed < summary["p90"]:
+        expected = summary["p90"]
+    else:
+        overdue = True
+        expected = elapsed * (1 + OVERDUE_FACTOR)
+    return {
+        "progress": min(0.99, elapsed / expected) if expected else 0.99,
+        "remaining": max(0.0, expected - elapsed),
+        "expected": expected,
+        "overdue": overdue,
+    }
+
+def estimate_batch_progress(running, queued, finished, max_workers, default_duration):
+    """
+    估计并行批次的剩余时间：运行中的任务占用槽位直到预计结束，排队的任务依次交给最先空闲的槽位
+
+    参数:
+        running: 运行中任务的列表，每项为 (已运行时间, 模型摘要或None)
+        queued: 排队任务的模型摘要列表（按提交顺序，没有模型时为None）
+        finished: 已结束任务的耗时列表
+        max_workers: 并发上限
+        default_duration: 没有模型的任务使用的耗时估计
+
+    返回:
+        {progress(0~1), remaining(秒)}
+    """
+    slots = []
+    done_work = sum(duration or 0.0 for duration in finished)
+    total_work = done_work
+    for elapsed, summary in running:
+        estimate = estimate_progress(elapsed, summary)
+        expected = estimate["expected"] if estimate else max(default_duration, elapsed)
+        slots.append(max(0.0, expected - elapsed))
+        done_work += min(elapsed, expected)
+        total_work += expected
+    slots.extend([0.0] * max(0, int(max_workers) - len(slots)))
+    heapq.heapify(slots)
+    for summary in queued:
+        duration = summary["median"] if summary else default_duration
+        heapq.heappush(slots, heapq.heappop(slots) + duration)
+        total_work += duration
+    return {
+        "progress": min(1.0, done_work / total_work) if total_work else 1.0,
+        "remaining": max(slots) if slots else 0.0,
+    }
+
+def format_seconds(seconds):
+    """把秒数格式化为 1h02m / 3m05s / 12s 形式"""
+    seconds = int(round(max(0.0, seconds)))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
@@ -0,0 +1,285 @@
+import os
+import time
+import fnmatch
+import threading
+from collections import deque
+from datetime import datetime
+from watchdog.observers import Observer
+from watchdog.events import (
+    FileSystemEventHandler, EVENT_TYPE_CREATED, EVENT_TYPE_MODIFIED, EVENT_TYPE_MOVED, EVENT_TYPE_DELETED
+)
+
+# 防抖等待的默认时长（秒）：最后一个事件之后这么久没有新事件才触发运行
+DEFAULT_DEBOUNCE_SECONDS = 2.0
+# 事件持续不断时，从第一个事件起最多等待防抖时长的这么多倍就触发
+MAX_DEBOUNCE_FACTOR = 10
+# 每个监视保留的最近触发延迟数量
+LAG_WINDOW = 50
+
+_WATCH_EVENT_TYPES = (EVENT_TYPE_CREATED, EVENT_TYPE_MODIFIED, EVENT_TYPE_MOVED, EVENT_TYPE_DELETED)
+
+# 监视注册表：watch_id -> 监视状态
+_WATCHES = {}
+_WATCH_LOCK = threading.RLock()
+_OBSERVER = None
+
+class _WatchHandler(FileSystemEventHandler):
+    """把文件系统事件按路径模式过滤后交给对应的监视"""
+
+    def __init__(self, watch_id, root):
+        super().__init__()
+        self.watch_id = watch_id
+        self.root = root
+
+    def on_any_event(self, event):
+        if event.event_type not in _WATCH_EVENT_TYPES:
+            return
+        if event.is_directory and event.event_type == EVENT_TYPE_MODIFIED:
+            # 目录的修改事件只是其中文件变化的副产物
+            return
+        path = getattr(event, "dest_path", "") or event.src_path
+        _on_event(self.watch_id, self.root, os.fsdecode(path))
+
+def _get_observer():
+    """按需启动共用的watchdog观察线程，调用方需持有锁"""
+    global _OBSERVER
+    if _OBSERVER is None or not _OBSERVER.is_alive():
+        _OBSERVER = Observer()
+        _OBSERVER.daemon = True
+        _OBSERVER.start()
+    return _OBSERVER
+
+def _matches(patterns, root, path):
+    """路径（相对于监视目录）或文件名是否匹配任一glob模式；没有模式时匹配所有文件"""
+    if not patterns:
+        return True
+    relative = os.path.relpath(path, root).replace(os.sep, "/")
+    name = os.path.basename(path)
+    return any(fnmatch.fnmatch(relative, pattern) or fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+def _resolve_paths(binding):
+    """监视路径：相对路径以Taskfile所在目录为基准"""
+    base_dir = os.path.dirname(os.path.abspath(binding["taskfile"])) if binding.get("taskfile") else os.getcwd()
+    return [os.path.normpath(os.path.join(base_dir, path)) for path in binding.get("paths") or []]
+
+def _definition(binding):
+    """决定监视行为的字段，用于判断绑定是否有变化"""
+    return (
+        binding.get("task"), binding.get("taskfile"), tuple(binding.get("paths") or []),
+        tuple(binding.get("patterns") or []), float(binding.get("debounce") or DEFAULT_DEBOUNCE_SECONDS),
+        bool(binding.get("recursive", True)), bool(binding.get("enabled", True)),
+    )
+
+def _new_watch(binding, submit):
+    return {
+        "watch_id": binding["id"],
+        "task": binding["task"],
+        "taskfile": binding.get("taskfile"),
+        "paths": list(binding.get("paths") or []),
+        "patterns": list(binding.get("patterns") or []),
+        "debounce": max(0.0, float(binding.get("debounce") or DEFAULT_DEBOUNCE_SECONDS)),
+        "recursive": bool(binding.get("recursive", True)),
+        "enabled": bool(binding.get("enabled", True)),
+        "definition": _definition(binding),
+        "submit": submit,
+        "error": None,
+        # 统计：匹配的文件事件数、防抖后的触发数、启动的运行数、因任务仍在运行而合并的触发数
+        "events": 0,
+        "triggers": 0,
+        "runs": 0,
+        "coalesced": 0,
+        "running": False,
+        # 运行期间再次触发时排队的后续运行（最多一个），记录其窗口内第一个事件的时间
+        "followup": False,
+        "last_event_at": None,
+        "last_run_at": None,
+        "last_status": None,
+        "last_lag": None,
+        "_lags": deque(maxlen=LAG_WINDOW),
+        "_followup_since": None,
+        # 当前防抖窗口：第一个事件的时间（墙钟、单调时钟）与触发截止时间
+        "_window_started": None,
+        "_window_monotonic": None,
+        "_deadline": None,
+        "_timer": None,
+        "_handles": [],
+    }
+
+def _schedule(watch):
+    """向观察线程登记监视路径，调用方需持有锁"""
+    if not watch["enabled"]:
+        return
+    missing = []
+    observer = _get_observer()
+    for path in _resolve_paths(watch):
+        if not os.path.isdir(path):
+            missing.append(path)
+            continue
+        try:
+            watch["_handles"].append(
+                observer.schedule(_WatchHandler(watch["watch_id"], path), path, recursive=watch["recursive"])
+            )
+        except OSError as e:
+            missing.append(f"{path} ({str(e)})")
+    watch["error"] = f"无法监视: {', '.join(missing)}" if missing else None
+
+def _unschedule(watch):
+    """取消监视路径和尚未触发的防抖定时器，调用方需持有锁"""
+    for handle in watch["_handles"]:
+        try:
+            _OBSERVER.unschedule(handle)
+        except (KeyError, AttributeError):
+            pass
+    watch["_handles"] = []
+    if watch["_timer"] is not None:
+        watch["_timer"].cancel()
+        watch["_timer"] = None
+    watch["_window_started"] = watch["_window_monotonic"] = watch["_deadline"] = None
+
+def _on_event(watch_id, root, path):
+    """文件事件：延长防抖窗口（持续有事件时不超过最长等待）"""
+    with _WATCH_LOCK:
+        watch = _WATCHES.get(watch_id)
+        if watch is None or not _matches(watch["patterns"], root, path):
+            return
+        now = time.monotonic()
+        watch["events"] += 1
+        watch["last_event_at"] = datetime.now().isoformat()
+        if watch["_window_started"] is None:
+            watch["_window_started"] = time.time()
+            watch["_window_monotonic"] = now
+        max_deadline = watch["_window_monotonic"] + max(watch["debounce"] * MAX_DEBOUNCE_FACTOR, watch["debounce"])
+        watch["_deadline"] = min(now + watch["debounce"], max_deadline)
+        if watch["_timer"] is None:
+            _start_timer(watch, watch["_deadline"] - now)
+
+def _start_timer(watch, delay):
+    """启动防抖定时器，调用方需持有锁"""
+    timer = threading.Timer(max(0.0, delay), _check_window, args=(watch["watch_id"],))
+    timer.daemon = True
+    watch["_timer"] = timer
+    timer.start()
+
+def _check_window(watch_id):
+    """防抖定时器到期：截止时间被新事件推后时继续等待，否则触发"""
+    with _WATCH_LOCK:
+        watch = _WATCHES.get(watch_id)
+        if watch is None or watch["_deadline"] is None:
+            return
+        remaining = watch["_deadline"] - time.monotonic()
+        if remaining > 0:
+            _start_timer(watch, remaining)
+            return
+        first_event = watch["_window_started"]
+        watch["_timer"] = None
+        watch["_window_started"] = watch["_window_monotonic"] = watch["_deadline"] = None
+        watch["triggers"] += 1
+        if watch["running"]:
+            # 任务仍在运行：最多排队一个后续运行，更多的触发合并进去
+            if watch["followup"]:
+                watch["coalesced"] += 1
+            else:
+                watch["followup"] = True
+                watch["_followup_since"] = first_event
+            return
+        watch["running"] = True
+    _start_run(watch, first_event)
+
+def _start_run(watch, first_event):
+    """提交一次运行（在锁外调用，提交可能等待队列空位）"""
+    submitted_at = time.time()
+    try:
+        future = watch["submit"]()
+    except Exception as e:
+        future = None
+        print(f"提交监视触发的任务 {watch['task']} 时出错: {str(e)}")
+    with _WATCH_LOCK:
+        if future is None:
+            watch["running"] = False
+            watch["last_status"] = "rejected"
+            return
+        watch["runs"] += 1
+        watch["last_run_at"] = datetime.now().isoformat()
+    future.add_done_callback(lambda f: _on_run_done(watch, first_event, submitted_at, f))
+
+def _on_run_done(watch, first_event, submitted_at, future):
+    """运行结束：记录触发延迟，有排队的后续运行时立即提交"""
+    record = None
+    if not future.cancelled() and future.exception() is None:
+        record = future.result()
+    with _WATCH_LOCK:
+        if record is not None:
+            # 触发延迟 = 防抖等待 + 排队等待，即从第一个文件事件到任务开始执行的时间
+            lag = round(submitted_at - first_event + (record.get("queue_wait") or 0), 3)
+            watch["last_lag"] = lag
+            watch["_lags"].append(lag)
+            watch["last_status"] = record.get("status")
+        else:
+            watch["last_status"] = "cancelled" if future.cancelled() else "error"
+        if not watch["followup"] or _WATCHES.get(watch["watch_id"]) is not watch:
+            watch["running"] = False
+            return
+        watch["followup"] = False
+        first_event = watch["_followup_since"]
+        watch["_followup_since"] = None
+    _start_run(watch, first_event)
+
+def sync_watches(bindings, submit_factory):
+    """
+    按绑定列表更新监视：新增的开始监视，删除的停止监视，定义变化的重新登记（未变化的保留统计）
+
+    参数:
+        bindings: 绑定列表，每项为 {id, task, taskfile, paths, patterns, debounce, recursive, enabled}
+        submit_factory: submit_factory(绑定) -> 提交函数，提交函数无参数，返回Future（结果为运行记录）或None
+    """
+    wanted = {binding["id"]: binding for binding in bindings if binding.get("id") and binding.get("task")}
+    with _WATCH_LOCK:
+        for watch_id in list(_WATCHES):
+            watch = _WATCHES[watch_id]
+            if watch_id not in wanted or watch["definition"] != _definition(wanted[watch_id]):
+                _unschedule(watch)
+                del _WATCHES[watch_id]
+        for watch_id, binding in wanted.items():
+            if watch_id in _WATCHES:
+                continue
+            watch = _new_watch(binding, submit_factory(binding))
+            _WATCHES[watch_id] = watch
+            _schedule(watch)
+
+def stop_all_watches():
+    """停止所有监视"""
+    with _WATCH_LOCK:
+        for watch in _WATCHES.values():
+            _unschedule(watch)
+        _WATCHES.clear()
+
+def _public_watch(watch):
+    lags = list(watch["_lags"])
+    return {
+        "watch_id": watch["watch_id"],
+        "task": watch["task"],
+        "taskfile": watch["taskfile"],
+        "paths": list(watch["paths"]),
+        "patterns": list(watch["patterns"]),
+        "debounce": watch["debounce"],
+        "enabled": watch["enabled"],
+        "error": watch["error"],
+        "events": watch["events"],
+        "triggers": watch["triggers"],
+        "runs": watch["runs"],
+        "coalesced": watch["coalesced"],
+        "running": watch["running"],
+        "followup": watch["followup"],
+        "pending": watch["_deadline"] is not None,
+        "last_event_at": watch["last_event_at"],
+        "last_run_at": watch["last_run_at"],
+        "last_status": watch["last_status"],
+        "last_lag": watch["last_lag"],
+        "avg_lag": round(sum(lags) / len(lags), 3) if lags else None,
+        "max_lag": max(lags) if lags else None,
+    }
+
+def list_watches():
+    """列出所有监视的状态快照（含触发次数与延迟统计）"""
+    with _WATCH_LOCK:
+        return [_public_watch(watch) for watch in _WATCHES.values()]
@@ -0,0 +1,329 @@
+import os
+import glob
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from src.services.direct_runner import get_task_definition, render_task_paths
+
+# 指纹缓存文件（项目目录下的 cache/fingerprints.json）
+CACHE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "cache", "fingerprints.json")
+CACHE_VERSION = 1
+
+# 并行计算文件哈希的线程数（hashlib在处理大块数据时会释放GIL）
+HASH_WORKERS = min(8, (os.cpu_count() or 1) * 2)
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# 任务状态
+STATUS_UP_TO_DATE = "up_to_date"
+STATUS_STALE = "stale"
+STATUS_UNKNOWN = "unknown"  # 没有sources或使用了无法解析的模板，无法判断
+
+# files: 文件路径 -> [mtime_ns, size, sha256]，mtime和大小不变时复用哈希
+# tasks: 任务ID -> {"fingerprint", "built_at"}，最近一次成功运行时的源文件指纹
+_STATE = {"files": {}, "tasks": {}}
+_STATE_LOCK = threading.RLock()
+_LOADED_MTIME = None
+_DIRTY = False
+
+# 检查结果的短期缓存：任务ID -> (检查时间, 状态)，避免界面每次刷新都重新展开glob
+STATUS_TTL_SECONDS = 5.0
+# 检查结果缓存的最大条目数（超出后丢弃最久未更新的）
+MAX_STATUS_MEMO = 2000
+_STATUS_MEMO = OrderedDict()
+
+# 成功运行后的指纹记录在单独的线程中依次进行，不占用运行完成回调
+_MARK_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fingerprint-mark")
+
+def task_id(taskfile_path, task_name):
+    """指纹缓存中的任务ID"""
+    return f"{os.path.abspath(taskfile_path)}::{task_name}"
+
+def _merge_from_disk():
+    """
+    首次使用或磁盘文件被其他进程（如守护进程）更新后合并磁盘缓存，调用方需持有锁
+
+    任务记录以 built_at 较新的为准，文件哈希以内存中的为准。
+    """
+    global _LOADED_MTIME
+    try:
+        mtime = os.stat(CACHE_FILE).st_mtime_ns
+    except OSError:
+        return
+    if mtime == _LOADED_MTIME:
+        return
+    _LOADED_MTIME = mtime
+    try:
+        with open(CACHE_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return
+    if data.get("version") != CACHE_VERSION:
+        return
+    for path, entry in data.get("files", {}).items():
+        _STATE["files"].setdefault(path, entry)
+    for key, record in data.get("tasks", {}).items():
+        current = _STATE["tasks"].get(key)
+        if current is None or record.get("built_at", 0) > current.get("built_at", 0):
+            _STATE["tasks"][key] = record
+
+def save_cache():
+    """有变化时把缓存写入磁盘（先合并其他进程的写入，再原子替换）"""
+    global _DIRTY, _LOADED_MTIME
+    with _STATE_LOCK:
+        if not _DIRTY:
+            return
+        _merge_from_disk()
+        data = {"version": CACHE_VERSION, "files": dict(_STATE["files"]), "tasks": dict(_STATE["tasks"])}
+        _DIRTY = False
+        try:
+            os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+            tmp_path = f"{CACHE_FILE}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, CACHE_FILE)
+            _LOADED_MTIME = os.stat(CACHE_FILE).st_mtime_ns
+        except OSError as e:
+            print(f"保存指纹缓存时出错: {str(e)}")
+
+def clear_cache():
+    """清空指纹缓存（包括磁盘文件）"""
+    global _DIRTY
+    with _STATE_LOCK:
+        _STATE["files"] = {}
+        _STATE["tasks"] = {}
+        _STATUS_MEMO.clear()
+        _DIRTY = False
+    try:
+        os.remove(CACHE_FILE)
+    except OSError:
+        pass
+
+def _as_list(value):
+    if not value:
+        return []
+    return value if isinstance(value, list) else [value]
+
+def _glob_files(task_dir, patterns, memo):
+    """展开glob模式为文件列表（支持 ** 与 exclude），同一次检查内相同模式只展开一次"""
+    included = set()
+    excluded = set()
+    for pattern in patterns:
+        target = excluded if isinstance(pattern, dict) else included
+        pattern = pattern.get("exclude") if isinstance(pattern, dict) else pattern
+        if not pattern:
+            continue
+        full_pattern = os.path.normpath(os.path.join(task_dir, pattern))
+        if full_pattern not in memo:
+            memo[full_pattern] = [path for path in glob.glob(full_pattern, recursive=True) if os.path.isfile(path)]
+        target.update(memo[full_pattern])
+    return sorted(included - excluded)
+
+def _resolve_task(taskfile_path, task_name, memo):
+    """
+    读取任务的sources/generates并展开为文件列表
+
+    返回:
+        dict 或 None（没有sources或模板无法解析）
+    """
+    definition = get_task_definition(taskfile_path, task_name)
+    sources = [p for p in _as_list(definition.get("sources")) if isinstance(p, (str, dict))]
+    if not sources:
+        return None
+    generates = [p for p in _as_list(definition.get("generates")) if isinstance(p, (str, dict))]
+
+    # 展开路径中的模板，{exclude: 模式} 项保持其形式
+    patterns = sources + generates
+    raw = [str(p.get("exclude") or "") if isinstance(p, dict) else p for p in patterns]
+    rendered = render_task_paths(taskfile_path, task_name, raw)
+    if rendered is None:
+        return None
+    task_dir, rendered_paths = rendered
+    patterns = [{"exclude": value} if isinstance(p, dict) else value for p, value in zip(patterns, rendered_paths)]
+    sources, generates = patterns[:len(sources)], patterns[len(sources):]
+
+    return {
+        "dir": task_dir,
+        "method": definition.get("method") or "checksum",
+        "source_files": _glob_files(task_dir, sources, memo),
+        "generate_patterns": [p for p in generates if not isinstance(p, dict)],
+        "generate_files": _glob_files(task_dir, generates, memo),
+    }
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _file_hashes(paths):
+    """
+    获取文件内容哈希：mtime和大小未变的文件复用缓存，其余并行计算
+
+    返回:
+        文件路径 -> sha256（读取失败的文件不包含在内）
+    """
+    global _DIRTY
+    hashes = {}
+    to_hash = []
+    with _STATE_LOCK:
+        _merge_from_disk()
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            cached = _STATE["files"].get(path)
+            if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+                hashes[path] = cached[2]
+            else:
+                to_hash.append((path, stat.st_mtime_ns, stat.st_size))
+
+    if not to_hash:
+        return hashes
+
+    def hash_one(item):
+        try:
+            return item, _hash_file(item[0])
+        except OSError:
+            return item, None
+
+    if len(to_hash) == 1:
+        results = [hash_one(to_hash[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=HASH_WORKERS) as pool:
+            results = list(pool.map(hash_one, to_hash))
+
+    with _STATE_LOCK:
+        for (path, mtime_ns, size), digest in results:
+            if digest is None:
+                continue
+            hashes[path] = digest
+            _STATE["files"][path] = [mtime_ns, size, digest]
+        _DIRTY = True
+    return hashes
+
+def _fingerprint(resolved, hashes):
+    """由源文件相对路径和内容哈希计算任务指纹"""
+    digest = hashlib.sha256(resolved["method"].encode("utf-8"))
+    for path in resolved["source_files"]:
+        digest.update(os.path.relpath(path, resolved["dir"]).encode("utf-8"))
+        digest.update(hashes.get(path, "missing").encode("utf-8"))
+    return digest.hexdigest()
+
+def _generates_present(resolved):
+    """每个generates模式都至少匹配到一个文件"""
+    memo = {}
+    return all(_glob_files(resolved["dir"], [pattern], memo) for pattern in resolved["generate_patterns"])
+
+def _is_up_to_date(key, resolved, hashes):
+    method = resolved["method"]
+    if method == "none":
+        return False
+    if not _generates_present(resolved):
+        return False
+    if method == "timestamp":
+        # 所有生成文件都比最新的源文件新
+        if not resolved["generate_files"] or not resolved["source_files"]:
+            return False
+        try:
+            newest_source = max(os.stat(path).st_mtime_ns for path in resolved["source_files"])
+            oldest_output = min(os.stat(path).st_mtime_ns for path in resolved["generate_files"])
+        except OSError:
+            return False
+        return oldest_output >= newest_source
+    with _STATE_LOCK:
+        _merge_from_disk()
+        record = _STATE["tasks"].get(key)
+    return bool(record) and record.get("fingerprint") == _fingerprint(resolved, hashes)
+
+def check_tasks(task_refs, max_age=0):
+    """
+    批量检查任务是否已是最新
+
+    参数:
+        task_refs: (Taskfile路径, 任务名) 列表
+        max_age: 可复用的检查结果最长时间（秒），0表示总是重新检查
+
+    返回:
+        任务ID -> 状态（up_to_date / stale / unknown）
+    """
+    memo = {}
+    resolved_tasks = {}
+    statuses = {}
+    now = time.time()
+    for taskfile_path, task_name in task_refs:
+        key = task_id(taskfile_path, task_name)
+        cached = _STATUS_MEMO.get(key)
+        if max_age and cached and now - cached[0] < max_age:
+            statuses[key] = cached[1]
+            continue
+        resolved = _resolve_task(taskfile_path, task_name, memo)
+        if resolved is None:
+            statuses[key] = STATUS_UNKNOWN
+        else:
+            resolved_tasks[key] = resolved
+
+    # 所有任务的源文件一起计算哈希，共享的文件只处理一次
+    all_files = set()
+    for key, resolved in resolved_tasks.items():
+        if resolved["method"] == "checksum":
+            all_files.update(resolved["source_files"])
+    hashes = _file_hashes(sorted(all_files))
+
+    for key, resolved in resolved_tasks.items():
+        statuses[key] = STATUS_UP_TO_DATE if _is_up_to_date(key, resolved, hashes) else STATUS_STALE
+    with _STATE_LOCK:
+        for key, status in statuses.items():
+            _STATUS_MEMO.pop(key, None)
+            _STATUS_MEMO[key] = (now, status)
+        while len(_STATUS_MEMO) > MAX_STATUS_MEMO:
+            _STATUS_MEMO.popitem(last=False)
+
+    save_cache()
+    return statuses
+
+def _record_build(taskfile_path, task_name):
+    """计算并保存任务当前的源文件指纹"""
+    global _DIRTY
+    key = task_id(taskfile_path, task_name)
+    try:
+        resolved = _resolve_task(taskfile_path, task_name, {})
+        if resolved is None or resolved["method"] != "checksum":
+            return
+        hashes = _file_hashes(resolved["source_files"])
+        with _STATE_LOCK:
+            _STATE["tasks"][key] = {
+                "fingerprint": _fingerprint(resolved, hashes),
+                "built_at": time.time(),
+            }
+            _STATUS_MEMO.pop(key, None)
+            _DIRTY = True
+        save_cache()
+    except Exception as e:
+        print(f"记录任务 {task_name} 的指纹时出错: {str(e)}")
+
+def mark_built(taskfile_path, task_name):
+    """
+    任务成功运行后记录当前源文件指纹（任务没有sources时不做任何事）
+
+    展开glob和计算哈希在后台线程中进行，调用方（运行完成回调）不等待。
+
+    参数:
+        taskfile_path: Taskfile路径
+        task_name: 任务名称
+
+    返回:
+        concurrent.futures.Future，记录完成时结束；没有Taskfile路径时返回None
+    """
+    if not taskfile_path:
+        return None
+    with _STATE_LOCK:
+        _STATUS_MEMO.pop(task_id(taskfile_path, task_name), None)
+    return _MARK_EXECUTOR.submit(_record_build, taskfile_path, task_name)
@@ -0,0 +1,182 @@
+import os
+import time
+import threading
+from collections import deque
+from datetime import datetime
+import psutil
+
+# 准入决策
+DECISION_ADMITTED = "admitted"
+DECISION_DEFERRED = "deferred"
+
+# 负载门控配置（启用后执行池只在系统负载低于阈值时启动新的运行）
+_GATE_SETTINGS = {
+    "enabled": False,
+    # 系统CPU使用率上限（%）
+    "max_cpu_percent": 90.0,
+    # 每个CPU核心的1分钟平均负载上限（Windows上无loadavg时忽略）
+    "max_load_per_cpu": 1.5,
+    # 可用内存下限（MB）
+    "min_available_mb": 1024,
+    # 两次准入之间的最小间隔（秒），让刚启动的任务的负载反映到采样中
+    "admission_interval": 1.0,
+}
+# 门控拒绝后重新检查的间隔（秒）
+RECHECK_INTERVAL = 1.0
+
+_GATE_LOCK = threading.Lock()
+# 最近的准入决策与负载采样
+_DECISIONS = deque(maxlen=500)
+_SAMPLES = deque(maxlen=300)
+# 放行次数与被推迟过的排队项数（同一排队项多次重新检查只计一次）
+_COUNTS = {DECISION_ADMITTED: 0, DECISION_DEFERRED: 0}
+_LAST_ADMISSION = 0.0
+# 每个被推迟的排队项最近一次记录的超限类型，类型不变的重复推迟不再记录
+_LAST_DEFERRAL = {}
+
+def configure_gate(enabled=None, max_cpu_percent=None, max_load_per_cpu=None, min_available_mb=None,
+                   admission_interval=None):
+    """
+    更新负载门控配置
+
+    参数:
+        enabled: 是否启用
+        max_cpu_percent: CPU使用率上限（%）
+        max_load_per_cpu: 每核平均负载上限
+        min_available_mb: 可用内存下限（MB）
+        admission_interval: 两次准入之间的最小间隔（秒）
+    """
+    with _GATE_LOCK:
+        if enabled is not None:
+            if enabled and not _GATE_SETTINGS["enabled"]:
+                # cpu_percent(interval=None) 返回距上次调用的使用率，先调用一次作为基准
+                psutil.cpu_percent(interval=None)
+            _GATE_SETTINGS["enabled"] = bool(enabled)
+        for key, value in (("max_cpu_percent", max_cpu_percent), ("max_load_per_cpu", max_load_per_cpu),
+                           ("min_available_mb", min_available_mb), ("admission_interval", admission_interval)):
+            if value is not None:
+                _GATE_SETTINGS[key] = max(0.0, float(value))
+
+def get_gate_settings():
+    """获取负载门控配置副本"""
+    with _GATE_LOCK:
+        return dict(_GATE_SETTINGS)
+
+def is_gate_enabled():
+    """负载门控是否启用"""
+    return _GATE_SETTINGS["enabled"]
+
+def sample_load():
+    """
+    采样当前系统负载
+
+    返回:
+        dict: time、cpu_percent、load_per_cpu（Windows上为None）、available_mb
+    """
+    cpu_count = os.cpu_count() or 1
+    try:
+        load_per_cpu = round(os.getloadavg()[0] / cpu_count, 2)
+    except (AttributeError, OSError):
+        load_per_cpu = None
+    sample = {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "cpu_percent": psutil.cpu_percent(interval=None),
+        "load_per_cpu": load_per_cpu,
+        "available_mb": round(psutil.virtual_memory().available / (1024 * 1024)),
+    }
+    with _GATE_LOCK:
+        _SAMPLES.append(sample)
+    return sample
+
+def _over_threshold(sample, settings):
+    """
+    检查采样是否超出阈值
+
+    返回:
+        (超限类型元组, 原因描述)；均未超出时返回 ((), None)。
+        类型为 "cpu"、"load"、"memory"，原因描述含实时读数，只用于展示
+    """
+    kinds = []
+    reasons = []
+    if sample["cpu_percent"] > settings["max_cpu_percent"]:
+        kinds.append("cpu")
+        reasons.append(f"CPU {sample['cpu_percent']:.0f}% > {settings['max_cpu_percent']:.0f}%")
+    if sample["load_per_cpu"] is not None and sample["load_per_cpu"] > settings["max_load_per_cpu"]:
+        kinds.append("load")
+        reasons.append(f"负载 {sample['load_per_cpu']:.2f}/核 > {settings['max_load_per_cpu']:.2f}")
+    if sample["available_mb"] < settings["min_available_mb"]:
+        kinds.append("memory")
+        reasons.append(f"可用内存 {sample['available_mb']}MB < {settings['min_available_mb']:.0f}MB")
+    return tuple(kinds), "; ".join(reasons) or None
+
+def _record(item_id, task_name, decision, reason, sample, active_count, kinds=()):
+    """
+    记录准入决策，调用方需持有锁
+
+    同一排队项的推迟只计数一次；超限类型不变的重复推迟（读数变化）不再记录，类型变化时记录新的原因
+    """
+    if decision == DECISION_DEFERRED:
+        if item_id not in _LAST_DEFERRAL:
+            _COUNTS[DECISION_DEFERRED] += 1
+        elif _LAST_DEFERRAL[item_id] == kinds:
+            return
+        _LAST_DEFERRAL[item_id] = kinds
+    else:
+        _COUNTS[decision] += 1
+        _LAST_DEFERRAL.pop(item_id, None)
+    _DECISIONS.append(dict(sample, item_id=item_id, task=task_name, decision=decision,
+                           reason=reason or "", active=active_count))
+
+def admit(item_id, task_name, active_count):
+    """
+    判断是否允许启动新的运行，并记录决策
+
+    没有运行中的任务时总是放行，避免外部负载过高导致队列永远停滞。
+
+    参数:
+        item_id: 排队项ID
+        task_name: 任务名称
+        active_count: 当前运行中的任务数
+
+    返回:
+        (是否放行, 建议的重新检查间隔秒数)
+    """
+    global _LAST_ADMISSION
+    if not is_gate_enabled():
+        return True, 0
+    settings = get_gate_settings()
+
+    since_last = time.monotonic() - _LAST_ADMISSION
+    if active_count and since_last < settings["admission_interval"]:
+        # 上一个运行刚启动，负载还没有体现在采样中，稍后再判断
+        return False, settings["admission_interval"] - since_last
+
+    sample = sample_load()
+    kinds, reason = _over_threshold(sample, settings) if active_count else ((), None)
+    with _GATE_LOCK:
+        if reason:
+            _record(item_id, task_name, DECISION_DEFERRED, reason, sample, active_count, kinds)
+            return False, RECHECK_INTERVAL
+        _record(item_id, task_name, DECISION_ADMITTED, None, sample, active_count)
+        _LAST_ADMISSION = time.monotonic()
+    return True, 0
+
+def forget_item(item_id):
+    """排队项被取消后清理其决策状态"""
+    with _GATE_LOCK:
+        _LAST_DEFERRAL.pop(item_id, None)
+
+def get_gate_snapshot():
+    """
+    获取负载门控状态，供仪表盘展示
+
+    返回:
+        dict: settings、counts、decisions（最近的决策）、samples（最近的负载采样）
+    """
+    with _GATE_LOCK:
+        return {
+            "settings": dict(_GATE_SETTINGS),
+            "counts": dict(_COUNTS),
+            "decisions": list(_DECISIONS),
+            "samples": list(_SAMPLES),
+        }
@@ -0,0 +1,212 @@
+import os
+import re
+import glob
+import uuid
+import itertools
+import threading
+from datetime import datetime
+from src.services.scheduler import NODE_PENDING, NODE_RUNNING, NODE_SUCCESS, NODE_FAILED, NODE_SKIPPED, NODE_FINISHED
+
+# 单次矩阵运行的最大单元数（变量取值的笛卡尔积）
+MAX_MATRIX_CELLS = 1000
+# 注册表中保留的已结束矩阵运行数量
+MAX_FINISHED_MATRIX_RUNS = 20
+
+# 矩阵运行注册表：matrix_id -> 运行状态
+_MATRIX_RUNS = {}
+_MATRIX_LOCK = threading.RLock()
+
+_GLOB_CHARS_RE = re.compile(r"[*?\[]")
+
+def parse_matrix_values(spec, base_dir=None):
+    """
+    解析变量的取值列表：每行一个值（单行时也可以用逗号分隔），含 * ? [ 的值按glob展开
+
+    参数:
+        spec: 取值文本或列表
+        base_dir: 相对glob模式的基准目录（通常是Taskfile所在目录，与task的工作目录一致）
+
+    返回:
+        去重后的取值列表（保持顺序，glob结果按名称排序）
+    """
+    if isinstance(spec, (list, tuple)):
+        entries = [str(value) for value in spec]
+    else:
+        text = str(spec or "").strip()
+        entries = text.splitlines() if "\n" in text else re.split(r"[,，]", text)
+
+    values = []
+    for entry in (entry.strip() for entry in entries):
+        if not entry:
+            continue
+        if not _GLOB_CHARS_RE.search(entry):
+            values.append(entry)
+            continue
+        if os.path.isabs(entry) or not base_dir:
+            values.extend(sorted(glob.glob(entry)))
+        else:
+            matches = glob.glob(os.path.join(base_dir, entry))
+            values.extend(sorted(os.path.relpath(match, base_dir) for match in matches))
+    return list(dict.fromkeys(values))
+
+def expand_matrix(var_values):
+    """
+    生成变量取值的笛卡尔积
+
+    参数:
+        var_values: {变量名: 取值列表}
+
+    返回:
+        单元列表，每项为 {变量名: 值}
+
+    异常:
+        ValueError: 某个变量没有取值，或单元数超过上限
+    """
+    names = list(var_values)
+    for name in names:
+        if not var_values[name]:
+            raise ValueError(f"变量 {name} 没有取值")
+    total = 1
+    for name in names:
+        total *= len(var_values[name])
+    if total > MAX_MATRIX_CELLS:
+        raise ValueError(f"矩阵共 {total} 个单元，超过上限 {MAX_MATRIX_CELLS}")
+    return [dict(zip(names, combo)) for combo in itertools.product(*(var_values[name] for name in names))]
+
+def _public_matrix(matrix):
+    return {
+        "matrix_id": matrix["matrix_id"],
+        "task": matrix["task"],
+        "taskfile": matrix["taskfile"],
+        "created_at": matrix["created_at"],
+        "status": matrix["status"],
+        "vars": list(matrix["vars"]),
+        "max_concurrency": matrix["max_concurrency"],
+        "cells": [dict(cell, vars=dict(cell["vars"])) for cell in matrix["cells"]],
+    }
+
+def _refresh_matrix_status(matrix):
+    """根据单元状态更新整体状态，调用方需持有锁"""
+    states = [cell["status"] for cell in matrix["cells"]]
+    if all(state in NODE_FINISHED for state in states):
+        matrix["status"] = NODE_SUCCESS if all(state == NODE_SUCCESS for state in states) else NODE_FAILED
+
+def _submit_next(matrix, block):
+    """在并发上限内提交下一个待运行单元；队列已满无法提交的单元记为失败"""
+    while True:
+        with _MATRIX_LOCK:
+            running = sum(1 for cell in matrix["cells"] if cell["status"] == NODE_RUNNING)
+            if running >= matrix["max_concurrency"]:
+                return
+            index = next((i for i, cell in enumerate(matrix["cells"]) if cell["status"] == NODE_PENDING), None)
+            if index is None:
+                return
+            cell = matrix["cells"][index]
+            cell["status"] = NODE_RUNNING
+
+        future = matrix["submit"](dict(cell["vars"]), block)
+        if future is not None:
+            future.add_done_callback(lambda f, i=index: _on_cell_done(matrix, i, f))
+            return
+        with _MATRIX_LOCK:
+            cell.update(status=NODE_FAILED, reason="执行队列已满")
+            _refresh_matrix_status(matrix)
+
+def _on_cell_done(matrix, index, future):
+    """单元完成：记录结果并提交下一个单元（单个单元失败不影响其他单元）"""
+    record, error = None, None
+    try:
+        record = future.result()
+    except Exception as e:
+        error = str(e)
+
+    with _MATRIX_LOCK:
+        cell = matrix["cells"][index]
+        if record is not None:
+            cell["run_id"] = record.get("run_id")
+            cell["exit_code"] = record.get("exit_code")
+            cell["duration"] = record.get("duration")
+            cell["status"] = NODE_SUCCESS if record.get("status") == "success" else NODE_FAILED
+            if record.get("status") not in ("success", "failed"):
+                cell["reason"] = record.get("status")
+        else:
+            cell["status"] = NODE_FAILED
+            cell["reason"] = error
+        _refresh_matrix_status(matrix)
+
+    # 在完成回调（后台线程）中提交，可以等待队列空位
+    _submit_next(matrix, block=True)
+
+def _prune_matrix_runs():
+    """只保留最近的已结束矩阵运行，调用方需持有锁"""
+    finished = [matrix_id for matrix_id, matrix in _MATRIX_RUNS.items() if matrix["status"] != NODE_RUNNING]
+    for matrix_id in finished[:max(0, len(finished) - MAX_FINISHED_MATRIX_RUNS)]:
+        _MATRIX_RUNS.pop(matrix_id, None)
+
+def start_matrix_run(task_name, taskfile_path, cells, submit, max_concurrency=2):
+    """
+    按变量组合扇出运行同一个任务，最多同时运行max_concurrency个单元（同时受执行池上限约束）
+
+    参数:
+        task_name: 任务名称
+        taskfile_path: Taskfile路径
+        cells: expand_matrix 的返回值
+        submit: 提交函数 submit(变量字典, 队列已满时是否阻塞) -> Future（结果为运行记录）或None
+        max_concurrency: 并发上限
+
+    返回:
+        matrix_id
+    """
+    matrix_id = uuid.uuid4().hex[:12]
+    matrix = {
+        "matrix_id": matrix_id,
+        "task": task_name,
+        "taskfile": taskfile_path,
+        "created_at": datetime.now().isoformat(),
+        "status": NODE_RUNNING if cells else NODE_SUCCESS,
+        "vars": list(cells[0]) if cells else [],
+        "max_concurrency": max(1, int(max_concurrency)),
+        "submit": submit,
+        "cells": [
+            {"vars": dict(cell_vars), "status": NODE_PENDING, "run_id": None, "exit_code": None, "duration": None,
+             "reason": None}
+            for cell_vars in cells
+        ],
+    }
+    with _MATRIX_LOCK:
+        _MATRIX_RUNS[matrix_id] = matrix
+        _prune_matrix_runs()
+
+    # 首批单元在调用线程中提交，不阻塞
+    for _ in range(min(matrix["max_concurrency"], len(cells))):
+        _submit_next(matrix, block=False)
+    return matrix_id
+
+def cancel_matrix_run(matrix_id):
+    """
+    停止提交矩阵中尚未开始的单元（已开始的运行不受影响）
+
+    返回:
+        是否找到该矩阵运行
+    """
+    with _MATRIX_LOCK:
+        matrix = _MATRIX_RUNS.get(matrix_id)
+        if matrix is None:
+            return False
+        for cell in matrix["cells"]:
+            if cell["status"] == NODE_PENDING:
+                cell["status"] = NODE_SKIPPED
+                cell["reason"] = "已取消"
+        _refresh_matrix_status(matrix)
+        return True
+
+def get_matrix_run(matrix_id):
+    """获取矩阵运行状态快照，不存在时返回None"""
+    with _MATRIX_LOCK:
+        matrix = _MATRIX_RUNS.get(matrix_id)
+        return _public_matrix(matrix) if matrix else None
+
+def list_matrix_runs():
+    """列出所有矩阵运行状态快照（按创建顺序）"""
+    with _MATRIX_LOCK:
+        return [_public_matrix(matrix) for matrix in _MATRIX_RUNS.values()]
@@ -0,0 +1,149 @@
+import math
+
+# 耗时回归检测：每个任务维护指数加权均值/方差（基线）和P²分位数估计（p50、p90），
+# 每次运行只做常数次更新，不需要保留或重新扫描运行历史。状态都是普通字典，可直接保存为JSON。
+# 耗时通常右偏（偶尔很慢），均值和方差在对数空间中计算，z值衡量的是耗时的倍数变化。
+
+# 指数加权的平滑系数（越大越快适应新的耗时水平）
+EWMA_ALPHA = 0.2
+# 基线至少需要的运行次数，之前的运行只更新统计不做判断
+MIN_BASELINE_RUNS = 5
+# 判为回归的最小z值（对数耗时相对基线的标准差倍数）
+Z_THRESHOLD = 3.0
+# 判为回归时耗时至少是p90的倍数，避免把耗时本来就波动大的任务的正常长尾判为回归
+P90_RATIO = 1.3
+# 判为回归时至少比基线多出的秒数，忽略极短任务的抖动
+MIN_DELTA_SECONDS = 0.5
+# 对数耗时的标准差下限（约5%的波动）：耗时非常稳定的任务方差接近0，否则微小变化也会得到很大的z值
+LOG_STD_FLOOR = 0.05
+
+def new_quantile_sketch(q):
+    """创建P²分位数估计器（Jain & Chlamtac），固定用5个标记跟踪分位数q"""
+    return {
+        "q": q,
+        "count": 0,
+        "heights": [],
+        "positions": [1, 2, 3, 4, 5],
+        "desired": [1, 1 + 2 * q, 1 + 4 * q, 3 + 2 * q, 5],
+        "increments": [0, q / 2, q, (1 + q) / 2, 1],
+    }
+
+def _parabolic(sketch, i, step):
+    h, n = sketch["heights"], sketch["positions"]
+    return h[i] + step / (n[i + 1] - n[i - 1]) * (
+        (n[i] - n[i - 1] + step) * (h[i + 1] - h[i]) / (n[i + 1] - n[i])
+        + (n[i + 1] - n[i] - step) * (h[i] - h[i - 1]) / (n[i] - n[i - 1])
+    )
+
+def update_quantile_sketch(sketch, value):
+    """向P²估计器加入一个观测值（原地更新，常数时间）"""
+    h, n = sketch["heights"], sketch["positions"]
+    sketch["count"] += 1
+    if sketch["count"] <= 5:
+        h.append(value)
+        h.sort()
+        return sketch
+
+    if value < h[0]:
+        h[0] = value
+        k = 0
+    elif value >= h[4]:
+        h[4] = value
+        k = 3
+    else:
+        k = next(i for i in range(4) if h[i] <= value < h[i + 1])
+    for i in range(k + 1, 5):
+        n[i] += 1
+    for i in range(5):
+        sketch["desired"][i] += sketch["increments"][i]
+
+    # 调整中间三个标记的高度，使其位置接近期望位置
+    for i in range(1, 4):
+        delta = sketch["desired"][i] - n[i]
+        if (delta >= 1 and n[i + 1] - n[i] > 1) or (delta <= -1 and n[i - 1] - n[i] < -1):
+            step = 1 if delta > 0 else -1
+            height = _parabolic(sketch, i, step)
+            if not h[i - 1] < height < h[i + 1]:
+                height = h[i] + step * (h[i + step] - h[i]) / (n[i + step] - n[i])
+            h[i] = height
+            n[i] += step
+    return sketch
+
+def quantile_value(sketch):
+    """P²估计器当前的分位数估计，没有观测值时返回None"""
+    heights = sketch["heights"]
+    if not heights:
+        return None
+    if sketch["count"] <= 5:
+        return heights[int(round(sketch["q"] * (len(heights) - 1)))]
+    return heights[2]
+
+def new_duration_stats():
+    """创建任务的耗时统计"""
+    return {
+        "count": 0,
+        # 对数耗时的指数加权均值与方差
+        "ewma": None,
+        "ewmvar": 0.0,
+        "p50": new_quantile_sketch(0.5),
+        "p90": new_quantile_sketch(0.9),
+    }
+
+def check_regression(stats, duration):
+    """
+    判断一次运行的耗时相对基线是否显著变长（不更新统计）
+
+    参数:
+        stats: new_duration_stats 创建的统计
+        duration: 本次运行耗时（秒）
+
+    返回:
+        {regression, baseline(基线耗时，对数均值换算回秒), p50, p90, z, ratio(相对基线的倍数)}；
+        基线运行次数不足时返回None
+    """
+    if stats["count"] < MIN_BASELINE_RUNS or stats["ewma"] is None:
+        return None
+    baseline = math.exp(stats["ewma"])
+    std = max(math.sqrt(stats["ewmvar"]), LOG_STD_FLOOR)
+    p90 = quantile_value(stats["p90"])
+    z = (math.log(max(duration, 1e-3)) - stats["ewma"]) / std
+    regression = (
+        z >= Z_THRESHOLD
+        and duration >= P90_RATIO * p90
+        and duration - baseline >= MIN_DELTA_SECONDS
+    )
+    return {
+        "regression": regression,
+        "baseline": round(baseline, 3),
+        "p50": round(quantile_value(stats["p50"]), 3),
+        "p90": round(p90, 3),
+        "z": round(z, 2),
+        "ratio": round(duration / baseline, 2),
+    }
+
+def update_duration_stats(stats, duration):
+    """
+    先按更新前的基线判断是否回归，再把本次耗时计入统计（原地更新，常数时间）
+
+    回归的运行同样计入基线：耗时持续变长时基线随之调整，之后不再重复标记。
+
+    参数:
+        stats: 耗时统计
+        duration: 本次运行耗时（秒）
+
+    返回:
+        check_regression 的结果；基线运行次数不足时为None
+    """
+    verdict = check_regression(stats, duration)
+    value = math.log(max(duration, 1e-3))
+    if stats["ewma"] is None:
+        stats["ewma"] = value
+    else:
+        diff = value - stats["ewma"]
+        increment = EWMA_ALPHA * diff
+        stats["ewma"] += increment
+        stats["ewmvar"] = (1 - EWMA_ALPHA) * (stats["ewmvar"] + diff * increment)
+    update_quantile_sketch(stats["p50"], duration)
+    update_quantile_sketch(stats["p90"], duration)
+    stats["count"] += 1
+    return verdict
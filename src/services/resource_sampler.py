@@ -0,0 +1,241 @@
+import time
+import threading
+from collections import OrderedDict
+import psutil
+
+# 运行资源采样配置：运行期间按固定间隔采样整个进程树的CPU、内存、IO和线程数
+_SAMPLER_SETTINGS = {
+    "enabled": True,
+    # 采样间隔（秒）
+    "interval": 1.0,
+    # 每个运行保留的最多采样点数，超出时把已有的点两两合并、采样间隔加倍
+    "max_points": 240,
+}
+# 保留时间序列的已结束运行数量
+MAX_FINISHED_SERIES = 200
+
+# 时间序列中每个采样点的字段（按此顺序存为列表，节省内存和传输）
+POINT_FIELDS = ("t", "cpu_percent", "rss", "read_bytes", "write_bytes", "threads")
+
+_SAMPLER_LOCK = threading.Lock()
+_WAKE = threading.Event()
+# 采样中的运行：run_id -> 采样状态
+_TRACKED = {}
+# 已结束运行的时间序列：run_id -> 序列快照
+_FINISHED = OrderedDict()
+_SAMPLER_THREAD = None
+
+def configure_sampler(enabled=None, interval=None, max_points=None):
+    """
+    更新资源采样配置（只影响之后启动的运行的开关，间隔立即生效）
+
+    参数:
+        enabled: 是否采样
+        interval: 采样间隔（秒）
+        max_points: 每个运行保留的最多采样点数
+    """
+    with _SAMPLER_LOCK:
+        if enabled is not None:
+            _SAMPLER_SETTINGS["enabled"] = bool(enabled)
+        if interval is not None:
+            _SAMPLER_SETTINGS["interval"] = max(0.05, float(interval))
+        if max_points is not None:
+            _SAMPLER_SETTINGS["max_points"] = max(10, int(max_points))
+    _WAKE.set()
+
+def get_sampler_settings():
+    """获取资源采样配置副本"""
+    with _SAMPLER_LOCK:
+        return dict(_SAMPLER_SETTINGS)
+
+def _new_state(pid):
+    return {
+        "pid": pid,
+        "started": time.monotonic(),
+        "interval": _SAMPLER_SETTINGS["interval"],
+        # 进程对象缓存：cpu_percent需要同一个对象上的两次调用才能计算使用率
+        "procs": {},
+        # IO计数基准：首次采样时已存在的进程（如复用的常驻shell）只统计之后的读写
+        "io_base": {},
+        "io": {},
+        "first": True,
+        "ticks": 0,
+        "stride": 1,
+        "points": [],
+        "samples": 0,
+        "cpu_sum": 0.0,
+        "rss_sum": 0,
+        "threads_sum": 0,
+        "cpu_peak": 0.0,
+        "rss_peak": 0,
+        "threads_peak": 0,
+    }
+
+def _sample_tree(state):
+    """采样一次进程树，返回采样点；根进程已退出时返回None"""
+    root = state["procs"].get(state["pid"])
+    try:
+        if root is None:
+            root = state["procs"][state["pid"]] = psutil.Process(state["pid"])
+        children = root.children(recursive=True)
+    except psutil.Error:
+        return None
+
+    alive = {root.pid: root}
+    for child in children:
+        # 沿用缓存的对象，新出现的进程首次采样的CPU使用率为0
+        alive[child.pid] = state["procs"].get(child.pid) or child
+    state["procs"] = alive
+
+    cpu_percent = 0.0
+    rss = 0
+    threads = 0
+    # 整体替换而不是原地修改，读取摘要时不需要与采样线程同步
+    io = dict(state["io"])
+    for pid, proc in alive.items():
+        try:
+            with proc.oneshot():
+                cpu_percent += proc.cpu_percent(interval=None)
+                rss += proc.memory_info().rss
+                threads += proc.num_threads()
+                try:
+                    counters = proc.io_counters()
+                except (AttributeError, psutil.AccessDenied):
+                    counters = None
+        except psutil.Error:
+            continue
+        if counters is not None:
+            base = state["io_base"].setdefault(pid, (counters.read_bytes, counters.write_bytes) if state["first"] else (0, 0))
+            # 已退出的进程保留最后一次看到的读写量
+            io[pid] = (counters.read_bytes - base[0], counters.write_bytes - base[1])
+    state["io"] = io
+    state["first"] = False
+    return [
+        round(time.monotonic() - state["started"], 2),
+        round(cpu_percent, 1),
+        rss,
+        sum(read for read, _ in io.values()),
+        sum(write for _, write in io.values()),
+        threads,
+    ]
+
+def _record_point(state, point, max_points):
+    """累计峰值和均值，并按当前步长写入时间序列，调用方需持有锁"""
+    state["samples"] += 1
+    state["cpu_sum"] += point[1]
+    state["rss_sum"] += point[2]
+    state["threads_sum"] += point[5]
+    state["cpu_peak"] = max(state["cpu_peak"], point[1])
+    state["rss_peak"] = max(state["rss_peak"], point[2])
+    state["threads_peak"] = max(state["threads_peak"], point[5])
+    state["ticks"] += 1
+    if (state["ticks"] - 1) % state["stride"]:
+        return
+    state["points"].append(point)
+    if len(state["points"]) > max_points:
+        # 序列过长：隔点保留并加倍步长，长时间运行的序列大小保持有界
+        state["points"] = state["points"][::2]
+        state["stride"] *= 2
+
+def _sampler_loop():
+    """采样线程：每个间隔采样所有运行中的进程树，没有运行时退出"""
+    global _SAMPLER_THREAD
+    while True:
+        with _SAMPLER_LOCK:
+            if not _TRACKED:
+                _SAMPLER_THREAD = None
+                return
+            interval = _SAMPLER_SETTINGS["interval"]
+        _WAKE.wait(interval)
+        _WAKE.clear()
+        with _SAMPLER_LOCK:
+            states = list(_TRACKED.items())
+            max_points = _SAMPLER_SETTINGS["max_points"]
+        for run_id, state in states:
+            point = _sample_tree(state)
+            if point is None:
+                continue
+            with _SAMPLER_LOCK:
+                if _TRACKED.get(run_id) is state:
+                    state["interval"] = interval
+                    _record_point(state, point, max_points)
+
+def track_run(run_id, pid):
+    """
+    开始采样运行的进程树（进程启动后调用；未启用采样时不做任何事）
+
+    参数:
+        run_id: 运行ID
+        pid: 运行的根进程ID
+    """
+    global _SAMPLER_THREAD
+    if not _SAMPLER_SETTINGS["enabled"]:
+        return
+    state = _new_state(pid)
+    # 首次采样记录CPU时间和IO计数的基准，不计入统计
+    _sample_tree(state)
+    with _SAMPLER_LOCK:
+        _TRACKED[run_id] = state
+        if _SAMPLER_THREAD is None:
+            _SAMPLER_THREAD = threading.Thread(target=_sampler_loop, name="resource-sampler", daemon=True)
+            _SAMPLER_THREAD.start()
+
+def _summary(state):
+    """运行的资源占用摘要（峰值与均值），调用方需持有锁"""
+    samples = state["samples"]
+    if not samples:
+        return None
+    last = state["points"][-1] if state["points"] else [0, 0, 0, 0, 0, 0]
+    return {
+        "samples": samples,
+        "cpu_percent_peak": state["cpu_peak"],
+        "cpu_percent_mean": round(state["cpu_sum"] / samples, 1),
+        "rss_peak": state["rss_peak"],
+        "rss_mean": int(state["rss_sum"] / samples),
+        "read_bytes": max(last[3], sum(read for read, _ in state["io"].values())),
+        "write_bytes": max(last[4], sum(write for _, write in state["io"].values())),
+        "threads_peak": state["threads_peak"],
+        "threads_mean": round(state["threads_sum"] / samples, 1),
+    }
+
+def _series(run_id, state, running):
+    return {
+        "run_id": run_id,
+        "running": running,
+        "interval": state["interval"] * state["stride"],
+        "fields": list(POINT_FIELDS),
+        "points": [list(point) for point in state["points"]],
+        "summary": _summary(state),
+    }
+
+def untrack_run(run_id):
+    """
+    停止采样运行并保留其时间序列
+
+    返回:
+        资源占用摘要 {samples, cpu_percent_peak/mean, rss_peak/mean, read_bytes, write_bytes, threads_peak/mean}；
+        未采样或运行太短（没有完成一次采样）时返回None
+    """
+    with _SAMPLER_LOCK:
+        state = _TRACKED.pop(run_id, None)
+        if state is None:
+            return None
+        _FINISHED[run_id] = _series(run_id, state, False)
+        while len(_FINISHED) > MAX_FINISHED_SERIES:
+            _FINISHED.popitem(last=False)
+        return _FINISHED[run_id]["summary"]
+
+def get_run_resources(run_id):
+    """
+    获取运行的资源时间序列
+
+    返回:
+        {run_id, running, interval, fields, points, summary}，points中每项按fields顺序排列；
+        没有采样数据时返回None
+    """
+    with _SAMPLER_LOCK:
+        state = _TRACKED.get(run_id)
+        if state is not None:
+            return _series(run_id, state, True)
+        series = _FINISHED.get(run_id)
+        return dict(series, points=[list(point) for point in series["points"]]) if series else None
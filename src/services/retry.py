@@ -0,0 +1,237 @@
+import os
+import json
+import random
+import threading
+from collections import deque
+from datetime import datetime
+
+# 重试配置：按标签的默认重试次数与退避参数（任务定义中的retry字段优先）
+_RETRY_SETTINGS = {
+    # 标签 -> 最大尝试次数（含首次运行）
+    "tag_attempts": {},
+    # 首次重试前的等待时间（秒），之后每次翻倍
+    "backoff": 2.0,
+    # 单次等待的上限（秒）
+    "max_backoff": 60.0,
+    # 抖动比例：实际等待时间在 [1-jitter, 1+jitter] 倍之间随机
+    "jitter": 0.5,
+    # 不稳定度达到该值的任务被隔离到专用槽位
+    "flaky_threshold": 0.3,
+}
+_SETTINGS_LOCK = threading.Lock()
+
+# 不稳定度统计：每个任务最近的若干次逻辑运行（含所有重试）
+FLAKY_WINDOW = 20
+# 运行次数少于该值时不判定为不稳定
+FLAKY_MIN_RUNS = 3
+FLAKY_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                          "cache", "flakiness.json")
+_FLAKY = {}
+_FLAKY_LOCK = threading.Lock()
+_FLAKY_LOADED = False
+
+def configure_retry(tag_attempts=None, backoff=None, max_backoff=None, jitter=None, flaky_threshold=None):
+    """
+    更新重试配置
+
+    参数:
+        tag_attempts: {标签: 最大尝试次数}
+        backoff: 首次重试前的等待时间（秒）
+        max_backoff: 单次等待上限（秒）
+        jitter: 抖动比例（0~1）
+        flaky_threshold: 隔离不稳定任务的阈值（0~1）
+    """
+    with _SETTINGS_LOCK:
+        if tag_attempts is not None:
+            _RETRY_SETTINGS["tag_attempts"] = {str(tag): max(1, int(count)) for tag, count in tag_attempts.items()}
+        if backoff is not None:
+            _RETRY_SETTINGS["backoff"] = max(0.0, float(backoff))
+        if max_backoff is not None:
+            _RETRY_SETTINGS["max_backoff"] = max(0.0, float(max_backoff))
+        if jitter is not None:
+            _RETRY_SETTINGS["jitter"] = min(1.0, max(0.0, float(jitter)))
+        if flaky_threshold is not None:
+            _RETRY_SETTINGS["flaky_threshold"] = min(1.0, max(0.0, float(flaky_threshold)))
+
+def get_retry_settings():
+    """获取重试配置副本"""
+    with _SETTINGS_LOCK:
+        return dict(_RETRY_SETTINGS, tag_attempts=dict(_RETRY_SETTINGS["tag_attempts"]))
+
+def build_policy(retry_value, tags, parse_duration):
+    """
+    合并任务定义中的retry字段与标签策略，得到重试策略
+
+    retry字段可以是尝试次数，也可以是字典：
+        retry: {attempts: 3, backoff: 5s, max_backoff: 2m, jitter: 0.2, exit_codes: [1, 255]}
+
+    参数:
+        retry_value: 任务定义中的retry字段
+        tags: 任务标签
+        parse_duration: 解析时长配置的函数（如 "5s"），无法解析时返回None
+
+    返回:
+        dict: attempts、backoff、max_backoff、jitter、exit_codes（None表示任意非零退出码）
+    """
+    settings = get_retry_settings()
+    policy = {
+        "attempts": max([1] + [settings["tag_attempts"][tag] for tag in tags if tag in settings["tag_attempts"]]),
+        "backoff": settings["backoff"],
+        "max_backoff": settings["max_backoff"],
+        "jitter": settings["jitter"],
+        "exit_codes": None,
+    }
+    if isinstance(retry_value, dict):
+        attempts = retry_value.get("attempts", retry_value.get("max_attempts"))
+        for key in ("backoff", "max_backoff"):
+            if key in retry_value:
+                seconds = parse_duration(retry_value[key])
+                policy[key] = seconds if seconds is not None else 0.0
+        if "jitter" in retry_value:
+            try:
+                policy["jitter"] = min(1.0, max(0.0, float(retry_value["jitter"])))
+            except (TypeError, ValueError):
+                pass
+        exit_codes = retry_value.get("exit_codes", retry_value.get("on_exit_codes"))
+        if exit_codes is not None:
+            codes = exit_codes if isinstance(exit_codes, list) else [exit_codes]
+            policy["exit_codes"] = [int(code) for code in codes if str(code).lstrip("-").isdigit()]
+    else:
+        attempts = retry_value
+    if attempts is not None and not isinstance(attempts, bool):
+        try:
+            policy["attempts"] = max(1, int(attempts))
+        except (TypeError, ValueError):
+            pass
+    return policy
+
+def should_retry(policy, record, attempt):
+    """
+    判断一次失败的运行是否需要重试
+
+    只重试以非零退出码结束的运行；被取消、超时或无法启动的运行不重试。
+
+    参数:
+        policy: build_policy 的返回值
+        record: 本次尝试的运行记录
+        attempt: 本次尝试的序号（从1开始）
+
+    返回:
+        bool
+    """
+    if attempt >= policy["attempts"] or record.get("status") != "failed":
+        return False
+    return policy["exit_codes"] is None or record.get("exit_code") in policy["exit_codes"]
+
+def backoff_delay(policy, attempt):
+    """
+    计算第attempt次尝试失败后的等待时间：指数退避加随机抖动
+
+    参数:
+        policy: 重试策略
+        attempt: 刚失败的尝试序号（从1开始）
+
+    返回:
+        等待秒数
+    """
+    delay = min(policy["max_backoff"], policy["backoff"] * (2 ** (attempt - 1)))
+    jitter = policy["jitter"]
+    return round(max(0.0, delay * random.uniform(1 - jitter, 1 + jitter)), 3)
+
+def _load_flakiness():
+    """首次使用时读取不稳定度统计，调用方需持有锁"""
+    global _FLAKY_LOADED
+    if _FLAKY_LOADED:
+        return
+    _FLAKY_LOADED = True
+    try:
+        with open(FLAKY_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for key, runs in data.items():
+            _FLAKY[key] = deque(runs, maxlen=FLAKY_WINDOW)
+    except (OSError, ValueError):
+        pass
+
+def _save_flakiness():
+    """写入不稳定度统计，调用方需持有锁"""
+    try:
+        os.makedirs(os.path.dirname(FLAKY_FILE), exist_ok=True)
+        tmp_path = f"{FLAKY_FILE}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({key: list(runs) for key, runs in _FLAKY.items()}, f)
+        os.replace(tmp_path, FLAKY_FILE)
+    except OSError as e:
+        print(f"保存不稳定度统计时出错: {str(e)}")
+
+def _score(runs):
+    """
+    不稳定度：最近的逻辑运行中“重试后才成功”的次数与最终结果翻转（成功/失败交替）的次数之和，
+    除以运行次数，范围0~1
+    """
+    if not runs:
+        return 0.0
+    passed_on_retry = sum(1 for run in runs if run["final"] == "success" and run["failures"])
+    finals = [run["final"] for run in runs if run["final"] in ("success", "failed")]
+    flips = sum(1 for previous, current in zip(finals, finals[1:]) if previous != current)
+    return round(min(1.0, (passed_on_retry + flips) / len(runs)), 3)
+
+def record_attempts(task_key, statuses):
+    """
+    记录一次逻辑运行（所有尝试）的结果，返回更新后的不稳定度
+
+    参数:
+        task_key: 任务标识（Taskfile路径::任务名）
+        statuses: 各次尝试的状态列表
+
+    返回:
+        不稳定度（0~1）
+    """
+    with _FLAKY_LOCK:
+        _load_flakiness()
+        runs = _FLAKY.setdefault(task_key, deque(maxlen=FLAKY_WINDOW))
+        runs.append({
+            "final": statuses[-1],
+            "attempts": len(statuses),
+            "failures": sum(1 for status in statuses if status != "success"),
+            "at": datetime.now().isoformat(timespec="seconds"),
+        })
+        _save_flakiness()
+        return _score(runs)
+
+def get_flakiness(task_key):
+    """获取任务的不稳定度（0~1）"""
+    with _FLAKY_LOCK:
+        _load_flakiness()
+        return _score(_FLAKY.get(task_key, ()))
+
+def is_flaky(task_key):
+    """任务是否不稳定，需要隔离到专用槽位"""
+    with _FLAKY_LOCK:
+        _load_flakiness()
+        runs = _FLAKY.get(task_key, ())
+        if len(runs) < FLAKY_MIN_RUNS:
+            return False
+        return _score(runs) >= get_retry_settings()["flaky_threshold"]
+
+def get_flakiness_snapshot():
+    """
+    获取所有任务的不稳定度统计，供状态页展示
+
+    返回:
+        列表，按不稳定度降序
+    """
+    threshold = get_retry_settings()["flaky_threshold"]
+    with _FLAKY_LOCK:
+        _load_flakiness()
+        rows = []
+        for key, runs in _FLAKY.items():
+            score = _score(runs)
+            rows.append({
+                "task": key,
+                "runs": len(runs),
+                "retried": sum(1 for run in runs if run["attempts"] > 1),
+                "failed": sum(1 for run in runs if run["final"] != "success"),
+                "flakiness": score,
+                "isolated": len(runs) >= FLAKY_MIN_RUNS and score >= threshold,
+            })
+    return sorted(rows, key=lambda row: row["flakiness"], reverse=True)
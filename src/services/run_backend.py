@@ -0,0 +1,115 @@
+from src.services import run_engine, run_logs, run_pool, load_gate, scheduler, matrix, retry, task_runner, shell_pool
+from src.services import file_watch, cron_scheduler, resource_sampler
+from src.services import daemon_client
+
+# 界面读取运行状态的统一入口：守护进程模式下转发到守护进程，否则访问本进程的执行层。
+# 守护进程不可用时返回空结果，界面照常渲染。
+
+def _use_daemon():
+    return task_runner.is_daemon_mode()
+
+def _call(remote, local, fallback, *args, **kwargs):
+    if not _use_daemon():
+        return local(*args, **kwargs)
+    try:
+        return remote(*args, **kwargs)
+    except daemon_client.DaemonError as e:
+        print(f"访问守护进程时出错: {str(e)}")
+        return fallback
+
+def list_runs(active_only=False):
+    return _call(daemon_client.list_runs, run_engine.list_runs, [], active_only=active_only)
+
+def get_run(run_id):
+    return _call(daemon_client.get_run, run_engine.get_run, None, run_id)
+
+def tail_run_output(run_id, offset=0, max_bytes=run_logs.DEFAULT_TAIL_BYTES):
+    return _call(daemon_client.tail_run_output, run_engine.tail_run_output, (b"", offset), run_id, offset, max_bytes)
+
+def get_log_size(run_id):
+    return _call(daemon_client.get_log_size, run_logs.get_log_size, 0, run_id)
+
+def get_run_output(run_id, max_chars=None):
+    return _call(daemon_client.get_run_output, run_engine.get_run_output, "", run_id, max_chars=max_chars)
+
+def cancel_run(run_id):
+    return _call(daemon_client.cancel_run, run_engine.cancel_run, False, run_id)
+
+def clear_finished_runs():
+    return _call(daemon_client.clear_finished_runs, run_engine.clear_finished_runs, None)
+
+def get_pool_snapshot():
+    if _use_daemon():
+        try:
+            return daemon_client.get_pool_snapshot()
+        except daemon_client.DaemonError as e:
+            print(f"访问守护进程时出错: {str(e)}")
+    return run_pool.get_pool_snapshot()
+
+def cancel_queued(item_id):
+    return _call(daemon_client.cancel_queued, run_pool.cancel_queued, False, item_id)
+
+def move_queued(item_id, offset):
+    return _call(daemon_client.move_queued, run_pool.move_queued, False, item_id, offset)
+
+def set_queued_priority(item_id, priority):
+    return _call(daemon_client.set_queued_priority, run_pool.set_queued_priority, False, item_id, priority)
+
+def get_gate_snapshot():
+    if _use_daemon():
+        try:
+            return daemon_client.get_gate_snapshot()
+        except daemon_client.DaemonError as e:
+            print(f"访问守护进程时出错: {str(e)}")
+    return load_gate.get_gate_snapshot()
+
+def get_flakiness_snapshot():
+    return _call(daemon_client.get_flakiness_snapshot, retry.get_flakiness_snapshot, [])
+
+def get_run_resources(run_id):
+    return _call(daemon_client.get_run_resources, resource_sampler.get_run_resources, None, run_id)
+
+def get_shell_pool_stats():
+    return _call(daemon_client.get_shell_pool_stats, shell_pool.get_shell_pool_stats, {})
+
+def list_watches():
+    return _call(daemon_client.list_watches, file_watch.list_watches, [])
+
+def list_schedules():
+    return _call(daemon_client.list_schedules, cron_scheduler.list_schedules, [])
+
+def list_parallel_batches():
+    return _call(daemon_client.list_parallel_batches, scheduler.list_parallel_batches, [])
+
+def get_dag_run(dag_id):
+    return _call(daemon_client.get_dag_run, scheduler.get_dag_run, None, dag_id)
+
+def get_matrix_run(matrix_id):
+    return _call(daemon_client.get_matrix_run, matrix.get_matrix_run, None, matrix_id)
+
+def cancel_matrix_run(matrix_id):
+    return _call(daemon_client.cancel_matrix_run, matrix.cancel_matrix_run, False, matrix_id)
+
+def pop_run_outcomes():
+    """
+    取出尚未处理的运行结果：本进程的结果，以及守护进程模式下守护进程中的结果
+
+    返回:
+        运行记录列表
+    """
+    outcomes = task_runner.pop_run_outcomes()
+    if _use_daemon() and daemon_client.read_state() is not None:
+        try:
+            outcomes.extend(daemon_client.pop_run_outcomes())
+        except daemon_client.DaemonError as e:
+            print(f"访问守护进程时出错: {str(e)}")
+    return outcomes
+
+def get_daemon_status():
+    """
+    获取守护进程状态
+
+    返回:
+        health信息字典；未运行时返回None
+    """
+    return daemon_client.get_status()
@@ -0,0 +1,306 @@
+"""
+本地执行守护进程：持有执行池、运行记录和日志，不受Streamlit脚本重跑和应用重启的影响
+
+用法:
+    python -m src.services.run_daemon [--port 端口]
+
+只监听127.0.0.1，请求需携带状态文件中的访问令牌（X-TaskGUI-Token）。
+界面通过 daemon_client / run_backend 访问，重新加载或重启后可重新连接到运行中的任务。
+"""
+import os
+import re
+import sys
+import json
+import base64
+import signal
+import secrets
+import argparse
+import threading
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, unquote
+
+from src.services import run_engine, run_logs, run_pool, load_gate, scheduler, matrix, retry, shell_pool, file_watch
+from src.services import cron_scheduler, resource_sampler
+from src.services import task_runner
+from src.services.daemon_client import STATE_FILE, TOKEN_HEADER, get_status
+
+# 请求体大小上限（字节）
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+_ROUTES = []
+
+def _route(method, pattern):
+    """注册路由，pattern中的命名分组作为参数传给处理函数"""
+    def decorator(func):
+        _ROUTES.append((method, re.compile(f"^{pattern}$"), func))
+        return func
+    return decorator
+
+@_route("GET", "/health")
+def _health(server, query, body):
+    return {
+        "pid": os.getpid(),
+        "port": server.server_address[1],
+        "started_at": server.started_at,
+        "active_runs": len(run_engine.list_runs(active_only=True)),
+    }
+
+@_route("POST", "/config")
+def _config(server, query, body):
+    task_runner.apply_settings(body or {})
+    return {"ok": True}
+
+@_route("POST", "/launch")
+def _launch(server, query, body):
+    results = task_runner.launch_headless_batch(
+        body["tasks"], body.get("taskfile"), body.get("parallel", False),
+        direct=body.get("direct", False), default_timeout=body.get("default_timeout", 0),
+        batch=body.get("batch", False), durations=body.get("durations")
+    )
+    return {"accepted": [result is not None for result in results]}
+
+@_route("GET", "/batches")
+def _batches(server, query, body):
+    return scheduler.list_parallel_batches()
+
+@_route("POST", "/dag")
+def _dag(server, query, body):
+    dag_id = task_runner.run_dependency_plan(
+        body["plan"], body.get("taskfile"), force=body.get("force", False),
+        direct=body.get("direct", False), default_timeout=body.get("default_timeout", 0)
+    )
+    return {"dag_id": dag_id}
+
+@_route("GET", "/dag/(?P<dag_id>[^/]+)")
+def _get_dag(server, query, body, dag_id):
+    return scheduler.get_dag_run(dag_id)
+
+@_route("POST", "/matrix")
+def _matrix(server, query, body):
+    matrix_id = task_runner.run_matrix(
+        body["task"], body.get("taskfile"), body["cells"], body.get("max_concurrency", 2),
+        direct=body.get("direct", False), default_timeout=body.get("default_timeout", 0)
+    )
+    return {"matrix_id": matrix_id}
+
+@_route("GET", "/matrix/(?P<matrix_id>[^/]+)")
+def _get_matrix(server, query, body, matrix_id):
+    return matrix.get_matrix_run(matrix_id)
+
+@_route("POST", "/matrix/(?P<matrix_id>[^/]+)/cancel")
+def _cancel_matrix(server, query, body, matrix_id):
+    return {"ok": matrix.cancel_matrix_run(matrix_id)}
+
+@_route("POST", "/watches")
+def _sync_watches(server, query, body):
+    task_runner.sync_watch_triggers(
+        body.get("bindings", []), direct=body.get("direct", False), default_timeout=body.get("default_timeout", 0)
+    )
+    return {"ok": True}
+
+@_route("GET", "/watches")
+def _list_watches(server, query, body):
+    return file_watch.list_watches()
+
+@_route("POST", "/schedules")
+def _sync_schedules(server, query, body):
+    task_runner.sync_cron_schedules(
+        body.get("bindings", []), direct=body.get("direct", False), default_timeout=body.get("default_timeout", 0)
+    )
+    return {"ok": True}
+
+@_route("GET", "/schedules")
+def _list_schedules(server, query, body):
+    return cron_scheduler.list_schedules()
+
+@_route("GET", "/runs")
+def _list_runs(server, query, body):
+    return run_engine.list_runs(active_only=query.get("active_only") == "1")
+
+@_route("POST", "/runs/clear")
+def _clear_runs(server, query, body):
+    run_engine.clear_finished_runs()
+    return {"cleared": True}
+
+@_route("GET", "/runs/(?P<run_id>[^/]+)")
+def _get_run(server, query, body, run_id):
+    return run_engine.get_run(run_id)
+
+@_route("GET", "/runs/(?P<run_id>[^/]+)/tail")
+def _tail(server, query, body, run_id):
+    kwargs = {"max_bytes": int(query["max_bytes"])} if "max_bytes" in query else {}
+    data, offset = run_engine.tail_run_output(run_id, int(query.get("offset", 0)), **kwargs)
+    return {"data": base64.b64encode(data).decode("ascii"), "offset": offset}
+
+@_route("GET", "/runs/(?P<run_id>[^/]+)/size")
+def _size(server, query, body, run_id):
+    return {"size": run_logs.get_log_size(run_id)}
+
+@_route("GET", "/runs/(?P<run_id>[^/]+)/output")
+def _output(server, query, body, run_id):
+    max_chars = int(query["max_chars"]) if "max_chars" in query else None
+    return {"output": run_engine.get_run_output(run_id, max_chars=max_chars)}
+
+@_route("GET", "/runs/(?P<run_id>[^/]+)/resources")
+def _run_resources(server, query, body, run_id):
+    return resource_sampler.get_run_resources(run_id)
+
+@_route("POST", "/runs/(?P<run_id>[^/]+)/cancel")
+def _cancel(server, query, body, run_id):
+    return {"cancelled": run_engine.cancel_run(run_id)}
+
+@_route("GET", "/pool")
+def _pool(server, query, body):
+    return run_pool.get_pool_snapshot()
+
+@_route("POST", "/pool/cancel")
+def _pool_cancel(server, query, body):
+    return {"ok": run_pool.cancel_queued(body["item_id"])}
+
+@_route("POST", "/pool/move")
+def _pool_move(server, query, body):
+    return {"ok": run_pool.move_queued(body["item_id"], int(body["offset"]))}
+
+@_route("POST", "/pool/priority")
+def _pool_priority(server, query, body):
+    return {"ok": run_pool.set_queued_priority(body["item_id"], body["priority"])}
+
+@_route("GET", "/gate")
+def _gate(server, query, body):
+    return load_gate.get_gate_snapshot()
+
+@_route("GET", "/flakiness")
+def _flakiness(server, query, body):
+    return retry.get_flakiness_snapshot()
+
+@_route("GET", "/shell-pool")
+def _shell_pool(server, query, body):
+    return shell_pool.get_shell_pool_stats()
+
+@_route("POST", "/outcomes/pop")
+def _outcomes(server, query, body):
+    return task_runner.pop_run_outcomes()
+
+@_route("POST", "/shutdown")
+def _shutdown(server, query, body):
+    # 运行中的任务在退出时终止（见 serve），守护进程不在后不会留下无人管理的进程
+    threading.Thread(target=server.shutdown, daemon=True).start()
+    return {"ok": True}
+
+class _Handler(BaseHTTPRequestHandler):
+    """JSON请求处理：校验令牌后按路由分发"""
+
+    def log_message(self, format, *args):
+        # 不输出每个请求的访问日志
+        pass
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _dispatch(self, method):
+        if not secrets.compare_digest(self.headers.get(TOKEN_HEADER, ""), self.server.token):
+            self._send_json(403, {"error": "无效的访问令牌"})
+            return
+
+        parsed = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+        body = None
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self._send_json(413, {"error": "请求体过大"})
+            return
+        if length:
+            try:
+                body = json.loads(self.rfile.read(length).decode("utf-8"))
+            except ValueError:
+                self._send_json(400, {"error": "请求体不是有效的JSON"})
+                return
+
+        for route_method, pattern, handler in _ROUTES:
+            match = pattern.match(parsed.path)
+            if route_method == method and match:
+                try:
+                    params = {key: unquote(value) for key, value in match.groupdict().items()}
+                    self._send_json(200, handler(self.server, query, body, **params))
+                except (KeyError, TypeError, ValueError) as e:
+                    self._send_json(400, {"error": f"无效的请求: {e}"})
+                except Exception as e:
+                    print(f"处理请求 {method} {parsed.path} 时出错: {str(e)}")
+                    self._send_json(500, {"error": str(e)})
+                return
+        self._send_json(404, {"error": "未知的接口"})
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+def _write_state(state):
+    """写入状态文件（仅当前用户可读，令牌不对其他用户公开）"""
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    tmp_path = STATE_FILE + ".tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, STATE_FILE)
+
+def _remove_state(pid):
+    """退出时删除状态文件（仅当文件仍属于本进程）"""
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            if json.load(f).get("pid") != pid:
+                return
+        os.remove(STATE_FILE)
+    except (OSError, ValueError):
+        pass
+
+def serve(port=0):
+    """
+    启动守护进程并阻塞直到收到停止请求或信号
+
+    参数:
+        port: 监听端口，0表示自动选择
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+    server.daemon_threads = True
+    server.token = secrets.token_urlsafe(32)
+    server.started_at = datetime.now().isoformat()
+
+    pid = os.getpid()
+    _write_state({"pid": pid, "port": server.server_address[1], "token": server.token, "started_at": server.started_at})
+    print(f"[{server.started_at}] 守护进程已启动: pid={pid} port={server.server_address[1]}", flush=True)
+
+    def handle_signal(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    if hasattr(signal, "SIGBREAK"):
+        signal.signal(signal.SIGBREAK, handle_signal)
+
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        _remove_state(pid)
+        run_engine.terminate_all_runs()
+        print(f"[{datetime.now().isoformat()}] 守护进程已退出", flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="TaskGUI 本地执行守护进程")
+    parser.add_argument("--port", type=int, default=0, help="监听端口（仅127.0.0.1），0表示自动选择")
+    args = parser.parse_args()
+    status = get_status()
+    if status is not None:
+        print(f"守护进程已在运行: pid={status['pid']} port={status['port']}")
+        return 1
+    serve(args.port)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,664 @@
+import os
+import sys
+import time
+import uuid
+import atexit
+import signal
+import locale
+import threading
+import subprocess
+from datetime import datetime
+from src.services import run_logs, resource_sampler
+
+# 运行记录注册表：run_id -> 运行记录字典
+_RUNS = {}
+# 运行中的进程：run_id -> subprocess.Popen
+_PROCESSES = {}
+_RUNS_LOCK = threading.RLock()
+
+# 注册表中保留的已结束运行数量
+MAX_FINISHED_RUNS = 200
+# 读取管道的块大小
+READ_CHUNK_SIZE = 64 * 1024
+# 子进程输出的解码方式
+OUTPUT_ENCODING = locale.getpreferredencoding(False) or "utf-8"
+# 无法使用wait4时（Windows），用psutil采样资源占用的间隔（秒）
+USAGE_SAMPLE_INTERVAL = 0.2
+
+# 运行状态
+STATUS_RUNNING = "running"
+STATUS_SUCCESS = "success"
+STATUS_FAILED = "failed"
+STATUS_ERROR = "error"
+STATUS_CANCELLED = "cancelled"
+STATUS_TIMEOUT = "timeout"
+FINISHED_STATUSES = (STATUS_SUCCESS, STATUS_FAILED, STATUS_ERROR, STATUS_CANCELLED, STATUS_TIMEOUT)
+
+# 取消运行时从SIGTERM升级到SIGKILL前的等待时间（秒）
+TERMINATE_GRACE_SECONDS = 5.0
+# 服务退出时清理子进程的等待时间（秒）
+SHUTDOWN_GRACE_SECONDS = 2.0
+
+def build_task_argv(task_name, taskfile_path=None, extra_args=None):
+    """
+    构建调用task命令的参数列表
+
+    参数:
+        task_name: 任务名称
+        taskfile_path: Taskfile路径
+        extra_args: 追加到任务名之后的参数（如 VAR=value）
+
+    返回:
+        参数列表
+    """
+    argv = ["task"]
+    if taskfile_path and os.path.exists(taskfile_path):
+        argv += ["--taskfile", taskfile_path]
+    argv.append(task_name)
+    if extra_args:
+        argv.extend(extra_args)
+    return argv
+
+def _now_iso():
+    return datetime.now().isoformat()
+
+def new_run_id():
+    """生成新的运行ID（需要在启动前知道运行ID时使用）"""
+    return uuid.uuid4().hex[:12]
+
+def _new_record(run_id, task_name, taskfile_path, argv, cwd, meta):
+    return {
+        "run_id": run_id,
+        "task": task_name,
+        "taskfile": taskfile_path,
+        "argv": list(argv),
+        "cwd": cwd,
+        "pid": None,
+        "status": STATUS_RUNNING,
+        "exit_code": None,
+        "error": None,
+        "timeout": None,
+        "started_at": _now_iso(),
+        "ended_at": None,
+        "duration": None,
+        "cpu_time": None,
+        "peak_rss": None,
+        # 运行期间采样进程树得到的峰值与均值（CPU%、内存、读写量、线程数）
+        "resources": None,
+        "output_bytes": 0,
+        "meta": dict(meta or {}),
+        "_start_monotonic": time.monotonic(),
+        # 被取消或超时时记录结束原因，结束时作为最终状态
+        "_stop_reason": None,
+        # 运行结束事件（不通过poll检查，避免抢先回收子进程导致wait4拿不到资源占用）
+        "_done": threading.Event(),
+    }
+
+def _public(record):
+    """返回不包含内部字段的运行记录副本"""
+    return {k: v for k, v in record.items() if not k.startswith("_")}
+
+def _append_output(run_id, data):
+    """追加输出到运行日志（合并stdout/stderr，按到达顺序）"""
+    run_logs.append(run_id, data)
+    with _RUNS_LOCK:
+        record = _RUNS.get(run_id)
+        if record is not None:
+            record["output_bytes"] += len(data)
+
+def _pump_stream(run_id, stream, stream_name, on_output):
+    """持续读取管道，直到子进程关闭该管道"""
+    try:
+        while True:
+            data = stream.read(READ_CHUNK_SIZE)
+            if not data:
+                break
+            _append_output(run_id, data)
+            if on_output:
+                try:
+                    on_output(run_id, stream_name, data)
+                except Exception as e:
+                    print(f"处理运行输出回调时出错: {str(e)}")
+    except (OSError, ValueError):
+        pass
+    finally:
+        try:
+            stream.close()
+        except OSError:
+            pass
+
+def _finish_run(run_id, exit_code=None, error=None, on_complete=None, usage=None):
+    """记录运行结束信息并调用完成回调，返回运行记录副本"""
+    run_logs.close_log(run_id)
+    resources = resource_sampler.untrack_run(run_id)
+    with _RUNS_LOCK:
+        record = _RUNS.get(run_id)
+        if record is None:
+            return
+        record["exit_code"] = exit_code
+        record["resources"] = resources
+        if usage:
+            record["cpu_time"] = usage.get("cpu_time")
+            record["peak_rss"] = usage.get("peak_rss")
+        record["error"] = error
+        record["ended_at"] = _now_iso()
+        record["duration"] = round(time.monotonic() - record["_start_monotonic"], 3)
+        if error is not None:
+            record["status"] = STATUS_ERROR
+        elif record["_stop_reason"] is not None:
+            record["status"] = record["_stop_reason"]
+        else:
+            record["status"] = STATUS_SUCCESS if exit_code == 0 else STATUS_FAILED
+        _PROCESSES.pop(run_id, None)
+        record["_done"].set()
+        snapshot = _public(record)
+        _prune_finished_runs()
+
+    if on_complete:
+        try:
+            on_complete(snapshot)
+        except Exception as e:
+            print(f"处理运行完成回调时出错: {str(e)}")
+    return snapshot
+
+def _wait_with_rusage(process):
+    """
+    POSIX：用wait4回收子进程并取得资源占用
+
+    返回:
+        (退出码, 资源占用字典)；子进程已被其他调用回收时资源占用为None
+    """
+    while True:
+        try:
+            _, status, rusage = os.wait4(process.pid, 0)
+            break
+        except InterruptedError:
+            continue
+        except ChildProcessError:
+            # 已被poll()等调用回收，只能拿到退出码
+            return process.wait(), None
+
+    exit_code = os.waitstatus_to_exitcode(status)
+    process.returncode = exit_code
+    # ru_maxrss在Linux上以KB为单位，macOS上以字节为单位；
+    # wait4的统计包含子进程已回收的后代进程（task启动的命令）
+    scale = 1 if sys.platform == "darwin" else 1024
+    return exit_code, {
+        "cpu_time": round(rusage.ru_utime + rusage.ru_stime, 3),
+        "peak_rss": rusage.ru_maxrss * scale,
+    }
+
+def _wait_with_sampling(process):
+    """
+    无wait4的平台：运行期间用psutil采样整个进程树的CPU时间和内存
+
+    返回:
+        (退出码, 资源占用字典)；psutil不可用时资源占用为None
+    """
+    try:
+        import psutil
+        root = psutil.Process(process.pid)
+    except Exception:
+        return process.wait(), None
+
+    cpu_times = {}
+    peak_rss = 0
+    while process.poll() is None:
+        rss = 0
+        try:
+            for proc in [root] + root.children(recursive=True):
+                try:
+                    times = proc.cpu_times()
+                    cpu_times[proc.pid] = times.user + times.system
+                    rss += proc.memory_info().rss
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    continue
+        except psutil.NoSuchProcess:
+            pass
+        peak_rss = max(peak_rss, rss)
+        time.sleep(USAGE_SAMPLE_INTERVAL)
+
+    return process.returncode, {
+        "cpu_time": round(sum(cpu_times.values()), 3),
+        "peak_rss": peak_rss,
+    }
+
+def _wait_process(run_id, process, readers, on_complete):
+    """等待子进程结束并收尾"""
+    if hasattr(os, "wait4"):
+        exit_code, usage = _wait_with_rusage(process)
+    else:
+        exit_code, usage = _wait_with_sampling(process)
+    for reader in readers:
+        reader.join()
+    _finish_run(run_id, exit_code=exit_code, on_complete=on_complete, usage=usage)
+
+def _prune_finished_runs():
+    """只保留最近的已结束运行，调用方需持有锁"""
+    finished = [rid for rid, rec in _RUNS.items() if rec["status"] in FINISHED_STATUSES]
+    for rid in finished[:max(0, len(finished) - MAX_FINISHED_RUNS)]:
+        _RUNS.pop(rid, None)
+        run_logs.forget(rid)
+
+def _snapshot_descendants(pid):
+    """获取进程的所有后代进程（psutil不可用时返回空列表）"""
+    try:
+        import psutil
+        return psutil.Process(pid).children(recursive=True)
+    except Exception:
+        return []
+
+def _signal_tree(process, force):
+    """
+    向运行的进程组发送终止信号
+
+    参数:
+        process: subprocess.Popen对象
+        force: False发送SIGTERM（Windows上为不带/F的taskkill），True发送SIGKILL
+    """
+    if sys.platform == "win32":
+        args = ["taskkill", "/T", "/PID", str(process.pid)]
+        if force:
+            args.insert(1, "/F")
+        subprocess.run(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                       creationflags=subprocess.CREATE_NO_WINDOW)
+        return
+    try:
+        # 运行在独立会话中启动，进程组ID等于其PID
+        os.killpg(process.pid, signal.SIGKILL if force else signal.SIGTERM)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+def _stop_process_tree(process, done, grace):
+    """
+    先温和终止整个进程树，超过等待时间后强制结束，包括脱离进程组的后代进程
+
+    参数:
+        process: subprocess.Popen对象
+        done: 运行结束事件
+        grace: 从SIGTERM升级到SIGKILL前的等待时间（秒）
+    """
+    descendants = _snapshot_descendants(process.pid)
+    _signal_tree(process, force=False)
+
+    if not done.wait(grace):
+        _signal_tree(process, force=True)
+    for child in descendants:
+        try:
+            if child.is_running():
+                child.kill()
+        except Exception:
+            pass
+
+def cancel_run(run_id, grace=TERMINATE_GRACE_SECONDS, reason=STATUS_CANCELLED):
+    """
+    取消运行：向进程组发送SIGTERM，超过等待时间后升级为SIGKILL（在后台线程中进行）
+
+    参数:
+        run_id: 运行ID
+        grace: 升级到SIGKILL前的等待时间（秒）
+        reason: 结束状态，"cancelled" 或 "timeout"
+
+    返回:
+        是否找到正在运行的进程
+    """
+    with _RUNS_LOCK:
+        process = _PROCESSES.get(run_id)
+        record = _RUNS.get(run_id)
+        parent_id = record["meta"].get("batch_id") if record and process is None else None
+    if parent_id and record["status"] == STATUS_RUNNING:
+        # 批量运行中的单个任务没有独立进程，只能取消整个批量调用
+        return cancel_run(parent_id, grace=grace, reason=reason)
+
+    with _RUNS_LOCK:
+        if process is None or record is None or record["_stop_reason"] is not None:
+            return False
+        record["_stop_reason"] = reason
+        done = record["_done"]
+
+    threading.Thread(
+        target=_stop_process_tree,
+        args=(process, done, grace),
+        name=f"run-{run_id}-stop",
+        daemon=True
+    ).start()
+    return True
+
+def _watch_timeout(run_id, done, timeout):
+    """超时监视：到时仍在运行则按超时取消"""
+    if not done.wait(timeout):
+        print(f"运行 {run_id} 超过 {timeout} 秒，正在终止")
+        cancel_run(run_id, reason=STATUS_TIMEOUT)
+
+def terminate_all_runs(grace=SHUTDOWN_GRACE_SECONDS):
+    """
+    终止所有运行中的进程树（服务退出时调用）
+
+    参数:
+        grace: 升级到SIGKILL前的等待时间（秒）
+    """
+    with _RUNS_LOCK:
+        running = [(run_id, process, _RUNS[run_id]["_done"]) for run_id, process in _PROCESSES.items() if run_id in _RUNS]
+        for run_id, _, _ in running:
+            if _RUNS[run_id]["_stop_reason"] is None:
+                _RUNS[run_id]["_stop_reason"] = STATUS_CANCELLED
+    if not running:
+        return
+
+    descendants = {run_id: _snapshot_descendants(process.pid) for run_id, process, _ in running}
+    for _, process, _ in running:
+        _signal_tree(process, force=False)
+
+    deadline = time.monotonic() + grace
+    for _, _, done in running:
+        done.wait(max(0, deadline - time.monotonic()))
+
+    for run_id, process, done in running:
+        if not done.is_set():
+            _signal_tree(process, force=True)
+        for child in descendants[run_id]:
+            try:
+                if child.is_running():
+                    child.kill()
+            except Exception:
+                pass
+
+atexit.register(terminate_all_runs)
+
+def start_run(task_name, taskfile_path=None, argv=None, cwd=None, env=None,
+              on_output=None, on_complete=None, meta=None, timeout=None, run_id=None):
+    """
+    以无窗口子进程方式启动任务，并通过管道捕获输出
+
+    参数:
+        task_name: 任务名称（用于记录）
+        taskfile_path: Taskfile路径
+        argv: 要执行的参数列表，默认为 task --taskfile <path> <name>
+        cwd: 工作目录
+        env: 环境变量字典，默认继承当前进程
+        on_output: 输出回调 (run_id, stream_name, data)
+        on_complete: 完成回调，参数为运行记录副本（在后台线程中调用）
+        meta: 附加到运行记录上的元数据
+        timeout: 超时时间（秒），超时后终止整个进程树；None或0表示不限制
+        run_id: 预先分配的运行ID（见 new_run_id），默认自动生成
+
+    返回:
+        run_id字符串
+    """
+    argv = list(argv or build_task_argv(task_name, taskfile_path))
+    run_id = run_id or new_run_id()
+
+    run_logs.open_log(run_id)
+    with _RUNS_LOCK:
+        _RUNS[run_id] = _new_record(run_id, task_name, taskfile_path, argv, cwd, meta)
+        _RUNS[run_id]["timeout"] = timeout or None
+
+    popen_kwargs = {
+        "stdin": subprocess.DEVNULL,
+        "stdout": subprocess.PIPE,
+        "stderr": subprocess.PIPE,
+        "cwd": cwd,
+        "env": env,
+        "bufsize": 0,
+    }
+    if sys.platform == "win32":
+        # 不弹出控制台窗口；独立进程组便于整体终止
+        popen_kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        # 独立会话（进程组），取消时可以一次性向整个进程树发送信号
+        popen_kwargs["start_new_session"] = True
+
+    try:
+        process = subprocess.Popen(argv, **popen_kwargs)
+    except Exception as e:
+        print(f"启动任务 {task_name} 失败: {str(e)}")
+        _finish_run(run_id, error=str(e), on_complete=on_complete)
+        return run_id
+
+    with _RUNS_LOCK:
+        _PROCESSES[run_id] = process
+        _RUNS[run_id]["pid"] = process.pid
+    resource_sampler.track_run(run_id, process.pid)
+
+    readers = []
+    for stream, stream_name in ((process.stdout, "stdout"), (process.stderr, "stderr")):
+        reader = threading.Thread(
+            target=_pump_stream,
+            args=(run_id, stream, stream_name, on_output),
+            name=f"run-{run_id}-{stream_name}",
+            daemon=True
+        )
+        reader.start()
+        readers.append(reader)
+
+    threading.Thread(
+        target=_wait_process,
+        args=(run_id, process, readers, on_complete),
+        name=f"run-{run_id}-wait",
+        daemon=True
+    ).start()
+
+    if timeout:
+        threading.Thread(
+            target=_watch_timeout,
+            args=(run_id, _RUNS[run_id]["_done"], timeout),
+            name=f"run-{run_id}-timeout",
+            daemon=True
+        ).start()
+
+    return run_id
+
+def attach_run(task_name, taskfile_path, process, argv=None, cwd=None, meta=None, timeout=None):
+    """
+    为在已有进程（如常驻shell）中执行的运行登记记录；取消或超时时终止该进程的整个进程树。
+    输出由调用方通过 append_run_output 写入，结束时调用 finish_attached_run
+
+    参数:
+        task_name: 任务名称
+        taskfile_path: Taskfile路径
+        process: 执行该运行的进程（Popen）
+        argv: 记录用的参数列表
+        cwd: 工作目录
+        meta: 附加到运行记录上的元数据
+        timeout: 超时时间（秒）；None或0表示不限制
+
+    返回:
+        run_id字符串
+    """
+    run_id = new_run_id()
+    run_logs.open_log(run_id)
+    with _RUNS_LOCK:
+        _RUNS[run_id] = _new_record(run_id, task_name, taskfile_path, argv or [], cwd, meta)
+        _RUNS[run_id]["timeout"] = timeout or None
+        _RUNS[run_id]["pid"] = process.pid
+        _PROCESSES[run_id] = process
+    resource_sampler.track_run(run_id, process.pid)
+
+    if timeout:
+        threading.Thread(
+            target=_watch_timeout,
+            args=(run_id, _RUNS[run_id]["_done"], timeout),
+            name=f"run-{run_id}-timeout",
+            daemon=True
+        ).start()
+    return run_id
+
+def finish_attached_run(run_id, exit_code=None, on_complete=None):
+    """
+    结束 attach_run 登记的运行
+
+    参数:
+        run_id: 运行ID
+        exit_code: 退出码；None表示进程在运行结束前退出（被取消、超时或意外退出）
+        on_complete: 完成回调，参数为运行记录副本
+
+    返回:
+        运行记录副本
+    """
+    with _RUNS_LOCK:
+        record = _RUNS.get(run_id)
+        stopped = record is not None and record["_stop_reason"] is not None
+    error = "进程意外退出" if exit_code is None and not stopped else None
+    return _finish_run(run_id, exit_code=exit_code, error=error, on_complete=on_complete)
+
+def open_child_run(parent_id, task_name, taskfile_path=None, meta=None):
+    """
+    为批量调用中的单个任务登记运行记录（没有独立进程，输出由批量运行拆分后写入）
+
+    参数:
+        parent_id: 批量运行的run_id
+        task_name: 任务名称
+        taskfile_path: Taskfile路径
+        meta: 附加到运行记录上的元数据
+
+    返回:
+        run_id字符串
+    """
+    run_id = new_run_id()
+    run_logs.open_log(run_id)
+    with _RUNS_LOCK:
+        parent = _RUNS.get(parent_id) or {}
+        _RUNS[run_id] = _new_record(run_id, task_name, taskfile_path, parent.get("argv", []),
+                                    parent.get("cwd"), dict(meta or {}, batch_id=parent_id))
+        _RUNS[run_id]["pid"] = parent.get("pid")
+    return run_id
+
+def mark_child_started(run_id):
+    """批量运行中的任务实际开始执行时调用，耗时从此刻开始计算"""
+    with _RUNS_LOCK:
+        record = _RUNS.get(run_id)
+        if record is not None and record["status"] == STATUS_RUNNING:
+            record["started_at"] = _now_iso()
+            record["_start_monotonic"] = time.monotonic()
+
+def append_run_output(run_id, data):
+    """写入没有独立管道的运行的输出（批量调用中的单个任务、常驻shell中的运行）"""
+    _append_output(run_id, data)
+
+def finish_child_run(run_id, status, exit_code=None, error=None, pid=None):
+    """
+    结束批量运行中的单个任务。日志保持打开，由 close_child_run 在批量进程结束后关闭，
+    以免另一条管道中稍晚读到的输出丢失
+
+    参数:
+        run_id: 运行ID
+        status: 结束状态（success / failed / cancelled / timeout / error）
+        exit_code: 退出码
+        error: 说明信息
+        pid: 批量进程的PID（登记时进程可能尚未启动）
+
+    返回:
+        运行记录副本；已结束时返回现有记录
+    """
+    with _RUNS_LOCK:
+        record = _RUNS.get(run_id)
+        if record is None:
+            return None
+        if record["status"] == STATUS_RUNNING:
+            record["status"] = status
+            record["exit_code"] = exit_code
+            record["error"] = error
+            record["pid"] = record["pid"] or pid
+            record["ended_at"] = _now_iso()
+            record["duration"] = round(time.monotonic() - record["_start_monotonic"], 3)
+            record["_done"].set()
+        return _public(record)
+
+def close_child_run(run_id):
+    """批量进程结束后关闭单个任务的日志"""
+    run_logs.close_log(run_id)
+    with _RUNS_LOCK:
+        _prune_finished_runs()
+
+def get_run(run_id):
+    """
+    获取运行记录
+
+    参数:
+        run_id: 运行ID
+
+    返回:
+        运行记录副本，不存在时返回None
+    """
+    with _RUNS_LOCK:
+        record = _RUNS.get(run_id)
+        return _public(record) if record else None
+
+def list_runs(active_only=False):
+    """
+    列出运行记录（按启动顺序）
+
+    参数:
+        active_only: 是否只返回运行中的记录
+
+    返回:
+        运行记录副本列表
+    """
+    with _RUNS_LOCK:
+        records = [_public(rec) for rec in _RUNS.values()]
+    if active_only:
+        records = [rec for rec in records if rec["status"] == STATUS_RUNNING]
+    return records
+
+def get_run_output(run_id, max_chars=None):
+    """
+    获取运行已捕获的输出文本
+
+    参数:
+        run_id: 运行ID
+        max_chars: 只返回最后的若干字符
+
+    返回:
+        输出文本
+    """
+    if max_chars is None:
+        data = run_logs.read_last(run_id, run_logs.get_log_size(run_id))
+    else:
+        # 多字节编码下一个字符最多占4字节
+        data = run_logs.read_last(run_id, max_chars * 4)
+    text = data.decode(OUTPUT_ENCODING, errors="replace")
+    if max_chars is not None:
+        text = text[-max_chars:]
+    return text
+
+def tail_run_output(run_id, offset=0, max_bytes=run_logs.DEFAULT_TAIL_BYTES):
+    """
+    增量读取运行输出
+
+    参数:
+        run_id: 运行ID
+        offset: 上次读取返回的offset
+        max_bytes: 单次最多返回的字节数
+
+    返回:
+        (新增字节, 新offset)
+    """
+    return run_logs.tail(run_id, offset, max_bytes)
+
+def wait_run(run_id, timeout=None, poll_interval=0.05):
+    """
+    阻塞等待运行结束（用于脚本和基准测试）
+
+    参数:
+        run_id: 运行ID
+        timeout: 超时时间（秒），None表示一直等待
+        poll_interval: 轮询间隔
+
+    返回:
+        运行记录副本；超时时返回当前记录
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        record = get_run(run_id)
+        if record is None or record["status"] in FINISHED_STATUSES:
+            return record
+        if deadline is not None and time.monotonic() >= deadline:
+            return record
+        time.sleep(poll_interval)
+
+def clear_finished_runs():
+    """清除所有已结束的运行记录"""
+    with _RUNS_LOCK:
+        for run_id in [rid for rid, rec in _RUNS.items() if rec["status"] in FINISHED_STATUSES]:
+            _RUNS.pop(run_id, None)
+            run_logs.forget(run_id)
@@ -0,0 +1,297 @@
+import os
+import gzip
+import time
+import shutil
+import threading
+
+# 运行日志目录（项目目录下的 logs/runs）
+LOG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "logs", "runs")
+
+# 每个运行在内存中保留的最近输出字节数（环形缓冲区容量）
+RING_BUFFER_BYTES = 256 * 1024
+# 运行结束后内存中只保留的尾部字节数
+FINISHED_TAIL_BYTES = 64 * 1024
+# tail 单次返回的默认最大字节数
+DEFAULT_TAIL_BYTES = 1024 * 1024
+
+# 日志保留策略
+_RETENTION = {
+    "max_files": 50,
+    "max_total_bytes": 500 * 1024 * 1024,
+    "max_age_days": 7,
+}
+
+# 日志注册表：run_id -> 日志状态
+_LOGS = {}
+_LOGS_LOCK = threading.RLock()
+
+def configure_logs(max_files=None, max_total_mb=None, max_age_days=None):
+    """
+    更新日志保留策略
+
+    参数:
+        max_files: 保留的已完成日志文件数量上限
+        max_total_mb: 已完成日志文件的总大小上限（MB）
+        max_age_days: 已完成日志文件的最长保留天数
+    """
+    with _LOGS_LOCK:
+        if max_files is not None:
+            _RETENTION["max_files"] = max(1, int(max_files))
+        if max_total_mb is not None:
+            _RETENTION["max_total_bytes"] = max(1, int(max_total_mb)) * 1024 * 1024
+        if max_age_days is not None:
+            _RETENTION["max_age_days"] = max(0, float(max_age_days))
+
+def get_log_path(run_id, compressed=False):
+    """获取运行日志段文件路径"""
+    return os.path.join(LOG_DIR, f"{run_id}.log.gz" if compressed else f"{run_id}.log")
+
+def _get_size_path(run_id):
+    """压缩日志的大小记录文件路径（保存解压后的字节数，读取大小时不需要解压）"""
+    return os.path.join(LOG_DIR, f"{run_id}.log.size")
+
+def _write_size(run_id, size):
+    try:
+        with open(_get_size_path(run_id), "w", encoding="utf-8") as f:
+            f.write(str(size))
+    except OSError as e:
+        print(f"记录运行日志 {run_id} 的大小时出错: {str(e)}")
+
+def open_log(run_id):
+    """
+    为运行创建日志：内存环形缓冲区 + 磁盘段文件
+
+    参数:
+        run_id: 运行ID
+    """
+    os.makedirs(LOG_DIR, exist_ok=True)
+    with _LOGS_LOCK:
+        _LOGS[run_id] = {
+            # 内存中保存 [ring_start, total) 区间的字节，之前的字节已写入磁盘
+            "ring": bytearray(),
+            "ring_start": 0,
+            "total": 0,
+            "segment": open(get_log_path(run_id), "ab"),
+            "compressed": False,
+            "lock": threading.Lock(),
+        }
+
+def append(run_id, data):
+    """
+    追加输出。缓冲区超出容量时，把较旧的一半写入磁盘段文件
+
+    参数:
+        run_id: 运行ID
+        data: 输出字节
+    """
+    log = _LOGS.get(run_id)
+    if log is None:
+        return
+    with log["lock"]:
+        if log["segment"] is None:
+            return
+        log["ring"].extend(data)
+        log["total"] += len(data)
+        overflow = len(log["ring"]) - RING_BUFFER_BYTES
+        if overflow > 0:
+            # 一次多写出半个缓冲区，减少小块写盘次数
+            spill = min(len(log["ring"]), overflow + RING_BUFFER_BYTES // 2)
+            log["segment"].write(log["ring"][:spill])
+            del log["ring"][:spill]
+            log["ring_start"] += spill
+
+def close_log(run_id):
+    """
+    运行结束：把剩余缓冲写入磁盘，压缩段文件并执行保留策略
+
+    参数:
+        run_id: 运行ID
+    """
+    log = _LOGS.get(run_id)
+    if log is None:
+        return
+    with log["lock"]:
+        if log["segment"] is None:
+            return
+        # 磁盘上保存完整输出，内存只保留尾部供快速读取
+        log["segment"].write(log["ring"])
+        log["segment"].close()
+        log["segment"] = None
+        keep = min(len(log["ring"]), FINISHED_TAIL_BYTES)
+        del log["ring"][:len(log["ring"]) - keep]
+        log["ring_start"] = log["total"] - keep
+
+    try:
+        _compress_segment(run_id)
+        with log["lock"]:
+            log["compressed"] = True
+        # 切换到压缩文件后再删除原文件，避免并发读取落空
+        os.remove(get_log_path(run_id))
+    except OSError as e:
+        print(f"压缩运行日志 {run_id} 时出错: {str(e)}")
+
+    rotate_logs()
+
+def _compress_segment(run_id):
+    """将已完成的段文件压缩为 .gz，并记录解压后的大小（原文件由调用方删除）"""
+    raw_path = get_log_path(run_id)
+    gz_path = get_log_path(run_id, compressed=True)
+    with open(raw_path, "rb") as src, gzip.open(gz_path + ".tmp", "wb", compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    # 先写大小记录再切换到压缩文件，读取方看到 .gz 时大小记录已存在
+    _write_size(run_id, os.path.getsize(raw_path))
+    os.replace(gz_path + ".tmp", gz_path)
+
+def _read_disk(run_id, start, end, compressed):
+    """从段文件读取 [start, end) 区间的字节"""
+    if end <= start:
+        return b""
+    path = get_log_path(run_id, compressed=compressed)
+    opener = gzip.open if compressed else open
+    try:
+        with opener(path, "rb") as f:
+            f.seek(start)
+            return f.read(end - start)
+    except OSError:
+        return b""
+
+def _disk_size(run_id):
+    """返回不在注册表中的运行日志 (是否压缩, 大小)，用于读取历史日志"""
+    raw_path = get_log_path(run_id)
+    if os.path.exists(raw_path):
+        return False, os.path.getsize(raw_path)
+    gz_path = get_log_path(run_id, compressed=True)
+    if os.path.exists(gz_path):
+        try:
+            with open(_get_size_path(run_id), "r", encoding="utf-8") as f:
+                return True, int(f.read())
+        except (OSError, ValueError):
+            pass
+        # 没有大小记录的旧日志：解压一次得到大小并补上记录
+        try:
+            with gzip.open(gz_path, "rb") as f:
+                size = f.seek(0, os.SEEK_END)
+        except OSError:
+            return True, 0
+        _write_size(run_id, size)
+        return True, size
+    return False, 0
+
+def tail(run_id, offset=0, max_bytes=DEFAULT_TAIL_BYTES):
+    """
+    返回自 offset 之后新增的输出字节
+
+    参数:
+        run_id: 运行ID
+        offset: 调用方已读取到的位置（上次返回的新offset）
+        max_bytes: 单次最多返回的字节数
+
+    返回:
+        (新增字节, 新offset)
+    """
+    offset = max(0, int(offset))
+    log = _LOGS.get(run_id)
+    if log is None:
+        compressed, total = _disk_size(run_id)
+        end = min(total, offset + max_bytes)
+        return _read_disk(run_id, offset, end, compressed), max(offset, end)
+
+    with log["lock"]:
+        total = log["total"]
+        end = min(total, offset + max_bytes)
+        if offset >= end:
+            return b"", offset
+        ring_start = log["ring_start"]
+        memory_part = bytes(log["ring"][max(0, offset - ring_start):end - ring_start]) if end > ring_start else b""
+        if log["segment"] is not None and offset < ring_start:
+            # 运行中：确保已写出的部分对读取可见
+            log["segment"].flush()
+        compressed = log["compressed"]
+
+    disk_part = _read_disk(run_id, offset, min(end, ring_start), compressed) if offset < ring_start else b""
+    return disk_part + memory_part, end
+
+def read_last(run_id, max_bytes):
+    """
+    读取最后 max_bytes 字节输出
+
+    参数:
+        run_id: 运行ID
+        max_bytes: 字节数
+
+    返回:
+        输出字节
+    """
+    log = _LOGS.get(run_id)
+    if log is not None:
+        total = log["total"]
+    else:
+        total = _disk_size(run_id)[1]
+    data, _ = tail(run_id, max(0, total - max_bytes), max_bytes)
+    return data
+
+def get_log_size(run_id):
+    """返回运行已产生的输出总字节数"""
+    log = _LOGS.get(run_id)
+    return log["total"] if log is not None else _disk_size(run_id)[1]
+
+def forget(run_id):
+    """从内存中移除日志（磁盘上的日志文件仍按保留策略管理）"""
+    with _LOGS_LOCK:
+        log = _LOGS.pop(run_id, None)
+    if log is not None and log["segment"] is not None:
+        with log["lock"]:
+            log["segment"].close()
+            log["segment"] = None
+
+def rotate_logs():
+    """
+    按数量、总大小和保留天数清理已压缩的日志文件（从最旧的开始删除）
+
+    返回:
+        删除的文件数量
+    """
+    if not os.path.isdir(LOG_DIR):
+        return 0
+    with _LOGS_LOCK:
+        retention = dict(_RETENTION)
+
+    files = []
+    names = set(os.listdir(LOG_DIR))
+    for name in names:
+        base = name[:-len(".size")]
+        if name.endswith(".log.size") and base not in names and base + ".gz" not in names:
+            # 日志已被删除，清理残留的大小记录（压缩过程中原文件仍在，不会误删）
+            try:
+                os.remove(os.path.join(LOG_DIR, name))
+            except OSError:
+                pass
+        if not name.endswith(".log.gz"):
+            continue
+        path = os.path.join(LOG_DIR, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, path))
+    files.sort(reverse=True)
+
+    cutoff = time.time() - retention["max_age_days"] * 86400
+    removed = 0
+    kept_bytes = 0
+    kept_files = 0
+    for mtime, size, path in files:
+        if kept_files < retention["max_files"] and kept_bytes + size <= retention["max_total_bytes"] and mtime >= cutoff:
+            kept_files += 1
+            kept_bytes += size
+            continue
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            continue
+        try:
+            os.remove(path[:-len(".gz")] + ".size")
+        except OSError:
+            pass
+    return removed
@@ -0,0 +1,524 @@
+import os
+import time
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import Future
+from datetime import datetime
+from src.services.load_gate import admit, forget_item
+
+# 队列策略
+QUEUE_POLICY_FIFO = "fifo"
+QUEUE_POLICY_PRIORITY = "priority"
+
+# 未设置优先级的任务使用的优先级（数值越小越先执行）
+DEFAULT_PRIORITY = 5
+# 命名的优先级（任务定义中的 priority: high / medium / low）对应的数值
+PRIORITY_LEVELS = {"high": 1, "medium": 5, "low": 9}
+
+# 资源锁模式：共享锁可以同时被多个运行持有，独占锁与任何其他持有者冲突
+RESOURCE_SHARED = "shared"
+RESOURCE_EXCLUSIVE = "exclusive"
+
+# 执行池配置
+_POOL_SETTINGS = {
+    "max_workers": min(4, os.cpu_count() or 1),
+    "max_queue_size": 200,
+    "queue_policy": QUEUE_POLICY_PRIORITY,
+    # 老化间隔（秒）：每等待这么久优先级提升一级，避免低优先级任务饿死；0表示不老化
+    "aging_seconds": 60,
+    # 标签并发上限：标签 -> 同时运行的最大数量
+    "tag_limits": {},
+    # 隔离槽位数：不稳定的任务只在这些槽位中运行，不占用也不挤占普通槽位；0表示不隔离
+    "isolated_slots": 1,
+}
+
+# 等待队列：队列项按 (sort_key, seq) 排序，调度时取第一个满足标签上限的项
+_QUEUE = []
+# 正在运行的队列项：item_id -> 队列项
+_ACTIVE = {}
+_SEQ = itertools.count()
+# 老化计算的时间基准
+_EPOCH = time.monotonic()
+_COND = threading.Condition()
+_DISPATCHER = None
+
+# 统计信息
+_STATS = {
+    "submitted": 0,
+    "started": 0,
+    "completed": 0,
+    "rejected": 0,
+}
+# 最近完成时间（用于计算吞吐量）与最近的排队等待时间
+_COMPLETION_TIMES = deque(maxlen=1000)
+_QUEUE_WAITS = deque(maxlen=200)
+# 各任务的排队等待统计：任务名 -> {"count", "total", "max"}
+_TASK_WAITS = {}
+# 各资源的使用与争用统计：资源名 -> {"runs", "contended", "total", "max"}
+_RESOURCE_STATS = {}
+# 吞吐量统计窗口（秒）
+THROUGHPUT_WINDOW = 300
+
+def configure_pool(max_workers=None, max_queue_size=None, queue_policy=None, aging_seconds=None, tag_limits=None,
+                   isolated_slots=None):
+    """
+    更新执行池配置，立即对后续调度生效
+
+    参数:
+        max_workers: 最大并发运行数
+        max_queue_size: 等待队列上限（超出后提交会被拒绝或阻塞）
+        queue_policy: "fifo" 或 "priority"
+        aging_seconds: 优先级老化间隔（秒），0表示不老化
+        tag_limits: 标签并发上限 {标签: 数量}
+        isolated_slots: 不稳定任务的隔离槽位数，0表示不隔离
+    """
+    with _COND:
+        if max_workers is not None:
+            _POOL_SETTINGS["max_workers"] = max(1, int(max_workers))
+        if max_queue_size is not None:
+            _POOL_SETTINGS["max_queue_size"] = max(1, int(max_queue_size))
+        if isolated_slots is not None:
+            _POOL_SETTINGS["isolated_slots"] = max(0, int(isolated_slots))
+        if tag_limits is not None:
+            _POOL_SETTINGS["tag_limits"] = {str(tag): max(1, int(limit)) for tag, limit in tag_limits.items()}
+        resort = False
+        if queue_policy in (QUEUE_POLICY_FIFO, QUEUE_POLICY_PRIORITY) and queue_policy != _POOL_SETTINGS["queue_policy"]:
+            _POOL_SETTINGS["queue_policy"] = queue_policy
+            resort = True
+        if aging_seconds is not None and max(0.0, float(aging_seconds)) != _POOL_SETTINGS["aging_seconds"]:
+            _POOL_SETTINGS["aging_seconds"] = max(0.0, float(aging_seconds))
+            resort = True
+        if resort:
+            for item in _QUEUE:
+                item["sort_key"] = _sort_key(item)
+        _COND.notify_all()
+
+def get_pool_settings():
+    """获取执行池配置副本"""
+    with _COND:
+        return dict(_POOL_SETTINGS, tag_limits=dict(_POOL_SETTINGS["tag_limits"]))
+
+def parse_priority(value, default=DEFAULT_PRIORITY):
+    """
+    把任务定义中的priority转换为排队使用的数值
+
+    参数:
+        value: 数值，或 high / medium / low（不区分大小写）
+        default: 未设置或无法解析时返回的值
+
+    返回:
+        优先级数值（越小越先执行）
+    """
+    if isinstance(value, str) and value.strip().lower() in PRIORITY_LEVELS:
+        return PRIORITY_LEVELS[value.strip().lower()]
+    if value is None or isinstance(value, bool):
+        return default
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+def priority_level(value):
+    """
+    优先级所属的级别（用于按高/中/低分组展示）
+
+    参数:
+        value: 任务定义中的priority（数值或 high / medium / low）
+
+    返回:
+        "high" / "medium" / "low"；无法解析时返回None
+    """
+    number = parse_priority(value, default=None)
+    if number is None:
+        return None
+    if number < (PRIORITY_LEVELS["high"] + PRIORITY_LEVELS["medium"]) / 2:
+        return "high"
+    if number > (PRIORITY_LEVELS["medium"] + PRIORITY_LEVELS["low"]) / 2:
+        return "low"
+    return "medium"
+
+def _sort_key(item):
+    """
+    根据队列策略计算排序键（越小越先执行），调用方需持有锁
+
+    老化：有效优先级 = priority - 等待时间 / aging_seconds。所有排队项以相同速度老化，
+    因此按 priority + 提交时间 / aging_seconds 排序即可，排序键不随时间变化。
+    """
+    if _POOL_SETTINGS["queue_policy"] != QUEUE_POLICY_PRIORITY:
+        return 0
+    aging = _POOL_SETTINGS["aging_seconds"]
+    if not aging:
+        return item["priority"]
+    return item["priority"] + (item["_submitted_monotonic"] - _EPOCH) / aging
+
+def _effective_priority(item, now):
+    """排队项当前的有效优先级（含老化），调用方需持有锁"""
+    aging = _POOL_SETTINGS["aging_seconds"]
+    if _POOL_SETTINGS["queue_policy"] != QUEUE_POLICY_PRIORITY or not aging:
+        return item["priority"]
+    return round(item["sort_key"] - (now - _EPOCH) / aging, 2)
+
+def _ordered_queue():
+    """按调度顺序排列的排队项，调用方需持有锁"""
+    return sorted(_QUEUE, key=lambda item: (item["sort_key"], item["seq"]))
+
+def _blocking_tags(item):
+    """返回因达到并发上限而阻止该项启动的标签，调用方需持有锁"""
+    limits = _POOL_SETTINGS["tag_limits"]
+    blocked = []
+    for tag in item["tags"]:
+        if tag in limits and sum(1 for active in _ACTIVE.values() if tag in active["tags"]) >= limits[tag]:
+            blocked.append(tag)
+    return blocked
+
+def _held_resources():
+    """运行中的队列项持有的资源锁 {资源名: {模式}}，调用方需持有锁"""
+    held = {}
+    for active in _ACTIVE.values():
+        for name, mode in active["resources"].items():
+            held.setdefault(name, set()).add(mode)
+    return held
+
+def _resource_conflicts(item, held):
+    """返回与已持有（或已被更早的排队项预留）的锁冲突的资源，调用方需持有锁"""
+    conflicts = []
+    for name, mode in item["resources"].items():
+        modes = held.get(name)
+        if modes and (mode == RESOURCE_EXCLUSIVE or RESOURCE_EXCLUSIVE in modes):
+            conflicts.append(name)
+    return conflicts
+
+def _track_contention(item, conflicts, now):
+    """记录排队项因资源冲突而等待的时间，调用方需持有锁"""
+    item["_blocked_resources"] = conflicts
+    if conflicts:
+        item["_contended"].update(conflicts)
+        if item["_contention_since"] is None:
+            item["_contention_since"] = now
+    elif item["_contention_since"] is not None:
+        item["resource_wait"] += now - item["_contention_since"]
+        item["_contention_since"] = None
+
+def _in_isolated_slot(item):
+    """该项是否使用隔离槽位（隔离槽位数为0时不稳定任务也使用普通槽位），调用方需持有锁"""
+    return item["isolated"] and _POOL_SETTINGS["isolated_slots"] > 0
+
+def _next_item():
+    """
+    选出下一个可以启动的排队项（跳过受标签上限、资源锁限制的项和没有空闲槽位的项），调用方需持有锁
+
+    因资源冲突而等待的项会预留它需要的资源，排在后面的项不能再获取这些资源，
+    避免共享锁持续被后来者占用导致独占锁一直拿不到
+    """
+    isolated_active = sum(1 for item in _ACTIVE.values() if _in_isolated_slot(item))
+    free = {
+        False: _POOL_SETTINGS["max_workers"] - (len(_ACTIVE) - isolated_active),
+        True: _POOL_SETTINGS["isolated_slots"] - isolated_active,
+    }
+    held = _held_resources()
+    now = time.monotonic()
+    chosen = None
+    for item in _ordered_queue():
+        conflicts = _resource_conflicts(item, held)
+        _track_contention(item, conflicts, now)
+        if conflicts:
+            for name, mode in item["resources"].items():
+                held.setdefault(name, set()).add(mode)
+        elif chosen is None and free[_in_isolated_slot(item)] > 0 and not _blocking_tags(item):
+            chosen = item
+    return chosen
+
+def _ensure_dispatcher():
+    """按需启动调度线程，调用方需持有锁"""
+    global _DISPATCHER
+    if _DISPATCHER is None or not _DISPATCHER.is_alive():
+        _DISPATCHER = threading.Thread(target=_dispatch_loop, name="run-pool-dispatcher", daemon=True)
+        _DISPATCHER.start()
+
+def submit_run(task_name, launch, priority=5, block=False, timeout=None, meta=None, tags=None, isolated=False,
+               resources=None):
+    """
+    提交一次运行到执行池
+
+    参数:
+        task_name: 任务名称（用于展示和统计）
+        launch: 启动函数 launch(on_complete) -> run_id，on_complete接收运行记录
+        priority: 优先级，数值越小越先执行（仅priority策略生效）
+        block: 队列已满时是否阻塞等待空位（背压）
+        timeout: 阻塞等待的超时时间（秒）
+        meta: 附加信息
+        tags: 任务标签，用于标签并发上限
+        isolated: 是否在隔离槽位中运行（不稳定的任务）
+        resources: 运行期间需要持有的资源锁 {资源名: "shared" 或 "exclusive"}
+
+    返回:
+        concurrent.futures.Future，结果为运行记录；队列已满且未阻塞时返回None
+    """
+    future = Future()
+    with _COND:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while len(_QUEUE) >= _POOL_SETTINGS["max_queue_size"]:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if not block or (remaining is not None and remaining <= 0):
+                _STATS["rejected"] += 1
+                return None
+            _COND.wait(remaining)
+
+        seq = next(_SEQ)
+        item = {
+            "item_id": f"q{seq}",
+            "seq": seq,
+            "task": task_name,
+            "priority": priority,
+            "tags": [str(tag) for tag in (tags or [])],
+            "isolated": bool(isolated),
+            "resources": {str(name): mode for name, mode in (resources or {}).items()},
+            "launch": launch,
+            "future": future,
+            "meta": dict(meta or {}),
+            "submitted_at": datetime.now().isoformat(),
+            "_submitted_monotonic": time.monotonic(),
+            "run_id": None,
+            "queue_wait": None,
+            # 因资源冲突而等待的累计时间（秒）
+            "resource_wait": 0.0,
+            "_contention_since": None,
+            "_contended": set(),
+            "_blocked_resources": [],
+        }
+        item["sort_key"] = _sort_key(item)
+        future.item_id = item["item_id"]
+        _QUEUE.append(item)
+        _STATS["submitted"] += 1
+        _ensure_dispatcher()
+        _COND.notify_all()
+    return future
+
+def _dispatch_loop():
+    """调度线程：有空闲槽位且系统负载允许时按队列顺序启动运行"""
+    while True:
+        with _COND:
+            while True:
+                item = _next_item()
+                if item is None:
+                    _COND.wait()
+                    continue
+                # 负载门控：系统负载超过阈值时暂缓启动，稍后重新检查
+                admitted, recheck = admit(item["item_id"], item["task"], len(_ACTIVE))
+                if admitted:
+                    break
+                _COND.wait(recheck)
+            _QUEUE.remove(item)
+            item["queue_wait"] = round(time.monotonic() - item["_submitted_monotonic"], 3)
+            _record_resource_wait(item)
+            _ACTIVE[item["item_id"]] = item
+            _STATS["started"] += 1
+            _QUEUE_WAITS.append(item["queue_wait"])
+            task_waits = _TASK_WAITS.setdefault(item["task"], {"count": 0, "total": 0.0, "max": 0.0})
+            task_waits["count"] += 1
+            task_waits["total"] += item["queue_wait"]
+            task_waits["max"] = max(task_waits["max"], item["queue_wait"])
+            # 队列出现空位，唤醒因背压阻塞的提交方
+            _COND.notify_all()
+
+        _start_item(item)
+
+def _record_resource_wait(item):
+    """队列项启动时结算资源争用时间，计入涉及的各个资源，调用方需持有锁"""
+    _track_contention(item, [], time.monotonic())
+    item["resource_wait"] = round(item["resource_wait"], 3)
+    for name in item["resources"]:
+        stats = _RESOURCE_STATS.setdefault(name, {"runs": 0, "contended": 0, "total": 0.0, "max": 0.0})
+        stats["runs"] += 1
+        if name in item["_contended"]:
+            stats["contended"] += 1
+            stats["total"] += item["resource_wait"]
+            stats["max"] = max(stats["max"], item["resource_wait"])
+
+def _resolve_future(future, record=None, error=None):
+    """
+    完成队列项的future
+
+    启动失败时 on_complete 会在调度线程上被调用，而future的完成回调可能以 block=True 重新提交
+    （顺序运行的下一步、监听和定时的补跑）；队列已满时这种提交要等调度线程腾出空位，
+    在调度线程上执行就会永久卡住，因此交给一次性线程完成
+    """
+    def resolve():
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(record)
+
+    if threading.current_thread() is _DISPATCHER:
+        threading.Thread(target=resolve, name="run-pool-complete", daemon=True).start()
+    else:
+        resolve()
+
+def _start_item(item):
+    """在锁外启动运行，避免阻塞其他提交"""
+    def on_complete(record):
+        record = dict(record)
+        record["queue_wait"] = item["queue_wait"]
+        record["priority"] = item["priority"]
+        if item["resources"]:
+            record["resource_wait"] = item["resource_wait"]
+        with _COND:
+            _ACTIVE.pop(item["item_id"], None)
+            _STATS["completed"] += 1
+            _COMPLETION_TIMES.append(time.monotonic())
+            _COND.notify_all()
+        _resolve_future(item["future"], record=record)
+
+    try:
+        item["run_id"] = item["launch"](on_complete)
+    except Exception as e:
+        print(f"启动任务 {item['task']} 时出错: {str(e)}")
+        with _COND:
+            _ACTIVE.pop(item["item_id"], None)
+            _STATS["completed"] += 1
+            _COND.notify_all()
+        _resolve_future(item["future"], error=e)
+
+def cancel_queued(item_id):
+    """
+    取消尚未开始的排队项
+
+    参数:
+        item_id: 队列项ID
+
+    返回:
+        是否成功取消
+    """
+    with _COND:
+        for item in _QUEUE:
+            if item["item_id"] == item_id:
+                _QUEUE.remove(item)
+                forget_item(item_id)
+                item["future"].cancel()
+                _COND.notify_all()
+                return True
+    return False
+
+def move_queued(item_id, offset):
+    """
+    在排队顺序中移动排队项（与相邻项交换位置）
+
+    参数:
+        item_id: 队列项ID
+        offset: -1 表示前移一位，1 表示后移一位
+
+    返回:
+        是否移动成功
+    """
+    with _COND:
+        order = _ordered_queue()
+        for index, item in enumerate(order):
+            if item["item_id"] == item_id:
+                target = index + offset
+                if not 0 <= target < len(order) or offset == 0:
+                    return False
+                other = order[target]
+                item["sort_key"], other["sort_key"] = other["sort_key"], item["sort_key"]
+                item["seq"], other["seq"] = other["seq"], item["seq"]
+                _COND.notify_all()
+                return True
+    return False
+
+def set_queued_priority(item_id, priority):
+    """
+    修改排队项的优先级（已等待的时间仍计入老化）
+
+    参数:
+        item_id: 队列项ID
+        priority: 新的优先级
+
+    返回:
+        是否修改成功
+    """
+    with _COND:
+        for item in _QUEUE:
+            if item["item_id"] == item_id:
+                item["priority"] = priority
+                item["sort_key"] = _sort_key(item)
+                _COND.notify_all()
+                return True
+    return False
+
+def _describe(item, now):
+    return {
+        "item_id": item["item_id"],
+        "task": item["task"],
+        "priority": item["priority"],
+        "effective_priority": _effective_priority(item, now) if item["queue_wait"] is None else None,
+        "tags": ", ".join(item["tags"]),
+        "isolated": item["isolated"],
+        "resources": ", ".join(f"{name}({'共享' if mode == RESOURCE_SHARED else '独占'})"
+                               for name, mode in item["resources"].items()),
+        "blocked_by": ", ".join(_blocking_tags(item) + [f"资源 {name}" for name in item["_blocked_resources"]])
+                      if item["queue_wait"] is None else "",
+        "submitted_at": item["submitted_at"],
+        "run_id": item["run_id"],
+        "waited": round(now - item["_submitted_monotonic"], 1) if item["queue_wait"] is None else item["queue_wait"],
+    }
+
+def _resource_rows():
+    """各资源的当前持有者、等待数和累计争用统计，调用方需持有锁"""
+    names = set(_RESOURCE_STATS)
+    for item in list(_ACTIVE.values()) + _QUEUE:
+        names.update(item["resources"])
+    rows = []
+    for name in names:
+        stats = _RESOURCE_STATS.get(name, {"runs": 0, "contended": 0, "total": 0.0, "max": 0.0})
+        holders = [f"{item['task']}({'共享' if item['resources'][name] == RESOURCE_SHARED else '独占'})"
+                   for item in _ACTIVE.values() if name in item["resources"]]
+        rows.append({
+            "resource": name,
+            "holders": ", ".join(holders),
+            "waiting": sum(1 for item in _QUEUE if name in item["_blocked_resources"]),
+            "runs": stats["runs"],
+            "contended": stats["contended"],
+            "total_wait": round(stats["total"], 3),
+            "avg_wait": round(stats["total"] / stats["contended"], 3) if stats["contended"] else 0.0,
+            "max_wait": round(stats["max"], 3),
+        })
+    return sorted(rows, key=lambda row: (row["total_wait"], row["waiting"]), reverse=True)
+
+def get_pool_snapshot():
+    """
+    获取执行池当前状态，供状态页展示
+
+    返回:
+        dict: 配置、排队与运行中的队列项以及吞吐量/排队延迟统计
+    """
+    now = time.monotonic()
+    with _COND:
+        queued = [_describe(item, now) for item in _ordered_queue()]
+        active = [_describe(item, now) for item in _ACTIVE.values()]
+        recent = [t for t in _COMPLETION_TIMES if now - t <= THROUGHPUT_WINDOW]
+        waits = list(_QUEUE_WAITS)
+        stats = dict(_STATS)
+        settings = dict(_POOL_SETTINGS, tag_limits=dict(_POOL_SETTINGS["tag_limits"]))
+        task_waits = [
+            {"task": task, "count": waits["count"], "avg_wait": round(waits["total"] / waits["count"], 3),
+             "max_wait": waits["max"]}
+            for task, waits in _TASK_WAITS.items()
+        ]
+        resources = _resource_rows()
+
+    return {
+        "settings": settings,
+        "queued": queued,
+        "active": active,
+        "stats": stats,
+        # 每分钟完成的运行数
+        "throughput_per_min": round(len(recent) * 60.0 / THROUGHPUT_WINDOW, 2),
+        "avg_queue_wait": round(sum(waits) / len(waits), 3) if waits else 0.0,
+        "max_queue_wait": max(waits) if waits else 0.0,
+        # 各任务的排队等待统计（平均等待最长的在前）
+        "task_waits": sorted(task_waits, key=lambda row: row["avg_wait"], reverse=True),
+        # 各资源的持有者、等待数与争用时间（累计争用时间最长的在前）
+        "resources": resources,
+    }
@@ -0,0 +1,521 @@
+import uuid
+import heapq
+import time
+import threading
+from datetime import datetime
+
+# 没有历史耗时的任务使用的默认耗时估计（秒）
+DEFAULT_DURATION_ESTIMATE = 10.0
+
+# 节点状态
+NODE_PENDING = "pending"
+NODE_RUNNING = "running"
+NODE_SUCCESS = "success"
+NODE_FAILED = "failed"
+NODE_SKIPPED = "skipped"
+NODE_FINISHED = (NODE_SUCCESS, NODE_FAILED, NODE_SKIPPED)
+
+# DAG运行注册表：dag_id -> 运行状态
+_DAG_RUNS = {}
+_DAG_LOCK = threading.RLock()
+# 注册表中保留的已结束DAG运行数量
+MAX_FINISHED_DAG_RUNS = 50
+
+# 并行批次注册表：batch_id -> 预测与实际完成时间
+_PARALLEL_BATCHES = {}
+# 注册表中保留的并行批次数量
+MAX_PARALLEL_BATCHES = 20
+
+def normalize_deps(deps):
+    """
+    将Taskfile中的deps规范化为任务名列表
+
+    参数:
+        deps: 字符串列表，或 {task: name, vars: {...}} 形式的字典列表
+
+    返回:
+        任务名列表（去重并保持顺序）
+    """
+    names = []
+    for dep in deps if isinstance(deps, list) else []:
+        if isinstance(dep, str):
+            name = dep
+        elif isinstance(dep, dict) and dep.get("task"):
+            name = dep["task"]
+        else:
+            continue
+        if name not in names:
+            names.append(name)
+    return names
+
+def build_run_graph(task_deps, selected_tasks):
+    """
+    为选中任务及其传递依赖构建DAG
+
+    参数:
+        task_deps: 任务名 -> deps 的字典（通常来自 parse_taskfile 的 deps 字段）
+        selected_tasks: 选中的任务名列表
+
+    返回:
+        dict: {
+            "nodes": 任务名 -> 依赖任务名集合,
+            "order": 拓扑顺序列表,
+            "external": 当前Taskfile中找不到的依赖名（如include进来的任务），交给task自行处理
+        }
+
+    异常:
+        ValueError: 存在循环依赖
+    """
+    nodes = {}
+    external = set()
+    stack = list(selected_tasks)
+
+    while stack:
+        name = stack.pop()
+        if name in nodes:
+            continue
+        deps = []
+        for dep in normalize_deps(task_deps.get(name)):
+            if dep in task_deps:
+                deps.append(dep)
+            else:
+                external.add(dep)
+        nodes[name] = set(deps)
+        stack.extend(dep for dep in deps if dep not in nodes)
+
+    return {
+        "nodes": nodes,
+        "order": topological_order(nodes),
+        "external": sorted(external),
+    }
+
+def topological_order(nodes):
+    """
+    计算拓扑顺序（依赖在前）
+
+    参数:
+        nodes: 任务名 -> 依赖集合
+
+    返回:
+        任务名列表
+
+    异常:
+        ValueError: 存在循环依赖
+    """
+    order = []
+    state = {}  # 0=访问中, 1=已完成
+
+    for root in sorted(nodes):
+        if root in state:
+            continue
+        # 迭代式DFS，避免深依赖链触发递归上限
+        stack = [(root, iter(sorted(nodes[root])))]
+        path = [root]
+        state[root] = 0
+        while stack:
+            name, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                path.pop()
+                state[name] = 1
+                order.append(name)
+                continue
+            if state.get(child) == 0:
+                cycle = path[path.index(child):] + [child]
+                raise ValueError(f"检测到循环依赖: {' -> '.join(cycle)}")
+            if child not in state:
+                state[child] = 0
+                path.append(child)
+                stack.append((child, iter(sorted(nodes.get(child, ())))))
+    return order
+
+def get_dependents(nodes):
+    """反转依赖关系：任务名 -> 直接依赖它的任务集合"""
+    dependents = {name: set() for name in nodes}
+    for name, deps in nodes.items():
+        for dep in deps:
+            dependents.setdefault(dep, set()).add(name)
+    return dependents
+
+def compute_critical_path(graph, durations):
+    """
+    计算关键路径（耗时最长的依赖链）
+
+    参数:
+        graph: build_run_graph 的返回值
+        durations: 任务名 -> 预计耗时（秒），缺失时使用默认估计
+
+    返回:
+        (关键路径任务名列表, 关键路径总耗时)
+    """
+    nodes = graph["nodes"]
+    finish = {}
+    parent = {}
+    for name in graph["order"]:
+        start = 0.0
+        for dep in nodes[name]:
+            if finish[dep] > start:
+                start = finish[dep]
+                parent[name] = dep
+        finish[name] = start + durations.get(name, DEFAULT_DURATION_ESTIMATE)
+
+    if not finish:
+        return [], 0.0
+
+    end = max(finish, key=finish.get)
+    path = [end]
+    while path[-1] in parent:
+        path.append(parent[path[-1]])
+    path.reverse()
+    return path, finish[end]
+
+def estimate_makespan(graph, durations, max_workers):
+    """
+    用列表调度模拟估算整体完成时间（考虑并发上限）
+
+    参数:
+        graph: build_run_graph 的返回值
+        durations: 任务名 -> 预计耗时（秒）
+        max_workers: 并发上限
+
+    返回:
+        预计总耗时（秒）
+    """
+    nodes = graph["nodes"]
+    dependents = get_dependents(nodes)
+    remaining = {name: len(deps) for name, deps in nodes.items()}
+    ready_at = {name: 0.0 for name, count in remaining.items() if count == 0}
+    running = []  # (结束时间, 任务名)
+    clock = 0.0
+    max_workers = max(1, int(max_workers))
+
+    while ready_at or running:
+        # 按就绪时间顺序填满空闲槽位
+        startable = sorted((t, name) for name, t in ready_at.items() if t <= clock)
+        while startable and len(running) < max_workers:
+            _, name = startable.pop(0)
+            ready_at.pop(name)
+            running.append((clock + durations.get(name, DEFAULT_DURATION_ESTIMATE), name))
+        if not running:
+            clock = min(ready_at.values())
+            continue
+        running.sort()
+        clock, name = running.pop(0)
+        for child in dependents.get(name, ()):
+            remaining[child] -= 1
+            if remaining[child] == 0:
+                ready_at[child] = clock
+    return clock
+
+def plan_dag_run(task_deps, selected_tasks, durations, max_workers):
+    """
+    生成执行前展示的计划：DAG、关键路径和预计总耗时
+
+    参数:
+        task_deps: 任务名 -> deps
+        selected_tasks: 选中的任务名列表
+        durations: 任务名 -> 预计耗时的字典，或返回预计耗时（可为None）的函数
+        max_workers: 并发上限
+
+    返回:
+        计划字典
+    """
+    graph = build_run_graph(task_deps, selected_tasks)
+    estimate = durations if callable(durations) else durations.get
+    estimates = {}
+    for name in graph["nodes"]:
+        value = estimate(name)
+        estimates[name] = float(value) if value else DEFAULT_DURATION_ESTIMATE
+    critical_path, critical_length = compute_critical_path(graph, estimates)
+    return {
+        "graph": graph,
+        "selected": list(selected_tasks),
+        "durations": estimates,
+        "critical_path": critical_path,
+        "critical_path_length": critical_length,
+        "makespan": estimate_makespan(graph, estimates, max_workers),
+        "max_workers": max_workers,
+    }
+
+def simulate_list_schedule(ordered, durations, max_workers):
+    """
+    模拟无依赖任务的列表调度：按顺序把任务交给最先空闲的槽位
+
+    参数:
+        ordered: 任务名列表（调度顺序）
+        durations: 任务名 -> 预计耗时（秒）
+        max_workers: 并发上限
+
+    返回:
+        (任务名 -> (预计开始, 预计结束), 预计总耗时)
+    """
+    slots = [0.0] * max(1, int(max_workers))
+    timeline = {}
+    for name in ordered:
+        start = heapq.heappop(slots)
+        end = start + durations.get(name, DEFAULT_DURATION_ESTIMATE)
+        timeline[name] = (start, end)
+        heapq.heappush(slots, end)
+    return timeline, max((end for _, end in timeline.values()), default=0.0)
+
+def plan_parallel_batch(task_names, durations, max_workers, priority=None):
+    """
+    为并行批次安排提交顺序：最长处理时间优先（LPT），缩短整体完成时间
+
+    执行池按优先级出队，因此只在同一优先级内按预计耗时从长到短排列。
+
+    参数:
+        task_names: 任务名列表（选择顺序）
+        durations: 任务名 -> 预计耗时（秒），无历史时为None
+        max_workers: 并发上限
+        priority: 返回任务优先级的函数，None表示不区分优先级
+
+    返回:
+        计划字典：order为提交顺序，makespan为预计总耗时，baseline_makespan为按选择顺序提交的预计总耗时
+    """
+    estimates = {}
+    for name in task_names:
+        value = durations.get(name)
+        estimates[name] = float(value) if value else DEFAULT_DURATION_ESTIMATE
+    priorities = {name: priority(name) if priority else 0 for name in task_names}
+    # 排序稳定：耗时相同的任务保持选择顺序
+    order = sorted(task_names, key=lambda name: (priorities[name], -estimates[name]))
+    baseline = sorted(task_names, key=lambda name: priorities[name])
+    timeline, makespan = simulate_list_schedule(order, estimates, max_workers)
+    return {
+        "order": order,
+        "durations": estimates,
+        "estimated": [name for name in task_names if durations.get(name)],
+        "timeline": timeline,
+        "makespan": makespan,
+        "baseline_makespan": simulate_list_schedule(baseline, estimates, max_workers)[1],
+        "max_workers": max(1, int(max_workers)),
+    }
+
+def _on_batch_task_done(batch, name, future):
+    """批次中的任务结束：记录实际完成时间，全部结束时记录实际总耗时"""
+    record = None
+    if not future.cancelled() and future.exception() is None:
+        record = future.result()
+    with _DAG_LOCK:
+        task = batch["tasks"][name]
+        task["actual_end"] = round(time.monotonic() - batch["_started_monotonic"], 3)
+        task["duration"] = (record or {}).get("duration")
+        task["status"] = (record or {}).get("status") or ("cancelled" if future.cancelled() else "error")
+        if all(task["actual_end"] is not None for task in batch["tasks"].values()):
+            batch["actual_makespan"] = max(task["actual_end"] for task in batch["tasks"].values())
+            batch["status"] = "finished"
+
+def track_parallel_batch(plan, futures, taskfile=None):
+    """
+    登记一个已提交的并行批次，任务结束时记录实际完成时间，用于与预测对比
+
+    参数:
+        plan: plan_parallel_batch 的返回值
+        futures: 任务名 -> Future（结果为运行记录），提交失败的任务为None
+        taskfile: 任务所在的Taskfile路径
+
+    返回:
+        batch_id
+    """
+    batch_id = uuid.uuid4().hex[:12]
+    batch = {
+        "batch_id": batch_id,
+        "created_at": datetime.now().isoformat(),
+        "status": "running",
+        "taskfile": taskfile,
+        "max_workers": plan["max_workers"],
+        "makespan": round(plan["makespan"], 3),
+        "baseline_makespan": round(plan["baseline_makespan"], 3),
+        "estimated": len(plan["estimated"]),
+        "actual_makespan": None,
+        "_started_monotonic": time.monotonic(),
+        "tasks": {
+            name: {
+                "position": position,
+                "estimate": plan["durations"][name],
+                "predicted_end": round(plan["timeline"][name][1], 3),
+                "actual_end": None,
+                "duration": None,
+                "status": "queued",
+            }
+            for position, name in enumerate(plan["order"]) if futures.get(name) is not None
+        },
+    }
+    if not batch["tasks"]:
+        return None
+    with _DAG_LOCK:
+        _PARALLEL_BATCHES[batch_id] = batch
+        for old_id in list(_PARALLEL_BATCHES)[:max(0, len(_PARALLEL_BATCHES) - MAX_PARALLEL_BATCHES)]:
+            _PARALLEL_BATCHES.pop(old_id, None)
+    for name in batch["tasks"]:
+        futures[name].add_done_callback(lambda future, name=name: _on_batch_task_done(batch, name, future))
+    return batch_id
+
+def list_parallel_batches():
+    """列出最近的并行批次（预测与实际完成时间，按创建顺序）"""
+    with _DAG_LOCK:
+        return [
+            {
+                **{key: value for key, value in batch.items() if not key.startswith("_") and key != "tasks"},
+                "tasks": {name: dict(task) for name, task in batch["tasks"].items()},
+            }
+            for batch in _PARALLEL_BATCHES.values()
+        ]
+
+def _public_dag(dag):
+    graph_nodes = dag["plan"]["graph"]["nodes"]
+    return {
+        "dag_id": dag["dag_id"],
+        "created_at": dag["created_at"],
+        "status": dag["status"],
+        "taskfile": dag.get("taskfile"),
+        "nodes": {name: dict(node, deps=sorted(graph_nodes[name])) for name, node in dag["nodes"].items()},
+        "critical_path": list(dag["plan"]["critical_path"]),
+        "makespan": dag["plan"]["makespan"],
+        "max_workers": dag["plan"]["max_workers"],
+    }
+
+def estimate_dag_remaining(dag, remaining):
+    """
+    估计DAG运行的剩余时间：只考虑未结束的节点，运行中的节点按剩余耗时计
+
+    参数:
+        dag: get_dag_run 返回的快照
+        remaining: 未结束节点名 -> 剩余耗时（秒）
+
+    返回:
+        {remaining: 考虑并发上限的预计剩余时间, critical_path: 剩余关键路径, critical_remaining: 剩余关键路径耗时}
+    """
+    unfinished = [name for name, node in dag["nodes"].items() if node["status"] not in NODE_FINISHED]
+    pending = set(unfinished)
+    # 快照中的节点按拓扑顺序排列
+    graph = {
+        "nodes": {name: {dep for dep in dag["nodes"][name]["deps"] if dep in pending} for name in unfinished},
+        "order": unfinished,
+    }
+    critical_path, critical_remaining = compute_critical_path(graph, remaining)
+    return {
+        "remaining": estimate_makespan(graph, remaining, dag.get("max_workers") or 1),
+        "critical_path": critical_path,
+        "critical_remaining": critical_remaining,
+    }
+
+def _refresh_dag_status(dag):
+    """根据节点状态更新DAG整体状态，调用方需持有锁"""
+    states = [node["status"] for node in dag["nodes"].values()]
+    if all(state in NODE_FINISHED for state in states):
+        dag["status"] = NODE_SUCCESS if all(state == NODE_SUCCESS for state in states) else NODE_FAILED
+
+def _skip_downstream(dag, name, reason):
+    """失败节点的所有下游节点标记为跳过，调用方需持有锁"""
+    stack = list(dag["dependents"].get(name, ()))
+    while stack:
+        child = stack.pop()
+        node = dag["nodes"][child]
+        if node["status"] == NODE_PENDING:
+            node["status"] = NODE_SKIPPED
+            node["reason"] = reason
+            stack.extend(dag["dependents"].get(child, ()))
+
+def _submit_ready(dag):
+    """提交所有依赖已成功的待运行节点"""
+    to_submit = []
+    with _DAG_LOCK:
+        for name in dag["plan"]["graph"]["order"]:
+            node = dag["nodes"][name]
+            if node["status"] != NODE_PENDING:
+                continue
+            if all(dag["nodes"][dep]["status"] == NODE_SUCCESS for dep in dag["plan"]["graph"]["nodes"][name]):
+                node["status"] = NODE_RUNNING
+                to_submit.append(name)
+
+    for name in to_submit:
+        future = dag["submit"](name)
+        if future is None:
+            _on_node_done(dag, name, None, error="执行队列已满")
+        else:
+            future.add_done_callback(lambda f, n=name: _on_node_done(dag, n, f))
+
+def _on_node_done(dag, name, future, error=None):
+    """节点完成：记录结果，失败时只短路下游节点，然后继续提交就绪节点"""
+    record = None
+    if future is not None and error is None:
+        try:
+            record = future.result()
+        except Exception as e:
+            error = str(e)
+
+    with _DAG_LOCK:
+        node = dag["nodes"][name]
+        if record is not None:
+            node["run_id"] = record.get("run_id")
+            node["exit_code"] = record.get("exit_code")
+            node["duration"] = record.get("duration")
+            node["status"] = NODE_SUCCESS if record.get("status") == "success" else NODE_FAILED
+        else:
+            node["status"] = NODE_FAILED
+            node["reason"] = error
+        if node["status"] == NODE_FAILED:
+            _skip_downstream(dag, name, f"依赖 {name} 失败")
+        _refresh_dag_status(dag)
+
+    _submit_ready(dag)
+
+def _prune_dag_runs():
+    """只保留最近的已结束DAG运行，调用方需持有锁"""
+    finished = [dag_id for dag_id, dag in _DAG_RUNS.items() if dag["status"] != NODE_RUNNING]
+    for dag_id in finished[:max(0, len(finished) - MAX_FINISHED_DAG_RUNS)]:
+        _DAG_RUNS.pop(dag_id, None)
+
+def start_dag_run(plan, submit, satisfied=None, taskfile=None):
+    """
+    按计划执行DAG：每个共享依赖只运行一次，独立分支并发运行（受执行池上限约束）
+
+    参数:
+        plan: plan_dag_run 的返回值
+        submit: 提交函数 submit(task_name) -> Future（结果为运行记录）或None
+        satisfied: 已是最新、无需运行的任务集合；只有其依赖也都无需运行时才会跳过
+        taskfile: 任务所在的Taskfile路径（用于在界面中查找任务的历史耗时）
+
+    返回:
+        dag_id
+    """
+    dag_id = uuid.uuid4().hex[:12]
+    dag = {
+        "dag_id": dag_id,
+        "created_at": datetime.now().isoformat(),
+        "status": NODE_RUNNING,
+        "taskfile": taskfile,
+        "plan": plan,
+        "submit": submit,
+        "dependents": get_dependents(plan["graph"]["nodes"]),
+        "nodes": {
+            name: {"status": NODE_PENDING, "run_id": None, "exit_code": None, "duration": None, "reason": None}
+            for name in plan["graph"]["order"]
+        },
+    }
+    graph_nodes = plan["graph"]["nodes"]
+    for name in plan["graph"]["order"]:
+        if name in (satisfied or ()) and all(dag["nodes"][dep]["status"] == NODE_SUCCESS for dep in graph_nodes[name]):
+            dag["nodes"][name].update(status=NODE_SUCCESS, reason="已是最新")
+
+    with _DAG_LOCK:
+        _refresh_dag_status(dag)
+        _DAG_RUNS[dag_id] = dag
+        _prune_dag_runs()
+
+    _submit_ready(dag)
+    return dag_id
+
+def get_dag_run(dag_id):
+    """获取DAG运行状态快照，不存在时返回None"""
+    with _DAG_LOCK:
+        dag = _DAG_RUNS.get(dag_id)
+        return _public_dag(dag) if dag else None
+
+def list_dag_runs():
+    """列出所有DAG运行状态快照（按创建顺序）"""
+    with _DAG_LOCK:
+        return [_public_dag(dag) for dag in _DAG_RUNS.values()]
@@ -0,0 +1,279 @@
+import os
+import sys
+import uuid
+import shlex
+import atexit
+import threading
+import subprocess
+from src.services import run_engine
+
+# 常驻shell池配置
+_SHELL_POOL_SETTINGS = {
+    "enabled": False,
+    # 预热并保持空闲的shell数量
+    "size": 2,
+    # 每个shell执行这么多条命令后回收，避免状态（如后台进程、文件描述符）累积
+    "max_commands": 100,
+}
+_SETTINGS_LOCK = threading.Lock()
+
+# 空闲shell列表，每项为 {"process", "commands"}
+_IDLE_SHELLS = []
+_POOL_LOCK = threading.Lock()
+_POOL_STATS = {"created": 0, "reused": 0, "recycled": 0, "broken": 0, "commands": 0}
+
+READ_CHUNK_SIZE = 64 * 1024
+
+def is_supported():
+    """常驻shell只用于POSIX上需要shell解释的直接执行命令（Windows上直接执行不经过shell）"""
+    return sys.platform != "win32"
+
+def configure_shell_pool(enabled=None, size=None, max_commands=None):
+    """
+    更新常驻shell池配置；启用时在后台预热，停用时关闭空闲的shell
+
+    参数:
+        enabled: 是否启用
+        size: 保持空闲的shell数量
+        max_commands: 单个shell最多执行的命令数
+    """
+    with _SETTINGS_LOCK:
+        if enabled is not None:
+            _SHELL_POOL_SETTINGS["enabled"] = bool(enabled) and is_supported()
+        if size is not None:
+            _SHELL_POOL_SETTINGS["size"] = max(0, int(size))
+        if max_commands is not None:
+            _SHELL_POOL_SETTINGS["max_commands"] = max(1, int(max_commands))
+        enabled = _SHELL_POOL_SETTINGS["enabled"]
+
+    if enabled:
+        threading.Thread(target=warm_shells, name="shell-pool-warm", daemon=True).start()
+    else:
+        close_idle_shells()
+
+def get_shell_pool_settings():
+    """获取常驻shell池配置副本"""
+    with _SETTINGS_LOCK:
+        return dict(_SHELL_POOL_SETTINGS)
+
+def is_enabled():
+    """常驻shell池是否启用"""
+    with _SETTINGS_LOCK:
+        return _SHELL_POOL_SETTINGS["enabled"]
+
+def _spawn_shell():
+    """启动一个常驻shell：命令从stdin读入，stdout/stderr合并到同一管道"""
+    process = subprocess.Popen(
+        ["sh"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        bufsize=0,
+        # 独立会话（进程组），取消运行时可以整体终止
+        start_new_session=True
+    )
+    with _POOL_LOCK:
+        _POOL_STATS["created"] += 1
+    return {"process": process, "commands": 0}
+
+def _close_shell(shell):
+    """关闭shell：关闭stdin让其自行退出，来不及退出时强制结束"""
+    process = shell["process"]
+    try:
+        process.stdin.close()
+    except OSError:
+        pass
+    try:
+        process.wait(timeout=1)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+    try:
+        process.stdout.close()
+    except OSError:
+        pass
+
+def warm_shells():
+    """补足空闲shell到配置数量"""
+    settings = get_shell_pool_settings()
+    while settings["enabled"]:
+        with _POOL_LOCK:
+            if len(_IDLE_SHELLS) >= settings["size"]:
+                return
+        try:
+            shell = _spawn_shell()
+        except OSError as e:
+            print(f"预热常驻shell时出错: {str(e)}")
+            return
+        with _POOL_LOCK:
+            _IDLE_SHELLS.append(shell)
+
+def close_idle_shells():
+    """关闭所有空闲shell（停用或退出时调用）"""
+    with _POOL_LOCK:
+        shells = list(_IDLE_SHELLS)
+        _IDLE_SHELLS.clear()
+    for shell in shells:
+        _close_shell(shell)
+
+atexit.register(close_idle_shells)
+
+def acquire_shell():
+    """取出一个存活的空闲shell，没有时新启动一个"""
+    while True:
+        with _POOL_LOCK:
+            shell = _IDLE_SHELLS.pop() if _IDLE_SHELLS else None
+            if shell is not None and shell["process"].poll() is None:
+                _POOL_STATS["reused"] += 1
+                return shell
+            if shell is not None:
+                _POOL_STATS["broken"] += 1
+        if shell is None:
+            return _spawn_shell()
+
+def release_shell(shell, healthy=True):
+    """
+    归还shell：出错、已执行足够多命令或空闲数已满时关闭，否则放回池中
+
+    参数:
+        shell: acquire_shell 的返回值
+        healthy: 本次执行是否正常结束（读到了结束标记）
+    """
+    settings = get_shell_pool_settings()
+    with _POOL_LOCK:
+        if not healthy:
+            _POOL_STATS["broken"] += 1
+        elif shell["commands"] >= settings["max_commands"]:
+            _POOL_STATS["recycled"] += 1
+        elif settings["enabled"] and len(_IDLE_SHELLS) < settings["size"] and shell["process"].poll() is None:
+            _IDLE_SHELLS.append(shell)
+            return
+    threading.Thread(target=_close_shell, args=(shell,), name="shell-pool-close", daemon=True).start()
+    if settings["enabled"]:
+        # 包括被取消、超时终止的shell：随后补充新的空闲shell
+        threading.Thread(target=warm_shells, name="shell-pool-warm", daemon=True).start()
+
+def get_shell_pool_stats():
+    """获取常驻shell池统计：空闲数、累计启动/复用/回收/损坏次数和执行的命令数"""
+    with _POOL_LOCK:
+        return dict(_POOL_STATS, idle=len(_IDLE_SHELLS), **get_shell_pool_settings())
+
+def _build_payload(script, cwd, env, marker):
+    """
+    构造写入shell的命令：在子shell中切换目录、导出环境变量并eval脚本，
+    set -e、exit、cd等不会影响常驻shell；脚本有语法错误时eval失败，结束标记仍会输出。
+    stdin重定向到/dev/null，避免命令读走后续写入的内容
+    """
+    lines = ["(", f"cd -- {shlex.quote(cwd)} || exit 1"]
+    for name, value in (env or {}).items():
+        if os.environ.get(name) != value and name.isidentifier():
+            lines.append(f"export {name}={shlex.quote(value)}")
+    lines.append(f"eval {shlex.quote(script)}")
+    lines.append(") </dev/null")
+    lines.append(f"printf '%s%d\\n' {marker.decode('ascii')} \"$?\"")
+    return ("\n".join(lines) + "\n").encode(run_engine.OUTPUT_ENCODING, errors="replace")
+
+def execute(shell, script, cwd, env=None, on_output=None):
+    """
+    在常驻shell中执行脚本并等待结束（阻塞）
+
+    参数:
+        shell: acquire_shell 的返回值
+        script: shell脚本
+        cwd: 工作目录
+        env: 环境变量字典（只导出与当前进程不同的变量）
+        on_output: 输出回调 on_output(bytes)
+
+    返回:
+        退出码；shell在结束前退出（被终止或损坏）时返回None
+    """
+    process = shell["process"]
+    marker = f"__TASKGUI_DONE_{uuid.uuid4().hex}__".encode("ascii")
+    shell["commands"] += 1
+    with _POOL_LOCK:
+        _POOL_STATS["commands"] += 1
+    try:
+        process.stdin.write(_build_payload(script, cwd, env, marker))
+    except (OSError, ValueError):
+        return None
+
+    # 结束标记可能被拆在两次读取之间，末尾保留不足一个标记长度的数据暂不输出
+    keep = len(marker) - 1
+    buffer = b""
+    while True:
+        try:
+            data = process.stdout.read(READ_CHUNK_SIZE)
+        except (OSError, ValueError):
+            data = b""
+        if not data:
+            if buffer and on_output:
+                on_output(buffer)
+            return None
+        buffer += data
+        index = buffer.find(marker)
+        if index < 0:
+            if len(buffer) > keep:
+                if on_output:
+                    on_output(buffer[:-keep] if keep else buffer)
+                buffer = buffer[-keep:] if keep else b""
+            continue
+
+        if index and on_output:
+            on_output(buffer[:index])
+        rest = buffer[index + len(marker):]
+        while b"\n" not in rest:
+            try:
+                data = process.stdout.read(READ_CHUNK_SIZE)
+            except (OSError, ValueError):
+                data = b""
+            if not data:
+                return None
+            rest += data
+        status, _, trailing = rest.partition(b"\n")
+        if trailing and on_output:
+            # 命令启动的后台进程在结束标记之后写出的内容，归入本次运行
+            on_output(trailing)
+        try:
+            return int(status)
+        except ValueError:
+            return None
+
+def run_in_shell(task_name, taskfile_path, script, cwd, env=None, on_complete=None, meta=None, timeout=None):
+    """
+    在常驻shell中运行任务脚本，登记为普通运行记录（取消、超时时终止整个shell，随后丢弃）
+
+    常驻shell不会被wait4回收，运行记录中没有 cpu_time 和 peak_rss；开启资源采样时内存等指标来自采样。
+
+    参数:
+        task_name: 任务名称
+        taskfile_path: Taskfile路径
+        script: 展开后的shell脚本
+        cwd: 工作目录
+        env: 环境变量字典
+        on_complete: 完成回调，参数为运行记录副本
+        meta: 附加到运行记录上的元数据
+        timeout: 超时时间（秒）
+
+    返回:
+        run_id字符串
+    """
+    try:
+        shell = acquire_shell()
+    except OSError as e:
+        print(f"启动常驻shell失败: {str(e)}")
+        return run_engine.start_run(task_name, taskfile_path, argv=["sh", "-c", script], cwd=cwd, env=env,
+                                    on_complete=on_complete, meta=meta, timeout=timeout)
+
+    argv = [shell["process"].args[0], "-c", script]
+    run_id = run_engine.attach_run(task_name, taskfile_path, shell["process"], argv=argv, cwd=cwd,
+                                   meta=dict(meta or {}, shell_pool=True), timeout=timeout)
+
+    def worker():
+        exit_code = execute(shell, script, cwd, env, on_output=lambda data: run_engine.append_run_output(run_id, data))
+        record = run_engine.finish_attached_run(run_id, exit_code=exit_code, on_complete=on_complete)
+        # 被取消或超时的运行已经终止了整个shell，不能再放回池中
+        stopped = (record or {}).get("status") in (run_engine.STATUS_CANCELLED, run_engine.STATUS_TIMEOUT)
+        release_shell(shell, healthy=exit_code is not None and not stopped)
+
+    threading.Thread(target=worker, name=f"run-{run_id}-shell", daemon=True).start()
+    return run_id
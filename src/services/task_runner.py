@@ -1,12 +1,280 @@
 import os
+import re
 import subprocess
 import platform
-import threading
 import datetime
+import threading
+from collections import deque
+from concurrent.futures import Future
+from src.services.run_engine import start_run, build_task_argv
+from src.services.batch_runner import start_batch
+from src.services.matrix import parse_matrix_values, expand_matrix, start_matrix_run
+from src.services.file_watch import sync_watches
+from src.services.cron_scheduler import sync_schedules
+from src.services.run_pool import (
+    submit_run, configure_pool, get_pool_settings, parse_priority, RESOURCE_SHARED, RESOURCE_EXCLUSIVE,
+    QUEUE_POLICY_PRIORITY
+)
+from src.services.scheduler import normalize_deps, plan_dag_run, start_dag_run, plan_parallel_batch, track_parallel_batch
+from src.services.run_logs import configure_logs
+from src.services.load_gate import configure_gate
+from src.services.retry import configure_retry, build_policy, should_retry, backoff_delay, record_attempts, is_flaky
+from src.services.shell_pool import configure_shell_pool
+from src.services.resource_sampler import configure_sampler
+from src.services import daemon_client, shell_pool
+from src.services.direct_runner import expand_task, get_task_definition, explain_fallback
+from src.services.fingerprint import check_tasks, mark_built, task_id, STATUS_UP_TO_DATE
+
+# 执行模式：headless 在后台无窗口运行并捕获输出；detached 在独立终端窗口中运行
+EXECUTION_MODE_HEADLESS = "headless"
+EXECUTION_MODE_DETACHED = "detached"
 
-def run_task_via_cmd(task_name, taskfile_path=None):
+# 已完成运行的结果，由界面线程在下次刷新时取出并写入任务运行时数据
+# （后台线程不能直接访问st.session_state）
+_RUN_OUTCOMES = deque()
+
+def get_execution_mode():
     """
-    通过命令行运行任务
+    获取当前的任务执行模式
+    
+    返回:
+        "headless" 或 "detached"
+    """
+    try:
+        import streamlit as st
+        basic_settings = st.session_state.get('basic_settings', {}) or {}
+        return basic_settings.get('execution_mode', EXECUTION_MODE_HEADLESS)
+    except Exception:
+        return EXECUTION_MODE_HEADLESS
+
+def is_direct_execution():
+    """
+    是否启用直接执行模式（不经过task，直接执行展开后的命令）
+    
+    返回:
+        bool
+    """
+    try:
+        import streamlit as st
+        basic_settings = st.session_state.get('basic_settings', {}) or {}
+        return bool(basic_settings.get('direct_execution', False))
+    except Exception:
+        return False
+
+def is_daemon_mode():
+    """
+    是否通过本地守护进程运行任务（运行不受界面重跑和重启影响）
+    
+    返回:
+        bool
+    """
+    try:
+        import streamlit as st
+        basic_settings = st.session_state.get('basic_settings', {}) or {}
+        return bool(basic_settings.get('use_daemon', False))
+    except Exception:
+        return False
+
+def is_batch_invocation():
+    """
+    是否把同一Taskfile中的多个任务合并为一次task调用（task a b c / task --parallel a b c）
+    
+    返回:
+        bool
+    """
+    try:
+        import streamlit as st
+        basic_settings = st.session_state.get('basic_settings', {}) or {}
+        return bool(basic_settings.get('batch_invocation', False))
+    except Exception:
+        return False
+
+def is_force_run():
+    """
+    是否强制运行已是最新的任务（sources/generates未变化时默认跳过）
+    
+    返回:
+        bool
+    """
+    try:
+        import streamlit as st
+        return bool(st.session_state.get('force_run', False))
+    except Exception:
+        return False
+
+def get_default_timeout():
+    """
+    获取设置中的全局运行超时（秒），0表示不限制
+    
+    返回:
+        超时秒数
+    """
+    try:
+        import streamlit as st
+        basic_settings = st.session_state.get('basic_settings', {}) or {}
+        return float(basic_settings.get('run_timeout', 0) or 0)
+    except Exception:
+        return 0
+
+def get_duration_estimates(task_names, taskfile_path):
+    """
+    按界面中的运行历史估计各任务耗时（需在界面线程中调用）
+    
+    参数:
+        task_names: 任务名称列表
+        taskfile_path: Taskfile路径
+        
+    返回:
+        任务名 -> 预计耗时（秒），没有历史时为None
+    """
+    try:
+        from src.utils.selection_utils import estimate_task_duration, find_task_key
+        return {task_name: estimate_task_duration(find_task_key(task_name, taskfile_path)) for task_name in task_names}
+    except Exception:
+        return {}
+
+def parse_timeout(value):
+    """
+    解析超时配置：数字表示秒，也支持 "90s"、"5m"、"1h30m" 形式
+    
+    参数:
+        value: 配置值
+        
+    返回:
+        秒数；无法解析或未配置时返回None
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value) if value > 0 else None
+    # ms必须排在m之前，否则"250ms"会被拆成250分钟
+    parts = re.findall(r"(\d+(?:\.\d+)?)\s*(ms|h|m|s)?", str(value).strip().lower())
+    if not parts or not re.fullmatch(r"(\s*\d+(?:\.\d+)?\s*(ms|h|m|s)?)+", str(value).strip().lower()):
+        return None
+    units = {"h": 3600, "m": 60, "s": 1, "ms": 0.001, "": 1}
+    seconds = sum(float(number) * units[unit] for number, unit in parts)
+    return seconds if seconds > 0 else None
+
+def parse_tag_limits(value):
+    """
+    解析标签并发上限配置，支持字典或 "gpu=1, net=2" 形式的字符串
+    
+    参数:
+        value: 配置值
+        
+    返回:
+        {标签: 上限}，忽略无法解析的项
+    """
+    if isinstance(value, dict):
+        items = value.items()
+    else:
+        items = [part.split("=", 1) for part in re.split(r"[,，;\n]", str(value or "")) if "=" in part]
+    limits = {}
+    for tag, limit in items:
+        try:
+            limit = int(str(limit).strip())
+        except ValueError:
+            continue
+        if str(tag).strip() and limit > 0:
+            limits[str(tag).strip()] = limit
+    return limits
+
+def get_task_priority(task_name, taskfile_path=None):
+    """
+    获取任务定义中的优先级（数值越小越先执行，也可以写 high / medium / low），未定义时为5
+    
+    参数:
+        task_name: 任务名称
+        taskfile_path: Taskfile路径
+        
+    返回:
+        优先级数值
+    """
+    return parse_priority(get_task_definition(taskfile_path, task_name).get('priority') if taskfile_path else None)
+
+def _get_task_tags(task_name, taskfile_path=None):
+    """获取任务定义中的标签列表"""
+    tags = get_task_definition(taskfile_path, task_name).get('tags', []) if taskfile_path else []
+    return [tags] if isinstance(tags, str) else list(tags or [])
+
+def _add_resource(resources, name, mode):
+    """登记一个资源锁，同一资源同时声明共享和独占时按独占处理"""
+    name = str(name).strip()
+    if not name:
+        return
+    mode = RESOURCE_SHARED if str(mode).strip().lower() in ("shared", "read", "共享") else RESOURCE_EXCLUSIVE
+    if resources.get(name) != RESOURCE_EXCLUSIVE:
+        resources[name] = mode
+
+def get_task_resources(task_name, taskfile_path=None):
+    """
+    获取任务运行期间需要持有的资源锁
+    
+    任务定义中的resources字段可以是列表或字典，未指定模式时为独占：
+        resources: [dist, "cache:shared"]
+        resources: {dist: exclusive, cache: shared}
+    也可以用标签声明：lock:dist（独占）、lock:cache:shared（共享）
+    
+    参数:
+        task_name: 任务名称
+        taskfile_path: Taskfile路径
+        
+    返回:
+        {资源名: "shared" 或 "exclusive"}
+    """
+    if not taskfile_path:
+        return {}
+    declared = get_task_definition(taskfile_path, task_name).get('resources') or {}
+    resources = {}
+    if isinstance(declared, dict):
+        for name, mode in declared.items():
+            _add_resource(resources, name, mode or RESOURCE_EXCLUSIVE)
+    else:
+        for entry in ([declared] if isinstance(declared, str) else declared):
+            if isinstance(entry, dict):
+                _add_resource(resources, entry.get('name', ''), entry.get('mode', RESOURCE_EXCLUSIVE))
+            else:
+                name, _, mode = str(entry).partition(':')
+                _add_resource(resources, name, mode or RESOURCE_EXCLUSIVE)
+    for tag in _get_task_tags(task_name, taskfile_path):
+        prefix, _, rest = str(tag).partition(':')
+        if prefix == 'lock' and rest:
+            name, _, mode = rest.partition(':')
+            _add_resource(resources, name, mode or RESOURCE_EXCLUSIVE)
+    return resources
+
+def resolve_retry_policy(task_name, taskfile_path=None):
+    """
+    确定任务的重试策略：任务定义中的 retry 字段优先，否则按标签的重试次数
+    
+    参数:
+        task_name: 任务名称
+        taskfile_path: Taskfile路径
+        
+    返回:
+        重试策略字典，见 retry.build_policy
+    """
+    retry_value = get_task_definition(taskfile_path, task_name).get('retry') if taskfile_path else None
+    return build_policy(retry_value, _get_task_tags(task_name, taskfile_path), parse_timeout)
+
+def resolve_task_timeout(task_name, taskfile_path=None, default_timeout=0):
+    """
+    确定任务的超时时间：任务定义中的 timeout 优先，否则使用全局超时
+    
+    参数:
+        task_name: 任务名称
+        taskfile_path: Taskfile路径
+        default_timeout: 全局超时（秒），0表示不限制
+        
+    返回:
+        超时秒数或None
+    """
+    task_timeout = parse_timeout(get_task_definition(taskfile_path, task_name).get('timeout')) if taskfile_path else None
+    return task_timeout or (float(default_timeout) if default_timeout else None)
+
+def run_task_detached(task_name, taskfile_path=None):
+    """
+    在独立的终端窗口中运行任务（分离模式，不捕获输出）
     
     参数:
         task_name: 任务名称
@@ -23,7 +291,7 @@ def run_task_via_cmd(task_name, taskfile_path=None):
             command = f'task {task_name}'
         
         # 根据操作系统确定如何运行命令
-        if 1:
+        if platform.system() == 'Windows':
             # 在Windows上使用Windows Terminal (wt.exe)运行PowerShell
             current_time = datetime.datetime.now().strftime("%H:%M:%S")
             process = subprocess.Popen(
@@ -57,46 +325,623 @@ def run_task_via_cmd(task_name, taskfile_path=None):
         print(f"运行任务时出错: {str(e)}")
         return None
 
-def run_tasks_via_cmd(task_names, taskfile_path, parallel=False):
+def run_task_headless(task_name, taskfile_path=None, on_complete=None, meta=None, direct=False, skip_deps=False, timeout=None,
+                      call_vars=None):
     """
-    运行多个任务
+    在后台以无窗口子进程运行任务，输出通过管道捕获
+    
+    参数:
+        task_name: 任务名称
+        taskfile_path: Taskfile路径
+        on_complete: 完成回调，参数为运行记录
+        meta: 附加到运行记录上的元数据
+        direct: 是否直接执行展开后的命令；任务不支持时自动回退到task
+        skip_deps: 直接执行时忽略deps（依赖已由调度器执行）
+        timeout: 超时时间（秒），超时后终止整个进程树
+        call_vars: 传给任务的变量 {名称: 值}（相当于 task name VAR=value）
+        
+    返回:
+        run_id字符串
+    """
+    meta = dict(meta or {})
+    if call_vars:
+        meta["vars"] = dict(call_vars)
+    if direct:
+        expansion = expand_task(taskfile_path, task_name, skip_deps=skip_deps, call_vars=call_vars)
+        if expansion is not None:
+            meta["direct"] = True
+            if expansion.get("script") and shell_pool.is_enabled():
+                # 需要shell解释的命令交给预热的常驻shell，省去每次启动shell的开销
+                return shell_pool.run_in_shell(
+                    task_name,
+                    taskfile_path,
+                    expansion["script"],
+                    expansion["cwd"],
+                    env=expansion["env"],
+                    on_complete=on_complete,
+                    meta=meta,
+                    timeout=timeout
+                )
+            return start_run(
+                task_name,
+                taskfile_path,
+                argv=expansion["argv"],
+                cwd=expansion["cwd"],
+                env=expansion["env"],
+                on_complete=on_complete,
+                meta=meta,
+                timeout=timeout
+            )
+    
+    cwd = os.path.dirname(os.path.abspath(taskfile_path)) if taskfile_path else None
+    return start_run(
+        task_name,
+        taskfile_path,
+        argv=build_task_argv(task_name, taskfile_path, [f"{name}={value}" for name, value in (call_vars or {}).items()]),
+        cwd=cwd,
+        on_complete=on_complete,
+        meta=meta,
+        timeout=timeout
+    )
+
+def apply_pool_settings():
+    """
+    将界面设置应用到执行层；守护进程模式下同时启动守护进程并同步设置
+    
+    返回:
+        守护进程模式下守护进程是否可用，否则为True
+    """
+    try:
+        import streamlit as st
+        basic_settings = dict(st.session_state.get('basic_settings', {}) or {})
+    except Exception:
+        return True
+    apply_settings(basic_settings)
+    if not basic_settings.get('use_daemon', False):
+        return True
+    try:
+        daemon_client.ensure_daemon()
+        daemon_client.configure(basic_settings)
+        return True
+    except daemon_client.DaemonError as e:
+        print(f"连接守护进程时出错: {str(e)}")
+        return False
+
+def apply_settings(basic_settings):
+    """
+    将并发上限、队列容量、队列策略、优先级老化、标签并发上限与隔离槽位应用到执行池，
+    并同步重试策略、负载门控阈值、常驻shell池和运行日志的保留策略
+    
+    参数:
+        basic_settings: 基本设置字典
+    """
+    configure_pool(
+        max_workers=basic_settings.get('max_parallel_runs'),
+        max_queue_size=basic_settings.get('run_queue_size'),
+        queue_policy=basic_settings.get('queue_policy'),
+        aging_seconds=basic_settings.get('priority_aging_seconds'),
+        tag_limits=parse_tag_limits(basic_settings.get('tag_concurrency_limits', {})),
+        isolated_slots=basic_settings.get('flaky_isolated_slots')
+    )
+    configure_retry(
+        tag_attempts=parse_tag_limits(basic_settings.get('retry_tag_attempts', {})),
+        backoff=basic_settings.get('retry_backoff_seconds'),
+        max_backoff=basic_settings.get('retry_max_backoff_seconds'),
+        flaky_threshold=basic_settings.get('flaky_threshold')
+    )
+    configure_gate(
+        enabled=basic_settings.get('load_gate_enabled'),
+        max_cpu_percent=basic_settings.get('load_gate_max_cpu'),
+        max_load_per_cpu=basic_settings.get('load_gate_max_load'),
+        min_available_mb=basic_settings.get('load_gate_min_memory_mb')
+    )
+    configure_shell_pool(
+        enabled=basic_settings.get('shell_pool_enabled'),
+        size=basic_settings.get('shell_pool_size'),
+        max_commands=basic_settings.get('shell_pool_max_commands')
+    )
+    configure_sampler(
+        enabled=basic_settings.get('resource_sampling_enabled'),
+        interval=basic_settings.get('resource_sample_interval')
+    )
+    configure_logs(
+        max_files=basic_settings.get('max_log_files'),
+        max_total_mb=basic_settings.get('log_max_total_mb'),
+        max_age_days=basic_settings.get('log_retention_days')
+    )
+
+def submit_task_run(task_name, taskfile_path=None, priority=None, block=False, meta=None, direct=None, skip_deps=False,
+                    default_timeout=None, call_vars=None):
+    """
+    将后台运行提交到有界执行池
+    
+    参数:
+        task_name: 任务名称
+        taskfile_path: Taskfile路径
+        priority: 优先级（数值越小越先执行），None表示使用任务定义中的priority
+        block: 队列已满时是否阻塞等待
+        meta: 附加到运行记录上的元数据
+        direct: 是否直接执行；None表示使用设置（需在界面线程中调用）
+        skip_deps: 直接执行时忽略deps
+        default_timeout: 全局超时（秒）；None表示使用设置（需在界面线程中调用）
+        call_vars: 传给任务的变量 {名称: 值}
+        
+    返回:
+        Future对象（结果为运行记录）；队列已满时返回None
+    """
+    if direct is None:
+        direct = is_direct_execution()
+    if default_timeout is None:
+        default_timeout = get_default_timeout()
+    timeout = resolve_task_timeout(task_name, taskfile_path, default_timeout)
+    if priority is None:
+        priority = get_task_priority(task_name, taskfile_path)
+    tags = _get_task_tags(task_name, taskfile_path)
+    resources = get_task_resources(task_name, taskfile_path)
+    policy = resolve_retry_policy(task_name, taskfile_path)
+    flaky_key = task_id(taskfile_path, task_name) if taskfile_path else task_name
+    # 不稳定的任务在隔离槽位中运行，重试不会挤占其他任务的并发槽位
+    isolated = is_flaky(flaky_key)
+    
+    def submit_attempt(attempt, block):
+        attempt_meta = dict(meta or {}, attempt=attempt, max_attempts=policy["attempts"])
+        
+        def launch(on_complete):
+            return run_task_headless(task_name, taskfile_path, on_complete=on_complete, meta=attempt_meta,
+                                     direct=direct, skip_deps=skip_deps, timeout=timeout, call_vars=call_vars)
+        
+        return submit_run(task_name, launch, priority=priority, block=block, meta=attempt_meta, tags=tags,
+                          isolated=isolated, resources=resources)
+    
+    first = submit_attempt(1, block)
+    if first is None:
+        return None
+    
+    # 返回的Future在最后一次尝试结束后完成；每次尝试的结果都单独保存
+    result = Future()
+    statuses = []
+    
+    def on_attempt_done(future, attempt):
+        if future.cancelled():
+            result.cancel()
+            return
+        if future.exception() is not None:
+            _store_outcome({"task": task_name, "taskfile": taskfile_path, "status": "error",
+                            "error": str(future.exception()), "meta": dict(meta or {}, attempt=attempt)})
+            result.set_exception(future.exception())
+            return
+        record = dict(future.result(), attempt=attempt, max_attempts=policy["attempts"])
+        statuses.append(record.get("status"))
+        if should_retry(policy, record, attempt):
+            delay = backoff_delay(policy, attempt)
+            record["retry_in"] = delay
+            _store_outcome(record)
+            print(f"任务 {task_name} 第 {attempt} 次运行失败（退出码 {record.get('exit_code')}），{delay} 秒后重试")
+            timer = threading.Timer(delay, retry, args=(attempt + 1, record))
+            timer.daemon = True
+            timer.start()
+            return
+        finish(record)
+    
+    def finish(record, store=True):
+        try:
+            record["flakiness"] = record_attempts(flaky_key, statuses)
+        except Exception as e:
+            print(f"记录任务不稳定度时出错: {str(e)}")
+        if store:
+            _store_outcome(record)
+        result.set_result(record)
+    
+    def retry(attempt, last_record):
+        # 在定时器线程中提交，可以等待队列空位
+        error = "执行队列已满"
+        try:
+            future = submit_attempt(attempt, True)
+        except Exception as e:
+            error = str(e)
+            future = None
+        if future is None:
+            # 无法重试：以最后一次失败的运行结束，否则等待结果的调用方会一直挂起
+            # （该记录已经保存过，不再重复保存）
+            print(f"重试任务 {task_name} 时提交失败: {error}")
+            record = dict(last_record, retry_error=error)
+            record.pop("retry_in", None)
+            finish(record, store=False)
+            return
+        future.add_done_callback(lambda f: on_attempt_done(f, attempt))
+    
+    first.add_done_callback(lambda f: on_attempt_done(f, 1))
+    return result
+
+def submit_batch_run(task_names, taskfile_path=None, parallel=False, block=False, default_timeout=0):
+    """
+    把多个任务作为一次task调用提交到执行池（整个调用占用一个并发槽位）
+    
+    合并调用不按重试策略重试失败的任务（task在第一个失败后就停止整个调用），
+    需要重试的任务失败时只输出提示；需要重试时请关闭合并调用。
     
     参数:
         task_names: 任务名称列表
         taskfile_path: Taskfile路径
         parallel: 是否并行运行
+        block: 队列已满时是否阻塞等待
+        default_timeout: 全局超时（秒）
         
     返回:
-        结果列表，每个结果对应一个任务的运行对象
+        Future对象（结果为批量运行记录，batch_runs为各任务的运行记录）；队列已满时返回None
     """
-    if not task_names:
-        return []
+    # 只有每个任务都有超时时才限制整个调用：并行取最大值，顺序取总和
+    timeouts = [resolve_task_timeout(task_name, taskfile_path, default_timeout) for task_name in task_names]
+    timeout = None
+    if timeouts and all(timeouts):
+        timeout = max(timeouts) if parallel else sum(timeouts)
     
-    results = []
+    def launch(on_complete):
+        return start_batch(task_names, taskfile_path, parallel=parallel, on_complete=on_complete, timeout=timeout)
     
-    if parallel:
-        # 并行运行
-        threads = []
-        for task_name in task_names:
-            # 使用线程并行启动任务
-            thread = threading.Thread(
-                target=lambda t=task_name: results.append(run_task_via_cmd(t, taskfile_path))
-            )
-            threads.append(thread)
-            thread.start()
+    tags = sorted({tag for task_name in task_names for tag in _get_task_tags(task_name, taskfile_path)})
+    # 整个调用持有所有任务的资源锁（同一资源按最严格的模式）
+    resources = {}
+    for task_name in task_names:
+        for name, mode in get_task_resources(task_name, taskfile_path).items():
+            _add_resource(resources, name, mode)
+    priority = min(get_task_priority(task_name, taskfile_path) for task_name in task_names)
+    future = submit_run(f"批量({len(task_names)})", launch, priority=priority, block=block,
+                        meta={"batch_tasks": list(task_names)}, tags=tags, resources=resources)
+    if future is not None:
+        future.add_done_callback(_collect_batch_outcome)
+    return future
+
+def _collect_batch_outcome(future):
+    """批量运行完成回调：把每个任务的运行结果分别保存"""
+    if future.cancelled() or future.exception() is not None:
+        return
+    record = future.result()
+    for child in record.get("batch_runs", []):
+        if should_retry(resolve_retry_policy(child.get("task"), child.get("taskfile")), child, 1):
+            print(f"任务 {child.get('task')} 在合并调用中失败，合并调用不支持重试")
+        _store_outcome(dict(child, queue_wait=record.get("queue_wait"), priority=record.get("priority"),
+                            resource_wait=record.get("resource_wait")))
+
+def _store_outcome(record):
+    """保存运行结果，成功时记录源文件指纹"""
+    if record.get("status") == "success":
+        # 成功运行后记录源文件指纹，供后续的最新检查使用
+        try:
+            mark_built(record.get("taskfile"), record.get("task"))
+        except Exception as e:
+            print(f"记录任务指纹时出错: {str(e)}")
+    _RUN_OUTCOMES.append(record)
+
+def pop_run_outcomes():
+    """
+    取出所有尚未处理的运行结果
+    
+    返回:
+        运行记录列表（按完成顺序）
+    """
+    outcomes = []
+    while _RUN_OUTCOMES:
+        outcomes.append(_RUN_OUTCOMES.popleft())
+    return outcomes
+
+def run_task_via_cmd(task_name, taskfile_path=None, mode=None):
+    """
+    通过命令行运行任务
+    
+    参数:
+        task_name: 任务名称
+        taskfile_path: Taskfile路径
+        mode: 执行模式，默认使用设置中的执行模式
         
-        # 等待所有线程完成
-        for thread in threads:
-            thread.join(0.5)  # 设置超时，避免长时间等待
-    else:
-        # 顺序运行
-        for task_name in task_names:
-            process = run_task_via_cmd(task_name, taskfile_path)
-            results.append(process)
+    返回:
+        后台模式返回执行池Future（守护进程模式下为True），分离模式返回subprocess.Popen对象，启动失败返回None
+    """
+    mode = mode or get_execution_mode()
+    if mode == EXECUTION_MODE_DETACHED:
+        return run_task_detached(task_name, taskfile_path)
+    return _launch_tasks([task_name], taskfile_path, True, mode)[0]
+
+def plan_dependency_run(task_names, taskfile_path, estimate_duration=None):
+    """
+    为选中任务及其传递依赖生成DAG执行计划（含关键路径与预计总耗时）
+    
+    参数:
+        task_names: 选中的任务名称列表
+        taskfile_path: Taskfile路径
+        estimate_duration: 返回任务预计耗时（秒）的函数，无历史时返回None
+        
+    返回:
+        计划字典，见 scheduler.plan_dag_run；另含 rerun_deps: 任务名 -> 原因，
+        列出只能通过task运行、因而会再次运行自己deps的节点
+        
+    异常:
+        ValueError: 存在循环依赖
+    """
+    from src.services.taskfile import parse_taskfile
+    task_deps = {task['name']: task.get('deps', []) for task in parse_taskfile(taskfile_path)}
+    apply_pool_settings()
+    plan = plan_dag_run(
+        task_deps,
+        task_names,
+        estimate_duration or (lambda _name: None),
+        get_pool_settings()["max_workers"]
+    )
+    # task命令总会先运行任务自己的deps，有依赖的节点需要忽略deps直接执行，依赖才只运行一次；
+    # 无法直接执行或依赖了外部任务（由task处理）的节点只能回退到task
+    rerun_deps = {}
+    for name, deps in plan["graph"]["nodes"].items():
+        if not deps:
+            continue
+        external = [dep for dep in normalize_deps(task_deps.get(name)) if dep not in task_deps]
+        reason = f"依赖了外部任务 {', '.join(external)}" if external else explain_fallback(taskfile_path, name, skip_deps=True)
+        if reason:
+            rerun_deps[name] = reason
+    plan["rerun_deps"] = rerun_deps
+    return plan
+
+def run_dependency_plan(plan, taskfile_path, force=None, direct=None, default_timeout=None):
+    """
+    按DAG计划在后台执行任务：共享依赖只运行一次，独立分支并发运行
+    
+    有依赖的节点总是忽略deps直接执行（不受执行设置影响），计划中rerun_deps列出的节点除外
+    
+    参数:
+        plan: plan_dependency_run 的返回值
+        taskfile_path: Taskfile路径
+        force: 是否强制运行已是最新的任务，None表示使用界面中的设置
+        direct: 没有依赖的节点是否直接执行，None表示使用设置
+        default_timeout: 全局超时（秒），None表示使用设置
+        
+    返回:
+        dag_id
+        
+    异常:
+        daemon_client.DaemonError: 守护进程模式下守护进程不可用
+    """
+    if force is None:
+        # 在界面线程中调用：读取设置，守护进程模式下交给守护进程执行
+        force = is_force_run()
+        direct = is_direct_execution()
+        default_timeout = get_default_timeout()
+        if is_daemon_mode():
+            apply_pool_settings()
+            return daemon_client.start_dag(plan, taskfile_path, force, direct, default_timeout)
+        apply_pool_settings()
+    satisfied = set()
+    if not force:
+        satisfied = set(split_up_to_date(plan["graph"]["order"], taskfile_path)[1])
+    graph_nodes = plan["graph"]["nodes"]
+    rerun_deps = plan.get("rerun_deps") or {}
     
+    def submit(task_name):
+        # 依赖由调度器负责执行：有依赖的节点直接执行并忽略deps，通过task运行会再次运行deps
+        node_direct = task_name not in rerun_deps and (direct or bool(graph_nodes[task_name]))
+        return submit_task_run(task_name, taskfile_path, meta={"dag": True},
+                               direct=node_direct, skip_deps=True, default_timeout=default_timeout)
+    
+    return start_dag_run(plan, submit, satisfied=satisfied, taskfile=taskfile_path)
+
+def build_matrix_cells(taskfile_path, var_specs):
+    """
+    解析各变量的取值（列表或glob）并生成变量组合
+    
+    参数:
+        taskfile_path: Taskfile路径（相对glob以其所在目录为基准）
+        var_specs: {变量名: 取值文本或列表}
+        
+    返回:
+        单元列表，每项为 {变量名: 值}
+        
+    异常:
+        ValueError: 没有变量、某个变量没有取值或组合数超过上限
+    """
+    base_dir = os.path.dirname(os.path.abspath(taskfile_path)) if taskfile_path else None
+    var_values = {name.strip(): parse_matrix_values(spec, base_dir) for name, spec in var_specs.items() if name.strip()}
+    if not var_values:
+        raise ValueError("没有指定变量")
+    return expand_matrix(var_values)
+
+def run_matrix(task_name, taskfile_path, cells, max_concurrency=2, direct=None, default_timeout=None):
+    """
+    按变量组合扇出运行任务，每个组合是一次独立的后台运行，结果照常写入运行历史
+    
+    参数:
+        task_name: 任务名称
+        taskfile_path: Taskfile路径
+        cells: build_matrix_cells 的返回值
+        max_concurrency: 矩阵内的并发上限（同时受执行池上限约束）
+        direct: 是否直接执行，None表示使用设置（需在界面线程中调用）
+        default_timeout: 全局超时（秒），None表示使用设置
+        
+    返回:
+        matrix_id
+        
+    异常:
+        daemon_client.DaemonError: 守护进程模式下守护进程不可用
+    """
+    if direct is None:
+        # 在界面线程中调用：读取设置，守护进程模式下交给守护进程执行
+        direct = is_direct_execution()
+        default_timeout = get_default_timeout()
+        apply_pool_settings()
+        if is_daemon_mode():
+            return daemon_client.start_matrix(task_name, taskfile_path, cells, max_concurrency, direct, default_timeout)
+    
+    def submit(call_vars, block):
+        return submit_task_run(task_name, taskfile_path, block=block, meta={"matrix": True}, direct=direct,
+                               default_timeout=default_timeout, call_vars=call_vars)
+    
+    return start_matrix_run(task_name, taskfile_path, cells, submit, max_concurrency)
+
+def sync_watch_triggers(bindings, direct=None, default_timeout=None):
+    """
+    应用文件监视触发的绑定：匹配的文件变化经过防抖后提交一次后台运行
+    
+    参数:
+        bindings: 绑定列表，见 file_watch.sync_watches
+        direct: 是否直接执行，None表示使用设置（需在界面线程中调用）
+        default_timeout: 全局超时（秒），None表示使用设置
+        
+    异常:
+        daemon_client.DaemonError: 守护进程模式下守护进程不可用
+    """
+    if direct is None:
+        # 在界面线程中调用：读取设置，守护进程模式下由守护进程监视（本进程的监视全部停止）
+        direct = is_direct_execution()
+        default_timeout = get_default_timeout()
+        apply_pool_settings()
+        if is_daemon_mode():
+            sync_watches([], None)
+            daemon_client.sync_watches(bindings, direct, default_timeout)
+            return
+    
+    def submit_factory(binding):
+        def submit():
+            return submit_task_run(binding["task"], binding.get("taskfile"), block=True,
+                                   meta={"trigger": "watch", "watch_id": binding["id"]},
+                                   direct=direct, default_timeout=default_timeout)
+        return submit
+    
+    sync_watches(bindings, submit_factory)
+
+def sync_cron_schedules(bindings, direct=None, default_timeout=None):
+    """
+    应用定时计划：到达cron表达式的触发时间时提交一次后台运行，停机期间错过的按补跑策略处理
+    
+    参数:
+        bindings: 绑定列表，见 cron_scheduler.sync_schedules
+        direct: 是否直接执行，None表示使用设置（需在界面线程中调用）
+        default_timeout: 全局超时（秒），None表示使用设置
+        
+    异常:
+        daemon_client.DaemonError: 守护进程模式下守护进程不可用
+    """
+    if direct is None:
+        # 在界面线程中调用：读取设置，守护进程模式下由守护进程定时（本进程的计划全部停止）
+        direct = is_direct_execution()
+        default_timeout = get_default_timeout()
+        apply_pool_settings()
+        if is_daemon_mode():
+            sync_schedules([], None)
+            daemon_client.sync_schedules(bindings, direct, default_timeout)
+            return
+    
+    def submit_factory(binding):
+        def submit():
+            return submit_task_run(binding["task"], binding.get("taskfile"), block=True,
+                                   meta={"trigger": "cron", "schedule_id": binding["id"]},
+                                   direct=direct, default_timeout=default_timeout)
+        return submit
+    
+    sync_schedules(bindings, submit_factory)
+
+def _submit_sequence(task_names, taskfile_path, futures, direct, default_timeout):
+    """后台模式下的顺序运行：前一个任务结束后再提交下一个"""
+    def submit_next(index):
+        if index >= len(task_names):
+            return
+        # 首个任务在调用线程中提交，不阻塞；后续任务在完成回调中提交，可等待队列空位
+        future = submit_task_run(task_names[index], taskfile_path, block=index > 0, direct=direct,
+                                 default_timeout=default_timeout)
+        futures.append(future)
+        if future is None:
+            print(f"执行队列已满，顺序运行在任务 {task_names[index]} 处中止")
+            return
+        future.add_done_callback(lambda _f: submit_next(index + 1))
+    
+    submit_next(0)
+
+def launch_headless_batch(task_names, taskfile_path, parallel, direct=False, default_timeout=0, batch=False,
+                          durations=None):
+    """
+    在本进程的执行池中启动多个后台任务（不读取界面设置，守护进程也使用此函数）
+    
+    参数:
+        task_names: 任务名称列表
+        taskfile_path: Taskfile路径
+        parallel: 是否并行运行
+        direct: 是否直接执行
+        default_timeout: 全局超时（秒）
+        batch: 是否合并为一次task调用（直接执行时不合并，直接执行本身已省去task的开销）
+        durations: 任务名 -> 历史耗时估计（秒）；并行运行时按最长耗时优先的顺序提交
+        
+    返回:
+        Future列表（队列已满时为None）；顺序运行时列表随任务提交逐步填充；
+        合并调用时每个任务对应同一个Future
+    """
+    results = []
+    if batch and not direct and len(task_names) > 1:
+        if not parallel:
+            task_names = sorted(task_names, key=lambda task_name: get_task_priority(task_name, taskfile_path))
+        future = submit_batch_run(task_names, taskfile_path, parallel, default_timeout=default_timeout)
+        return [future] * len(task_names)
+    if parallel:
+        # 并行运行：全部提交到有界执行池，由池控制并发上限；
+        # 耗时长的任务先启动（LPT），避免最后只剩一个长任务在运行，缩短整体完成时间
+        settings = get_pool_settings()
+        priority = None
+        if settings["queue_policy"] == QUEUE_POLICY_PRIORITY:
+            priority = lambda task_name: get_task_priority(task_name, taskfile_path)
+        plan = plan_parallel_batch(task_names, durations or {}, settings["max_workers"], priority)
+        futures = {}
+        for task_name in plan["order"]:
+            futures[task_name] = submit_task_run(task_name, taskfile_path, direct=direct, default_timeout=default_timeout)
+        if len(task_names) > 1:
+            track_parallel_batch(plan, futures, taskfile_path)
+        results.extend(futures[task_name] for task_name in task_names)
+    else:
+        # 顺序运行：后台按优先级依次执行（同优先级保持选择顺序）
+        ordered = sorted(task_names, key=lambda task_name: get_task_priority(task_name, taskfile_path))
+        _submit_sequence(ordered, taskfile_path, results, direct, default_timeout)
     return results
 
-def run_multiple_tasks(task_names, taskfile_path, parallel=False):
+def _launch_tasks(task_names, taskfile_path, parallel, mode):
+    """按执行模式启动多个任务，返回每个任务的启动结果（Future、Popen或守护进程接受标记）"""
+    if mode == EXECUTION_MODE_DETACHED:
+        # 分离模式只负责打开终端窗口，启动本身是非阻塞的，无需额外线程
+        return [run_task_detached(task_name, taskfile_path) for task_name in task_names]
+    
+    # 后续任务可能在后台线程中提交，无法读取设置，先在界面线程中取出
+    direct = is_direct_execution()
+    default_timeout = get_default_timeout()
+    batch = is_batch_invocation()
+    durations = get_duration_estimates(task_names, taskfile_path) if parallel and len(task_names) > 1 else None
+    if is_daemon_mode():
+        if not apply_pool_settings():
+            return [None] * len(task_names)
+        try:
+            accepted = daemon_client.launch(task_names, taskfile_path, parallel, direct, default_timeout, batch,
+                                            durations)
+        except daemon_client.DaemonError as e:
+            print(f"提交任务到守护进程时出错: {str(e)}")
+            return [None] * len(task_names)
+        return [True if ok else None for ok in accepted]
+    
+    apply_pool_settings()
+    return launch_headless_batch(task_names, taskfile_path, parallel, direct, default_timeout, batch, durations)
+
+def split_up_to_date(task_names, taskfile_path):
+    """
+    按sources/generates指纹把任务分为需要运行与已是最新两组
+    
+    参数:
+        task_names: 任务名称列表
+        taskfile_path: Taskfile路径
+        
+    返回:
+        (需要运行的任务列表, 已是最新的任务列表)
+    """
+    if not taskfile_path:
+        return list(task_names), []
+    statuses = check_tasks([(taskfile_path, name) for name in task_names])
+    stale, fresh = [], []
+    for task_name in task_names:
+        target = fresh if statuses.get(task_id(taskfile_path, task_name)) == STATUS_UP_TO_DATE else stale
+        target.append(task_name)
+    return stale, fresh
+
+def run_tasks_via_cmd(task_names, taskfile_path, parallel=False):
     """
     运行多个任务
     
@@ -105,35 +950,49 @@ def run_multiple_tasks(task_names, taskfile_path, parallel=False):
         taskfile_path: Taskfile路径
         parallel: 是否并行运行
         
+    返回:
+        结果列表：后台模式为执行池Future（队列已满时为None），分离模式为Popen对象
+    """
+    if not task_names:
+        return []
+    
+    return _launch_tasks(task_names, taskfile_path, parallel, get_execution_mode())
+
+def run_multiple_tasks(task_names, taskfile_path, parallel=False, force=None):
+    """
+    运行多个任务（已是最新的任务默认跳过）
+    
+    参数:
+        task_names: 任务名称列表
+        taskfile_path: Taskfile路径
+        parallel: 是否并行运行
+        force: 是否强制运行已是最新的任务，默认使用界面中的设置
+        
     返回:
         消息列表，每个消息对应一个任务的运行结果
     """
     if not task_names:
         return ["没有指定任务"]
     
-    messages = []
+    skipped = []
+    if not (is_force_run() if force is None else force):
+        task_names, skipped = split_up_to_date(task_names, taskfile_path)
+    skipped_messages = [f"任务 {task_name} 已是最新，已跳过" for task_name in skipped]
+    if not task_names:
+        return skipped_messages
     
-    if parallel:
-        # 并行运行
-        threads = []
-        for task_name in task_names:
-            thread = threading.Thread(
-                target=lambda: run_task_via_cmd(task_name, taskfile_path)
-            )
-            threads.append(thread)
-            thread.start()
-            messages.append(f"任务 {task_name} 已在新窗口启动")
-        
-        # 等待所有线程完成（通常是立即返回的，因为只是启动进程）
-        for thread in threads:
-            thread.join(0.1)  # 设置超时，避免长时间等待
-    else:
-        # 顺序运行
-        for task_name in task_names:
-            process = run_task_via_cmd(task_name, taskfile_path)
-            if process:
-                messages.append(f"任务 {task_name} 已在新窗口启动")
-            else:
-                messages.append(f"任务 {task_name} 启动失败")
+    mode = get_execution_mode()
+    results = _launch_tasks(task_names, taskfile_path, parallel, mode)
+    
+    if mode == EXECUTION_MODE_HEADLESS and not parallel:
+        return [f"{len(task_names)} 个任务将在后台依次运行"] + skipped_messages
+    
+    messages = list(skipped_messages)
+    started_msg = "已在新窗口启动" if mode == EXECUTION_MODE_DETACHED else "已加入执行队列"
+    for task_name, result in zip(task_names, results):
+        if result is not None:
+            messages.append(f"任务 {task_name} {started_msg}")
+        else:
+            messages.append(f"任务 {task_name} 启动失败（执行队列已满）" if mode == EXECUTION_MODE_HEADLESS else f"任务 {task_name} 启动失败")
     
-    return messages 
\ No newline at end of file
+    return messages
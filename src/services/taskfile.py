@@ -4,6 +4,54 @@ import json
 import pandas as pd
 import streamlit as st
 
+def parse_taskfile(file_path):
+    """
+    解析Taskfile并返回任务记录列表（不依赖Streamlit，可在线程池中调用）
+    
+    参数:
+        file_path: Taskfile路径
+        
+    返回:
+        任务信息字典列表
+        
+    异常:
+        文件不存在或YAML解析失败时抛出原始异常
+    """
+    # 读取YAML文件
+    with open(file_path, 'r', encoding='utf-8') as f:
+        taskfile_data = yaml.safe_load(f) or {}
+    
+    # 提取任务
+    tasks_dict = taskfile_data.get('tasks', {}) or {}
+    
+    # 将任务转换为记录列表
+    tasks = []
+    for task_name, task_info in tasks_dict.items():
+        # 简写形式的任务（直接是命令字符串或列表）
+        if not isinstance(task_info, dict):
+            task_info = {'cmds': task_info if isinstance(task_info, list) else [task_info]}
+        
+        # 基本信息
+        task_data = {
+            'name': task_name,
+            'description': task_info.get('desc', ''),
+            'directory': task_info.get('dir', ''),
+            'emoji': task_info.get('emoji', ''),
+            'tags': task_info.get('tags', []),
+            'group': task_info.get('group', '默认'),
+            'priority': task_info.get('priority', 5),
+            'vars': task_info.get('vars', {}),
+            'deps': task_info.get('deps', []),
+            'cmds': task_info.get('cmds', []),
+            # 增量构建相关字段（用于判断任务是否已是最新）
+            'sources': task_info.get('sources', []),
+            'generates': task_info.get('generates', []),
+            'method': task_info.get('method', '')
+        }
+        tasks.append(task_data)
+    
+    return tasks
+
 def read_taskfile(file_path):
     """
     读取Taskfile并返回DataFrame
@@ -19,33 +67,8 @@ def read_taskfile(file_path):
         return pd.DataFrame()
     
     try:
-        # 读取YAML文件
-        with open(file_path, 'r', encoding='utf-8') as f:
-            taskfile_data = yaml.safe_load(f)
-        
-        # 提取任务
-        tasks_dict = taskfile_data.get('tasks', {})
-        
-        # 将任务转换为DataFrame
-        tasks = []
-        for task_name, task_info in tasks_dict.items():
-            # 基本信息
-            task_data = {
-                'name': task_name,
-                'description': task_info.get('desc', ''),
-                'directory': task_info.get('dir', ''),
-                'emoji': task_info.get('emoji', ''),
-                'tags': task_info.get('tags', []),
-                'group': task_info.get('group', '默认'),
-                'priority': task_info.get('priority', 5),
-                'vars': task_info.get('vars', {}),
-                'deps': task_info.get('deps', []),
-                'cmds': task_info.get('cmds', [])
-            }
-            tasks.append(task_data)
-        
         # 创建DataFrame
-        tasks_df = pd.DataFrame(tasks)
+        tasks_df = pd.DataFrame(parse_taskfile(file_path))
         
         # 确保所有必要的列都存在
         required_columns = ['name', 'description', 'directory', 'emoji', 'tags', 'group', 'priority']
@@ -86,46 +109,6 @@ def load_taskfile(file_path):
     # 读取任务数据
     return read_taskfile(file_path)
 
-def prepare_dataframe(df):
-    """
-    准备DataFrame以供显示
-    
-    参数:
-        df: 原始DataFrame
-        
-    返回:
-        处理后的DataFrame
-    """
-    if df.empty:
-        return df
-    
-    # 确保所有必要的列都存在
-    required_columns = ['name', 'description', 'directory', 'emoji', 'tags', 'group', 'priority']
-    for col in required_columns:
-        if col not in df.columns:
-            df[col] = ''
-    
-    # 处理排序
-    if 'sort_by' in st.session_state and 'sort_order' in st.session_state:
-        sort_by = st.session_state.sort_by
-        sort_order = st.session_state.sort_order
-        
-        # 映射UI显示名称到DataFrame列名
-        sort_column_map = {
-            '名称': 'name',
-            '描述': 'description',
-            '目录': 'directory',
-            '组': 'group',
-            '优先级': 'priority'
-        }
-        
-        if sort_by in sort_column_map:
-            column = sort_column_map[sort_by]
-            ascending = (sort_order == '升序')
-            df = df.sort_values(by=column, ascending=ascending)
-    
-    return df
-
 def filter_tasks(tasks_df):
     """
     根据过滤条件过滤任务
@@ -157,4 +140,41 @@ def filter_tasks(tasks_df):
             lambda x: any(tag in x for tag in tags_to_filter) if isinstance(x, list) else False
         )]
     
-    return filtered_df 
\ No newline at end of file
+    return filtered_df 
+
+
+def is_workspace_mode():
+    """
+    是否启用了工作区模式（加载发现的所有Taskfile）
+    
+    返回:
+        布尔值
+    """
+    basic_settings = st.session_state.get('basic_settings', {}) or {}
+    return bool(basic_settings.get('workspace_mode', False))
+
+
+def load_task_catalog(current_taskfile):
+    """
+    加载当前任务目录：工作区模式下合并所有发现的Taskfile，否则只读取当前Taskfile
+    
+    参数:
+        current_taskfile: 当前Taskfile路径
+        
+    返回:
+        包含任务信息的DataFrame
+    """
+    if not is_workspace_mode():
+        return read_taskfile(current_taskfile)
+    
+    from src.services.workspace import load_workspace
+    from src.utils.file_utils import find_taskfiles
+    
+    taskfiles = find_taskfiles()
+    if current_taskfile and current_taskfile not in taskfiles:
+        taskfiles.append(current_taskfile)
+    
+    tasks_df, errors = load_workspace(taskfiles)
+    for file_path, error in errors.items():
+        st.warning(f"读取Taskfile时出错 ({file_path}): {error}")
+    return tasks_df
@@ -0,0 +1,202 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from src.services.taskfile import parse_taskfile
+
+# 工作区任务键中文件ID与任务名之间的分隔符
+TASK_KEY_SEP = "::"
+
+# 工作区目录缓存：按 (路径, mtime, size) 签名缓存合并后的目录，避免每次rerun重复解析
+_WORKSPACE_CACHE = {}
+_WORKSPACE_CACHE_LOCK = threading.Lock()
+
+# 并行解析Taskfile的最大线程数
+MAX_LOAD_WORKERS = 8
+
+def make_file_id(file_path, root_dir=None):
+    """
+    为Taskfile生成稳定的文件ID（相对于工作区根目录的路径）
+
+    参数:
+        file_path: Taskfile路径
+        root_dir: 工作区根目录，默认为当前工作目录
+
+    返回:
+        使用"/"分隔的相对路径字符串
+    """
+    root_dir = root_dir or os.getcwd()
+    abs_path = os.path.abspath(file_path)
+    try:
+        rel_path = os.path.relpath(abs_path, os.path.abspath(root_dir))
+    except ValueError:
+        # Windows下不同盘符无法计算相对路径
+        rel_path = abs_path
+    return rel_path.replace(os.sep, "/")
+
+def make_task_key(file_id, task_name):
+    """
+    根据 (file_id, name) 生成任务键
+
+    参数:
+        file_id: 文件ID
+        task_name: 任务名称
+
+    返回:
+        任务键字符串
+    """
+    return f"{file_id}{TASK_KEY_SEP}{task_name}"
+
+def split_task_key(task_key):
+    """
+    将任务键拆分为 (file_id, name)
+
+    参数:
+        task_key: 任务键
+
+    返回:
+        (file_id, name) 元组；非工作区键的file_id为None
+    """
+    if TASK_KEY_SEP in task_key:
+        file_id, task_name = task_key.split(TASK_KEY_SEP, 1)
+        return file_id, task_name
+    return None, task_key
+
+def get_task_key(task):
+    """
+    获取任务的唯一键：工作区模式下为 file_id::name，单文件模式下为任务名
+
+    参数:
+        task: 任务数据（dict或pandas.Series）
+
+    返回:
+        任务键字符串
+    """
+    task_key = task.get('task_key') if hasattr(task, 'get') else None
+    if isinstance(task_key, str) and task_key:
+        return task_key
+    return task['name']
+
+def get_task_taskfile(task, default_taskfile=None):
+    """
+    获取任务所属的Taskfile路径
+
+    参数:
+        task: 任务数据（dict或pandas.Series）
+        default_taskfile: 任务未记录来源文件时使用的默认路径
+
+    返回:
+        Taskfile路径
+    """
+    taskfile = task.get('taskfile') if hasattr(task, 'get') else None
+    if isinstance(taskfile, str) and taskfile:
+        return taskfile
+    return default_taskfile
+
+def _file_signature(file_path):
+    """获取文件签名 (路径, mtime_ns, size)，文件不可访问时返回None"""
+    try:
+        stat = os.stat(file_path)
+        return (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
+
+def _load_one(file_path, root_dir):
+    """解析单个Taskfile并补充工作区列，返回 (file_path, 任务列表, 错误信息)"""
+    try:
+        tasks = parse_taskfile(file_path)
+    except Exception as e:
+        return file_path, [], str(e)
+
+    file_id = make_file_id(file_path, root_dir)
+    for task in tasks:
+        task['file_id'] = file_id
+        task['taskfile'] = file_path
+        task['task_key'] = make_task_key(file_id, task['name'])
+    return file_path, tasks, None
+
+def build_tag_index(tasks_df):
+    """
+    构建标签倒排索引
+
+    参数:
+        tasks_df: 合并后的任务数据框
+
+    返回:
+        dict: 标签 -> 任务键集合
+    """
+    tag_index = {}
+    for task_key, tags in zip(tasks_df['task_key'], tasks_df['tags']):
+        if isinstance(tags, list):
+            for tag in tags:
+                tag_index.setdefault(tag, set()).add(task_key)
+    return tag_index
+
+def load_workspace(taskfile_paths, root_dir=None, max_workers=None):
+    """
+    并行加载多个Taskfile并合并为一个任务目录
+
+    参数:
+        taskfile_paths: Taskfile路径列表
+        root_dir: 工作区根目录，用于生成文件ID
+        max_workers: 线程池大小，默认为 min(文件数, MAX_LOAD_WORKERS)
+
+    返回:
+        (tasks_df, errors) 元组：
+            tasks_df 包含 file_id/taskfile/task_key/search_text 列的合并数据框，
+            其 attrs["tag_index"] 为标签倒排索引；
+            errors 为 {文件路径: 错误信息}
+    """
+    root_dir = root_dir or os.getcwd()
+    signatures = tuple(sig for sig in (_file_signature(p) for p in taskfile_paths) if sig)
+    cache_key = (os.path.abspath(root_dir), signatures)
+
+    with _WORKSPACE_CACHE_LOCK:
+        cached = _WORKSPACE_CACHE.get(cache_key)
+    if cached is not None:
+        return cached[0].copy(), dict(cached[1])
+
+    paths = [sig[0] for sig in signatures]
+    records = []
+    errors = {}
+
+    if paths:
+        workers = max_workers or min(len(paths), MAX_LOAD_WORKERS)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="taskfile-loader") as pool:
+            # map保持输入顺序，保证合并结果稳定
+            for file_path, tasks, error in pool.map(lambda p: _load_one(p, root_dir), paths):
+                if error:
+                    errors[file_path] = error
+                records.extend(tasks)
+
+    tasks_df = pd.DataFrame(records)
+
+    # 确保所有必要的列都存在
+    required_columns = ['name', 'description', 'directory', 'emoji', 'tags', 'group', 'priority',
+                        'file_id', 'taskfile', 'task_key']
+    for col in required_columns:
+        if col not in tasks_df.columns:
+            tasks_df[col] = ''
+
+    if not tasks_df.empty:
+        tasks_df['tags'] = tasks_df['tags'].apply(lambda x: x if isinstance(x, list) else [])
+        # 预先计算搜索列，使整个工作区的搜索只需一次向量化匹配
+        tasks_df['search_text'] = (
+            tasks_df['name'].astype(str) + " " +
+            tasks_df['description'].astype(str) + " " +
+            tasks_df['tags'].apply(" ".join) + " " +
+            tasks_df['file_id'].astype(str)
+        ).str.lower()
+        tasks_df.attrs['tag_index'] = build_tag_index(tasks_df)
+
+    with _WORKSPACE_CACHE_LOCK:
+        # 只保留最新的一份工作区目录
+        _WORKSPACE_CACHE.clear()
+        _WORKSPACE_CACHE[cache_key] = (tasks_df, errors)
+
+    return tasks_df.copy(), dict(errors)
+
+def clear_workspace_cache():
+    """清除工作区目录缓存"""
+    with _WORKSPACE_CACHE_LOCK:
+        _WORKSPACE_CACHE.clear()
@@ -3,8 +3,12 @@ import pandas as pd
 import numpy as np
 from streamlit_echarts import st_echarts
 from datetime import datetime, timedelta
-from src.utils.selection_utils import get_global_state, get_selected_tasks
+from src.utils.selection_utils import get_global_state, get_selected_tasks, get_task_runtime
 from src.components.tag_filters import get_all_tags
+from src.services.load_gate import DECISION_DEFERRED
+from src.services.regression import Z_THRESHOLD, P90_RATIO, MIN_BASELINE_RUNS
+from src.services.run_backend import get_gate_snapshot, list_runs, get_run_resources
+from src.services.run_pool import priority_level
 
 def render_dashboard():
     """渲染仪表盘页面"""
@@ -12,8 +16,12 @@ def render_dashboard():
     
     # 获取全局状态和任务数据
     global_state = get_global_state()
-    tasks_data = global_state.get('tasks', {})
     task_files = global_state.get('task_files', {})
+    # 运行时数据保存在task_files的task_state中，合并到任务数据上供各图表读取
+    tasks_data = {
+        task_name: dict(task_info, runtime=get_task_runtime(task_name))
+        for task_name, task_info in global_state.get('tasks', {}).items()
+    }
     
     # 如果没有任务数据，显示提示信息
     if not tasks_data:
@@ -37,6 +45,15 @@ def render_dashboard():
         render_execution_history(tasks_data)
         render_tag_distribution(tasks_data)
         render_execution_time(tasks_data)
+    
+    # 耗时相对基线显著变长的运行
+    render_duration_regressions(tasks_data)
+    
+    # 按资源消耗排列任务（用于调整并发上限）
+    render_resource_usage(tasks_data)
+    
+    # 负载门控的准入记录（用于调整阈值）
+    render_load_gating()
 
 def render_top_metrics(tasks_data):
     """渲染顶部关键指标"""
@@ -296,8 +313,9 @@ def render_priority_distribution(tasks_data):
     priority_counts = {"高": 0, "中": 0, "低": 0, "未设置": 0}
     
     # 遍历所有任务，统计不同优先级的任务数量
+    # 与执行队列使用同一套换算：数值优先级按高/中/低分组
     for task_name, task_info in tasks_data.items():
-        priority = task_info.get('priority', 'medium')
+        priority = priority_level(task_info.get('priority', 'medium'))
         
         if priority == 'high':
             priority_counts["高"] += 1
@@ -346,7 +364,7 @@ def render_execution_time(tasks_data):
     
     for task_name, task_info in tasks_data.items():
         runtime = task_info.get('runtime', {})
-        duration = runtime.get('duration', 0)
+        duration = runtime.get('duration') or 0
         
         # 只处理有执行时间记录的任务
         if duration > 0:
@@ -385,3 +403,196 @@ def render_execution_time(tasks_data):
     
     # 显示条形图
     st_echarts(options=bar_options, height="300px")
+
+def render_duration_regressions(tasks_data):
+    """渲染被标记为耗时回归的运行列表"""
+    st.markdown("### 耗时回归")
+    
+    regressions = [
+        regression
+        for task_info in tasks_data.values()
+        for regression in task_info.get("runtime", {}).get("regressions", [])
+    ]
+    st.caption(f"成功运行的耗时比基线（对数耗时的指数加权均值）高出 {Z_THRESHOLD:.0f} 个标准差以上、"
+               f"且至少是历史p90的 {P90_RATIO} 倍时标记；每个任务需要先有 {MIN_BASELINE_RUNS} 次成功运行作为基线")
+    if not regressions:
+        st.info("没有被标记的运行")
+        return
+    
+    regressions.sort(key=lambda regression: regression.get("started_at") or "", reverse=True)
+    regressions_df = pd.DataFrame([
+        {
+            "时间": (regression.get("started_at") or "")[:19].replace("T", " "),
+            "任务": regression["task"],
+            "耗时(秒)": regression["duration"],
+            "基线(秒)": regression["baseline"],
+            "p50(秒)": regression["p50"],
+            "p90(秒)": regression["p90"],
+            "倍数": regression["ratio"],
+            "z值": regression["z"],
+            "运行ID": regression.get("run_id"),
+        }
+        for regression in regressions
+    ])
+    st.dataframe(regressions_df, use_container_width=True, hide_index=True)
+
+# 资源排行可选的指标：列名 -> 说明
+RESOURCE_METRICS = {
+    "CPU时间(秒)": "每次运行消耗的CPU时间（整个进程树；在常驻shell中执行的运行不记录）",
+    "平均CPU(%)": "运行期间进程树CPU使用率的均值，100%相当于占满一个核心",
+    "峰值CPU(%)": "运行期间进程树CPU使用率的峰值",
+    "峰值内存(MB)": "运行期间进程树常驻内存之和的峰值",
+    "读写量(MB)": "每次运行读写磁盘的字节数",
+    "峰值线程数": "运行期间进程树线程数的峰值",
+}
+# 资源排行使用的最近运行次数
+RESOURCE_HISTORY_RUNS = 10
+
+def _mean(values):
+    values = [value for value in values if value is not None]
+    return round(sum(values) / len(values), 2) if values else None
+
+def _resource_row(task_name, run_history):
+    """按最近几次运行的记录计算任务的平均资源消耗"""
+    runs = [entry for entry in run_history if entry.get("duration") is not None][-RESOURCE_HISTORY_RUNS:]
+    sampled = [entry["resources"] for entry in runs if entry.get("resources")]
+    if not runs:
+        return None
+    mb = 1024 * 1024
+    # wait4记录的峰值包含已回收的子进程，比采样更准确，优先使用
+    peaks = [entry.get("peak_rss") or (entry.get("resources") or {}).get("rss_peak") for entry in runs]
+    return {
+        "任务": task_name,
+        "运行次数": len(runs),
+        "CPU时间(秒)": _mean(entry.get("cpu_time") for entry in runs),
+        "平均CPU(%)": _mean(res["cpu_percent_mean"] for res in sampled),
+        "峰值CPU(%)": _mean(res["cpu_percent_peak"] for res in sampled),
+        "峰值内存(MB)": _mean(peak / mb for peak in peaks if peak),
+        "读写量(MB)": _mean((res["read_bytes"] + res["write_bytes"]) / mb for res in sampled),
+        "峰值线程数": _mean(res["threads_peak"] for res in sampled),
+    }
+
+def render_resource_usage(tasks_data):
+    """渲染任务资源消耗排行和单次运行的资源曲线"""
+    st.markdown("### 资源消耗")
+    
+    rows = []
+    for task_name, task_info in tasks_data.items():
+        row = _resource_row(task_name, task_info.get("runtime", {}).get("run_history", []))
+        if row:
+            rows.append(row)
+    if not rows:
+        st.info("没有资源占用数据，在后台运行任务后显示")
+    else:
+        metric = st.selectbox("排序指标", list(RESOURCE_METRICS), key="dashboard_resource_metric",
+                              help="按最近几次运行的平均值排列")
+        st.caption(RESOURCE_METRICS[metric])
+        ranked = sorted((row for row in rows if row[metric] is not None), key=lambda row: row[metric], reverse=True)
+        if ranked:
+            top = ranked[:10]
+            bar_options = {
+                "tooltip": {"trigger": "axis", "axisPointer": {"type": "shadow"}},
+                "grid": {"left": "3%", "right": "4%", "bottom": "15%", "containLabel": True},
+                "xAxis": {"type": "category", "data": [row["任务"] for row in top], "axisLabel": {"interval": 0, "rotate": 30}},
+                "yAxis": {"type": "value", "name": metric},
+                "series": [{"name": metric, "type": "bar", "data": [row[metric] for row in top],
+                            "itemStyle": {"color": "#91cc75"}}],
+            }
+            st_echarts(options=bar_options, height="300px")
+            st.dataframe(pd.DataFrame(ranked), use_container_width=True, hide_index=True)
+        else:
+            st.info("所选指标没有数据（运行短于采样间隔时只记录CPU时间和内存峰值）")
+    
+    render_run_resources()
+
+def render_run_resources():
+    """渲染所选运行的CPU和内存曲线"""
+    runs = [run for run in reversed(list_runs()) if run.get("resources") or run["status"] == "running"]
+    if not runs:
+        return
+    labels = {run["run_id"]: f"{run['task']} · {run['status']} · {run['started_at'][11:19]}" for run in runs}
+    run_id = st.selectbox("运行的资源曲线", list(labels), format_func=labels.get, key="dashboard_resource_run")
+    series = get_run_resources(run_id)
+    if not series or not series["points"]:
+        st.info("该运行没有采样数据")
+        return
+    index = {field: position for position, field in enumerate(series["fields"])}
+    points = series["points"]
+    line_options = {
+        "tooltip": {"trigger": "axis"},
+        "legend": {"data": ["CPU (%)", "内存 (MB)", "读写 (MB)"]},
+        "grid": {"left": "3%", "right": "4%", "bottom": "3%", "containLabel": True},
+        "xAxis": {"type": "category", "data": [f"{point[index['t']]:.1f}s" for point in points]},
+        "yAxis": [{"type": "value", "name": "CPU (%)"}, {"type": "value", "name": "MB"}],
+        "series": [
+            {"name": "CPU (%)", "type": "line", "data": [point[index["cpu_percent"]] for point in points]},
+            {"name": "内存 (MB)", "type": "line", "yAxisIndex": 1,
+             "data": [round(point[index["rss"]] / (1024 * 1024), 1) for point in points]},
+            {"name": "读写 (MB)", "type": "line", "yAxisIndex": 1,
+             "data": [round((point[index["read_bytes"]] + point[index["write_bytes"]]) / (1024 * 1024), 1)
+                      for point in points]},
+        ],
+    }
+    st_echarts(options=line_options, height="260px")
+    summary = series.get("summary")
+    if summary:
+        st.caption(f"CPU 均值 {summary['cpu_percent_mean']:.0f}% / 峰值 {summary['cpu_percent_peak']:.0f}% · "
+                   f"内存 均值 {summary['rss_mean'] / (1024 * 1024):.0f}MB / 峰值 {summary['rss_peak'] / (1024 * 1024):.0f}MB · "
+                   f"线程 峰值 {summary['threads_peak']} · 采样间隔 {series['interval']:.1f}s")
+
+def render_load_gating():
+    """渲染负载门控的负载采样与准入决策"""
+    st.markdown("### 负载门控")
+    
+    snapshot = get_gate_snapshot()
+    settings = snapshot["settings"]
+    counts = snapshot["counts"]
+    
+    if not settings["enabled"] and not snapshot["decisions"]:
+        st.info("负载门控未启用，可在设置中开启“按系统负载控制启动”")
+        return
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("放行", counts.get("admitted", 0))
+    with col2:
+        st.metric("被推迟的排队项", counts.get(DECISION_DEFERRED, 0))
+    with col3:
+        st.metric("状态", "已启用" if settings["enabled"] else "已停用")
+    st.caption(f"阈值: CPU ≤ {settings['max_cpu_percent']:.0f}% · 每核负载 ≤ {settings['max_load_per_cpu']:.2f} · "
+               f"可用内存 ≥ {settings['min_available_mb']:.0f}MB")
+    
+    samples = snapshot["samples"]
+    if samples:
+        # 负载采样曲线，虚线为阈值
+        times = [sample["time"][11:19] for sample in samples]
+        line_options = {
+            "tooltip": {"trigger": "axis"},
+            "legend": {"data": ["CPU (%)", "每核负载 (×100)"]},
+            "grid": {"left": "3%", "right": "4%", "bottom": "3%", "containLabel": True},
+            "xAxis": {"type": "category", "data": times},
+            "yAxis": {"type": "value"},
+            "series": [
+                {
+                    "name": "CPU (%)",
+                    "type": "line",
+                    "data": [sample["cpu_percent"] for sample in samples],
+                    "markLine": {"data": [{"yAxis": settings["max_cpu_percent"]}], "lineStyle": {"type": "dashed"}},
+                },
+                {
+                    "name": "每核负载 (×100)",
+                    "type": "line",
+                    "data": [round(sample["load_per_cpu"] * 100) if sample["load_per_cpu"] is not None else None
+                             for sample in samples],
+                    "markLine": {"data": [{"yAxis": settings["max_load_per_cpu"] * 100}], "lineStyle": {"type": "dashed"}},
+                },
+            ],
+        }
+        st_echarts(options=line_options, height="260px")
+    
+    decisions = snapshot["decisions"]
+    if decisions:
+        decisions_df = pd.DataFrame(list(reversed(decisions))[:100])
+        decisions_df = decisions_df[["time", "task", "decision", "reason", "active", "cpu_percent", "load_per_cpu", "available_mb"]]
+        decisions_df.columns = ["时间", "任务", "决策", "原因", "运行中", "CPU(%)", "每核负载", "可用内存(MB)"]
+        st.dataframe(decisions_df, use_container_width=True, hide_index=True)
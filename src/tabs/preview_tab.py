@@ -1,6 +1,9 @@
 import streamlit as st
 from src.utils.selection_utils import get_selected_tasks
 from src.views.card.card_view import render_card_view
+from src.components.matrix_panel import render_matrix_panel
+from src.components.watch_panel import render_watch_panel
+from src.components.schedule_panel import render_schedule_panel
 
 def render_preview_tab(filtered_df, default_taskfile):
     """渲染预览标签页"""
@@ -10,7 +13,14 @@ def render_preview_tab(filtered_df, default_taskfile):
         st.info("没有选中的任务。请从表格中选择要操作的任务。")
     else:
         # 筛选出选中的任务数据
-        selected_df = filtered_df[filtered_df['name'].isin(selected_tasks)].copy()
+        key_column = 'task_key' if 'task_key' in filtered_df.columns else 'name'
+        selected_df = filtered_df[filtered_df[key_column].isin(selected_tasks)].copy()
         # 使用卡片视图函数显示
         # st.markdown(f"## 已选择 {len(selected_tasks)} 个任务")
-        render_card_view(selected_df, default_taskfile, key_prefix="preview_view") 
\ No newline at end of file
+        render_card_view(selected_df, default_taskfile, key_prefix="preview_view")
+        # 为选中任务的变量指定多组取值，扇出运行
+        render_matrix_panel(selected_tasks, default_taskfile)
+    # 把任务绑定到目录，文件变化时自动运行（未选中任务时也显示已有的监视）
+    render_watch_panel(selected_tasks, default_taskfile)
+    # 按cron表达式定时运行任务
+    render_schedule_panel(selected_tasks, default_taskfile)
@@ -0,0 +1,40 @@
+import streamlit as st
+from src.services.run_backend import list_runs
+from src.components.run_log_panel import render_live_log_panels, MAX_LIVE_PANELS
+
+def render_runs_tab():
+    """渲染运行标签页：选择运行并实时查看输出"""
+    runs = list(reversed(list_runs()))
+    if not runs:
+        st.info("还没有后台运行。在卡片或任务操作中运行任务后，可在此实时查看输出。")
+        return
+
+    # 合并调用中的任务标注所属的批量运行
+    labels = {
+        run["run_id"]: f"{run['task']} · {run['status']} · {run['started_at'][11:19]}"
+                       + (f" · 批量 {run['meta']['batch_id']}" if run.get("meta", {}).get("batch_id") else "")
+                       + (" · 文件触发" if run.get("meta", {}).get("trigger") == "watch" else "")
+                       + (" · 定时" if run.get("meta", {}).get("trigger") == "cron" else "")
+        for run in runs
+    }
+    active_ids = [run["run_id"] for run in runs if run["status"] == "running"]
+
+    # 默认显示运行中的任务；用户手动选择后保持其选择
+    if "runs_tab_selected" not in st.session_state:
+        st.session_state.runs_tab_selected = active_ids[:MAX_LIVE_PANELS]
+    follow_active = st.checkbox("自动显示运行中的任务", value=True, key="runs_tab_follow_active")
+    if follow_active:
+        selected = list(dict.fromkeys(active_ids + [rid for rid in st.session_state.runs_tab_selected if rid in labels]))
+        st.session_state.runs_tab_selected = selected[:MAX_LIVE_PANELS]
+    else:
+        st.session_state.runs_tab_selected = [rid for rid in st.session_state.runs_tab_selected if rid in labels]
+
+    selected = st.multiselect(
+        "显示的运行:",
+        options=list(labels.keys()),
+        format_func=lambda run_id: labels[run_id],
+        key="runs_tab_selected",
+        max_selections=MAX_LIVE_PANELS
+    )
+
+    render_live_log_panels(selected)
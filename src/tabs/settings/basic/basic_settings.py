@@ -2,6 +2,7 @@ import streamlit as st
 import os
 import json
 import yaml
+from src.services.task_runner import parse_tag_limits
 
 # 设置文件路径 - 直接使用根目录下的config.yaml
 CONFIG_FILE = "config.yaml"  # 配置文件直接位于项目根目录
@@ -19,12 +20,40 @@ def load_basic_settings():
         "auto_backup": True,
         "backup_interval": 30,
         "show_welcome": True,
-        "max_log_files": 10,
+        "max_log_files": 50,
+        "log_retention_days": 7,
+        "log_max_total_mb": 500,
         "notify_on_completion": True,
+        "direct_execution": False,
+        "batch_invocation": False,
+        "shell_pool_enabled": False,
+        "shell_pool_size": 2,
+        "shell_pool_max_commands": 100,
+        "resource_sampling_enabled": True,
+        "resource_sample_interval": 1.0,
+        "run_timeout": 0,
+        "workspace_mode": False,
+        "execution_mode": "headless",
+        "max_parallel_runs": min(4, os.cpu_count() or 1),
+        "run_queue_size": 200,
+        "queue_policy": "priority",
+        "priority_aging_seconds": 60,
+        "tag_concurrency_limits": {},
+        "retry_tag_attempts": {},
+        "retry_backoff_seconds": 2,
+        "retry_max_backoff_seconds": 60,
+        "flaky_threshold": 0.3,
+        "flaky_isolated_slots": 1,
+        "use_daemon": False,
+        "load_gate_enabled": False,
+        "load_gate_max_cpu": 90,
+        "load_gate_max_load": 1.5,
+        "load_gate_min_memory_mb": 1024,
         # 添加标签页显示默认设置
         "show_card_tab": True,
         "show_table_tab": True,
         "show_preview_tab": True,
+        "show_runs_tab": True,
         "show_dashboard_tab": True,
         "show_settings_tab": True,
         "show_state_tab": True
@@ -114,6 +143,10 @@ def render_basic_settings():
                                  value=st.session_state.basic_settings.get("show_welcome", True),
                                  help="程序启动时显示欢迎页面")
         
+        workspace_mode = st.checkbox("工作区模式", 
+                                   value=st.session_state.basic_settings.get("workspace_mode", False),
+                                   help="同时加载当前目录下发现的所有Taskfile，任务按 文件::任务名 区分")
+        
         # 添加标签页显示设置
         st.subheader("标签页显示设置")
         st.write("选择要在应用中显示的标签页:")
@@ -127,6 +160,8 @@ def render_basic_settings():
             enabled_tabs.append("表格视图") 
         if st.session_state.basic_settings.get("show_preview_tab", True):
             enabled_tabs.append("预览")
+        if st.session_state.basic_settings.get("show_runs_tab", True):
+            enabled_tabs.append("运行")
         if st.session_state.basic_settings.get("show_dashboard_tab", True):
             enabled_tabs.append("仪表盘")
         if st.session_state.basic_settings.get("show_settings_tab", True):
@@ -148,6 +183,10 @@ def render_basic_settings():
                                      value=st.session_state.basic_settings.get("show_preview_tab", True),
                                      help="启用或禁用预览标签页")
         
+        show_runs_tab = st.checkbox("显示运行标签页", 
+                                  value=st.session_state.basic_settings.get("show_runs_tab", True),
+                                  help="启用或禁用运行输出标签页（实时查看后台运行的输出）")
+        
         show_dashboard_tab = st.checkbox("显示仪表盘", 
                                        value=st.session_state.basic_settings.get("show_dashboard_tab", True),
                                        help="启用或禁用仪表盘标签页")
@@ -167,6 +206,142 @@ def render_basic_settings():
                           index=0 if st.session_state.basic_settings.get("run_mode", "sequential") == "sequential" else 1,
                           help="选择默认任务执行模式")
         
+        execution_mode = st.radio("执行方式", 
+                                options=["后台执行", "终端窗口"], 
+                                index=0 if st.session_state.basic_settings.get("execution_mode", "headless") == "headless" else 1,
+                                help="后台执行：无窗口运行并捕获输出、记录退出码和耗时；终端窗口：在独立终端中运行（分离模式）")
+        
+        max_parallel_runs = st.slider("最大并发运行数", 
+                                    min_value=1, 
+                                    max_value=max(16, os.cpu_count() or 1), 
+                                    value=int(st.session_state.basic_settings.get("max_parallel_runs", min(4, os.cpu_count() or 1))),
+                                    help="后台执行时同时运行的任务上限，其余任务在队列中等待")
+        
+        run_queue_size = st.number_input("执行队列容量", 
+                                       min_value=1, 
+                                       max_value=10000, 
+                                       value=int(st.session_state.basic_settings.get("run_queue_size", 200)),
+                                       help="排队等待的任务上限，队列已满时新的运行会被拒绝")
+        
+        run_timeout = st.number_input("运行超时（秒）",
+                                      min_value=0,
+                                      max_value=7 * 24 * 3600,
+                                      value=int(st.session_state.basic_settings.get("run_timeout", 0)),
+                                      step=60,
+                                      help="后台运行超过该时间将终止整个进程树，0表示不限制；任务中的timeout字段优先")
+        
+        use_daemon = st.checkbox("通过守护进程运行",
+                                 value=st.session_state.basic_settings.get("use_daemon", False),
+                                 help="后台执行时由独立的本地守护进程管理执行队列、运行记录和日志，"
+                                      "刷新页面或重启应用后仍可查看和控制运行中的任务")
+        
+        direct_execution = st.checkbox("直接执行命令（跳过task）",
+                                     value=st.session_state.basic_settings.get("direct_execution", False),
+                                     help="后台执行时直接运行任务展开后的cmds，省去task解析Taskfile和额外进程的开销；"
+                                          "使用了不支持的模板或特性的任务自动回退到task")
+        
+        shell_pool_enabled = st.checkbox("复用常驻shell执行命令",
+                                       value=st.session_state.basic_settings.get("shell_pool_enabled", False),
+                                       help="直接执行需要shell解释的命令时，交给预先启动的常驻shell执行，"
+                                            "省去每个任务启动新shell的开销（仅限Linux/macOS）；"
+                                            "取消或超时的运行会终止所在的shell，随后自动补充；"
+                                            "常驻shell中的运行不记录CPU时间和内存峰值（开启资源采样时使用采样值）")
+        shell_cols = st.columns(2)
+        with shell_cols[0]:
+            shell_pool_size = st.number_input("预热shell数量",
+                                              min_value=1, max_value=16,
+                                              value=int(st.session_state.basic_settings.get("shell_pool_size", 2)),
+                                              help="保持空闲待用的shell数量，顺序执行时1个即可")
+        with shell_cols[1]:
+            shell_pool_max_commands = st.number_input("单个shell最多执行命令数",
+                                                      min_value=1, max_value=10000,
+                                                      value=int(st.session_state.basic_settings.get("shell_pool_max_commands", 100)),
+                                                      help="执行这么多条命令后关闭该shell并启动新的，避免状态累积")
+        
+        sample_cols = st.columns(2)
+        with sample_cols[0]:
+            resource_sampling_enabled = st.checkbox("采样运行的资源占用",
+                                                    value=st.session_state.basic_settings.get("resource_sampling_enabled", True),
+                                                    help="后台运行期间按间隔采样任务整个进程树的CPU、内存、读写量和线程数，"
+                                                         "记录峰值与均值，可在仪表盘中按资源消耗排列任务")
+        with sample_cols[1]:
+            resource_sample_interval = st.number_input("采样间隔（秒）",
+                                                       min_value=0.1, max_value=60.0, step=0.5,
+                                                       value=float(st.session_state.basic_settings.get("resource_sample_interval", 1.0)),
+                                                       help="间隔越短曲线越细，采样本身的开销也越大；短于间隔的运行只记录CPU时间和内存峰值")
+        
+        batch_invocation = st.checkbox("多个任务合并为一次task调用",
+                                     value=st.session_state.basic_settings.get("batch_invocation", False),
+                                     help="后台运行多个任务时只启动一个task进程（task a b c，并行时加--parallel），"
+                                          "Taskfile只解析一次；输出按任务前缀拆分到各任务的运行记录。"
+                                          "整个调用占用一个并发槽位，取消其中一个任务会取消整个调用；"
+                                          "合并调用中失败的任务不会按重试设置重试")
+        
+        queue_policy = st.radio("队列顺序", 
+                              options=["先进先出", "按优先级"], 
+                              index=0 if st.session_state.basic_settings.get("queue_policy", "priority") == "fifo" else 1,
+                              horizontal=True,
+                              help="按优先级时，priority数值越小越先执行（也可以写 high / medium / low，分别相当于1、5、9）")
+        
+        priority_aging_seconds = st.number_input("优先级老化间隔（秒）",
+                                                 min_value=0,
+                                                 max_value=24 * 3600,
+                                                 value=int(st.session_state.basic_settings.get("priority_aging_seconds", 60)),
+                                                 step=10,
+                                                 help="按优先级排队时，每等待这么久优先级提升一级，避免低优先级任务一直等待；0表示不老化")
+        
+        tag_limits = parse_tag_limits(st.session_state.basic_settings.get("tag_concurrency_limits", {}))
+        tag_concurrency_limits = st.text_input("标签并发上限",
+                                               value=", ".join(f"{tag}={limit}" for tag, limit in tag_limits.items()),
+                                               placeholder="gpu=1, network=2",
+                                               help="带有这些标签的任务同时运行的数量上限，格式为 标签=数量，多个用逗号分隔")
+        
+        retry_attempts = parse_tag_limits(st.session_state.basic_settings.get("retry_tag_attempts", {}))
+        retry_tag_attempts = st.text_input("按标签重试",
+                                           value=", ".join(f"{tag}={count}" for tag, count in retry_attempts.items()),
+                                           placeholder="network=3",
+                                           help="带有这些标签的任务失败后最多尝试的次数（含首次），格式为 标签=次数；"
+                                                "任务中的retry字段优先，如 retry: {attempts: 3, exit_codes: [1]}")
+        retry_cols = st.columns(4)
+        with retry_cols[0]:
+            retry_backoff_seconds = st.number_input("首次重试等待（秒）",
+                                                    min_value=0, max_value=3600,
+                                                    value=int(st.session_state.basic_settings.get("retry_backoff_seconds", 2)),
+                                                    help="之后每次重试等待时间翻倍，并加入随机抖动")
+        with retry_cols[1]:
+            retry_max_backoff_seconds = st.number_input("最长重试等待（秒）",
+                                                        min_value=0, max_value=24 * 3600,
+                                                        value=int(st.session_state.basic_settings.get("retry_max_backoff_seconds", 60)))
+        with retry_cols[2]:
+            flaky_threshold = st.number_input("不稳定度阈值",
+                                              min_value=0.05, max_value=1.0, step=0.05,
+                                              value=float(st.session_state.basic_settings.get("flaky_threshold", 0.3)),
+                                              help="重试后才成功或结果反复变化的比例达到该值的任务视为不稳定")
+        with retry_cols[3]:
+            flaky_isolated_slots = st.number_input("不稳定任务隔离槽位",
+                                                   min_value=0, max_value=16,
+                                                   value=int(st.session_state.basic_settings.get("flaky_isolated_slots", 1)),
+                                                   help="不稳定的任务只在这些额外的槽位中运行，不占用普通并发槽位；0表示不隔离")
+        
+        load_gate_enabled = st.checkbox("按系统负载控制启动",
+                                        value=st.session_state.basic_settings.get("load_gate_enabled", False),
+                                        help="并行运行时只在CPU、平均负载和可用内存都未超过阈值时启动新的任务，"
+                                             "超出时任务留在队列中等待；准入记录可在仪表盘中查看")
+        gate_cols = st.columns(3)
+        with gate_cols[0]:
+            load_gate_max_cpu = st.number_input("CPU使用率上限 (%)",
+                                                min_value=1, max_value=100,
+                                                value=int(st.session_state.basic_settings.get("load_gate_max_cpu", 90)))
+        with gate_cols[1]:
+            load_gate_max_load = st.number_input("每核平均负载上限",
+                                                 min_value=0.1, max_value=64.0, step=0.1,
+                                                 value=float(st.session_state.basic_settings.get("load_gate_max_load", 1.5)),
+                                                 help="1分钟平均负载除以CPU核数，Windows上不适用")
+        with gate_cols[2]:
+            load_gate_min_memory_mb = st.number_input("可用内存下限 (MB)",
+                                                      min_value=0, max_value=1024 * 1024, step=256,
+                                                      value=int(st.session_state.basic_settings.get("load_gate_min_memory_mb", 1024)))
+        
         notify_completion = st.checkbox("任务完成通知", 
                                       value=st.session_state.basic_settings.get("notify_on_completion", True),
                                       help="任务完成时发送系统通知")
@@ -185,10 +360,23 @@ def render_basic_settings():
         
         max_logs = st.slider("最大日志文件数", 
                            min_value=5, 
-                           max_value=50, 
-                           value=st.session_state.basic_settings.get("max_log_files", 10),
+                           max_value=500, 
+                           value=st.session_state.basic_settings.get("max_log_files", 50),
                            step=5,
-                           help="保留的最大日志文件数量，超过将自动清理")
+                           help="保留的已完成运行日志数量（logs/runs下的压缩文件），超过将自动清理")
+        
+        log_retention_days = st.number_input("日志保留天数", 
+                                           min_value=1, 
+                                           max_value=365, 
+                                           value=int(st.session_state.basic_settings.get("log_retention_days", 7)),
+                                           help="超过天数的运行日志将自动清理")
+        
+        log_max_total_mb = st.number_input("日志总大小上限（MB）", 
+                                         min_value=10, 
+                                         max_value=100000, 
+                                         value=int(st.session_state.basic_settings.get("log_max_total_mb", 500)),
+                                         step=10,
+                                         help="已压缩运行日志的总大小上限，超出时从最旧的开始清理")
         
         # 提交按钮
         submitted = st.form_submit_button("保存设置")
@@ -196,14 +384,15 @@ def render_basic_settings():
         if submitted:
             # 检查标签页设置是否发生变化
             tabs_changed = False
-            for tab_setting in ["show_card_tab", "show_table_tab", "show_preview_tab", 
+            for tab_setting in ["show_card_tab", "show_table_tab", "show_preview_tab", "show_runs_tab",
                                "show_dashboard_tab", "show_settings_tab", "show_state_tab"]:
                 if st.session_state.basic_settings.get(tab_setting, True) != locals()[tab_setting]:
                     tabs_changed = True
                     break
             
-            # 更新设置
-            new_settings = {
+            # 更新设置（保留表单未覆盖的其他设置项）
+            new_settings = dict(st.session_state.basic_settings)
+            new_settings.update({
                 "dark_mode": dark_mode,
                 "auto_load_recent": auto_load,
                 "run_mode": "sequential" if run_mode == "顺序执行" else "parallel",
@@ -211,15 +400,43 @@ def render_basic_settings():
                 "backup_interval": backup_interval,
                 "show_welcome": show_welcome,
                 "max_log_files": max_logs,
+                "log_retention_days": int(log_retention_days),
+                "log_max_total_mb": int(log_max_total_mb),
                 "notify_on_completion": notify_completion,
+                "workspace_mode": workspace_mode,
+                "execution_mode": "headless" if execution_mode == "后台执行" else "detached",
+                "max_parallel_runs": int(max_parallel_runs),
+                "run_queue_size": int(run_queue_size),
+                "queue_policy": "fifo" if queue_policy == "先进先出" else "priority",
+                "priority_aging_seconds": int(priority_aging_seconds),
+                "tag_concurrency_limits": parse_tag_limits(tag_concurrency_limits),
+                "retry_tag_attempts": parse_tag_limits(retry_tag_attempts),
+                "retry_backoff_seconds": int(retry_backoff_seconds),
+                "retry_max_backoff_seconds": int(retry_max_backoff_seconds),
+                "flaky_threshold": float(flaky_threshold),
+                "flaky_isolated_slots": int(flaky_isolated_slots),
+                "load_gate_enabled": load_gate_enabled,
+                "load_gate_max_cpu": int(load_gate_max_cpu),
+                "load_gate_max_load": float(load_gate_max_load),
+                "load_gate_min_memory_mb": int(load_gate_min_memory_mb),
+                "direct_execution": direct_execution,
+                "batch_invocation": batch_invocation,
+                "shell_pool_enabled": shell_pool_enabled,
+                "shell_pool_size": int(shell_pool_size),
+                "shell_pool_max_commands": int(shell_pool_max_commands),
+                "resource_sampling_enabled": resource_sampling_enabled,
+                "resource_sample_interval": float(resource_sample_interval),
+                "use_daemon": use_daemon,
+                "run_timeout": int(run_timeout),
                 # 添加标签页显示设置
                 "show_card_tab": show_card_tab,
                 "show_table_tab": show_table_tab,
                 "show_preview_tab": show_preview_tab,
+                "show_runs_tab": show_runs_tab,
                 "show_dashboard_tab": show_dashboard_tab,
                 "show_settings_tab": True,  # 设置页始终启用
                 "show_state_tab": show_state_tab
-            }
+            })
             
             # 保存到session_state
             st.session_state.basic_settings = new_settings
@@ -0,0 +1,142 @@
+import re
+import html
+
+# 完整的CSI序列（如 \x1b[31m、\x1b[2K）与OSC序列（如终端标题）
+_CSI_RE = re.compile(r"\x1b\[([0-9;?]*)([@-~])")
+_OSC_RE = re.compile(r"\x1b\][^\x07\x1b]*(?:\x07|\x1b\\)")
+# 文本末尾尚未接收完整的转义序列
+_PARTIAL_ESCAPE_RE = re.compile(r"\x1b(?:\[[0-9;?]*|\][^\x07\x1b]*)?$")
+
+# 标准16色（与常见深色终端配色接近）
+_BASIC_COLORS = [
+    "#000000", "#cd3131", "#0dbc79", "#e5e510", "#2472c8", "#bc3fbc", "#11a8cd", "#e5e5e5",
+    "#666666", "#f14c4c", "#23d18b", "#f5f543", "#3b8eea", "#d670d6", "#29b8db", "#ffffff",
+]
+
+def _color_256(index):
+    """将256色索引转换为CSS颜色"""
+    if index < 16:
+        return _BASIC_COLORS[index]
+    if index < 232:
+        index -= 16
+        levels = [0, 95, 135, 175, 215, 255]
+        r, g, b = levels[index // 36], levels[(index // 6) % 6], levels[index % 6]
+        return f"#{r:02x}{g:02x}{b:02x}"
+    gray = 8 + (index - 232) * 10
+    return f"#{gray:02x}{gray:02x}{gray:02x}"
+
+def _extended_color(params, i):
+    """解析 38;5;n / 38;2;r;g;b 形式的扩展颜色，返回 (颜色, 消耗的参数个数)"""
+    if i + 1 < len(params) and params[i + 1] == 5 and i + 2 < len(params):
+        return _color_256(max(0, min(255, params[i + 2]))), 3
+    if i + 1 < len(params) and params[i + 1] == 2 and i + 4 < len(params):
+        r, g, b = (max(0, min(255, v)) for v in params[i + 2:i + 5])
+        return f"#{r:02x}{g:02x}{b:02x}", 5
+    return None, 1
+
+def _apply_sgr(style, codes):
+    """根据SGR参数更新样式字典"""
+    params = [int(code) if code.isdigit() else 0 for code in codes.split(";")] if codes else [0]
+    i = 0
+    while i < len(params):
+        code = params[i]
+        step = 1
+        if code == 0:
+            style.clear()
+        elif code == 1:
+            style["bold"] = True
+        elif code == 3:
+            style["italic"] = True
+        elif code == 4:
+            style["underline"] = True
+        elif code == 22:
+            style.pop("bold", None)
+        elif code == 23:
+            style.pop("italic", None)
+        elif code == 24:
+            style.pop("underline", None)
+        elif 30 <= code <= 37:
+            style["fg"] = _BASIC_COLORS[code - 30]
+        elif 90 <= code <= 97:
+            style["fg"] = _BASIC_COLORS[code - 90 + 8]
+        elif 40 <= code <= 47:
+            style["bg"] = _BASIC_COLORS[code - 40]
+        elif 100 <= code <= 107:
+            style["bg"] = _BASIC_COLORS[code - 100 + 8]
+        elif code == 39:
+            style.pop("fg", None)
+        elif code == 49:
+            style.pop("bg", None)
+        elif code in (38, 48):
+            color, step = _extended_color(params, i)
+            if color:
+                style["fg" if code == 38 else "bg"] = color
+        i += step
+
+def _style_to_css(style):
+    css = []
+    if "fg" in style:
+        css.append(f"color:{style['fg']}")
+    if "bg" in style:
+        css.append(f"background-color:{style['bg']}")
+    if style.get("bold"):
+        css.append("font-weight:bold")
+    if style.get("italic"):
+        css.append("font-style:italic")
+    if style.get("underline"):
+        css.append("text-decoration:underline")
+    return ";".join(css)
+
+def collapse_carriage_returns(text):
+    """
+    模拟终端的回车行为：每行只保留最后一个 \\r 之后的内容（进度条等）
+
+    参数:
+        text: 原始文本
+
+    返回:
+        处理后的文本
+    """
+    if "\r" not in text:
+        return text
+    lines = []
+    for line in text.split("\n"):
+        line = line.rstrip("\r")
+        lines.append(line[line.rfind("\r") + 1:])
+    return "\n".join(lines)
+
+def strip_ansi(text):
+    """去除文本中的ANSI转义序列"""
+    text = _OSC_RE.sub("", text)
+    return _PARTIAL_ESCAPE_RE.sub("", _CSI_RE.sub("", text))
+
+def ansi_to_html(text):
+    """
+    将含ANSI颜色的终端输出转换为HTML（已转义，可直接嵌入）
+
+    参数:
+        text: 终端输出文本
+
+    返回:
+        HTML字符串
+    """
+    text = _PARTIAL_ESCAPE_RE.sub("", _OSC_RE.sub("", collapse_carriage_returns(text)))
+    parts = []
+    style = {}
+    css = ""
+    pos = 0
+
+    for match in _CSI_RE.finditer(text):
+        if match.start() > pos:
+            chunk = html.escape(text[pos:match.start()])
+            parts.append(f'<span style="{css}">{chunk}</span>' if css else chunk)
+        pos = match.end()
+        # 只处理颜色/样式（m），光标移动、清屏等控制序列直接丢弃
+        if match.group(2) == "m":
+            _apply_sgr(style, match.group(1))
+            css = _style_to_css(style)
+
+    if pos < len(text):
+        chunk = html.escape(text[pos:])
+        parts.append(f'<span style="{css}">{chunk}</span>' if css else chunk)
+    return "".join(parts)
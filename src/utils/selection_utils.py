@@ -7,6 +7,11 @@ import psutil
 import time
 from datetime import datetime
 from pathlib import Path
+from src.services.run_backend import pop_run_outcomes
+from src.services.duration_model import new_duration_model, update_duration_model, summarize_duration_model
+from src.services.regression import new_duration_stats, update_duration_stats
+from src.services.fingerprint import check_tasks, task_id, STATUS_TTL_SECONDS
+from src.services.workspace import get_task_key, get_task_taskfile
 
 # 全局内存缓存
 _MEMORY_CACHE = None  # 内存缓存
@@ -16,6 +21,8 @@ _MEMORY_CACHE_MAX_SIZE = 50 * 1024 * 1024  # 最大缓存大小（50MB）
 _MEMORY_CACHE_MAX_AGE = 3600  # 最大缓存年龄（秒）
 _LAST_GC_TIME = 0  # 上次垃圾回收时间
 _GC_INTERVAL = 300  # 垃圾回收间隔（秒）
+MAX_RUN_HISTORY = 50  # 每个任务保留的运行历史条数
+MAX_REGRESSIONS = 20  # 每个任务保留的耗时回归记录条数
 
 # 本地配置文件路径
 # LOCAL_CONFIG_DIR = os.path.join(os.path.expanduser("~"), ".glowtoolbox")
@@ -324,27 +331,34 @@ def register_tasks_from_df(tasks_df, source_file):
     """
     从DataFrame注册任务
     
+    工作区模式下数据框带有task_key和taskfile列，任务以 (file_id, name) 组成的键注册，
+    并归属到各自的来源文件；否则以任务名注册到source_file。
+    
     参数:
         tasks_df: 任务数据框
-        source_file: 来源文件路径
+        source_file: 来源文件路径（数据框未提供taskfile列时使用）
     """
-    for _, row in tasks_df.iterrows():
-        task_name = row['name']
-        task_data = row.to_dict()
-        register_task(task_name, task_data, source_file)
+    has_keys = 'task_key' in tasks_df.columns
+    has_files = 'taskfile' in tasks_df.columns
     
-    # 更新内存缓存
-    update_memory_cache()
+    for row in tasks_df.to_dict('records'):
+        task_name = row['task_key'] if has_keys and row.get('task_key') else row['name']
+        task_file = row['taskfile'] if has_files and row.get('taskfile') else source_file
+        # 批量注册时只在最后统一更新一次全局状态
+        register_task(task_name, row, task_file, update_state=False)
+    
+    update_global_state(get_global_state())
 
-def register_task(task_name, task_data, source_file, runtime_data=None):
+def register_task(task_name, task_data, source_file, runtime_data=None, update_state=True):
     """
     注册单个任务
     
     参数:
-        task_name: 任务名称
+        task_name: 任务名称（工作区模式下为任务键）
         task_data: 任务数据
         source_file: 来源文件
         runtime_data: 运行时数据
+        update_state: 是否立即更新全局状态（批量注册时设为False）
     """
     global_state = get_global_state()
     
@@ -400,7 +414,62 @@ def register_task(task_name, task_data, source_file, runtime_data=None):
         global_state["select"] = {}
     global_state["select"][task_name] = selected
     
-    update_global_state(global_state)  # 更新内存状态
+    if update_state:
+        update_global_state(global_state)  # 更新内存状态
+
+def resolve_task_ref(task_name, default_taskfile=None):
+    """
+    将任务键解析为 (Taskfile路径, 任务名)
+    
+    参数:
+        task_name: 任务名称或工作区任务键
+        default_taskfile: 找不到来源文件时使用的Taskfile
+    
+    返回:
+        tuple: (taskfile_path, task_name)
+    """
+    global_state = get_global_state()
+    task_info = global_state.get("tasks", {}).get(task_name, {})
+    source_file = task_info.get("source_file") or default_taskfile
+    name = task_info.get("data", {}).get("name") or task_name
+    return source_file, name
+
+def group_tasks_by_taskfile(task_names, default_taskfile=None):
+    """
+    按来源Taskfile对任务分组，保持原有顺序
+    
+    参数:
+        task_names: 任务名称或任务键列表
+        default_taskfile: 找不到来源文件时使用的Taskfile
+    
+    返回:
+        dict: Taskfile路径 -> 任务名列表
+    """
+    groups = {}
+    for task_name in task_names:
+        source_file, name = resolve_task_ref(task_name, default_taskfile)
+        groups.setdefault(source_file, []).append(name)
+    return groups
+
+def find_task_key(task_name, taskfile=None):
+    """
+    根据 (Taskfile路径, 任务名) 查找全局状态中的任务键，与 resolve_task_ref 互逆
+    
+    参数:
+        task_name: 任务名称
+        taskfile: 任务所在的Taskfile路径
+    
+    返回:
+        任务键；找不到时返回任务名本身
+    """
+    global_state = get_global_state()
+    tasks = global_state.get("tasks", {})
+    if task_name in tasks and (taskfile is None or tasks[task_name].get("source_file") == taskfile):
+        return task_name
+    for task_key, task_info in tasks.items():
+        if task_info.get("source_file") == taskfile and task_info.get("data", {}).get("name") == task_name:
+            return task_key
+    return task_name
 
 def update_task_selection(task_name, is_selected, rerun=True):
     """
@@ -593,13 +662,16 @@ def update_task_runtime(task_name, runtime_data):
     
     return False
 
-def record_task_run(task_name, status="success"):
+def record_task_run(task_name, status="success", run_info=None, update_state=True):
     """
     记录任务运行
     
     参数:
         task_name: 任务名称
         status: 运行状态
+        run_info: 执行层的运行记录（含exit_code、duration、cpu_time、peak_rss、queue_wait、resources），
+                  提供时写入最近一次结果并追加到运行历史
+        update_state: 是否立即更新全局状态，批量记录时可设为False
     """
     global_state = get_global_state()
     
@@ -636,11 +708,110 @@ def record_task_run(task_name, status="success"):
         
         # 更新运行时数据
         runtime = global_state["task_files"][source_file]["task_state"][task_name]["runtime"]
-        runtime["last_run"] = datetime.now().isoformat()
+        runtime["last_run"] = (run_info or {}).get("ended_at") or datetime.now().isoformat()
         runtime["run_count"] = runtime.get("run_count", 0) + 1
         runtime["last_status"] = status
         
-        update_global_state(global_state)
+        if run_info:
+            runtime["last_exit_code"] = run_info.get("exit_code")
+            runtime["duration"] = run_info.get("duration")
+            runtime["cpu_time"] = run_info.get("cpu_time")
+            runtime["peak_rss"] = run_info.get("peak_rss")
+            runtime["queue_wait"] = run_info.get("queue_wait")
+            runtime["resources"] = run_info.get("resources")
+            if run_info.get("flakiness") is not None:
+                runtime["flakiness"] = run_info["flakiness"]
+            
+            # 先取模型和统计（首次使用时由已有历史补建），再记录本次运行，避免重复计入
+            duration_model = _get_duration_model(runtime)
+            duration_stats = _get_duration_stats(runtime)
+            regression = None
+            if status == "success" and run_info.get("duration") is not None:
+                update_duration_model(duration_model, run_info["duration"])
+                verdict = update_duration_stats(duration_stats, run_info["duration"])
+                if verdict and verdict["regression"]:
+                    regression = verdict
+            
+            run_history = runtime.setdefault("run_history", [])
+            run_history.append({
+                "run_id": run_info.get("run_id"),
+                "date": runtime["last_run"][:10],
+                "started_at": run_info.get("started_at"),
+                "status": status,
+                "exit_code": run_info.get("exit_code"),
+                "duration": run_info.get("duration"),
+                "cpu_time": run_info.get("cpu_time"),
+                "peak_rss": run_info.get("peak_rss"),
+                "queue_wait": run_info.get("queue_wait"),
+                # 运行期间采样的资源占用峰值与均值（运行短于采样间隔时为None）
+                "resources": run_info.get("resources"),
+                # 因资源锁冲突而等待的时间（声明了资源的任务）
+                "resource_wait": run_info.get("resource_wait"),
+                # 第几次尝试（失败重试时每次尝试各记录一条）
+                "attempt": run_info.get("attempt"),
+                # 矩阵运行等带变量的运行记录所用的变量
+                "vars": (run_info.get("meta") or {}).get("vars"),
+                # 耗时相对基线显著变长时记录判断依据（基线、p90、z值、倍数）
+                "regression": regression,
+            })
+            del run_history[:-MAX_RUN_HISTORY]
+            
+            if regression:
+                flagged = dict(regression, task=task_name, run_id=run_info.get("run_id"),
+                               started_at=run_info.get("started_at"), duration=run_info.get("duration"))
+                regressions = runtime.setdefault("regressions", [])
+                regressions.append(flagged)
+                del regressions[:-MAX_REGRESSIONS]
+                st.session_state.setdefault("new_regressions", []).append(flagged)
+        
+        if update_state:
+            update_global_state(global_state)
+
+def apply_run_outcomes():
+    """
+    将后台运行的完成结果写入任务运行时数据，需在界面线程中调用（每次刷新时）
+    
+    返回:
+        本次处理的运行结果数量
+    """
+    outcomes = pop_run_outcomes()
+    for record in outcomes:
+        task_key = find_task_key(record.get("task"), record.get("taskfile"))
+        record_task_run(task_key, status=record.get("status"), run_info=record, update_state=False)
+    
+    if outcomes:
+        update_global_state(get_global_state())
+    return len(outcomes)
+
+def refresh_task_freshness(tasks_df, default_taskfile=None):
+    """
+    批量检查声明了sources的任务是否已是最新，结果保存到 st.session_state.task_freshness
+    
+    参数:
+        tasks_df: 任务DataFrame
+        default_taskfile: 默认Taskfile路径
+        
+    返回:
+        dict: 任务键 -> 状态（up_to_date / stale / unknown）
+    """
+    refs = {}
+    if tasks_df is not None and 'sources' in tasks_df.columns:
+        for task in tasks_df.to_dict('records'):
+            if not task.get('sources'):
+                continue
+            taskfile = get_task_taskfile(task, default_taskfile)
+            if taskfile:
+                refs[get_task_key(task)] = (taskfile, task['name'])
+    
+    freshness = {}
+    if refs:
+        try:
+            statuses = check_tasks(list(refs.values()), max_age=STATUS_TTL_SECONDS)
+            freshness = {key: statuses.get(task_id(*ref)) for key, ref in refs.items()}
+        except Exception as e:
+            print(f"检查任务是否最新时出错: {str(e)}")
+    st.session_state.task_freshness = freshness
+    return freshness
 
 def get_task_runtime(task_name):
     """
@@ -673,6 +844,53 @@ def get_task_runtime(task_name):
         "custom_flags": {}
     }
 
+def _get_duration_model(runtime):
+    """获取任务的耗时模型，没有模型时按已有的成功运行历史补建"""
+    if "duration_model" not in runtime:
+        model = new_duration_model()
+        for entry in runtime.get("run_history", []):
+            if entry.get("status") == "success" and entry.get("duration") is not None:
+                update_duration_model(model, entry["duration"])
+        runtime["duration_model"] = model
+    return runtime["duration_model"]
+
+def _get_duration_stats(runtime):
+    """获取任务的耗时统计（回归检测基线），没有统计时按已有的成功运行历史补建（补建时不判断回归）"""
+    if "duration_stats" not in runtime:
+        stats = new_duration_stats()
+        for entry in runtime.get("run_history", []):
+            if entry.get("status") == "success" and entry.get("duration") is not None:
+                update_duration_stats(stats, entry["duration"])
+        runtime["duration_stats"] = stats
+    return runtime["duration_stats"]
+
+def pop_new_regressions():
+    """取出自上次调用以来新标记的耗时回归（用于提示）"""
+    return st.session_state.pop("new_regressions", [])
+
+def get_task_duration_summary(task_name):
+    """
+    获取任务的耗时模型摘要（近期运行权重更高的中位数和p90）
+    
+    参数:
+        task_name: 任务名称
+    返回:
+        {median, p90, runs}，没有成功运行的历史时返回None
+    """
+    return summarize_duration_model(_get_duration_model(get_task_runtime(task_name)))
+
+def estimate_task_duration(task_name):
+    """
+    根据运行历史估计任务耗时：耗时模型的中位数
+    
+    参数:
+        task_name: 任务名称
+    返回:
+        预计耗时（秒），没有历史时返回None
+    """
+    summary = get_task_duration_summary(task_name)
+    return summary["median"] if summary else get_task_runtime(task_name).get("duration")
+
 # 导出全局状态为字典 - 提供接口以备需要
 def export_state_as_dict():
     """导出全局状态为字典"""
@@ -15,7 +15,7 @@ def init_session_state():
     if 'parallel_mode' not in st.session_state:
         st.session_state.parallel_mode = False
     if 'sort_by' not in st.session_state:
-        st.session_state.sort_by = '名称'
+        st.session_state.sort_by = '默认'
     if 'sort_order' not in st.session_state:
         st.session_state.sort_order = '升序'
 
@@ -3,8 +3,15 @@ import os
 from src.utils.file_utils import get_task_command, copy_to_clipboard, open_file, get_directory_files
 from src.services.task_runner import run_task_via_cmd
 from src.components.batch_operations import render_batch_operations
-from src.utils.selection_utils import update_task_selection, get_task_selection_state, init_global_state, record_task_run, load_local_config
+from src.utils.selection_utils import update_task_selection, get_task_selection_state, init_global_state, record_task_run, load_local_config, get_card_view_settings, get_selected_tasks
 from src.views.card.task_card import render_task_card
+from src.services.workspace import get_task_key
+
+# 每页卡片数量选项：每张卡片包含展开框和多个按钮，一次只渲染一页，任务很多时点击也能快速响应
+CARD_PAGE_SIZES = [12, 24, 48, 96]
+DEFAULT_CARD_PAGE_SIZE = 24
+# 翻页方式："分页"每次显示一页；"滚动加载"在列表末尾点击加载下一页，已显示的卡片保留
+CARD_PAGING_MODES = ["分页", "滚动加载"]
 
 def group_tasks_by_first_tag(tasks_df):
     """按第一个标签对任务进行分组
@@ -57,8 +64,98 @@ def sort_grouped_tasks(grouped_tasks, pinned_tags):
     # 排序并返回
     return sorted(groups, key=sort_key)
 
+def get_card_window(total, key_prefix):
+    """显示每页数量和翻页方式控件，返回本次要渲染的卡片范围
+    
+    参数:
+        total: 任务总数
+        key_prefix: 组件key前缀
+        
+    返回:
+        tuple: (起始位置, 结束位置)，左闭右开
+    """
+    col1, col2 = st.columns(2)
+    with col1:
+        page_size = st.selectbox(
+            "每页卡片数量",
+            CARD_PAGE_SIZES,
+            index=CARD_PAGE_SIZES.index(DEFAULT_CARD_PAGE_SIZE),
+            key=f"{key_prefix}_page_size"
+        )
+    with col2:
+        mode = st.radio(
+            "翻页方式",
+            CARD_PAGING_MODES,
+            horizontal=True,
+            key=f"{key_prefix}_paging_mode"
+        )
+    
+    if mode == CARD_PAGING_MODES[0]:
+        pages = max(1, (total + page_size - 1) // page_size)
+        page_key = f"{key_prefix}_page"
+        # 过滤条件或每页数量变化后页数可能变少，先把页码限制在范围内再创建控件
+        if st.session_state.get(page_key, 1) > pages:
+            st.session_state[page_key] = pages
+        if pages > 1:
+            page = st.number_input(f"页码（共 {pages} 页）", min_value=1, max_value=pages, step=1, key=page_key)
+        else:
+            page = 1
+        start = (page - 1) * page_size
+        return start, min(total, start + page_size)
+    
+    # 滚动加载：已加载的数量保存在会话状态中，至少显示一页
+    window_key = f"{key_prefix}_window"
+    shown = max(page_size, st.session_state.get(window_key, page_size))
+    st.session_state[window_key] = shown
+    return 0, min(total, shown)
+
+def render_load_more(end, total, key_prefix):
+    """滚动加载模式下在列表末尾显示"加载更多"按钮
+    
+    参数:
+        end: 当前已显示的数量
+        total: 任务总数
+        key_prefix: 组件key前缀
+    """
+    if end >= total or st.session_state.get(f"{key_prefix}_paging_mode") != CARD_PAGING_MODES[1]:
+        return
+    
+    def load_more():
+        page_size = st.session_state.get(f"{key_prefix}_page_size", DEFAULT_CARD_PAGE_SIZE)
+        st.session_state[f"{key_prefix}_window"] = end + page_size
+    
+    st.button(f"加载更多（已显示 {end}/{total}）", key=f"{key_prefix}_load_more", on_click=load_more, use_container_width=True)
+
+def render_card_grid(tasks, cards_per_row, current_taskfile, key_prefix, card_settings, selected):
+    """按每行卡片数量渲染一组任务卡片
+    
+    参数:
+        tasks: 任务列表
+        cards_per_row: 每行卡片数量
+        current_taskfile: 当前任务文件路径
+        key_prefix: 组件key前缀
+        card_settings: 卡片视图设置
+        selected: 选中任务键的集合
+    """
+    for i in range(0, len(tasks), cards_per_row):
+        cols = st.columns(cards_per_row)
+        # 为每个列填充卡片
+        for col_idx, task in enumerate(tasks[i:i + cards_per_row]):
+            with cols[col_idx]:
+                with st.container():
+                    # 使用通用任务卡片渲染函数
+                    render_task_card(
+                        task=task,
+                        current_taskfile=current_taskfile,
+                        idx=i + col_idx,
+                        view_type=key_prefix,
+                        show_checkbox=True,
+                        card_settings=card_settings,
+                        is_selected=get_task_key(task) in selected
+                    )
+
 def render_card_view(filtered_df, current_taskfile, key_prefix="card_view"):
-    """渲染卡片视图
+    """渲染卡片视图，只渲染当前页（或已加载部分）的卡片
     
     参数:
         filtered_df: 过滤后的任务数据框
@@ -73,6 +170,10 @@ def render_card_view(filtered_df, current_taskfile, key_prefix="card_view"):
     group_by_tag = config.get('card_group_by_tag', False)
     pinned_tags = config.get('pinned_tags', [])
     
+    # 卡片设置和选中状态每次渲染只读取一次，不再由每张卡片各自读取配置文件
+    card_settings = get_card_view_settings()
+    selected = set(get_selected_tasks())
+    
     # 添加每行卡片数量的滑动条
     cards_per_row = st.slider(
         "每行显示卡片数量", 
@@ -83,15 +184,25 @@ def render_card_view(filtered_df, current_taskfile, key_prefix="card_view"):
         key=f"{key_prefix}_cards_per_row"
     )
     
+    total = len(filtered_df)
+    start, end = get_card_window(total, key_prefix)
+    if total:
+        st.caption(f"显示第 {start + 1}-{end} 个，共 {total} 个任务")
+    
     if group_by_tag:
-        # 按标签分组显示
+        # 按标签分组显示：分组排序后展开为一个列表再取当前范围，分组跨页时在下一页继续显示标题
         grouped_tasks = group_tasks_by_first_tag(filtered_df)
         
         # 对分组进行排序
         sorted_groups = sort_grouped_tasks(grouped_tasks, pinned_tags)
+        ordered = [(tag, task) for tag, tasks in sorted_groups for task in tasks]
+        
+        page_groups = {}
+        for tag, task in ordered[start:end]:
+            page_groups.setdefault(tag, []).append(task)
         
         # 遍历每个标签组
-        for tag, tasks in sorted_groups:
+        for tag, tasks in page_groups.items():
             # 创建标签锚点ID
             tag_id = tag.replace(" ", "_").lower()
             
@@ -104,43 +215,13 @@ def render_card_view(filtered_df, current_taskfile, key_prefix="card_view"):
             else:
                 st.markdown(f"### {tag}")
             
-            # 创建行
-            for i in range(0, len(tasks), cards_per_row):
-                cols = st.columns(cards_per_row)
-                # 获取当前行的任务
-                row_tasks = tasks[i:min(i+cards_per_row, len(tasks))]
-                
-                # 为每个列填充卡片
-                for col_idx, task in enumerate(row_tasks):
-                    with cols[col_idx]:
-                        with st.container():
-                            # 使用通用任务卡片渲染函数
-                            render_task_card(
-                                task=task,
-                                current_taskfile=current_taskfile,
-                                idx=i + col_idx,
-                                view_type=key_prefix,
-                                show_checkbox=True
-                            )
+            render_card_grid(tasks, cards_per_row, current_taskfile, key_prefix, card_settings, selected)
     else:
         # 原有的不分组显示逻辑
-        for i in range(0, len(filtered_df), cards_per_row):
-            cols = st.columns(cards_per_row)
-            # 获取当前行的任务
-            row_tasks = filtered_df.iloc[i:min(i+cards_per_row, len(filtered_df))]
-            
-            # 为每个列填充卡片
-            for col_idx, (_, task) in enumerate(row_tasks.iterrows()):
-                with cols[col_idx]:
-                    with st.container():
-                        # 使用通用任务卡片渲染函数
-                        render_task_card(
-                            task=task,
-                            current_taskfile=current_taskfile,
-                            idx=i + col_idx,
-                            view_type=key_prefix,
-                            show_checkbox=True
-                        )
+        tasks = [task for _, task in filtered_df.iloc[start:end].iterrows()]
+        render_card_grid(tasks, cards_per_row, current_taskfile, key_prefix, card_settings, selected)
+    
+    render_load_more(end, total, key_prefix)
     
     # 批量操作部分
-    # render_batch_operations(current_taskfile, view_key="card")
\ No newline at end of file
+    # render_batch_operations(current_taskfile, view_key="card")
@@ -1,9 +1,10 @@
 import streamlit as st
 import os
 from src.utils.file_utils import get_task_command, copy_to_clipboard, open_file, get_directory_files
-from src.services.task_runner import run_task_via_cmd
-from src.utils.selection_utils import update_task_selection, get_task_selection_state, record_task_run, get_task_runtime, get_card_view_settings
+from src.services.task_runner import run_task_via_cmd, get_execution_mode, EXECUTION_MODE_DETACHED
+from src.utils.selection_utils import update_task_selection, get_task_selection_state, record_task_run, get_card_view_settings
 from src.views.card.task_card_editor import render_task_edit_form
+from src.services.workspace import get_task_key, get_task_taskfile
 import hashlib
 
 def get_tag_color(tag):
@@ -48,21 +49,29 @@ def render_tags(tags):
     # 一次性渲染整个容器
     st.markdown(tags_container, unsafe_allow_html=True)
 
-def render_task_card(task, current_taskfile, idx=0, view_type="preview", show_checkbox=False):
+def render_task_card(task, current_taskfile, idx=0, view_type="preview", show_checkbox=False,
+                     card_settings=None, is_selected=None):
     """通用的任务卡片渲染函数，可在不同视图中复用
     
     参数:
         task: 任务数据
         current_taskfile: 当前任务文件路径
-        idx: 任务索引，用于生成唯一key
+        idx: 任务索引（组件key只由视图类型和任务键生成，翻页或过滤后保持不变，不再使用此参数）
         view_type: 视图类型，"preview"或"card"
         show_checkbox: 是否显示选择框
+        card_settings: 卡片视图设置，批量渲染时由调用方读取一次后传入，为None时自行读取
+        is_selected: 任务是否选中，批量渲染时由调用方传入，为None时自行查询
     """
     # 获取卡片视图设置
-    card_settings = get_card_view_settings()
+    if card_settings is None:
+        card_settings = get_card_view_settings()
     
-    # 生成唯一前缀，用于区分不同视图的组件key
-    prefix = f"{view_type}_{idx}_{task['name']}"
+    # 工作区模式下任务以 (文件, 任务名) 区分，并使用任务自身所属的Taskfile
+    task_key = get_task_key(task)
+    task_taskfile = get_task_taskfile(task, current_taskfile)
+    
+    # 生成唯一前缀，用于区分不同视图的组件key（不含位置，翻页后同一任务的按钮和编辑状态不变）
+    prefix = f"{view_type}_{task_key}"
     
     # 初始化编辑状态
     edit_key = f"edit_state_{prefix}"
@@ -70,7 +79,13 @@ def render_task_card(task, current_taskfile, idx=0, view_type="preview", show_ch
         st.session_state[edit_key] = False
     
     # 在expander中显示卡片内容
-    with st.expander(f"{task['emoji']} {task['name']}", expanded=True):
+    title = f"{task['emoji']} {task['name']}"
+    if task_key != task['name']:
+        title += f"  ·  {task.get('file_id', '')}"
+    # sources/generates未变化的任务标记为最新
+    if st.session_state.get('task_freshness', {}).get(task_key) == "up_to_date":
+        title += "  ·  ✅ 最新"
+    with st.expander(title, expanded=True):
         # 如果是编辑模式，显示编辑表单
         if st.session_state[edit_key]:
             # 定义返回按钮回调
@@ -81,7 +96,7 @@ def render_task_card(task, current_taskfile, idx=0, view_type="preview", show_ch
             # 渲染编辑表单
             render_task_edit_form(
                 task=task, 
-                taskfile_path=current_taskfile, 
+                taskfile_path=task_taskfile, 
                 on_save_callback=lambda: setattr(st.session_state, edit_key, False),
                 with_back_button=True,
                 back_button_callback=back_button_callback
@@ -102,13 +117,14 @@ def render_task_card(task, current_taskfile, idx=0, view_type="preview", show_ch
             
             # 显示命令 - 根据设置显示
             if card_settings.get("show_command", True):
-                cmd = get_task_command(task['name'], current_taskfile)
+                cmd = get_task_command(task['name'], task_taskfile)
                 st.code(cmd, language="bash")
             
             # 如果需要显示选择框
             if show_checkbox:
                 # 获取当前选择状态
-                is_selected = get_task_selection_state(task['name'])
+                if is_selected is None:
+                    is_selected = get_task_selection_state(task_key)
                 
                 # 操作按钮 - 使用动态列布局
                 # 定义按钮配置列表
@@ -151,19 +167,23 @@ def render_task_card(task, current_taskfile, idx=0, view_type="preview", show_ch
                             # 检查按钮状态变化
                             if st.button(config["icon"], key=btn_key, help=config["help"], type=button_type):
                                 # 直接更新全局选择状态
-                                update_task_selection(task['name'], not is_selected)
+                                update_task_selection(task_key, not is_selected)
                                 
                         # 运行按钮
                         elif "run_" in btn_key:
                             if st.button(config["icon"], key=btn_key, help=config["help"], type=button_type):
                                 with st.spinner(f"正在启动任务 {task['name']}..."):
-                                    run_task_via_cmd(task['name'], current_taskfile)
-                                    record_task_run(task['name'], status="started")
+                                    result = run_task_via_cmd(task['name'], task_taskfile)
+                                    if result is None:
+                                        st.warning("任务启动失败或执行队列已满")
+                                    elif get_execution_mode() == EXECUTION_MODE_DETACHED:
+                                        # 分离模式无法获知运行结果，只记录启动；后台模式在运行结束时记录真实结果
+                                        record_task_run(task_key, status="started")
                                     
                         # 复制命令按钮
                         elif "copy_" in btn_key:
                             if st.button(config["icon"], key=btn_key, help=config["help"], type=button_type):
-                                cmd = get_task_command(task['name'], current_taskfile)
+                                cmd = get_task_command(task['name'], task_taskfile)
                                 copy_to_clipboard(cmd)
                                 
                         # 编辑按钮
@@ -186,16 +206,3 @@ def render_task_card(task, current_taskfile, idx=0, view_type="preview", show_ch
                                     # 使用原来的内联编辑模式
                                     st.session_state[edit_key] = True
                                     st.rerun() # 编辑模式需要重新加载
-            
-            # 获取任务运行时数据
-            runtime = get_task_runtime(task['name'])
-            
-            # 如果有运行记录，显示运行信息
-            # if runtime.get("run_count", 0) > 0:
-            #     col_a, col_b, col_c = st.columns(3)
-            #     with col_a:
-            #         st.markdown(f"**运行次数**: {runtime.get('run_count', 0)}")
-            #     with col_b:
-            #         st.markdown(f"**最后运行**: {runtime.get('last_run', 'N/A')}")
-            #     with col_c:
-            #         st.markdown(f"**最后状态**: {runtime.get('last_status', 'N/A')}")
\ No newline at end of file
@@ -12,13 +12,19 @@ def prepare_display_data(filtered_df):
     # 添加显示名称
     filtered_df_copy['显示名称'] = filtered_df_copy.apply(lambda x: f"{x['emoji']} {x['name']}", axis=1)
     
+    # 工作区模式下使用任务键区分不同文件中的同名任务
+    key_column = 'task_key' if 'task_key' in filtered_df_copy.columns else 'name'
+    
     # 创建勾选列，从集中状态管理获取
-    filtered_df_copy['选择'] = filtered_df_copy['name'].apply(
+    filtered_df_copy['选择'] = filtered_df_copy[key_column].apply(
         lambda x: get_task_selection_state(x)
     )
     
     # 准备要显示的列
-    display_df = filtered_df_copy[['选择', 'name', '显示名称', 'description', 'tags_str', 'directory']]
+    display_columns = ['选择', 'name', '显示名称', 'description', 'tags_str', 'directory']
+    if key_column == 'task_key':
+        display_columns.append('task_key')
+    display_df = filtered_df_copy[display_columns]
     display_df = display_df.rename(columns={
         'description': '描述',
         'tags_str': '标签',
@@ -40,8 +46,9 @@ def process_grid_selection_changes(grid_return):
     has_changes = False
     
     # 检查每个任务的选择状态与全局状态是否一致
+    key_column = 'task_key' if 'task_key' in updated_df.columns else 'name'
     for idx, row in updated_df.iterrows():
-        task_name = row['name']
+        task_name = row[key_column]
         if task_name and pd.notna(task_name):  # 确保任务名有效
             current_selection = bool(row['选择'])
             previous_selection = get_task_selection_state(task_name)
@@ -61,6 +68,6 @@ def process_grid_selection_changes(grid_return):
             st.session_state.selected_tasks = []
         
         # 重新构建选中任务列表
-        st.session_state.selected_tasks = list(updated_df[updated_df['选择'] == True]['name'].values)
+        st.session_state.selected_tasks = list(updated_df[updated_df['选择'] == True][key_column].values)
     
     return has_changes 
\ No newline at end of file
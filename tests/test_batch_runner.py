@@ -0,0 +1,150 @@
+import threading
+
+import pytest
+
+from src.services import batch_runner, run_engine
+from src.services.batch_runner import build_batch_argv
+
+TASKFILE = """
+version: '3'
+tasks:
+  build:
+    prefix: compile
+    cmds: [make]
+  test:
+    cmds: [pytest]
+  lint:
+    cmds: [flake8]
+"""
+
+@pytest.fixture
+def engine(monkeypatch):
+    """记录子运行的输出与状态变化，代替真实的运行引擎"""
+    events = {"output": {}, "started": [], "finished": {}, "closed": []}
+
+    monkeypatch.setattr(run_engine, "append_run_output",
+                        lambda child_id, data: events["output"].setdefault(child_id, []).append(data))
+    monkeypatch.setattr(run_engine, "mark_child_started", lambda child_id: events["started"].append(child_id))
+
+    def finish_child_run(child_id, status, exit_code=None, error=None, pid=None):
+        # 与引擎一致：已结束的子运行不再改变状态
+        if child_id in events["finished"]:
+            return None
+        events["finished"][child_id] = (status, exit_code, error)
+        return {"run_id": child_id, "status": status, "exit_code": exit_code}
+
+    monkeypatch.setattr(run_engine, "finish_child_run", finish_child_run)
+    monkeypatch.setattr(run_engine, "close_child_run", lambda child_id: events["closed"].append(child_id))
+    return events
+
+@pytest.fixture
+def batch(tmp_path):
+    taskfile = tmp_path / "Taskfile.yml"
+    taskfile.write_text(TASKFILE)
+    names = ["build", "test", "lint"]
+    return {
+        "children": {name: f"child-{name}" for name in names},
+        "prefixes": batch_runner._task_prefixes(names, str(taskfile)),
+        "failed": [],
+        "partial": {"stdout": b"", "stderr": b""},
+        "lock": threading.Lock(),
+    }
+
+def _feed(batch, text, stream_name="stdout", chunk=None):
+    data = text.encode("utf-8")
+    chunk = chunk or len(data)
+    for start in range(0, len(data), chunk):
+        batch_runner._feed_output(batch, stream_name, data[start:start + chunk])
+
+def _text(engine, name):
+    return b"".join(engine["output"].get(f"child-{name}", [])).decode("utf-8")
+
+def test_custom_prefix_maps_to_task(batch):
+    assert batch["prefixes"] == {"build": "build", "compile": "build", "test": "test", "lint": "lint"}
+
+def test_build_batch_argv(tmp_path):
+    taskfile = tmp_path / "Taskfile.yml"
+    taskfile.write_text(TASKFILE)
+    assert build_batch_argv(["a", "b"]) == ["task", "--output", "prefixed", "--verbose", "a", "b"]
+    assert build_batch_argv(["a"], str(taskfile), parallel=True) == [
+        "task", "--taskfile", str(taskfile), "--output", "prefixed", "--verbose", "--parallel", "a"]
+
+def test_sequential_run_with_failed_task(engine, batch):
+    _feed(batch, (
+        'task: "build" started\n'
+        'task: [build] make\n'
+        '[compile] gcc -o app main.c\n'
+        'task: "build" finished\n'
+        'task: "test" started\n'
+        'task: [test] pytest\n'
+        '[test] 1 failed\n'
+        'task: Failed to run task "test": exit status 2\n'
+    ))
+    assert engine["started"] == ["child-build", "child-test"]
+    assert _text(engine, "build") == "task: [build] make\ngcc -o app main.c\n"
+    assert _text(engine, "test") == ('task: [test] pytest\n1 failed\n'
+                                     'task: Failed to run task "test": exit status 2\n')
+    assert engine["finished"] == {
+        "child-build": (run_engine.STATUS_SUCCESS, None, None),
+        "child-test": (run_engine.STATUS_FAILED, 2, "exit status 2"),
+    }
+    assert batch["failed"] == ["test"]
+
+    # task以非零退出：未开始的lint记为因test失败而取消
+    records = batch_runner._finish_children(batch, {"status": run_engine.STATUS_FAILED, "exit_code": 2, "pid": 1})
+    assert [record["run_id"] for record in records] == ["child-lint"]
+    status, exit_code, error = engine["finished"]["child-lint"]
+    assert (status, exit_code) == (run_engine.STATUS_CANCELLED, None)
+    assert "test" in error
+    assert engine["closed"] == ["child-build", "child-test", "child-lint"]
+
+def test_interleaved_parallel_output_split_across_chunks(engine, batch):
+    # 并行运行时各任务的行交错出现，读取块可能在行中间断开
+    _feed(batch, (
+        'task: "build" started\n'
+        'task: "test" started\n'
+        '[compile] step 1\n'
+        '[test] collected 3 items\n'
+        '[compile] step 2\n'
+        '[test] 3 passed\n'
+        'task: "test" finished\n'
+        '[compile] 中文输出\n'
+        'task: "build" finished\n'
+        'task: Task "lint" is up to date\n'
+    ), chunk=7)
+    assert _text(engine, "build") == "step 1\nstep 2\n中文输出\n"
+    assert _text(engine, "test") == "collected 3 items\n3 passed\n"
+    assert engine["finished"] == {
+        "child-test": (run_engine.STATUS_SUCCESS, None, None),
+        "child-build": (run_engine.STATUS_SUCCESS, None, None),
+        "child-lint": (run_engine.STATUS_SUCCESS, None, None),
+    }
+
+def test_streams_are_buffered_separately(engine, batch):
+    _feed(batch, "[test] out", "stdout")
+    _feed(batch, "[compile] warn", "stderr")
+    _feed(batch, "put\n", "stdout")
+    assert _text(engine, "test") == "output\n"
+    assert _text(engine, "build") == ""
+    # 进程结束时处理最后一个没有换行的行
+    batch_runner._flush_output(batch)
+    assert _text(engine, "build") == "warn\n"
+    assert batch["partial"] == {"stdout": b"", "stderr": b""}
+
+def test_unknown_prefixes_and_other_lines_are_ignored(engine, batch):
+    _feed(batch, (
+        '[deploy] not ours\n'
+        'task: "deploy" started\n'
+        'task: Failed to run task "deploy": exit status 1\n'
+        'plain line\n'
+    ))
+    assert engine["output"] == {}
+    assert engine["started"] == []
+    assert engine["finished"] == {}
+    assert batch["failed"] == []
+
+def test_failure_without_attribution_fails_pending_tasks(engine, batch):
+    _feed(batch, 'task: "build" started\ntask: "build" finished\n')
+    batch_runner._finish_children(batch, {"status": run_engine.STATUS_FAILED, "exit_code": 201})
+    assert engine["finished"]["child-test"] == (run_engine.STATUS_FAILED, 201, None)
+    assert engine["finished"]["child-build"] == (run_engine.STATUS_SUCCESS, None, None)
@@ -0,0 +1,119 @@
+from datetime import datetime
+
+import pytest
+
+from src.services import cron_scheduler
+from src.services.cron_scheduler import (
+    parse_cron, next_fire_time, previous_fire_time, _new_schedule, _process_due,
+    CATCH_UP_SKIP, CATCH_UP_ONCE, CATCH_UP_ALL, MAX_COUNTED_SLOTS, MAX_PENDING_RUNS,
+)
+
+@pytest.fixture(autouse=True)
+def _memory_state(monkeypatch):
+    """不读写 cache/cron_state.json"""
+    monkeypatch.setattr(cron_scheduler, "_STATE", {})
+
+def _schedule(cron, catch_up, last_slot):
+    binding = {"id": "s1", "task": "build", "cron": cron, "catch_up": catch_up}
+    cron_scheduler._STATE["s1"] = {"last_slot": last_slot.isoformat(timespec="seconds")}
+    return _new_schedule(binding, submit=None, now=last_slot)
+
+def test_parse_cron_fields():
+    spec = parse_cron("*/15 9-17 * jan,jul mon-fri")
+    assert spec["minute"] == {0, 15, 30, 45}
+    assert spec["hour"] == set(range(9, 18))
+    assert spec["month"] == {1, 7}
+    assert spec["weekday"] == {1, 2, 3, 4, 5}
+    assert spec["day_any"] and not spec["weekday_any"]
+
+def test_parse_cron_macro_and_sunday_alias():
+    assert parse_cron("@daily")["hour"] == {0}
+    assert parse_cron("0 0 * * 7")["weekday"] == {0}
+
+@pytest.mark.parametrize("expression", ["", "* * * *", "60 * * * *", "* * * * mon-xyz", "*/0 * * * *", "5-1 * * * *"])
+def test_parse_cron_rejects_invalid(expression):
+    with pytest.raises(ValueError):
+        parse_cron(expression)
+
+def test_next_fire_time_is_strictly_after():
+    spec = parse_cron("30 * * * *")
+    assert next_fire_time(spec, datetime(2024, 1, 1, 10, 30)) == datetime(2024, 1, 1, 11, 30)
+    assert next_fire_time(spec, datetime(2024, 1, 1, 10, 29, 59)) == datetime(2024, 1, 1, 10, 30)
+
+def test_next_fire_time_crosses_month_and_year():
+    spec = parse_cron("0 0 1 * *")
+    assert next_fire_time(spec, datetime(2024, 12, 15, 8, 0)) == datetime(2025, 1, 1, 0, 0)
+    assert next_fire_time(parse_cron("0 12 29 2 *"), datetime(2024, 3, 1)) == datetime(2028, 2, 29, 12, 0)
+
+def test_next_fire_time_day_or_weekday():
+    # 日与周都有限定时满足其一即可：2024-01-01是周一
+    spec = parse_cron("0 0 15 * mon")
+    assert next_fire_time(spec, datetime(2024, 1, 1, 0, 0)) == datetime(2024, 1, 8, 0, 0)
+    assert next_fire_time(spec, datetime(2024, 1, 8, 0, 0)) == datetime(2024, 1, 15, 0, 0)
+
+def test_next_fire_time_never_fires():
+    assert next_fire_time(parse_cron("0 0 30 2 *"), datetime(2024, 1, 1)) is None
+
+def test_previous_fire_time_is_not_after():
+    spec = parse_cron("0 0 1 * *")
+    assert previous_fire_time(spec, datetime(2024, 3, 1, 0, 0, 30)) == datetime(2024, 3, 1, 0, 0)
+    assert previous_fire_time(spec, datetime(2024, 1, 15, 8, 0)) == datetime(2024, 1, 1, 0, 0)
+    assert previous_fire_time(parse_cron("*/10 * * * *"), datetime(2024, 1, 1, 0, 5)) == datetime(2024, 1, 1, 0, 0)
+
+def test_on_time_fire_runs_once():
+    schedule = _schedule("* * * * *", CATCH_UP_SKIP, datetime(2024, 1, 1, 10, 0))
+    assert _process_due(schedule, datetime(2024, 1, 1, 10, 1, 5)) == 1
+    assert schedule["missed"] == 0
+    assert schedule["last_slot"] == "2024-01-01T10:01:00"
+
+def test_nothing_due():
+    schedule = _schedule("0 * * * *", CATCH_UP_ALL, datetime(2024, 1, 1, 10, 0))
+    assert _process_due(schedule, datetime(2024, 1, 1, 10, 30)) == 0
+    assert schedule["last_slot"] == "2024-01-01T10:00:00"
+
+@pytest.mark.parametrize("policy, runs, caught_up", [
+    (CATCH_UP_SKIP, 0, 0),
+    (CATCH_UP_ONCE, 1, 1),
+    (CATCH_UP_ALL, 3, 3),
+])
+def test_missed_runs_follow_policy(policy, runs, caught_up):
+    # 11点、12点、13点三次触发都已超过宽限时间
+    schedule = _schedule("0 * * * *", policy, datetime(2024, 1, 1, 10, 0))
+    assert _process_due(schedule, datetime(2024, 1, 1, 13, 30)) == runs
+    assert schedule["missed"] == 3
+    assert schedule["caught_up"] == caught_up
+    assert schedule["last_slot"] == "2024-01-01T13:00:00"
+
+def test_missed_and_on_time_fire():
+    schedule = _schedule("0 * * * *", CATCH_UP_SKIP, datetime(2024, 1, 1, 10, 0))
+    assert _process_due(schedule, datetime(2024, 1, 1, 13, 0, 20)) == 1
+    assert schedule["missed"] == 2
+    assert schedule["caught_up"] == 0
+
+def test_catch_up_all_is_bounded():
+    schedule = _schedule("0 * * * *", CATCH_UP_ALL, datetime(2024, 1, 1, 0, 0))
+    assert _process_due(schedule, datetime(2024, 1, 2, 0, 30)) == MAX_PENDING_RUNS
+    assert schedule["missed"] == 24
+
+@pytest.mark.parametrize("policy", [CATCH_UP_SKIP, CATCH_UP_ONCE, CATCH_UP_ALL])
+def test_long_downtime_advances_to_latest_slot(policy):
+    # 每分钟触发，停机约一周（远超过统计上限），恢复时恰好在一次触发后10秒
+    start = datetime(2024, 1, 1, 0, 0)
+    now = datetime(2024, 1, 8, 12, 34, 10)
+    schedule = _schedule("* * * * *", policy, start)
+    runs = _process_due(schedule, now)
+    assert schedule["last_slot"] == "2024-01-08T12:34:00"
+    assert schedule["missed"] == MAX_COUNTED_SLOTS
+    # 准时的那次触发照常运行
+    assert runs == {CATCH_UP_SKIP: 1, CATCH_UP_ONCE: 1, CATCH_UP_ALL: MAX_PENDING_RUNS}[policy]
+
+    # 下一次触发只处理新的触发时间，不再重复统计停机期间的错过
+    assert _process_due(schedule, datetime(2024, 1, 8, 12, 35, 5)) == 1
+    assert schedule["missed"] == MAX_COUNTED_SLOTS
+    assert schedule["last_slot"] == "2024-01-08T12:35:00"
+
+def test_long_downtime_between_fires():
+    schedule = _schedule("* * * * *", CATCH_UP_ONCE, datetime(2024, 1, 1, 0, 0))
+    assert _process_due(schedule, datetime(2024, 1, 8, 12, 34, 50)) == 1
+    assert schedule["last_slot"] == "2024-01-08T12:34:00"
+    assert _process_due(schedule, datetime(2024, 1, 8, 12, 34, 55)) == 0
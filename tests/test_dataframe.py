@@ -0,0 +1,41 @@
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from src.services import dataframe
+from src.services.dataframe import sort_tasks, SORT_OPTIONS
+
+@pytest.fixture
+def session(monkeypatch):
+    """用普通字典代替Streamlit会话状态"""
+    state = {}
+    monkeypatch.setattr(dataframe, "st", SimpleNamespace(session_state=state))
+    runtime = {"a": {"duration": 3.0}, "b": {"duration": 1.0}}
+    monkeypatch.setattr(dataframe, "get_task_runtime", lambda key: runtime.get(key, {}))
+    return state
+
+def _names(df):
+    return df["name"].tolist()
+
+def test_default_keeps_taskfile_order(session):
+    df = pd.DataFrame({"name": ["b", "a"]})
+    assert _names(sort_tasks(df)) == ["b", "a"]
+
+def test_sort_by_column_and_order(session):
+    session.update(sort_by="目录", sort_order="降序")
+    df = pd.DataFrame({"name": ["x", "y", "z"], "directory": ["b", "c", "a"]})
+    assert _names(sort_tasks(df)) == ["y", "x", "z"]
+
+def test_named_and_numeric_priorities_sort_together(session):
+    session.update(sort_by="优先级", sort_order="升序")
+    df = pd.DataFrame({"name": ["docs", "build", "deploy", "lint"], "priority": ["low", 2, "high", ""]})
+    assert _names(sort_tasks(df)) == ["deploy", "build", "lint", "docs"]
+
+def test_runtime_columns_put_unrun_tasks_last(session):
+    for order, expected in (("升序", ["b", "a", "c"]), ("降序", ["a", "b", "c"])):
+        session.update(sort_by="耗时", sort_order=order)
+        assert _names(sort_tasks(pd.DataFrame({"name": ["c", "a", "b"]}))) == expected
+
+def test_sort_options_cover_columns():
+    assert set(SORT_OPTIONS.values()) >= {None, "name", "description", "directory", "group", "priority"}
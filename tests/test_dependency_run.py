@@ -0,0 +1,67 @@
+from concurrent.futures import Future
+
+import pytest
+
+from src.services import task_runner
+
+TASKFILE = """version: '3'
+tasks:
+  gen:
+    cmds:
+      - echo gen
+  compile:
+    deps: [gen]
+    cmds:
+      - echo compile
+  assets:
+    deps: [gen]
+    sources: ["*.css"]
+    cmds:
+      - echo assets
+  build:
+    deps: [compile, assets]
+    cmds:
+      - echo build
+  release:
+    deps: [build, "docs:publish"]
+    cmds:
+      - echo release
+"""
+
+@pytest.fixture
+def taskfile(tmp_path):
+    path = tmp_path / "Taskfile.yml"
+    path.write_text(TASKFILE, encoding="utf-8")
+    return str(path)
+
+@pytest.fixture
+def submitted(monkeypatch):
+    """记录每个节点的提交参数，并立即以成功结束"""
+    calls = {}
+
+    def fake_submit(task_name, taskfile_path=None, **kwargs):
+        calls[task_name] = kwargs
+        future = Future()
+        future.set_result({"run_id": task_name, "status": "success", "exit_code": 0, "duration": 0.1})
+        return future
+
+    monkeypatch.setattr(task_runner, "submit_task_run", fake_submit)
+    return calls
+
+def test_plan_lists_nodes_that_rerun_deps(taskfile):
+    plan = task_runner.plan_dependency_run(["release"], taskfile)
+    assert set(plan["rerun_deps"]) == {"assets", "release"}
+    assert "sources" in plan["rerun_deps"]["assets"]
+    assert "docs:publish" in plan["rerun_deps"]["release"]
+
+@pytest.mark.parametrize("direct", [False, True])
+def test_nodes_with_deps_run_without_their_deps(taskfile, submitted, direct):
+    plan = task_runner.plan_dependency_run(["build"], taskfile)
+    task_runner.run_dependency_plan(plan, taskfile, force=True, direct=direct, default_timeout=0)
+    assert set(submitted) == {"gen", "compile", "assets", "build"}
+    assert all(call["skip_deps"] for call in submitted.values())
+    # 有依赖的节点总是直接执行；没有依赖的节点按设置
+    assert submitted["compile"]["direct"] and submitted["build"]["direct"]
+    assert submitted["gen"]["direct"] == direct
+    # 无法直接执行的节点回退到task
+    assert not submitted["assets"]["direct"]
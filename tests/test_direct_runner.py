@@ -0,0 +1,63 @@
+import os
+import subprocess
+
+import pytest
+
+from src.services import direct_runner
+from src.services.direct_runner import expand_task, clear_expansion_cache
+
+TASKFILE = """version: '3'
+tasks:
+  block:
+    cmds:
+      - |
+        false
+        echo after-false
+      - echo second
+  stop:
+    cmds:
+      - exit 3
+      - echo unreachable
+  where:
+    cmds:
+      - echo "{{.USER_WORKING_DIR}}" && echo "{{.GREETING}}"
+"""
+
+@pytest.fixture
+def taskfile(tmp_path):
+    clear_expansion_cache()
+    path = tmp_path / "Taskfile.yml"
+    path.write_text(TASKFILE, encoding="utf-8")
+    yield str(path)
+    clear_expansion_cache()
+
+def _run(expansion):
+    result = subprocess.run(expansion["argv"], cwd=expansion["cwd"], env=expansion["env"],
+                            capture_output=True, text=True)
+    return result.returncode, result.stdout.split()
+
+def test_multiline_block_uses_last_line_status(taskfile):
+    # 与task一致：多行命令块中失败的行不会中止后续行
+    assert _run(expand_task(taskfile, "block")) == (0, ["after-false", "second"])
+
+def test_failing_command_stops_later_commands(taskfile):
+    assert _run(expand_task(taskfile, "stop")) == (3, [])
+
+def test_user_working_dir_is_launch_dir(taskfile, tmp_path, monkeypatch):
+    launch_dir = tmp_path / "launch"
+    launch_dir.mkdir()
+    monkeypatch.chdir(launch_dir)
+    monkeypatch.setenv("GREETING", "hello")
+    expansion = expand_task(taskfile, "where")
+    assert expansion["cwd"] == str(tmp_path)
+    assert _run(expansion)[1] == [str(launch_dir), "hello"]
+
+def test_environment_change_invalidates_cache(taskfile, monkeypatch):
+    monkeypatch.setenv("GREETING", "hello")
+    first = expand_task(taskfile, "where")
+    assert expand_task(taskfile, "where") is first
+    monkeypatch.setenv("GREETING", "bye")
+    second = expand_task(taskfile, "where")
+    assert second is not first
+    assert _run(second)[1][-1] == "bye"
+    assert second["env"]["GREETING"] == "bye"
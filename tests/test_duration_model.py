@@ -0,0 +1,76 @@
+import pytest
+
+from src.services.duration_model import (
+    new_duration_model, update_duration_model, duration_quantile, summarize_duration_model, estimate_progress,
+    estimate_batch_progress, format_seconds, BIN_RATIO, DECAY, MIN_WEIGHT, OVERDUE_FACTOR,
+)
+
+def _model(*durations):
+    model = new_duration_model()
+    for duration in durations:
+        update_duration_model(model, duration)
+    return model
+
+def test_empty_model_has_no_quantile():
+    assert duration_quantile(new_duration_model(), 0.5) is None
+    assert summarize_duration_model(new_duration_model()) is None
+
+def test_quantile_within_bin_width():
+    model = _model(*([2.0] * 5 + [20.0] * 5))
+    assert duration_quantile(model, 0.2) == pytest.approx(2.0, rel=BIN_RATIO - 1)
+    assert duration_quantile(model, 0.9) == pytest.approx(20.0, rel=BIN_RATIO - 1)
+
+def test_invalid_durations_are_ignored():
+    model = _model(None, -1, 5.0)
+    assert model["runs"] == 1
+
+def test_decay_favours_recent_runs():
+    # 先10次1秒，再10次10秒：近期的10秒权重更大，中位数跟随新水平
+    model = _model(*([1.0] * 10 + [10.0] * 10))
+    assert duration_quantile(model, 0.5) == pytest.approx(10.0, rel=BIN_RATIO - 1)
+    weights = sorted(model["bins"].values())
+    old_weight = sum(DECAY ** k for k in range(10, 20))
+    assert weights[0] == pytest.approx(old_weight)
+    assert model["total"] == pytest.approx(sum(weights))
+    assert model["runs"] == 20
+
+def test_decayed_bins_are_dropped():
+    model = _model(1.0)
+    updates = 0
+    while DECAY ** (updates + 1) >= MIN_WEIGHT:
+        update_duration_model(model, 10.0)
+        updates += 1
+    assert len(model["bins"]) == 2
+    update_duration_model(model, 10.0)
+    assert len(model["bins"]) == 1
+
+def test_estimate_progress_stages():
+    summary = {"median": 10.0, "p90": 20.0, "runs": 5}
+    assert estimate_progress(5, None) is None
+    early = estimate_progress(5, summary)
+    assert (early["expected"], early["remaining"], early["overdue"]) == (10.0, 5.0, False)
+    late = estimate_progress(15, summary)
+    assert (late["expected"], late["remaining"], late["overdue"]) == (20.0, 5.0, False)
+    overdue = estimate_progress(30, summary)
+    assert overdue["overdue"]
+    assert overdue["remaining"] == pytest.approx(30 * OVERDUE_FACTOR)
+    assert overdue["progress"] == pytest.approx(0.99, abs=0.1)
+
+def test_estimate_batch_progress_fills_earliest_free_slot():
+    running = [(2.0, {"median": 5.0, "p90": 8.0})]
+    queued = [{"median": 4.0, "p90": 6.0}, None]
+    result = estimate_batch_progress(running, queued, finished=[3.0], max_workers=2, default_duration=6.0)
+    # 槽位：运行中的任务还剩3秒、另一个空闲；4秒的任务放入空闲槽位，默认6秒的任务接在3秒之后
+    assert result["remaining"] == pytest.approx(9.0)
+    # 已完成 3 + 2，总量 3 + 5 + 4 + 6
+    assert result["progress"] == pytest.approx(5.0 / 18.0)
+
+def test_estimate_batch_progress_without_models():
+    # 没有模型且已超过默认耗时的运行按已运行时间计，不再占用剩余时间
+    result = estimate_batch_progress([(8.0, None)], [], finished=[], max_workers=1, default_duration=6.0)
+    assert result == {"progress": 1.0, "remaining": 0.0}
+    assert estimate_batch_progress([], [], [], 2, 6.0) == {"progress": 1.0, "remaining": 0.0}
+
+@pytest.mark.parametrize("seconds, text", [(0, "0s"), (12.4, "12s"), (185, "3m05s"), (3720, "1h02m")])
+def test_format_seconds(seconds, text):
+    assert format_seconds(seconds) == text
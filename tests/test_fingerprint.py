@@ -0,0 +1,171 @@
+import os
+import threading
+
+import pytest
+
+from src.services import fingerprint
+from src.services.fingerprint import (
+    check_tasks, mark_built, task_id, STATUS_UP_TO_DATE, STATUS_STALE, STATUS_UNKNOWN,
+)
+
+TASKFILE = """
+version: '3'
+tasks:
+  build:
+    sources:
+      - src/**/*.c
+      - exclude: src/vendor/**
+    generates:
+      - out/app
+    cmds:
+      - cc src/*.c -o out/app
+  stamp:
+    method: timestamp
+    sources: [src/*.c]
+    generates: [out/app]
+  always:
+    method: none
+    sources: [src/*.c]
+  plain:
+    cmds: [echo hi]
+"""
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path, monkeypatch):
+    """指纹缓存写入临时目录，内存状态在测试之间独立"""
+    monkeypatch.setattr(fingerprint, "CACHE_FILE", str(tmp_path / "cache" / "fingerprints.json"))
+    monkeypatch.setattr(fingerprint, "_STATE", {"files": {}, "tasks": {}})
+    monkeypatch.setattr(fingerprint, "_STATUS_MEMO", fingerprint.OrderedDict())
+    monkeypatch.setattr(fingerprint, "_LOADED_MTIME", None)
+    monkeypatch.setattr(fingerprint, "_DIRTY", False)
+
+@pytest.fixture
+def project(tmp_path):
+    """src下两个源文件和一个被排除的vendor文件"""
+    (tmp_path / "src" / "vendor").mkdir(parents=True)
+    (tmp_path / "src" / "main.c").write_text("int main() {}")
+    (tmp_path / "src" / "util.c").write_text("int util;")
+    (tmp_path / "src" / "vendor" / "lib.c").write_text("int lib;")
+    (tmp_path / "out").mkdir()
+    taskfile = tmp_path / "Taskfile.yml"
+    taskfile.write_text(TASKFILE)
+    return tmp_path, str(taskfile)
+
+def _status(taskfile, name):
+    return check_tasks([(taskfile, name)])[task_id(taskfile, name)]
+
+def _set_mtime(path, seconds):
+    os.utime(path, ns=(seconds * 10**9, seconds * 10**9))
+
+def test_glob_expansion_with_exclude(project):
+    root, taskfile = project
+    resolved = fingerprint._resolve_task(taskfile, "build", {})
+    assert resolved["source_files"] == [str(root / "src" / "main.c"), str(root / "src" / "util.c")]
+    assert resolved["method"] == "checksum"
+    assert resolved["generate_patterns"] == ["out/app"]
+    assert resolved["generate_files"] == []
+
+def test_tasks_without_sources_are_unknown(project):
+    _, taskfile = project
+    assert _status(taskfile, "plain") == STATUS_UNKNOWN
+    assert mark_built(taskfile, "plain").result(timeout=5) is None
+    assert _status(taskfile, "plain") == STATUS_UNKNOWN
+
+def test_checksum_follows_content(project):
+    root, taskfile = project
+    (root / "out" / "app").write_text("binary")
+    assert _status(taskfile, "build") == STATUS_STALE
+    mark_built(taskfile, "build").result(timeout=5)
+    assert _status(taskfile, "build") == STATUS_UP_TO_DATE
+
+    (root / "src" / "util.c").write_text("int util2;")
+    assert _status(taskfile, "build") == STATUS_STALE
+    # 内容改回原样即恢复为最新，只改动时间不影响
+    (root / "src" / "util.c").write_text("int util;")
+    _set_mtime(root / "src" / "util.c", 2_000_000_000)
+    assert _status(taskfile, "build") == STATUS_UP_TO_DATE
+    # 被排除的文件不参与指纹
+    (root / "src" / "vendor" / "lib.c").write_text("changed")
+    assert _status(taskfile, "build") == STATUS_UP_TO_DATE
+
+def test_missing_generates_is_stale(project):
+    _, taskfile = project
+    mark_built(taskfile, "build").result(timeout=5)
+    assert _status(taskfile, "build") == STATUS_STALE
+
+def test_hash_cache_reused_until_mtime_or_size_changes(project, monkeypatch):
+    root, _ = project
+    path = str(root / "src" / "main.c")
+    hashed = []
+    real_hash = fingerprint._hash_file
+    monkeypatch.setattr(fingerprint, "_hash_file", lambda p: hashed.append(p) or real_hash(p))
+
+    _set_mtime(path, 1_000_000_000)
+    first = fingerprint._file_hashes([path])[path]
+    assert fingerprint._file_hashes([path])[path] == first
+    assert hashed == [path]
+
+    # 大小相同的修改：mtime变化后重新计算
+    (root / "src" / "main.c").write_text("int mian() {}")
+    _set_mtime(path, 1_000_000_001)
+    assert fingerprint._file_hashes([path])[path] != first
+    assert hashed == [path, path]
+
+def test_hash_cache_survives_reload_from_disk(project, monkeypatch):
+    root, taskfile = project
+    (root / "out" / "app").write_text("binary")
+    mark_built(taskfile, "build").result(timeout=5)
+    assert os.path.exists(fingerprint.CACHE_FILE)
+
+    # 模拟新进程：内存为空，从磁盘合并
+    monkeypatch.setattr(fingerprint, "_STATE", {"files": {}, "tasks": {}})
+    monkeypatch.setattr(fingerprint, "_LOADED_MTIME", None)
+    monkeypatch.setattr(fingerprint, "_hash_file", lambda p: pytest.fail("mtime未变时不应重新计算哈希"))
+    assert _status(taskfile, "build") == STATUS_UP_TO_DATE
+
+def test_timestamp_method(project):
+    root, taskfile = project
+    for name in ("main.c", "util.c"):
+        _set_mtime(root / "src" / name, 1_000_000_000)
+    assert _status(taskfile, "stamp") == STATUS_STALE
+    (root / "out" / "app").write_text("binary")
+    _set_mtime(root / "out" / "app", 1_000_000_100)
+    assert _status(taskfile, "stamp") == STATUS_UP_TO_DATE
+    _set_mtime(root / "src" / "util.c", 1_000_000_200)
+    assert _status(taskfile, "stamp") == STATUS_STALE
+
+def test_method_none_is_never_up_to_date(project):
+    _, taskfile = project
+    mark_built(taskfile, "always").result(timeout=5)
+    assert _status(taskfile, "always") == STATUS_STALE
+
+def test_status_memo_reuse_and_bound(project, monkeypatch):
+    root, taskfile = project
+    monkeypatch.setattr(fingerprint, "MAX_STATUS_MEMO", 2)
+    refs = [(taskfile, name) for name in ("build", "stamp", "always", "plain")]
+    statuses = check_tasks(refs)
+    assert len(statuses) == 4
+    # 只保留最近写入的两条
+    assert list(fingerprint._STATUS_MEMO) == list(statuses)[-2:]
+
+    # max_age 内复用缓存结果，即使文件已变化
+    (root / "out" / "app").write_text("binary")
+    key = task_id(taskfile, "always")
+    assert check_tasks([(taskfile, "always")], max_age=60)[key] == STATUS_STALE
+    assert list(fingerprint._STATUS_MEMO)[-1] == key
+
+def test_mark_built_does_not_block_caller(project, monkeypatch):
+    _, taskfile = project
+    release = threading.Event()
+    real_hashes = fingerprint._file_hashes
+
+    def slow_hashes(paths):
+        assert release.wait(5)
+        return real_hashes(paths)
+
+    monkeypatch.setattr(fingerprint, "_file_hashes", slow_hashes)
+    future = mark_built(taskfile, "build")
+    assert not future.done()
+    release.set()
+    future.result(timeout=5)
+    assert task_id(taskfile, "build") in fingerprint._STATE["tasks"]
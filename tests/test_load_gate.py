@@ -0,0 +1,65 @@
+from collections import deque
+
+import pytest
+
+from src.services import load_gate
+from src.services.load_gate import admit, forget_item, get_gate_snapshot, DECISION_ADMITTED, DECISION_DEFERRED
+
+@pytest.fixture
+def samples(monkeypatch):
+    """启用门控并按顺序返回预设的负载采样"""
+    monkeypatch.setattr(load_gate, "_GATE_SETTINGS", dict(
+        load_gate._GATE_SETTINGS, enabled=True, max_cpu_percent=80.0, max_load_per_cpu=2.0,
+        min_available_mb=500, admission_interval=0.0,
+    ))
+    monkeypatch.setattr(load_gate, "_DECISIONS", deque(maxlen=500))
+    monkeypatch.setattr(load_gate, "_SAMPLES", deque(maxlen=300))
+    monkeypatch.setattr(load_gate, "_COUNTS", {DECISION_ADMITTED: 0, DECISION_DEFERRED: 0})
+    monkeypatch.setattr(load_gate, "_LAST_DEFERRAL", {})
+    queue = deque()
+
+    def fake_sample():
+        cpu, available = queue.popleft()
+        return {"time": "2024-01-01T00:00:00", "cpu_percent": cpu, "load_per_cpu": None, "available_mb": available}
+
+    monkeypatch.setattr(load_gate, "sample_load", fake_sample)
+    return queue
+
+def _reasons():
+    return [(decision["item_id"], decision["decision"], decision["reason"]) for decision in get_gate_snapshot()["decisions"]]
+
+def test_rechecks_with_changing_readings_count_once(samples):
+    samples.extend([(91, 4000), (95, 4000), (88, 4000), (50, 4000)])
+    assert admit("q1", "build", 1)[0] is False
+    assert admit("q1", "build", 1)[0] is False
+    assert admit("q1", "build", 1)[0] is False
+    assert admit("q1", "build", 1) == (True, 0)
+    assert get_gate_snapshot()["counts"] == {DECISION_ADMITTED: 1, DECISION_DEFERRED: 1}
+    assert _reasons() == [("q1", DECISION_DEFERRED, "CPU 91% > 80%"), ("q1", DECISION_ADMITTED, "")]
+
+def test_new_threshold_type_is_recorded_without_recounting(samples):
+    samples.extend([(91, 4000), (92, 100), (93, 120)])
+    for _ in range(3):
+        admit("q1", "build", 1)
+    assert get_gate_snapshot()["counts"][DECISION_DEFERRED] == 1
+    assert [reason for _, _, reason in _reasons()] == ["CPU 91% > 80%", "CPU 92% > 80%; 可用内存 100MB < 500MB"]
+
+def test_each_queued_item_counts_separately(samples):
+    samples.extend([(91, 4000), (91, 4000), (92, 4000), (93, 4000)])
+    admit("q1", "build", 1)
+    admit("q2", "test", 1)
+    admit("q1", "build", 1)
+    admit("q2", "test", 1)
+    assert get_gate_snapshot()["counts"][DECISION_DEFERRED] == 2
+
+def test_deferred_again_after_forget(samples):
+    samples.extend([(91, 4000), (91, 4000)])
+    admit("q1", "build", 1)
+    forget_item("q1")
+    admit("q1", "build", 1)
+    assert get_gate_snapshot()["counts"][DECISION_DEFERRED] == 2
+
+def test_idle_pool_always_admits(samples):
+    samples.append((99, 10))
+    assert admit("q1", "build", 0) == (True, 0)
+    assert get_gate_snapshot()["counts"] == {DECISION_ADMITTED: 1, DECISION_DEFERRED: 0}
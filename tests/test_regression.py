@@ -0,0 +1,72 @@
+import math
+import random
+
+import pytest
+
+from src.services.regression import (
+    new_quantile_sketch, update_quantile_sketch, quantile_value, new_duration_stats, update_duration_stats,
+    check_regression, MIN_BASELINE_RUNS, LOG_STD_FLOOR, Z_THRESHOLD,
+)
+
+def _sample_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[int(round(q * (len(ordered) - 1)))]
+
+@pytest.mark.parametrize("q", [0.5, 0.9])
+def test_sketch_tracks_sorted_sample_quantile(q):
+    rng = random.Random(42)
+    values = [rng.lognormvariate(2.0, 0.5) for _ in range(5000)]
+    sketch = new_quantile_sketch(q)
+    for value in values:
+        update_quantile_sketch(sketch, value)
+    assert quantile_value(sketch) == pytest.approx(_sample_quantile(values, q), rel=0.03)
+
+def test_sketch_with_few_values_is_exact():
+    sketch = new_quantile_sketch(0.5)
+    assert quantile_value(sketch) is None
+    for value in [5.0, 1.0, 3.0]:
+        update_quantile_sketch(sketch, value)
+    assert quantile_value(sketch) == 3.0
+
+def test_no_verdict_before_min_baseline_runs():
+    stats = new_duration_stats()
+    for _ in range(MIN_BASELINE_RUNS):
+        # 即使耗时突变也不判断
+        assert update_duration_stats(stats, 10.0) is None
+    assert check_regression(stats, 100.0) is not None
+
+def test_constant_durations_use_std_floor():
+    """耗时完全稳定时方差为0，z值按标准差下限计算，微小波动不判为回归"""
+    stats = new_duration_stats()
+    for _ in range(10):
+        update_duration_stats(stats, 10.0)
+    assert stats["ewmvar"] == pytest.approx(0.0)
+
+    verdict = check_regression(stats, 10.3)
+    assert verdict["z"] == pytest.approx(math.log(1.03) / LOG_STD_FLOOR, abs=0.01)
+    assert verdict["z"] < Z_THRESHOLD
+    assert not verdict["regression"]
+    assert check_regression(stats, 14.0)["regression"]
+
+def test_one_slow_run_is_flagged_and_baseline_run_after_is_not():
+    rng = random.Random(7)
+    stats = new_duration_stats()
+    for _ in range(30):
+        update_duration_stats(stats, rng.uniform(9.0, 11.0))
+
+    slow = update_duration_stats(stats, 30.0)
+    assert slow["regression"]
+    assert slow["baseline"] == pytest.approx(10.0, rel=0.1)
+    assert slow["ratio"] > 2.5
+
+    back = update_duration_stats(stats, 10.0)
+    assert not back["regression"]
+
+def test_short_tasks_ignore_small_absolute_changes():
+    """极短任务即使倍数变化大，多出的秒数不足 MIN_DELTA_SECONDS 也不判为回归"""
+    stats = new_duration_stats()
+    for _ in range(10):
+        update_duration_stats(stats, 0.05)
+    verdict = check_regression(stats, 0.2)
+    assert verdict["z"] >= Z_THRESHOLD
+    assert not verdict["regression"]
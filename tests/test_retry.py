@@ -0,0 +1,71 @@
+import pytest
+
+from src.services import retry
+from src.services.retry import build_policy, should_retry, backoff_delay, record_attempts, is_flaky, get_flakiness
+from src.services.task_runner import parse_timeout
+
+@pytest.fixture(autouse=True)
+def settings(tmp_path, monkeypatch):
+    """独立的重试配置与不稳定度统计"""
+    monkeypatch.setattr(retry, "_RETRY_SETTINGS", dict(
+        retry._RETRY_SETTINGS, tag_attempts={"net": 3, "ci": 2}, backoff=2.0, max_backoff=60.0, jitter=0.5,
+        flaky_threshold=0.3,
+    ))
+    monkeypatch.setattr(retry, "FLAKY_FILE", str(tmp_path / "flakiness.json"))
+    monkeypatch.setattr(retry, "_FLAKY", {})
+    monkeypatch.setattr(retry, "_FLAKY_LOADED", False)
+
+def test_policy_defaults_from_tags():
+    assert build_policy(None, [], parse_timeout) == {
+        "attempts": 1, "backoff": 2.0, "max_backoff": 60.0, "jitter": 0.5, "exit_codes": None,
+    }
+    assert build_policy(None, ["ci", "net", "web"], parse_timeout)["attempts"] == 3
+
+def test_policy_attempts_override_tags():
+    assert build_policy(5, ["net"], parse_timeout)["attempts"] == 5
+    assert build_policy(1, ["net"], parse_timeout)["attempts"] == 1
+    assert build_policy(0, [], parse_timeout)["attempts"] == 1
+    # 无法解析的值沿用标签策略
+    assert build_policy("many", ["net"], parse_timeout)["attempts"] == 3
+    assert build_policy(True, ["net"], parse_timeout)["attempts"] == 3
+
+def test_policy_from_dict():
+    policy = build_policy(
+        {"attempts": 4, "backoff": "500ms", "max_backoff": "1m", "jitter": 2, "exit_codes": [1, "255", "x"]},
+        ["net"], parse_timeout,
+    )
+    assert policy == {"attempts": 4, "backoff": 0.5, "max_backoff": 60.0, "jitter": 1.0, "exit_codes": [1, 255]}
+    assert build_policy({"max_attempts": 2, "on_exit_codes": 7}, [], parse_timeout)["exit_codes"] == [7]
+    # 无法解析的时长表示不等待
+    assert build_policy({"backoff": "soon"}, [], parse_timeout)["backoff"] == 0.0
+
+def test_should_retry():
+    policy = build_policy({"attempts": 3, "exit_codes": [1]}, [], parse_timeout)
+    assert should_retry(policy, {"status": "failed", "exit_code": 1}, 1)
+    assert should_retry(policy, {"status": "failed", "exit_code": 1}, 2)
+    assert not should_retry(policy, {"status": "failed", "exit_code": 1}, 3)
+    assert not should_retry(policy, {"status": "failed", "exit_code": 2}, 1)
+    for status in ("success", "cancelled", "timeout", "error"):
+        assert not should_retry(policy, {"status": status, "exit_code": 1}, 1)
+    assert should_retry(build_policy(2, [], parse_timeout), {"status": "failed", "exit_code": 137}, 1)
+
+def test_backoff_doubles_and_caps_without_jitter():
+    policy = dict(build_policy(None, [], parse_timeout), jitter=0.0, backoff=2.0, max_backoff=10.0)
+    assert [backoff_delay(policy, attempt) for attempt in range(1, 6)] == [2.0, 4.0, 8.0, 10.0, 10.0]
+
+def test_backoff_jitter_bounds(monkeypatch):
+    policy = dict(build_policy(None, [], parse_timeout), jitter=0.5, backoff=4.0)
+    monkeypatch.setattr(retry.random, "uniform", lambda low, high: low)
+    assert backoff_delay(policy, 2) == 4.0
+    monkeypatch.setattr(retry.random, "uniform", lambda low, high: high)
+    assert backoff_delay(policy, 2) == 12.0
+
+def test_flaky_after_retries_and_flips():
+    key = "Taskfile.yml::deploy"
+    assert record_attempts(key, ["success"]) == 0.0
+    assert record_attempts(key, ["failed", "success"]) == 0.5
+    assert not is_flaky(key)
+    record_attempts(key, ["failed"])
+    # 3次运行：1次重试后成功 + 1次结果翻转
+    assert get_flakiness(key) == pytest.approx(2 / 3, abs=1e-3)
+    assert is_flaky(key)
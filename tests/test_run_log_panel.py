@@ -0,0 +1,75 @@
+import codecs
+
+import pytest
+
+from src.components import run_log_panel
+from src.services.run_engine import OUTPUT_ENCODING, STATUS_RUNNING, STATUS_SUCCESS
+
+def _view():
+    return {
+        "offset": 0,
+        "decoder": codecs.getincrementaldecoder(OUTPUT_ENCODING)(errors="replace"),
+        "text": "",
+        "html": "",
+        "skipped": False,
+        "behind": True,
+        "done": False,
+    }
+
+@pytest.fixture
+def log(monkeypatch):
+    """用内存字节模拟日志，并记录大小查询次数"""
+    state = {"data": b"", "size_calls": 0, "tail_calls": 0}
+
+    def fake_tail(run_id, offset, max_bytes):
+        state["tail_calls"] += 1
+        end = min(len(state["data"]), offset + max_bytes)
+        return state["data"][offset:end], max(offset, end)
+
+    def fake_size(run_id):
+        state["size_calls"] += 1
+        return len(state["data"])
+
+    monkeypatch.setattr(run_log_panel, "tail_run_output", fake_tail)
+    monkeypatch.setattr(run_log_panel, "get_log_size", fake_size)
+    return state
+
+def test_steady_state_uses_tail_offset(log):
+    """追上之后只调用 tail，不再单独查询大小"""
+    view = _view()
+    log["data"] = b"hello\n"
+    assert run_log_panel._poll_run("r1", view, {"status": STATUS_RUNNING})
+    assert log["size_calls"] == 1
+    log["data"] += b"world\n"
+    assert run_log_panel._poll_run("r1", view, {"status": STATUS_RUNNING})
+    assert not run_log_panel._poll_run("r1", view, {"status": STATUS_RUNNING})
+    assert log["size_calls"] == 1
+    assert view["offset"] == len(log["data"])
+    assert view["text"] == "hello\nworld\n"
+
+def test_large_backlog_skips_to_tail(log):
+    """首次打开大日志时跳到末尾附近"""
+    view = _view()
+    log["data"] = b"x" * (run_log_panel.MAX_CATCHUP_BYTES * 3)
+    run_log_panel._poll_run("r1", view, {"status": STATUS_RUNNING})
+    assert view["skipped"]
+    assert view["offset"] == len(log["data"])
+
+def test_finished_run_stops_polling(log):
+    """运行结束且已读到最终大小后不再轮询"""
+    view = _view()
+    log["data"] = b"done\n"
+    record = {"status": STATUS_SUCCESS}
+    assert run_log_panel._poll_run("r1", view, record)
+    assert not view["done"]
+    assert not run_log_panel._poll_run("r1", view, record)
+    assert view["done"]
+    calls = log["tail_calls"]
+    assert not run_log_panel._poll_run("r1", view, record)
+    assert log["tail_calls"] == calls
+
+def test_running_run_keeps_polling(log):
+    """运行中即使暂时没有新输出也继续轮询"""
+    view = _view()
+    run_log_panel._poll_run("r1", view, {"status": STATUS_RUNNING})
+    assert not view["done"]
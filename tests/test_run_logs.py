@@ -0,0 +1,113 @@
+import os
+import gzip
+
+import pytest
+
+from src.services import run_logs
+
+@pytest.fixture(autouse=True)
+def log_dir(tmp_path, monkeypatch):
+    """日志写入临时目录，保留策略的修改只在测试内有效"""
+    monkeypatch.setattr(run_logs, "LOG_DIR", str(tmp_path))
+    monkeypatch.setattr(run_logs, "_RETENTION", dict(run_logs._RETENTION))
+    return tmp_path
+
+def _finished_log(run_id, data):
+    """写入一个已结束并已从内存移除的运行日志"""
+    run_logs.open_log(run_id)
+    run_logs.append(run_id, data)
+    run_logs.close_log(run_id)
+    run_logs.forget(run_id)
+
+def test_compressed_size_is_read_from_sidecar(log_dir, monkeypatch):
+    _finished_log("r1", b"x" * 5000)
+    assert sorted(os.listdir(log_dir)) == ["r1.log.gz", "r1.log.size"]
+
+    def no_decompress(*args, **kwargs):
+        raise AssertionError("读取大小时不应解压")
+
+    monkeypatch.setattr(run_logs.gzip, "open", no_decompress)
+    assert run_logs.get_log_size("r1") == 5000
+
+def test_legacy_log_without_sidecar(log_dir):
+    with gzip.open(log_dir / "old.log.gz", "wb") as f:
+        f.write(b"legacy output")
+    assert run_logs.get_log_size("old") == 13
+    assert (log_dir / "old.log.size").read_text() == "13"
+    assert run_logs.tail("old", 7) == (b"output", 13)
+
+def test_rotation_removes_sidecars(log_dir):
+    run_logs.configure_logs(max_files=1)
+    _finished_log("r1", b"first")
+    os.utime(log_dir / "r1.log.gz", (1, 1))
+    _finished_log("r2", b"second")
+    (log_dir / "orphan.log.size").write_text("3")
+    run_logs.rotate_logs()
+    assert sorted(os.listdir(log_dir)) == ["r2.log.gz", "r2.log.size"]
+
+@pytest.fixture
+def small_buffers(monkeypatch):
+    """缩小环形缓冲区，少量输出即可触发写盘"""
+    monkeypatch.setattr(run_logs, "RING_BUFFER_BYTES", 64)
+    monkeypatch.setattr(run_logs, "FINISHED_TAIL_BYTES", 16)
+
+DATA = bytes(range(256)) * 2
+
+def _read_all(run_id, chunk):
+    """按调用方的方式逐段读取：每次从上次返回的offset继续"""
+    data, offset = b"", 0
+    while True:
+        part, offset = run_logs.tail(run_id, offset, chunk)
+        if not part:
+            return data, offset
+        data += part
+
+def test_tail_spans_disk_and_ring_while_running(small_buffers):
+    run_logs.open_log("r1")
+    for index in range(0, len(DATA), 50):
+        run_logs.append("r1", DATA[index:index + 50])
+    log = run_logs._LOGS["r1"]
+    assert log["ring_start"] > 0
+    assert len(log["ring"]) <= run_logs.RING_BUFFER_BYTES
+    # 跨越已写盘部分与内存部分的读取
+    start = log["ring_start"] - 10
+    assert run_logs.tail("r1", start, 30) == (DATA[start:start + 30], start + 30)
+    assert _read_all("r1", 37) == (DATA, len(DATA))
+    run_logs.close_log("r1")
+
+def test_tail_offsets_are_stable_across_eviction(small_buffers):
+    run_logs.open_log("r1")
+    seen, offset = b"", 0
+    for index in range(0, len(DATA), 40):
+        run_logs.append("r1", DATA[index:index + 40])
+        part, offset = run_logs.tail("r1", offset)
+        seen += part
+    assert seen == DATA
+    assert run_logs.tail("r1", offset) == (b"", offset)
+    run_logs.close_log("r1")
+
+def test_tail_after_close_and_forget(small_buffers):
+    run_logs.open_log("r1")
+    run_logs.append("r1", DATA)
+    run_logs.close_log("r1")
+    # 已结束：内存只保留尾部，之前的部分从压缩文件读取
+    log = run_logs._LOGS["r1"]
+    assert len(log["ring"]) == run_logs.FINISHED_TAIL_BYTES
+    assert log["compressed"]
+    assert _read_all("r1", 100) == (DATA, len(DATA))
+    assert run_logs.read_last("r1", 20) == DATA[-20:]
+
+    run_logs.forget("r1")
+    assert run_logs.get_log_size("r1") == len(DATA)
+    assert run_logs.tail("r1", 500, 100) == (DATA[500:], len(DATA))
+    assert _read_all("r1", 64) == (DATA, len(DATA))
+    assert run_logs.read_last("r1", 20) == DATA[-20:]
+
+def test_tail_beyond_end_keeps_offset(small_buffers):
+    run_logs.open_log("r1")
+    run_logs.append("r1", b"abc")
+    assert run_logs.tail("r1", 10) == (b"", 10)
+    run_logs.close_log("r1")
+    run_logs.forget("r1")
+    assert run_logs.tail("r1", 10) == (b"", 10)
+    assert run_logs.tail("missing", 0) == (b"", 0)
@@ -0,0 +1,243 @@
+import itertools
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+from src.services import run_pool
+from src.services.run_pool import (
+    _sort_key, _effective_priority, _ordered_queue, _next_item, cancel_queued, move_queued, set_queued_priority,
+    parse_priority, priority_level, QUEUE_POLICY_FIFO, QUEUE_POLICY_PRIORITY, RESOURCE_SHARED, RESOURCE_EXCLUSIVE,
+)
+
+EPOCH = 1000.0
+
+@pytest.fixture(autouse=True)
+def pool(monkeypatch):
+    """独立的执行池状态：不启动调度线程，队列项直接写入队列"""
+    monkeypatch.setattr(run_pool, "_QUEUE", [])
+    monkeypatch.setattr(run_pool, "_ACTIVE", {})
+    monkeypatch.setattr(run_pool, "_EPOCH", EPOCH)
+    monkeypatch.setattr(run_pool, "_POOL_SETTINGS", dict(
+        run_pool._POOL_SETTINGS, max_workers=2, queue_policy=QUEUE_POLICY_PRIORITY, aging_seconds=60,
+        tag_limits={}, isolated_slots=1,
+    ))
+    monkeypatch.setattr(run_pool.time, "monotonic", lambda: EPOCH + 600)
+    monkeypatch.setattr(run_pool, "_SEQ", itertools.count())
+
+def _item(task, priority=5, submitted=0.0, tags=(), resources=None, isolated=False):
+    """构造排队项（submitted为相对老化基准的提交时间）"""
+    seq = next(run_pool._SEQ)
+    item = {
+        "item_id": f"q{seq}",
+        "seq": seq,
+        "task": task,
+        "priority": priority,
+        "tags": list(tags),
+        "isolated": isolated,
+        "resources": dict(resources or {}),
+        "future": Future(),
+        "queue_wait": None,
+        "resource_wait": 0.0,
+        "_submitted_monotonic": EPOCH + submitted,
+        "_contention_since": None,
+        "_contended": set(),
+        "_blocked_resources": [],
+    }
+    item["sort_key"] = _sort_key(item)
+    return item
+
+def _queue(*items):
+    run_pool._QUEUE.extend(items)
+    return items
+
+def _activate(*items):
+    for item in items:
+        item["queue_wait"] = 0.0
+        run_pool._ACTIVE[item["item_id"]] = item
+
+def _order():
+    return [item["task"] for item in _ordered_queue()]
+
+def test_priority_order_then_submission_order():
+    _queue(_item("low", 9), _item("high", 1), _item("mid-a", 5), _item("mid-b", 5))
+    assert _order() == ["high", "mid-a", "mid-b", "low"]
+
+def test_aging_lifts_long_waiting_items():
+    # 每等待60秒提升一级：等了300秒的priority 9与刚提交的priority 4相当，先提交的在前
+    _queue(_item("old", 9, submitted=0), _item("fresh", 4, submitted=300), _item("newer", 3, submitted=300))
+    assert _order() == ["newer", "old", "fresh"]
+    old = run_pool._QUEUE[0]
+    assert _effective_priority(old, EPOCH + 600) == pytest.approx(-1.0)
+
+@pytest.mark.parametrize("value, number", [
+    ("high", 1), ("Medium", 5), (" LOW ", 9), (2, 2.0), ("3.5", 3.5), (None, 5), ("urgent", 5), (True, 5),
+])
+def test_parse_priority(value, number):
+    assert parse_priority(value) == number
+
+@pytest.mark.parametrize("value, level", [
+    ("high", "high"), (1, "high"), (2.9, "high"), ("medium", "medium"), (5, "medium"), (7, "medium"),
+    ("low", "low"), (9, "low"), ("urgent", None), (None, None),
+])
+def test_priority_level(value, level):
+    assert priority_level(value) == level
+
+def test_no_aging_and_fifo_policy():
+    run_pool._POOL_SETTINGS["aging_seconds"] = 0
+    _queue(_item("old", 9, submitted=0), _item("fresh", 4, submitted=300))
+    assert _order() == ["fresh", "old"]
+    run_pool._POOL_SETTINGS["queue_policy"] = QUEUE_POLICY_FIFO
+    for item in run_pool._QUEUE:
+        item["sort_key"] = _sort_key(item)
+    assert _order() == ["old", "fresh"]
+
+def test_configure_pool_resorts_queue():
+    _queue(_item("a", 9, submitted=0), _item("b", 1, submitted=0))
+    assert _order() == ["b", "a"]
+    run_pool.configure_pool(queue_policy=QUEUE_POLICY_FIFO)
+    assert _order() == ["a", "b"]
+
+def test_next_item_respects_free_slots():
+    _activate(_item("r1"), _item("r2"))
+    _queue(_item("waiting", 1))
+    assert _next_item() is None
+    run_pool._ACTIVE.popitem()
+    assert _next_item()["task"] == "waiting"
+
+def test_tag_cap_skips_to_next_eligible_item():
+    run_pool._POOL_SETTINGS.update(max_workers=4, tag_limits={"gpu": 1})
+    _activate(_item("train", tags=["gpu"]))
+    _queue(_item("infer", 1, tags=["gpu", "ml"]), _item("docs", 5, tags=["web"]))
+    assert _next_item()["task"] == "docs"
+    assert run_pool._blocking_tags(run_pool._QUEUE[0]) == ["gpu"]
+    run_pool._ACTIVE.clear()
+    assert _next_item()["task"] == "infer"
+
+def test_isolated_slot_is_separate():
+    _activate(_item("r1"), _item("r2"))
+    flaky = _item("flaky", isolated=True)
+    _queue(_item("normal", 1), flaky)
+    assert _next_item() is flaky
+    _activate(flaky)
+    run_pool._QUEUE.remove(flaky)
+    assert _next_item() is None
+
+def test_shared_locks_coexist():
+    run_pool._POOL_SETTINGS["max_workers"] = 4
+    _activate(_item("reader-1", resources={"db": RESOURCE_SHARED}))
+    _queue(_item("reader-2", resources={"db": RESOURCE_SHARED}))
+    assert _next_item()["task"] == "reader-2"
+
+def test_exclusive_lock_conflicts_with_any_holder():
+    run_pool._POOL_SETTINGS["max_workers"] = 4
+    _activate(_item("reader", resources={"db": RESOURCE_SHARED}))
+    migrate = _item("migrate", 1, resources={"db": RESOURCE_EXCLUSIVE})
+    _queue(migrate, _item("other", 5, resources={"cache": RESOURCE_EXCLUSIVE}))
+    assert _next_item()["task"] == "other"
+    assert migrate["_blocked_resources"] == ["db"]
+    assert migrate["_contention_since"] == EPOCH + 600
+
+def test_waiting_exclusive_lock_reserves_resource():
+    # 等待独占锁的项预留资源，后来的共享锁请求不能插队
+    run_pool._POOL_SETTINGS["max_workers"] = 4
+    _activate(_item("reader-1", resources={"db": RESOURCE_SHARED}))
+    _queue(_item("migrate", 1, resources={"db": RESOURCE_EXCLUSIVE}),
+           _item("reader-2", 5, resources={"db": RESOURCE_SHARED}))
+    assert _next_item() is None
+    run_pool._ACTIVE.clear()
+    assert _next_item()["task"] == "migrate"
+
+def test_cancel_queued():
+    first, second = _queue(_item("a"), _item("b"))
+    assert cancel_queued(first["item_id"])
+    assert first["future"].cancelled()
+    assert _order() == ["b"]
+    assert not cancel_queued(first["item_id"])
+    assert not cancel_queued("missing")
+
+def test_move_queued_swaps_with_neighbour():
+    _queue(_item("a", 1), _item("b", 5), _item("c", 9))
+    b = run_pool._QUEUE[1]
+    assert move_queued(b["item_id"], -1)
+    assert _order() == ["b", "a", "c"]
+    assert move_queued(b["item_id"], 1)
+    assert move_queued(b["item_id"], 1)
+    assert _order() == ["a", "c", "b"]
+    # 已在末尾或偏移为0时不移动
+    assert not move_queued(b["item_id"], 1)
+    assert not move_queued(b["item_id"], 0)
+    assert not move_queued("missing", -1)
+
+def test_move_queued_with_equal_keys():
+    _queue(_item("a"), _item("b"), _item("c"))
+    assert move_queued(run_pool._QUEUE[2]["item_id"], -1)
+    assert _order() == ["a", "c", "b"]
+
+def test_set_queued_priority_keeps_aging():
+    _queue(_item("a", 5, submitted=0), _item("b", 5, submitted=120))
+    b = run_pool._QUEUE[1]
+    assert set_queued_priority(b["item_id"], 2)
+    assert b["sort_key"] == pytest.approx(4.0)
+    assert _order() == ["b", "a"]
+
+def test_submit_and_complete_through_dispatcher(monkeypatch):
+    """经过调度线程的完整流程：按优先级启动，完成时写入排队信息"""
+    monkeypatch.setattr(run_pool.time, "monotonic", run_pool.time.perf_counter)
+    run_pool._POOL_SETTINGS["max_workers"] = 1
+    started = []
+    first_started = threading.Event()
+    blocker = Future()
+
+    def launch(name):
+        def start(on_complete):
+            started.append(name)
+            first_started.set()
+            if name == "first":
+                blocker.add_done_callback(lambda _: on_complete({"task": name, "status": "success"}))
+            else:
+                on_complete({"task": name, "status": "success"})
+            return name
+        return start
+
+    futures = [run_pool.submit_run("first", launch("first"), priority=5)]
+    assert first_started.wait(5)
+    futures.append(run_pool.submit_run("later", launch("later"), priority=5))
+    futures.append(run_pool.submit_run("urgent", launch("urgent"), priority=1))
+    blocker.set_result(None)
+    records = [future.result(timeout=5) for future in futures]
+    assert started == ["first", "urgent", "later"]
+    assert all(record["status"] == "success" and record["queue_wait"] is not None for record in records)
+
+def test_launch_failure_with_full_queue_does_not_deadlock(monkeypatch):
+    """启动失败时完成回调以阻塞方式重新提交，队列已满也不能卡住调度线程"""
+    monkeypatch.setattr(run_pool.time, "monotonic", run_pool.time.perf_counter)
+    run_pool._POOL_SETTINGS.update(max_workers=1, max_queue_size=1)
+    taken = threading.Event()
+    queue_full = threading.Event()
+    resubmitted = Future()
+
+    def failing_launch(on_complete):
+        taken.set()
+        assert queue_full.wait(5)
+        raise OSError("Popen failed")
+
+    def launch(on_complete):
+        on_complete({"status": "success"})
+        return "run"
+
+    failing = run_pool.submit_run("failing", failing_launch)
+    failing.add_done_callback(
+        lambda _: resubmitted.set_result(run_pool.submit_run("follow-up", launch, block=True, timeout=5)))
+    # 调度线程取走failing后再填满队列
+    assert taken.wait(5)
+    waiting = run_pool.submit_run("waiting", launch)
+    assert waiting is not None
+    queue_full.set()
+
+    with pytest.raises(OSError):
+        failing.result(timeout=5)
+    assert waiting.result(timeout=5)["status"] == "success"
+    follow_up = resubmitted.result(timeout=10)
+    assert follow_up is not None
+    assert follow_up.result(timeout=5)["status"] == "success"
@@ -0,0 +1,165 @@
+from concurrent.futures import Future
+
+import pytest
+
+from src.services.scheduler import (
+    build_run_graph, topological_order, start_dag_run, get_dag_run, plan_dag_run,
+    simulate_list_schedule, plan_parallel_batch, track_parallel_batch, list_parallel_batches,
+    NODE_SUCCESS, NODE_FAILED, NODE_SKIPPED, NODE_RUNNING, DEFAULT_DURATION_ESTIMATE,
+)
+
+# build -> (compile, assets)，compile -> gen，assets -> gen，gen无依赖；test -> build
+TASK_DEPS = {
+    "gen": [],
+    "compile": ["gen"],
+    "assets": [{"task": "gen"}],
+    "build": ["compile", "assets", "remote:setup"],
+    "test": ["build"],
+    "lint": [],
+}
+
+def test_build_run_graph_collects_transitive_deps():
+    graph = build_run_graph(TASK_DEPS, ["build"])
+    assert graph["nodes"] == {
+        "build": {"compile", "assets"},
+        "compile": {"gen"},
+        "assets": {"gen"},
+        "gen": set(),
+    }
+    assert graph["external"] == ["remote:setup"]
+    order = graph["order"]
+    assert order.index("gen") < order.index("compile") < order.index("build")
+    assert order.index("assets") < order.index("build")
+
+def test_build_run_graph_shares_common_dep():
+    graph = build_run_graph(TASK_DEPS, ["test", "lint", "compile"])
+    assert sorted(graph["order"]) == ["assets", "build", "compile", "gen", "lint", "test"]
+    assert graph["order"].count("gen") == 1
+
+def test_cycle_is_reported():
+    with pytest.raises(ValueError, match="循环依赖: a -> b -> c -> a"):
+        build_run_graph({"a": ["b"], "b": ["c"], "c": ["a"]}, ["a"])
+
+def test_self_dependency_is_a_cycle():
+    with pytest.raises(ValueError):
+        topological_order({"a": {"a"}})
+
+def _start(selected, satisfied=None):
+    """启动DAG运行，返回 (dag_id, 提交记录)；提交记录为 任务名 -> Future，由测试决定何时完成"""
+    submitted = {}
+
+    def submit(name):
+        submitted[name] = Future()
+        return submitted[name]
+
+    plan = plan_dag_run(TASK_DEPS, selected, {}, max_workers=4)
+    return start_dag_run(plan, submit, satisfied=satisfied), submitted
+
+def _finish(submitted, name, status):
+    submitted[name].set_result({"run_id": name, "status": status, "exit_code": 0 if status == "success" else 1,
+                                "duration": 1.0})
+
+def test_dag_runs_shared_dep_once_in_dependency_order():
+    dag_id, submitted = _start(["test"])
+    assert list(submitted) == ["gen"]
+    _finish(submitted, "gen", "success")
+    assert set(submitted) == {"gen", "compile", "assets"}
+    _finish(submitted, "compile", "success")
+    assert "build" not in submitted
+    _finish(submitted, "assets", "success")
+    _finish(submitted, "build", "success")
+    _finish(submitted, "test", "success")
+    dag = get_dag_run(dag_id)
+    assert dag["status"] == NODE_SUCCESS
+    assert len(submitted) == 5
+
+def test_failure_skips_only_downstream():
+    dag_id, submitted = _start(["test", "lint"])
+    assert set(submitted) == {"gen", "lint"}
+    _finish(submitted, "gen", "success")
+    _finish(submitted, "compile", "failed")
+    nodes = get_dag_run(dag_id)["nodes"]
+    assert nodes["compile"]["status"] == NODE_FAILED
+    assert nodes["build"]["status"] == NODE_SKIPPED
+    assert nodes["test"]["status"] == NODE_SKIPPED
+    assert nodes["build"]["reason"] == "依赖 compile 失败"
+    # 独立分支不受影响，DAG在它们结束后才整体结束
+    assert nodes["assets"]["status"] == NODE_RUNNING
+    assert nodes["lint"]["status"] == NODE_RUNNING
+    _finish(submitted, "assets", "success")
+    _finish(submitted, "lint", "success")
+    dag = get_dag_run(dag_id)
+    assert dag["status"] == NODE_FAILED
+    assert dag["nodes"]["lint"]["status"] == NODE_SUCCESS
+    assert "build" not in submitted
+
+def test_rejected_submit_fails_node():
+    plan = plan_dag_run(TASK_DEPS, ["compile"], {}, max_workers=1)
+    dag_id = start_dag_run(plan, lambda name: None)
+    nodes = get_dag_run(dag_id)["nodes"]
+    assert nodes["gen"] == dict(nodes["gen"], status=NODE_FAILED, reason="执行队列已满")
+    assert nodes["compile"]["status"] == NODE_SKIPPED
+
+def test_satisfied_nodes_are_not_run():
+    dag_id, submitted = _start(["compile"], satisfied={"gen", "compile"})
+    assert submitted == {}
+    assert get_dag_run(dag_id)["status"] == NODE_SUCCESS
+
+def test_satisfied_node_runs_when_dep_must_run():
+    dag_id, submitted = _start(["compile"], satisfied={"compile"})
+    assert list(submitted) == ["gen"]
+    _finish(submitted, "gen", "success")
+    assert "compile" in submitted
+    assert get_dag_run(dag_id)["nodes"]["compile"]["status"] == NODE_RUNNING
+
+# 短任务先选中、长任务最后：按选择顺序提交时长任务最后才开始
+BATCH = ["a", "b", "c", "d", "e"]
+BATCH_DURATIONS = {"a": 1.0, "b": 1.0, "c": 1.0, "d": 1.0, "e": 4.0}
+
+def test_list_schedule_uses_first_free_slot():
+    timeline, makespan = simulate_list_schedule(BATCH, BATCH_DURATIONS, 2)
+    assert timeline == {"a": (0, 1), "b": (0, 1), "c": (1, 2), "d": (1, 2), "e": (2, 6)}
+    assert makespan == 6.0
+    assert simulate_list_schedule([], {}, 2) == ({}, 0.0)
+
+def test_parallel_batch_longest_first():
+    plan = plan_parallel_batch(BATCH, BATCH_DURATIONS, 2)
+    assert plan["order"] == ["e", "a", "b", "c", "d"]
+    assert plan["timeline"] == {"e": (0, 4), "a": (0, 1), "b": (1, 2), "c": (2, 3), "d": (3, 4)}
+    assert plan["makespan"] == 4.0
+    assert plan["baseline_makespan"] == 6.0
+    assert plan["estimated"] == BATCH
+
+def test_parallel_batch_default_estimates_and_ties():
+    plan = plan_parallel_batch(["x", "y", "z"], {"x": None, "z": 20.0}, 1)
+    assert plan["durations"] == {"x": DEFAULT_DURATION_ESTIMATE, "y": DEFAULT_DURATION_ESTIMATE, "z": 20.0}
+    # 耗时相同的任务保持选择顺序
+    assert plan["order"] == ["z", "x", "y"]
+    assert plan["estimated"] == ["z"]
+    assert plan["makespan"] == plan["baseline_makespan"] == 20.0 + 2 * DEFAULT_DURATION_ESTIMATE
+
+def test_parallel_batch_orders_within_priority():
+    priorities = {"a": 1, "b": 1, "c": 5, "d": 5, "e": 5}
+    plan = plan_parallel_batch(BATCH, dict(BATCH_DURATIONS, b=3.0), 2, priority=priorities.get)
+    assert plan["order"] == ["b", "a", "e", "c", "d"]
+
+def test_track_parallel_batch_records_actual_completion():
+    plan = plan_parallel_batch(BATCH, BATCH_DURATIONS, 2)
+    futures = {name: Future() for name in BATCH}
+    futures["d"] = None
+    batch_id = track_parallel_batch(plan, futures)
+    futures["e"].set_result({"status": "success", "duration": 4.2})
+    batch = next(batch for batch in list_parallel_batches() if batch["batch_id"] == batch_id)
+    assert set(batch["tasks"]) == {"a", "b", "c", "e"}
+    assert batch["tasks"]["e"]["predicted_end"] == 4.0
+    assert batch["tasks"]["e"]["status"] == "success"
+    assert batch["tasks"]["a"]["actual_end"] is None
+    assert batch["status"] == "running"
+    futures["a"].cancel()
+    for name in ("b", "c"):
+        futures[name].set_result({"status": "failed", "duration": 1.0})
+    batch = next(batch for batch in list_parallel_batches() if batch["batch_id"] == batch_id)
+    assert batch["status"] == "finished"
+    assert batch["tasks"]["a"]["status"] == "cancelled"
+    assert batch["actual_makespan"] is not None
+    assert track_parallel_batch(plan, {name: None for name in BATCH}) is None
@@ -0,0 +1,95 @@
+import threading
+
+import pytest
+
+from src.services import shell_pool, run_engine, run_logs
+from src.services.shell_pool import acquire_shell, release_shell, execute, run_in_shell
+
+pytestmark = pytest.mark.skipif(not shell_pool.is_supported(), reason="常驻shell仅支持POSIX")
+
+@pytest.fixture(autouse=True)
+def pool(tmp_path, monkeypatch):
+    """独立的shell池（启用、保持1个空闲shell），运行日志写入临时目录"""
+    monkeypatch.setattr(run_logs, "LOG_DIR", str(tmp_path / "logs"))
+    monkeypatch.setattr(shell_pool, "_IDLE_SHELLS", [])
+    monkeypatch.setattr(shell_pool, "_POOL_STATS", dict.fromkeys(shell_pool._POOL_STATS, 0))
+    monkeypatch.setattr(shell_pool, "_SHELL_POOL_SETTINGS", dict(shell_pool._SHELL_POOL_SETTINGS, enabled=True, size=1))
+    yield
+    shell_pool.close_idle_shells()
+
+@pytest.fixture
+def shell():
+    shell = acquire_shell()
+    yield shell
+    shell_pool._close_shell(shell)
+
+def _run(shell, script, cwd):
+    output = []
+    exit_code = execute(shell, script, str(cwd), on_output=output.append)
+    return exit_code, b"".join(output).decode("utf-8")
+
+def test_output_resembling_marker(shell, tmp_path, monkeypatch):
+    # 很小的读取块让结束标记跨越多次读取
+    monkeypatch.setattr(shell_pool, "READ_CHUNK_SIZE", 5)
+    fake = "__TASKGUI_DONE_0123456789abcdef0123456789abcdef__0"
+    exit_code, output = _run(shell, f"echo '{fake}'; printf '__TASKGUI_DONE_'; echo tail", tmp_path)
+    assert exit_code == 0
+    assert output == f"{fake}\n__TASKGUI_DONE_tail\n"
+    # shell仍可继续使用
+    assert _run(shell, "echo again", tmp_path) == (0, "again\n")
+
+def test_nonzero_exit_keeps_shell(shell, tmp_path):
+    assert _run(shell, "echo before; exit 3; echo after", tmp_path) == (3, "before\n")
+    assert _run(shell, "false", tmp_path)[0] == 1
+    # 语法错误让eval失败，但结束标记照常输出
+    assert _run(shell, "if then", tmp_path)[0] != 0
+    assert shell["process"].poll() is None
+    assert _run(shell, "pwd", tmp_path) == (0, f"{tmp_path}\n")
+
+def test_cwd_and_env_do_not_leak(shell, tmp_path):
+    (tmp_path / "sub").mkdir()
+    assert _run(shell, "cd sub; export LEAK=1", tmp_path) == (0, "")
+    output = []
+    assert execute(shell, 'echo "$GREETING"', str(tmp_path), env={"GREETING": "hi there"}, on_output=output.append) == 0
+    assert output == [b"hi there\n"]
+    # 目录切换和导出的变量只在子shell中生效
+    assert _run(shell, 'pwd; echo "[$LEAK][$GREETING]"', tmp_path) == (0, f"{tmp_path}\n[][]\n")
+
+def test_cancel_kills_shell_and_pool_replaces_it(tmp_path):
+    shell_pool.warm_shells()
+    original = shell_pool._IDLE_SHELLS[0]
+    done = threading.Event()
+    records = []
+
+    def on_complete(record):
+        records.append(record)
+        done.set()
+
+    run_id = run_in_shell("slow", None, "echo started; sleep 30", str(tmp_path), on_complete=on_complete)
+    assert shell_pool._IDLE_SHELLS == []
+    assert run_engine.cancel_run(run_id, grace=1)
+    assert done.wait(10)
+    assert records[0]["status"] == run_engine.STATUS_CANCELLED
+    assert records[0]["meta"]["shell_pool"]
+    assert original["process"].wait(timeout=5) is not None
+
+    # 被终止的shell不再放回池中，随后补充一个新的空闲shell
+    for _ in range(100):
+        with shell_pool._POOL_LOCK:
+            idle = list(shell_pool._IDLE_SHELLS)
+        if idle:
+            break
+        threading.Event().wait(0.05)
+    assert len(idle) == 1 and idle[0] is not original
+    assert idle[0]["process"].poll() is None
+    stats = shell_pool.get_shell_pool_stats()
+    assert stats["broken"] == 1 and stats["created"] == 2
+
+def test_recycled_after_max_commands(tmp_path):
+    shell_pool._SHELL_POOL_SETTINGS["max_commands"] = 2
+    shell = acquire_shell()
+    for _ in range(2):
+        assert _run(shell, "true", tmp_path)[0] == 0
+    release_shell(shell)
+    assert shell["process"].wait(timeout=5) is not None
+    assert shell_pool.get_shell_pool_stats()["recycled"] == 1
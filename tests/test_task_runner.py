@@ -0,0 +1,94 @@
+from collections import deque
+from concurrent.futures import Future
+
+import pytest
+
+from src.services import retry, task_runner
+from src.services.task_runner import parse_timeout, parse_tag_limits, submit_task_run, get_task_priority
+
+@pytest.mark.parametrize("value, seconds", [
+    (30, 30.0),
+    (1.5, 1.5),
+    ("45", 45.0),
+    ("90s", 90.0),
+    ("5m", 300.0),
+    ("1h30m", 5400.0),
+    ("1h 30m 15s", 5415.0),
+    ("250ms", 0.25),
+    ("1m500ms", 60.5),
+    ("2.5m", 150.0),
+    (" 10S ", 10.0),
+])
+def test_parse_timeout(value, seconds):
+    assert parse_timeout(value) == pytest.approx(seconds)
+
+@pytest.mark.parametrize("value", [None, True, False, 0, -5, "", "0s", "abc", "5x", "m5", "1h-2m"])
+def test_parse_timeout_rejects(value):
+    assert parse_timeout(value) is None
+
+def test_parse_tag_limits():
+    assert parse_tag_limits("gpu=1, net=2") == {"gpu": 1, "net": 2}
+    assert parse_tag_limits({"gpu": 2}) == {"gpu": 2}
+    assert parse_tag_limits("gpu=x，net=0; =3\ndb = 4") == {"db": 4}
+
+def test_named_priorities_order_before_default(tmp_path):
+    taskfile = tmp_path / "Taskfile.yml"
+    taskfile.write_text("""version: '3'
+tasks:
+  deploy: {priority: high, cmds: [echo]}
+  docs: {priority: low, cmds: [echo]}
+  build: {priority: 2, cmds: [echo]}
+  lint: {cmds: [echo]}
+""", encoding="utf-8")
+    priorities = {name: get_task_priority(name, str(taskfile)) for name in ["deploy", "docs", "build", "lint"]}
+    assert priorities == {"deploy": 1, "docs": 9, "build": 2.0, "lint": 5}
+    assert get_task_priority("deploy") == 5
+
+@pytest.fixture
+def retrying(tmp_path, monkeypatch):
+    """失败后最多尝试3次、不等待；记录保存的运行结果"""
+    monkeypatch.setattr(retry, "FLAKY_FILE", str(tmp_path / "flakiness.json"))
+    monkeypatch.setattr(retry, "_FLAKY", {})
+    monkeypatch.setattr(retry, "_FLAKY_LOADED", False)
+    monkeypatch.setattr(task_runner, "_RUN_OUTCOMES", deque())
+    monkeypatch.setattr(task_runner, "resolve_retry_policy",
+                        lambda task_name, taskfile_path=None: retry.build_policy(3, [], parse_timeout))
+    monkeypatch.setattr(task_runner, "backoff_delay", lambda policy, attempt: 0)
+    return task_runner._RUN_OUTCOMES
+
+def _finished(record):
+    future = Future()
+    future.set_result(record)
+    return future
+
+@pytest.mark.parametrize("failure", [RuntimeError("pool stopped"), None])
+def test_retry_submit_failure_resolves_with_last_record(retrying, monkeypatch, failure):
+    """重试提交抛出异常或被拒绝时，返回的Future以最后一次失败的记录结束"""
+    attempts = []
+
+    def submit_run(task_name, launch, **kwargs):
+        attempts.append(kwargs["meta"]["attempt"])
+        if len(attempts) == 1:
+            return _finished({"task": task_name, "status": "failed", "exit_code": 1})
+        if failure is not None:
+            raise failure
+        return None
+
+    monkeypatch.setattr(task_runner, "submit_run", submit_run)
+    record = submit_task_run("flaky", direct=False, default_timeout=0, priority=5).result(timeout=5)
+    assert attempts == [1, 2]
+    assert record["status"] == "failed"
+    assert record["attempt"] == 1
+    assert "retry_in" not in record
+    assert record["retry_error"] == (str(failure) if failure else "执行队列已满")
+    # 失败的那次尝试只保存一次
+    assert len(retrying) == 1
+
+def test_retry_until_success(retrying, monkeypatch):
+    statuses = iter(["failed", "failed", "success"])
+    monkeypatch.setattr(task_runner, "submit_run", lambda task_name, launch, **kwargs: _finished(
+        {"task": task_name, "status": next(statuses), "exit_code": 1}))
+    record = submit_task_run("flaky", direct=False, default_timeout=0, priority=5).result(timeout=5)
+    assert (record["status"], record["attempt"], record["max_attempts"]) == ("success", 3, 3)
+    assert [outcome["status"] for outcome in retrying] == ["failed", "failed", "success"]
+    assert record["flakiness"] > 0